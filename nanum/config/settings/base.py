@@ -108,6 +108,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # 3rd-party
     'raven.contrib.django.raven_compat',
     'rest_framework',
@@ -121,9 +122,11 @@ INSTALLED_APPS = [
     'users',
     'posts',
     'topics',
+    'search',
 ]
 
 MIDDLEWARE = [
+    'utils.query_budget.QueryBudgetMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -168,6 +171,26 @@ STREAM_API_SECRET = config_secret_common['getstream']['api_secret']
 
 # Celery
 # CELERY_BROKER_URL = 'amqp://localhost'
+CELERY_BEAT_SCHEDULE = {
+    'flush-counter-buffer': {
+        'task': 'flush_counter_buffer',
+        'schedule': 5.0,
+    },
+    'reconcile-counters': {
+        'task': 'reconcile_counters',
+        'schedule': 60.0 * 10,
+    },
+    # incremental 모드는 relation 삭제로 줄어든 count를 찾지 못하므로 하루에 한 번 전체를 다시 계산
+    'reconcile-all-counters': {
+        'task': 'reconcile_counters',
+        'schedule': 60.0 * 60 * 24,
+        'kwargs': {'full': True},
+    },
+    'drain-search-outbox': {
+        'task': 'drain_search_outbox',
+        'schedule': 2.0,
+    },
+}
 
 # CORS
 CORS_ORIGIN_ALLOW_ALL = False
@@ -183,3 +206,114 @@ USE_I18N = True
 USE_L10N = True
 USE_TZ = True
 DEBUG = True
+
+# Answer Feed
+# 팔로워 수(expert_count + interest_count)가 이 값 이상인 토픽의 답변은 fan-out 하지 않고 피드를 읽을 때 pull
+FEED_FANOUT_TOPIC_FOLLOWER_LIMIT = 10000
+FEED_FANOUT_BATCH_SIZE = 1000
+# 새로 팔로우 했을 때 Timeline에 채워넣을 최근 답변의 최대 개수
+FEED_BACKFILL_LIMIT = 200
+
+# Answer Image
+# 답변의 base64 이미지가 처리되기 전까지 저장되는 local 디렉토리 (None일 경우 시스템 temp 디렉토리 사용)
+QUILL_IMAGE_SPOOL_DIR = None
+# Celery broker가 없을 때 background task를 실행할 thread 수
+TASK_RUNNER_THREAD_POOL_SIZE = 4
+# 답변에 포함될 수 있는 base64 이미지의 최대 크기(byte)와 최대 픽셀 수
+QUILL_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+QUILL_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+# decode된 이미지가 이 크기를 넘으면 메모리 대신 temp 파일에 기록
+QUILL_IMAGE_SPOOL_MEMORY_SIZE = 1024 * 1024
+
+# Image Resize
+# /img/<key>/<width>x<height>/ 로 요청할 수 있는 (가로, 세로) 크기
+IMAGE_RESIZE_SIZES = ((25, 25), (50, 50), (100, 100), (200, 200), (400, 400))
+# resize 된 이미지가 저장되는 storage 경로
+IMAGE_RESIZE_CACHE_LOCATION = 'resized'
+IMAGE_RESIZE_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Counter Buffer
+# True일 경우 추천/팔로우/북마크/댓글 count 변경을 바로 UPDATE 하지 않고 buffer에 모았다가 주기적으로 반영
+COUNTER_BUFFER_ENABLED = False
+# RedisCounterBuffer: 여러 process가 공유 (Celery beat으로 flush)
+# LocalCounterBuffer: process 메모리 - 다른 process의 delta를 볼 수 없으므로 process가 하나인 개발, 테스트 환경에서만 사용
+COUNTER_BUFFER_BACKEND = 'utils.counter_buffer.RedisCounterBuffer'
+COUNTER_BUFFER_SHARDS = 16
+COUNTER_BUFFER_REDIS_URL = None
+# LocalCounterBuffer를 현재 process의 thread에서 flush 하는 간격(초), 0일 경우 직접 flush 할 때와 process 종료 시에만 반영
+COUNTER_BUFFER_FLUSH_INTERVAL = 5
+
+# Representation Cache
+# True일 경우 Answer, Question, Topic의 viewer와 상관없는 serialize 결과를 (model, pk, modified_at) 단위로 cache
+REPRESENTATION_CACHE_ENABLED = False
+# LocalRepresentationCache: process 메모리(LRU) - CELERY_BROKER_URL이 있을 경우 사용 불가
+# RedisRepresentationCache: 여러 process(web, Celery worker)가 공유
+REPRESENTATION_CACHE_BACKEND = 'utils.representation_cache.LocalRepresentationCache'
+REPRESENTATION_CACHE_REDIS_URL = None
+REPRESENTATION_CACHE_TIMEOUT = 60 * 60
+# LocalRepresentationCache에 저장할 최대 객체 수
+REPRESENTATION_CACHE_MAX_ENTRIES = 10000
+# serialize 결과의 형태가 바뀌는 배포 시 증가시켜 기존 cache를 사용하지 않도록 함
+REPRESENTATION_CACHE_VERSION = 1
+
+# Counter Reconciliation
+# count 필드들을 실제 개수로 다시 계산할 때 쿼리 한 번에 처리할 pk 범위
+RECONCILE_COUNTERS_CHUNK_SIZE = 10000
+# CounterReconcileRun 기록을 보관하는 기간(일)
+RECONCILE_COUNTERS_HISTORY_DAYS = 7
+
+# Comment Tree
+# mptt: django-mptt의 lft/rght, path: materialized path (같은 thread에 동시에 쓰는 요청이 많을 경우)
+# 변경 시 manage.py migrate_comment_tree --to <backend> 로 기존 트리를 변환
+COMMENT_TREE_BACKEND = 'mptt'
+
+# Query Budget
+# 요청마다 쿼리 수, DB 시간을 Server-Timing header와 'nanum.query_budget' log로 기록
+# 요청의 모든 쿼리를 debug cursor로 기록하므로 운영 환경(dev, deploy)에서는 끄고 local, travis에서만 켬
+QUERY_BUDGET_ENABLED = False
+# 같은 모양의 쿼리가 한 요청에서 이 횟수 이상 실행되면 N+1 의심 쿼리로 기록
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = 5
+# url name 별 최대 쿼리 수 - view class의 query_budget 속성이 우선
+QUERY_BUDGETS = {
+    'post:answer:answer-list': 10,
+    'post:answer:answer-main': 15,
+    'post:question:list': 10,
+    'post:question:main-feed': 15,
+    'topic:topic-list': 10,
+    'user:user-followers': 10,
+    'user:user-followings': 10,
+    'user:following-interests': 10,
+    'user:following-expertise': 10,
+}
+# True일 경우 budget을 넘긴 요청에서 QueryBudgetExceeded (test 환경)
+QUERY_BUDGET_ENFORCE = False
+
+# Search
+# 검색 backend - Elasticsearch를 사용하지 않을 경우 'search.backends.PostgresSearchBackend'
+SEARCH_BACKEND = 'search.backends.ElasticsearchSearchBackend'
+ELASTICSEARCH_HOSTS = ['localhost:9200']
+ELASTICSEARCH_TIMEOUT = 10
+# host 별 connection pool 크기
+ELASTICSEARCH_MAXSIZE = 10
+# reindex 명령으로 만든 index의 색인이 끝난 후 replica 수
+ELASTICSEARCH_NUMBER_OF_REPLICAS = 1
+# False일 경우 Answer, Question, Topic, User의 변경 사항을 search outbox에 쌓지 않음
+# None일 경우 SEARCH_BACKEND가 Elasticsearch index를 사용할 때만 쌓음 (PostgresSearchBackend는 쌓지 않음)
+SEARCH_INDEXING_ENABLED = None
+# drain_search_outbox task가 bulk 요청 한 번에 처리할 outbox row 수와 task 한 번에 처리할 최대 batch 수
+SEARCH_OUTBOX_BATCH_SIZE = 500
+SEARCH_OUTBOX_MAX_BATCHES = 20
+# Celery broker가 없을 때 현재 process에서 outbox를 처리하는 간격(초)
+SEARCH_OUTBOX_DRAIN_INTERVAL = 2
+# 검색 API의 type 별 기본, 최대 페이지 크기와 type 없이 검색할 때 type 별 결과 수
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGE_SIZE = 50
+SEARCH_PREVIEW_SIZE = 3
+# autocomplete API의 기본, 최대 결과 수
+AUTOCOMPLETE_SIZE = 10
+AUTOCOMPLETE_MAX_SIZE = 20
+# autocomplete 결과를 process 메모리에 저장하는 시간(초, 0일 경우 저장하지 않음)과 최대 검색어 수
+AUTOCOMPLETE_CACHE_TIMEOUT = 60
+AUTOCOMPLETE_CACHE_MAX_ENTRIES = 5000
+# Elasticsearch 요청이 실패한 후 이 시간(초) 동안은 요청하지 않고 PostgreSQL에서 검색
+AUTOCOMPLETE_ELASTICSEARCH_RETRY_INTERVAL = 5
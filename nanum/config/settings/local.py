@@ -16,3 +16,5 @@ INSTALLED_APPS += [
     'django_extensions',
 ]
 
+# 요청마다 쿼리 수, N+1 의심 쿼리를 기록
+QUERY_BUDGET_ENABLED = True
@@ -14,3 +14,7 @@ DATABASES = {
         "PASSWORD": ""
     }
 }
+
+# test에서 view의 query budget을 넘기면 실패
+QUERY_BUDGET_ENABLED = True
+QUERY_BUDGET_ENFORCE = True
@@ -0,0 +1,246 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.transaction import atomic
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from utils import (
+    ResizedImageField, backfill_image_digests, compute_image_digest, decode_image_key, encode_image_key,
+    get_resized_image_url,
+)
+from topics.models import Topic
+from utils import get_representation_cache, invalidate_representations
+from utils.query_budget import QueryBudgetExceeded, fingerprint_sql
+
+User = get_user_model()
+
+
+def create_image_data(color='red', size=(300, 300)):
+    image_file = BytesIO()
+    Image.new('RGB', size, color=color).save(image_file, 'PNG')
+    return image_file.getvalue()
+
+
+class ResizedImageTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.data = create_image_data()
+        self.digest = compute_image_digest(self.data)
+        self.name = default_storage.save('topic/image.png', ContentFile(self.data))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_key_contains_name_and_digest(self):
+        """
+        key로 name, digest를 되돌릴 수 있고, 변조된 key는 BadSignature인지 확인
+        :return:
+        """
+        key = encode_image_key(self.name, self.digest)
+        self.assertEqual(decode_image_key(key), (self.name, self.digest))
+        self.assertNotEqual(key, encode_image_key(self.name, compute_image_digest(b'other')))
+        with self.assertRaises(signing.BadSignature):
+            decode_image_key(key[:-2])
+
+    def test_resized_image_response(self):
+        """
+        resize 된 JPEG와 digest ETag, immutable Cache-Control이 반환되고 If-None-Match에 304로 응답하는지 확인
+        :return:
+        """
+        url = get_resized_image_url(self.name, 50, 50, digest=self.digest)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['ETag'], f'"{self.digest}-50x50"')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(Image.open(BytesIO(response.content)).size, (50, 50))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"{self.digest}-50x50"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_size_not_in_whitelist(self):
+        """
+        IMAGE_RESIZE_SIZES에 없는 크기는 404인지 확인
+        :return:
+        """
+        url = get_resized_image_url(self.name, 51, 50, digest=self.digest)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_replaced_image_changes_url(self):
+        """
+        같은 name의 원본이 교체되면 url이 바뀌고, 이전 url로 새 원본을 resize 하지 않는지 확인
+        :return:
+        """
+        old_url = get_resized_image_url(self.name, 100, 100, digest=self.digest)
+        default_storage.delete(self.name)
+        new_data = create_image_data(color='blue')
+        default_storage.save(self.name, ContentFile(new_data))
+
+        new_url = get_resized_image_url(self.name, 100, 100, digest=compute_image_digest(new_data))
+        self.assertNotEqual(old_url, new_url)
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+
+    @override_settings(IMAGE_RESIZE_SIZES=((50, 50), (200, 200)))
+    def test_resized_image_field(self):
+        """
+        ResizedImageField가 모델에 저장된 digest로 크기별 url을 만들고, 이미지가 없을 경우 None인지 확인
+        :return:
+        """
+
+        class ImageSerializer(serializers.Serializer):
+            resized_image = ResizedImageField()
+
+        instance = SimpleNamespace(image=SimpleNamespace(name=self.name), image_digest=self.digest)
+        resized_image = ImageSerializer(instance).data['resized_image']
+        self.assertEqual(list(resized_image), ['50x50', '200x200'])
+        self.assertEqual(resized_image['200x200'], get_resized_image_url(self.name, 200, 200, digest=self.digest))
+
+        instance = SimpleNamespace(image=SimpleNamespace(name=''), image_digest='')
+        self.assertIsNone(ImageSerializer(instance).data['resized_image'])
+
+        # digest가 저장되지 않은 경우 원본을 읽지 않고 None
+        instance = SimpleNamespace(image=SimpleNamespace(name=self.name), image_digest='')
+        self.assertIsNone(ImageSerializer(instance).data['resized_image'])
+
+        class SmallImageSerializer(serializers.Serializer):
+            resized_image = ResizedImageField(max_size=(100, 100))
+
+        instance = SimpleNamespace(image=SimpleNamespace(name=self.name), image_digest=self.digest)
+        self.assertEqual(list(SmallImageSerializer(instance).data['resized_image']), ['50x50'])
+
+    def test_backfill_image_digests(self):
+        """
+        digest가 비어있는 row만 원본을 읽어 digest를 저장하는지 확인
+        :return:
+        """
+        user = User.objects.create_user(email='abc1@abc.com', password='password', name='abc1')
+        topic = Topic.objects.create(creator=user, name='토픽', image=self.name)
+        other = Topic.objects.create(creator=user, name='다른 토픽', image=self.name, image_digest='stored')
+        Topic.objects.create(creator=user, name='이미지 없는 토픽')
+
+        self.assertEqual(backfill_image_digests(Topic.objects.all()), (1, 0))
+        topic.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((topic.image_digest, other.image_digest), (self.digest, 'stored'))
+        self.assertEqual(backfill_image_digests(Topic.objects.all()), (0, 0))
+
+
+class QueryBudgetTest(APITestCase):
+    URL_API_TOPIC_LIST = '/topic/'
+
+    def setUp(self):
+        user = User.objects.create_user(email='abc1@abc.com', password='password', name='abc1')
+        self.client.force_authenticate(user=user)
+
+    def test_fingerprint_sql(self):
+        """
+        문자열, 숫자 literal과 길이가 다른 IN list가 같은 fingerprint로 바뀌는지 확인
+        :return:
+        """
+        self.assertEqual(
+            fingerprint_sql("SELECT *  FROM \"topics_topic\"\n WHERE \"name\" = 'it''s' AND \"id\" = 3 LIMIT 10"),
+            'SELECT * FROM "topics_topic" WHERE "name" = ? AND "id" = ? LIMIT ?',
+        )
+        self.assertEqual(
+            fingerprint_sql('SELECT * FROM "topics_topic" WHERE "id" IN (1, 2, 3)'),
+            fingerprint_sql('SELECT * FROM "topics_topic" WHERE "id" IN (4)'),
+        )
+        self.assertEqual(
+            fingerprint_sql('SELECT * FROM "topics_topic" WHERE "id" IN (1, 2.5)'),
+            'SELECT * FROM "topics_topic" WHERE "id" IN (?...)',
+        )
+
+    @override_settings(QUERY_BUDGET_ENABLED=False)
+    def test_middleware_disabled(self):
+        """
+        QUERY_BUDGET_ENABLED가 False일 경우 header를 추가하지 않는지 확인
+        :return:
+        """
+        response = self.client.get(self.URL_API_TOPIC_LIST)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ENFORCE=False,
+                       QUERY_BUDGETS={'topic:topic-list': 100})
+    def test_middleware_header_and_log(self):
+        """
+        Server-Timing header와 view 이름, budget, 쿼리 수가 담긴 info log가 기록되는지 확인
+        :return:
+        """
+        with self.assertLogs('nanum.query_budget', level='INFO') as logs:
+            response = self.client.get(self.URL_API_TOPIC_LIST)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$')
+
+        self.assertEqual([log.levelname for log in logs.records], ['INFO'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['view'], record['budget'], record['status']), ('topic:topic-list', 100, 200))
+        self.assertGreater(record['queries'], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"', response['Server-Timing'])
+        self.assertEqual(record['n_plus_one'], [])
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ENFORCE=False,
+                       QUERY_BUDGETS={'topic:topic-list': 0}, QUERY_BUDGET_N_PLUS_ONE_THRESHOLD=1)
+    def test_middleware_warning_over_budget(self):
+        """
+        budget을 넘기거나 N+1 의심 쿼리가 있을 경우 warning으로 기록되는지 확인
+        :return:
+        """
+        with self.assertLogs('nanum.query_budget', level='INFO') as logs:
+            self.client.get(self.URL_API_TOPIC_LIST)
+        self.assertEqual([log.levelname for log in logs.records], ['WARNING'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['queries'], record['budget'])
+        self.assertTrue(record['n_plus_one'])
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ENFORCE=True,
+                       QUERY_BUDGETS={'topic:topic-list': 0})
+    def test_middleware_enforce(self):
+        """
+        QUERY_BUDGET_ENFORCE가 True일 경우 budget을 넘긴 요청이 QueryBudgetExceeded인지 확인
+        :return:
+        """
+        with self.assertLogs('nanum.query_budget', level='WARNING'):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.URL_API_TOPIC_LIST)
+
+
+@override_settings(REPRESENTATION_CACHE_ENABLED=True, CELERY_BROKER_URL=None,
+                   REPRESENTATION_CACHE_BACKEND='utils.representation_cache.LocalRepresentationCache')
+class RepresentationCacheTest(TransactionTestCase):
+    def test_invalidate_after_commit(self):
+        """
+        transaction 안에서 invalidate 할 경우 commit 이후에 cache가 삭제되는지 확인
+        :return:
+        """
+        cache = get_representation_cache()
+        key = (Topic._meta.label, 1)
+        cache.set(key, 'variant', {'name': 'old'})
+        with atomic():
+            invalidate_representations(Topic, [1])
+            self.assertEqual(cache.get_many([key], 'variant'), {key: {'name': 'old'}})
+        self.assertEqual(cache.get_many([key], 'variant'), {})
+
+    @override_settings(CELERY_BROKER_URL='amqp://localhost')
+    def test_local_cache_refused_with_broker(self):
+        """
+        worker가 따로 실행되는 환경(CELERY_BROKER_URL)에서 process 메모리 cache를 사용할 수 없는지 확인
+        :return:
+        """
+        with self.assertRaises(ImproperlyConfigured):
+            get_representation_cache()
+        with override_settings(REPRESENTATION_CACHE_ENABLED=False):
+            self.assertIsNone(get_representation_cache())
@@ -16,6 +16,7 @@ urlpatterns = [
     url(r'^topic/', include('topics.urls', namespace='topic')),
     url(r'^search/', include('search.urls', namespace='search')),
     url(r'^api-token-auth/', rest_views.obtain_auth_token),
+    url(r'^img/(?P<key>[\w-]+)/(?P<width>\d+)x(?P<height>\d+)/$', views.resized_image, name='image-resize'),
 ]
 
 # test
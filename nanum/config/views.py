@@ -1,7 +1,47 @@
-from django.http import HttpResponse
+from django.conf import settings
+from django.core import signing
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from django.shortcuts import render
+from django.views.decorators.http import require_safe
+
+from utils import decode_image_key, get_resized_image
 
 
 # test views
 def index(request):
     return render(request, 'index.html')
+
+
+@require_safe
+def resized_image(request, key, width, height):
+    """
+    /img/<key>/<width>x<height>/
+    key에 해당하는 원본 이미지를 width x height(IMAGE_RESIZE_SIZES 중 하나)로 resize 하여 반환
+    key에 원본 내용의 digest가 포함되어 있으므로 같은 url의 응답은 바뀌지 않음
+    resize 결과는 storage에 cache 되며, digest로 만든 ETag와 긴 immutable Cache-Control을 설정
+    """
+    width, height = int(width), int(height)
+    # 임의의 크기로 resize 결과가 storage에 쌓이지 않도록 정해진 크기만 허용
+    if (width, height) not in settings.IMAGE_RESIZE_SIZES:
+        raise Http404
+    try:
+        name, digest = decode_image_key(key)
+    except signing.BadSignature:
+        raise Http404
+
+    etag = f'"{digest}-{width}x{height}"'
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            data = get_resized_image(name, width, height, digest)
+        except (IOError, OSError):
+            raise Http404
+        # 원본이 교체되어 key의 digest와 내용이 다른 이전 url
+        if data is None:
+            raise Http404
+        response = HttpResponse(data, content_type='image/jpeg')
+
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={settings.IMAGE_RESIZE_CACHE_MAX_AGE}, immutable'
+    return response
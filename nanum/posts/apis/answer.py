@@ -8,6 +8,7 @@ from rest_framework.exceptions import ParseError
 from utils.permissions import IsAuthorOrAuthenticatedReadOnly
 from ..models import Answer
 from ..serializers.answer import AnswerUpdateSerializer, AnswerPostSerializer, AnswerGetSerializer
+from ..utils import feed
 from ..utils.filters import AnswerFilter
 from ..utils.pagination import ListPagination
 
@@ -45,7 +46,7 @@ class AnswerListCreateView(generics.ListCreateAPIView):
         """
         query_params = self.request.query_params.keys()
         values = self.request.query_params.values()
-        filter_fields = self.filter_class.get_fields().keys() | {'ordering', 'page'}
+        filter_fields = self.filter_class.get_fields().keys() | {'ordering', 'page', 'page_size', 'cursor'}
 
         # 만약 query parameter가 왔는데 value가 오지 않았을 경우
         # 혹은 query parameter가 왔는데 존재하지 않는 query parameter인 경우
@@ -103,7 +104,7 @@ class AnswerRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 class AnswerMainFeedListView(generics.ListCreateAPIView):
     """
     유저를 위한 주 답변 Feed
-    1. Topic, Follower를 기반으로 개인화된 피드 생성
+    1. Topic, Follower를 기반으로 개인화된 피드 생성 - posts.utils.feed 의 fan-out Timeline 사용
     2. +추후 Like 정보 추가
     3. +추후 CF Filtering / Content-based Filtering 적용
     """
@@ -116,26 +117,14 @@ class AnswerMainFeedListView(generics.ListCreateAPIView):
     def get_queryset(self):
         """
         GenericAPIView의 get_queryset override
-        Queryset을 필터하여 피드에 들어갈 내용을 반환
+        답변 publish 시점에 fan-out 되어 있는 유저의 피드 Timeline을 최신순으로 반환
         :return:
         """
         user = self.request.user
+        # ?page= 로 요청할 경우 전체 개수가 필요하므로 하나로 합친 queryset, 그 외에는 KeysetPagination이 합치는 queryset list
+        if self.paginator.page_number_query_param in self.request.query_params:
+            querysets = [feed.get_feed_queryset(user)]
+        else:
+            querysets = feed.get_feed_querysets(user)
 
-        # 유저가 팔로우 하고 있는 토픽들의 목록
-        answer_topic_interest = user.topic_interests.values_list('id', flat=True)
-        answer_topic_expertise = user.topic_expertise.values_list('id', flat=True)
-        following_topics = answer_topic_interest | answer_topic_expertise
-
-        # 유저가 팔로우 하고 있는 사람들의 목록
-        following_users = user.following.values_list('id', flat=True)
-
-        # 팔로우하고 있는 사람들이 작성한 글과 팔로우 하고 있는 토픽에 쓰여있는 글들을 최신순으로 정렬
-        queryset = Answer.objects.exclude(user=user) \
-            .filter(published=True, question__topics__in=following_topics) \
-            .filter(published=True, user__in=following_users) \
-            .order_by('modified_at')
-
-        if not queryset:
-            queryset = Answer.objects.filter(published=True)
-
-        return queryset
+        return querysets[0] if len(querysets) == 1 else querysets
@@ -1,12 +1,14 @@
 from django_filters import rest_framework as filters
 from rest_framework import generics, permissions
 from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.response import Response
 
 from utils.permissions import IsAuthorOrAuthenticatedReadOnly
 from ..models import Comment
-from ..serializers import CommentSerializer, CommentCreateSerializer
+from ..serializers import CommentSerializer, CommentCreateSerializer, CommentThreadSerializer, CommentTreeSerializer
+from ..utils import comment_tree
 from ..utils.filters import CommentFilter, CommentListFilter
-from ..utils.pagination import CommentPagination, ListPagination
+from ..utils.pagination import CommentPagination, CommentTreePagination, ListPagination
 
 __all__ = (
     'CommentListCreateView',
@@ -14,10 +16,35 @@ __all__ = (
 )
 
 
+def _is_mode_request(request, mode):
+    return request.method == 'GET' and request.query_params.get(mode, '').lower() in ('true', '1')
+
+
+def is_tree_request(request):
+    return _is_mode_request(request, 'tree') or _is_mode_request(request, 'thread')
+
+
+def is_thread_request(request):
+    return _is_mode_request(request, 'thread')
+
+
+def get_tree_context(view, comments):
+    """
+    트리에 포함된 Comment들에 대한 유저의 추천/비추천을 한 번에 가져와 serializer context에 포함
+    """
+    context = view.get_serializer_context()
+    context['comment_votes'] = comment_tree.get_viewer_votes(view.request.user, comments)
+    return context
+
+
 class CommentListCreateView(generics.ListCreateAPIView):
     """
     Comment List, Create API View
     Comment가 달린 Answer 혹은 Question의 정보를 string 포맷으로 반환 - "<post_type> - <post_pk>" 형식으로 표현
+
+    ?tree=true 일 경우 페이지의 최상위 Comment들 아래의 모든 Comment를 쿼리 한 번으로 가져와
+    children에 중첩된 형태로 반환
+    ?thread=true 일 경우 최상위 Comment들 아래로 depth 단계까지 node 마다 replies개의 children만 반환
     """
     queryset = Comment.objects.filter(parent=None)
     permission_classes = (
@@ -37,7 +64,8 @@ class CommentListCreateView(generics.ListCreateAPIView):
         query_params = self.request.query_params.keys()
         values = self.request.query_params.values()
         filter_fields = self.filter_class.get_fields().keys() | \
-                        {'ordering', 'page', 'user', 'question', 'answer'}
+                        {'ordering', 'page', 'page_size', 'cursor', 'user', 'question', 'answer', 'tree',
+                         'thread', 'depth', 'replies'}
 
         # 만약 query parameter가 왔는데 value가 오지 않았을 경우
         if "" in list(values):
@@ -49,6 +77,33 @@ class CommentListCreateView(generics.ListCreateAPIView):
 
         return super().filter_queryset(queryset)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if is_tree_request(self.request):
+            queryset = queryset.select_related(*comment_tree.TREE_RELATED_FIELDS)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not is_tree_request(request):
+            return super().list(request, *args, **kwargs)
+
+        if is_thread_request(request):
+            return self.list_thread(request)
+
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        comments = comment_tree.attach_descendants(page)
+        serializer = CommentTreeSerializer(page, many=True, context=get_tree_context(self, comments))
+        return self.get_paginated_response(serializer.data)
+
+    def list_thread(self, request):
+        depth, replies = comment_tree.get_thread_params(request.query_params)
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        comments = comment_tree.attach_thread(page, depth, replies)
+        context = get_tree_context(self, comments)
+        context['thread_params'] = (depth, replies)
+        serializer = CommentThreadSerializer(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
     def get_serializer(self, *args, **kwargs):
         if self.request.method == 'POST':
             serializer_class = CommentCreateSerializer
@@ -63,6 +118,11 @@ class CommentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     """
     Comment Retrieve, Update, Destroy API View
     Author 일 경우 Update, Destroy가 가능하고 Authenticated 일 경우 Get이 가능
+
+    ?tree=true 일 경우 Comment의 subtree 전체를 쿼리 한 번으로 가져와
+    바로 아래 children을 메모리에서 paginate 하여 중첩된 형태로 반환
+    ?thread=true 일 경우 Comment 아래로 depth 단계까지 node 마다 replies개의 children만 반환하며,
+    continuation이 주어질 경우 이미 보여준 children 이후의 children을 이어서 반환
     """
     queryset = Comment.objects.all()
     permission_classes = (
@@ -73,6 +133,39 @@ class CommentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     filter_backends = (filters.DjangoFilterBackend,)
     filter_class = CommentFilter
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if is_tree_request(self.request):
+            return queryset.select_related(*comment_tree.TREE_RELATED_FIELDS)
+        # 수정/삭제 시 comment_count를 변경할 post를 쿼리 없이 알 수 있도록 함께 가져옴
+        return queryset.select_related('comment_post_intermediate')
+
+    def retrieve(self, request, *args, **kwargs):
+        if not is_tree_request(request):
+            return super().retrieve(request, *args, **kwargs)
+
+        if is_thread_request(request):
+            return self.retrieve_thread(request)
+
+        instance = self.get_object()
+        comments = comment_tree.get_subtree(instance)
+        paginator = CommentTreePagination()
+        instance.tree_children = paginator.paginate_queryset(instance.tree_children, request, view=self)
+        data = CommentTreeSerializer(instance, context=get_tree_context(self, comments)).data
+        data['children'] = paginator.get_paginated_response(data['children']).data
+        return Response(data)
+
+    def retrieve_thread(self, request):
+        depth, replies = comment_tree.get_thread_params(request.query_params)
+        instance = self.get_object()
+        after = None
+        if 'continuation' in request.query_params:
+            after = comment_tree.decode_continuation(request.query_params['continuation'], instance)
+        comments = comment_tree.attach_thread([instance], depth, replies, after=after)
+        context = get_tree_context(self, comments)
+        context['thread_params'] = (depth, replies)
+        return Response(CommentThreadSerializer(instance, context=context).data)
+
     def filter_queryset(self, queryset):
         """
         GenericAPIView의 filter_queryset override
@@ -83,7 +176,8 @@ class CommentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         query_params = self.request.query_params.keys()
         values = self.request.query_params.values()
         filter_fields = self.filter_class.get_fields().keys() | \
-                        {'ordering', 'page', 'immediate_children', 'all_children'}
+                        {'ordering', 'page', 'page_size', 'cursor', 'immediate_children', 'all_children', 'tree',
+                         'thread', 'depth', 'replies', 'continuation'}
 
         # 만약 query parameter가 왔는데 value가 오지 않았을 경우
         if "" in list(values):
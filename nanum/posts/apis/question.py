@@ -33,7 +33,7 @@ class QuestionListCreateView(generics.ListCreateAPIView):
     def filter_queryset(self, queryset):
         query_params = self.request.query_params.keys()
         value = self.request.query_params.values()
-        filter_fields = self.filter_class.get_fields().keys() | {'ordering', 'page'}
+        filter_fields = self.filter_class.get_fields().keys() | {'ordering', 'page', 'page_size', 'cursor'}
         error = None
 
         if "" in list(value):
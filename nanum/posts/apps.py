@@ -3,6 +3,3 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
-
-    def ready(self):
-        import search.indexes.answer
@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.utils import feed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = '유저들의 답변 메인 피드 Timeline을 팔로우 중인 유저/토픽의 최근 답변으로 채워넣음'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, nargs='*', dest='user_pks',
+                            help='backfill 할 유저의 pk, 주어지지 않을 경우 모든 유저')
+
+    def handle(self, *args, **options):
+        user_pks = options['user_pks'] or User.objects.values_list('pk', flat=True).iterator()
+        total = 0
+        for user_pk in user_pks:
+            created = feed.backfill_user_feed(user_pk)
+            total += created
+            self.stdout.write(f'user {user_pk}: {created} entries')
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {total} feed entries'))
@@ -0,0 +1,60 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from posts.utils.benchmark import compare_results, get_endpoints, run_benchmark
+from posts.utils.benchmark_data import get_benchmark_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = '목록 API들의 응답 시간(p50/p95)과 쿼리 수를 측정하여 JSON으로 저장하고 baseline과 비교 ' \
+           '(seed_benchmark_data로 데이터를 생성한 DB에서 실행)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, dest='user_pk',
+                            help='요청을 보낼 유저의 pk, 주어지지 않을 경우 팔로우가 가장 많은 benchmark 유저')
+        parser.add_argument('--iterations', type=int, default=20, dest='iterations')
+        parser.add_argument('--warmup', type=int, default=3, dest='warmup')
+        parser.add_argument('--endpoint', nargs='*', dest='endpoints',
+                            help='측정할 endpoint 이름, 주어지지 않을 경우 전체')
+        parser.add_argument('--output', dest='output', default='benchmark.json',
+                            help='결과를 저장할 JSON 파일')
+        parser.add_argument('--compare', dest='compare',
+                            help='비교할 baseline JSON 파일 - 회귀가 있을 경우 실패')
+        parser.add_argument('--threshold', type=float, default=0.2, dest='threshold',
+                            help='허용하는 p95 증가 비율')
+
+    def handle(self, *args, **options):
+        if options['user_pk']:
+            user = User.objects.filter(pk=options['user_pk']).first()
+        else:
+            user = get_benchmark_users().annotate(
+                following_total=Count('following_relations')).order_by('-following_total', 'pk').first()
+        if user is None:
+            raise CommandError('요청을 보낼 유저가 없습니다. seed_benchmark_data를 먼저 실행하세요.')
+
+        endpoints = get_endpoints(user)
+        if options['endpoints']:
+            endpoints = [endpoint for endpoint in endpoints if endpoint.name in options['endpoints']]
+
+        result = run_benchmark(user, endpoints, iterations=options['iterations'], warmup=options['warmup'])
+        for name, endpoint in result['endpoints'].items():
+            self.stdout.write(
+                f'{name}: {endpoint["status"]}, {endpoint["queries"]} queries, '
+                f'p50 {endpoint["p50"]:.1f}ms, p95 {endpoint["p95"]:.1f}ms'
+            )
+        with open(options['output'], 'w') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        self.stdout.write(f'saved to {options["output"]}')
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = compare_results(baseline, result, threshold=options['threshold'])
+            if regressions:
+                raise CommandError('Regressions:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}'))
@@ -0,0 +1,100 @@
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.transaction import atomic
+from django.test import override_settings
+
+from posts.models import Comment, CommentPostIntermediate
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = '여러 writer가 같은 thread에 동시에 Comment를 추가할 때의 처리량을 Comment 트리 저장 방식별로 비교 ' \
+           '(benchmark용 DB에서 실행)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, dest='writers',
+                            help='동시에 Comment를 추가하는 thread 수')
+        parser.add_argument('--inserts', type=int, default=50, dest='inserts',
+                            help='writer 당 추가할 Comment 수')
+        parser.add_argument('--backend', nargs='*', choices=('mptt', 'path'), default=['mptt', 'path'],
+                            dest='backends', help='비교할 저장 방식')
+        parser.add_argument('--question', type=int, dest='question_pk',
+                            help='Comment를 추가할 질문의 pk, 주어지지 않을 경우 첫번째 질문')
+        parser.add_argument('--keep', action='store_true', dest='keep',
+                            help='benchmark 후 추가한 Comment를 삭제하지 않음')
+
+    def handle(self, *args, **options):
+        intermediates = CommentPostIntermediate.objects.exclude(question=None)
+        if options['question_pk']:
+            intermediates = intermediates.filter(question=options['question_pk'])
+        intermediate = intermediates.first()
+        user = User.objects.first()
+        if intermediate is None or user is None:
+            raise CommandError('Comment를 추가할 질문과 유저가 필요합니다.')
+
+        for backend in options['backends']:
+            with override_settings(COMMENT_TREE_BACKEND=backend):
+                result = self._run(backend, intermediate, user, options)
+            self.stdout.write(
+                f'{backend}: {result["count"]} inserts, {result["throughput"]:.1f} inserts/s, '
+                f'p50 {result["p50"]:.1f}ms, p95 {result["p95"]:.1f}ms, errors {result["errors"]}'
+            )
+
+    def _run(self, backend, intermediate, user, options):
+        root = Comment.objects.create(user=user, content=f'benchmark - {backend}',
+                                      comment_post_intermediate=intermediate)
+        parent_pks = [root.pk]
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def write():
+            try:
+                for i in range(options['inserts']):
+                    with lock:
+                        parent_pk = random.choice(parent_pks)
+                    started_at = time.perf_counter()
+                    try:
+                        with atomic():
+                            parent = Comment.objects.get(pk=parent_pk)
+                            comment = Comment.objects.create(
+                                user=user, content=f'benchmark reply {i}',
+                                comment_post_intermediate=intermediate, parent=parent)
+                    except Exception as e:
+                        with lock:
+                            errors.append(e)
+                        continue
+                    elapsed = time.perf_counter() - started_at
+                    with lock:
+                        latencies.append(elapsed)
+                        parent_pks.append(comment.pk)
+            finally:
+                # thread마다 생성된 DB connection 정리
+                connections.close_all()
+
+        threads = [threading.Thread(target=write) for _ in range(options['writers'])]
+        started_at = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started_at
+
+        if not options['keep']:
+            Comment.objects.get(pk=root.pk).delete()
+
+        latencies.sort()
+        return {
+            'count': len(latencies),
+            'throughput': len(latencies) / elapsed if elapsed else 0,
+            'p50': statistics.median(latencies) * 1000 if latencies else 0,
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else 0,
+            'errors': len(errors),
+        }
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.db.transaction import atomic
+
+from posts.models import Comment
+from posts.utils import comment_storage
+
+
+class Command(BaseCommand):
+    help = 'Comment 트리 저장 방식(COMMENT_TREE_BACKEND)을 바꾸기 위해 기존 트리 column을 변환'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', choices=('path', 'mptt'), required=True, dest='to',
+                            help='path: MPTT column으로 tree_path 계산, mptt: tree_path로 MPTT column 계산')
+        parser.add_argument('--chunk-size', type=int, default=1000, dest='chunk_size',
+                            help='쿼리 한 번에 처리할 tree 범위 (path 변환 시 tree_id, mptt 변환 시 최상위 Comment pk)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        total = 0
+        if options['to'] == 'mptt':
+            max_root_id = Comment.objects.filter(parent=None).aggregate(max_root_id=Max('pk'))['max_root_id'] or 0
+            for start in range(0, max_root_id + 1, chunk_size):
+                end = start + chunk_size - 1
+                with atomic():
+                    updated = comment_storage.build_mptt_from_paths(root_ids=(start, end))
+                total += updated
+                self.stdout.write(f'root {start}-{end}: {updated} comments')
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt MPTT columns of {total} comments'))
+            return
+
+        max_tree_id = Comment.objects.aggregate(max_tree_id=Max('tree_id'))['max_tree_id'] or 0
+        for start in range(0, max_tree_id + 1, chunk_size):
+            end = start + chunk_size - 1
+            with atomic():
+                updated = comment_storage.build_paths_from_mptt(tree_ids=(start, end))
+            total += updated
+            self.stdout.write(f'tree {start}-{end}: {updated} comments')
+        self.stdout.write(self.style.SUCCESS(f'Built tree_path of {total} comments'))
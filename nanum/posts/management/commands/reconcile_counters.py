@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from posts.utils import reconcile
+
+
+class Command(BaseCommand):
+    help = '답변/질문/댓글/토픽/프로필의 count 필드들을 실제 개수로 다시 계산'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', dest='dry_run',
+                            help='UPDATE 하지 않고 저장된 값과 실제 값이 다른 row만 출력')
+        parser.add_argument('--since', dest='since',
+                            help='주어진 시각(ISO 8601) 이후 변경된 row만 다시 계산')
+        parser.add_argument('--incremental', action='store_true', dest='incremental',
+                            help='마지막으로 실행된 시각 이후 변경된 row만 다시 계산')
+        parser.add_argument('--chunk-size', type=int, dest='chunk_size',
+                            help='쿼리 한 번에 처리할 pk 범위')
+        parser.add_argument('--model', nargs='*', dest='labels',
+                            help='다시 계산할 model label (예: posts.Answer), 주어지지 않을 경우 모든 model')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f'올바르지 않은 시각입니다: {options["since"]}')
+
+        specs = None
+        if options['labels']:
+            specs = [spec for spec in reconcile.get_counter_specs() if spec.model._meta.label in options['labels']]
+            if not specs:
+                raise CommandError(f'count 필드를 가진 model이 아닙니다: {", ".join(options["labels"])}')
+
+        if options['incremental'] and since is None:
+            result = reconcile.reconcile_changed_counters(
+                specs=specs,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+        elif since is None and specs is None:
+            result = reconcile.reconcile_all_counters(
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+        else:
+            result = reconcile.reconcile_counters(
+                specs=specs,
+                since=since,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+
+        total = 0
+        for (label, field), diffs in result.items():
+            total += len(diffs)
+            self.stdout.write(f'{label}.{field}: {len(diffs)} rows')
+            if options['dry_run']:
+                for pk, stored, actual in diffs:
+                    self.stdout.write(f'  pk {pk}: {stored} -> {actual}')
+        verb = 'Found' if options['dry_run'] else 'Reconciled'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {total} drifted counters'))
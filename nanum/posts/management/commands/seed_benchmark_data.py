@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from posts.utils.benchmark_data import BenchmarkScale, clear_benchmark_data, seed_benchmark_data
+
+
+class Command(BaseCommand):
+    help = 'API benchmark용 유저, 토픽, 질문, 답변, Comment 트리, 추천, 팔로우 데이터를 대량으로 생성 ' \
+           '(benchmark용 DB에서 실행)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, dest='users')
+        parser.add_argument('--topics', type=int, default=2000, dest='topics')
+        parser.add_argument('--questions', type=int, default=100000, dest='questions')
+        parser.add_argument('--answers', type=float, default=3, dest='answers',
+                            help='질문 당 평균 답변 수')
+        parser.add_argument('--delta-lines', type=int, default=5, dest='delta_lines',
+                            help='답변 당 Quill delta operation 수')
+        parser.add_argument('--comments', type=float, default=3, dest='comments',
+                            help='질문/답변 당 평균 Comment 수')
+        parser.add_argument('--comment-depth', type=int, default=4, dest='comment_depth',
+                            help='Comment 트리의 최대 depth')
+        parser.add_argument('--votes', type=float, default=5, dest='votes',
+                            help='답변/Comment 당 평균 추천 수')
+        parser.add_argument('--follows', type=float, default=20, dest='follows',
+                            help='유저 당 평균 팔로우 수')
+        parser.add_argument('--feed-users', type=int, default=100, dest='feed_users',
+                            help='피드를 backfill 할 유저 수')
+        parser.add_argument('--seed', type=int, default=0, dest='seed')
+        parser.add_argument('--batch-size', type=int, default=5000, dest='batch_size')
+        parser.add_argument('--clear', action='store_true', dest='clear',
+                            help='생성하기 전 기존 benchmark 데이터를 삭제')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_benchmark_data()
+            self.stdout.write('cleared benchmark data')
+
+        scale = BenchmarkScale(**{field: options[field] for field in BenchmarkScale._fields})
+        result = seed_benchmark_data(
+            scale, seed=options['seed'], batch_size=options['batch_size'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded ' + ', '.join(f'{count} {name}' for name, count in result.items())
+        ))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0038_answer_content_preview_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerFeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modified_at', models.DateTimeField()),
+                ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='posts.Answer')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='answerfeedentry',
+            unique_together=set([('user', 'answer')]),
+        ),
+        migrations.AddIndex(
+            model_name='answerfeedentry',
+            index=models.Index(fields=['user', '-modified_at'], name='posts_feed_user_modified_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0039_answerfeedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='tree_path',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=1100),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0040_comment_tree_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commentpostintermediate',
+            name='post_type',
+            field=models.CharField(blank=True, choices=[('question', 'Question'), ('answer', 'Answer')], editable=False, max_length=10),
+        ),
+        migrations.RunSQL(
+            sql="UPDATE posts_commentpostintermediate SET post_type = CASE "
+                "WHEN question_id IS NOT NULL THEN 'question' "
+                "WHEN answer_id IS NOT NULL THEN 'answer' "
+                "ELSE '' END",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# content_html의 tag와 자주 쓰이는 entity를 제거하여 content_text를, content_text로 search_vector를 만드는 trigger
+# content_html을 queryset.update로 바꾸는 경우(이미지 처리 등)에도 반영되도록 DB에서 처리
+ANSWER_TRIGGER_SQL = """
+CREATE FUNCTION posts_answer_search_update() RETURNS trigger AS $$
+BEGIN
+    NEW.content_text := btrim(regexp_replace(
+        replace(replace(replace(replace(replace(
+            regexp_replace(NEW.content_html, '<[^>]+>', ' ', 'g'),
+            '&nbsp;', ' '), '&lt;', '<'), '&gt;', '>'), '&quot;', '"'), '&amp;', '&'),
+        '\\s+', ' ', 'g'));
+    NEW.search_vector := to_tsvector('pg_catalog.simple', NEW.content_text);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER posts_answer_search_update
+    BEFORE INSERT OR UPDATE OF content_html ON posts_answer
+    FOR EACH ROW EXECUTE PROCEDURE posts_answer_search_update();
+"""
+
+QUESTION_TRIGGER_SQL = """
+CREATE TRIGGER posts_question_search_update
+    BEFORE INSERT OR UPDATE OF content ON posts_question
+    FOR EACH ROW EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.simple', content);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0041_commentpostintermediate_post_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='content_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql=ANSWER_TRIGGER_SQL,
+            reverse_sql="DROP TRIGGER IF EXISTS posts_answer_search_update ON posts_answer; "
+                        "DROP FUNCTION IF EXISTS posts_answer_search_update();",
+        ),
+        migrations.RunSQL(
+            sql=QUESTION_TRIGGER_SQL,
+            reverse_sql="DROP TRIGGER IF EXISTS posts_question_search_update ON posts_question",
+        ),
+        # 기존 row들에 trigger를 실행하여 채움
+        migrations.RunSQL(
+            sql="UPDATE posts_answer SET content_html = content_html",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql="UPDATE posts_question SET content = content",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='posts_answer_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='posts_question_search_gin'),
+        ),
+    ]
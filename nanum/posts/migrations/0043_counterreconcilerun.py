@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0042_answer_question_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterReconcileRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(db_index=True)),
+                ('finished_at', models.DateTimeField(auto_now_add=True)),
+                ('full', models.BooleanField(default=False)),
+                ('updated', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
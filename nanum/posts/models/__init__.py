@@ -1,2 +1,4 @@
 from .comment import *
 from .post import *
+from .feed import *
+from .reconcile import *
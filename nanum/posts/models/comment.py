@@ -1,36 +1,76 @@
 from django.conf import settings
 from django.db import models
-from django.db.models import F
-from django.db.transaction import atomic
 from mptt.fields import TreeForeignKey
 from mptt.models import MPTTModel
 
+from utils import counter_batch, exclude_counter_fields, increment_counters
+
 __all__ = (
     'CommentPostIntermediate',
     'Comment',
 )
 
 
+def get_comment_storage():
+    # posts.utils.comment_storage가 Comment를 import 하므로 호출 시점에 import
+    from ..utils.comment_storage import get_comment_storage
+    return get_comment_storage()
+
+
 class CommentPostIntermediate(models.Model):
     """
     PostType 모델
     Comment에 어떤 종류의 포스트와 연결이 되어있는지, Question/Answer에 어떤 Comment가 연결되어있는지를 위한 중간모델
     Reference: https://lukeplant.me.uk/blog/posts/avoid-django-genericforeignkey/
     """
+    POST_TYPE_QUESTION = 'question'
+    POST_TYPE_ANSWER = 'answer'
+    POST_TYPE_CHOICES = (
+        (POST_TYPE_QUESTION, 'Question'),
+        (POST_TYPE_ANSWER, 'Answer'),
+    )
+
     question = models.OneToOneField('Question', null=True, blank=True, on_delete=models.CASCADE,
                                     related_name='comment_post_intermediate')
     answer = models.OneToOneField('Answer', null=True, blank=True, on_delete=models.CASCADE,
                                   related_name='comment_post_intermediate')
+    # question/answer 중 어느 쪽에 연결되어 있는지 - 저장 시 question_id/answer_id로 결정되며
+    # 연결된 post를 가져오지 않고도 post의 종류를 알 수 있도록 함
+    post_type = models.CharField(max_length=10, choices=POST_TYPE_CHOICES, blank=True, editable=False)
 
     def __str__(self):
         return f'post: {self.post} \ncomment: {self.parent_comments}'
 
+    def save(self, *args, **kwargs):
+        if self.question_id is not None:
+            self.post_type = self.POST_TYPE_QUESTION
+        elif self.answer_id is not None:
+            self.post_type = self.POST_TYPE_ANSWER
+        super().save(*args, **kwargs)
+
     @property
-    def post_type(self):
-        if self.question:
-            return 'question'
-        if self.answer:
-            return 'answer'
+    def post_model(self):
+        """
+        연결된 post의 model class - 쿼리가 실행되지 않음
+        둘 다 없을 경우 raise AssertionError
+        :return:
+        """
+        if self.post_type == self.POST_TYPE_QUESTION:
+            return self._meta.get_field('question').related_model
+        if self.post_type == self.POST_TYPE_ANSWER:
+            return self._meta.get_field('answer').related_model
+        raise AssertionError("Neither 'question' or 'answer' set")
+
+    @property
+    def post_pk(self):
+        """
+        연결된 post의 pk - 쿼리가 실행되지 않음
+        :return:
+        """
+        if self.post_type == self.POST_TYPE_QUESTION:
+            return self.question_id
+        if self.post_type == self.POST_TYPE_ANSWER:
+            return self.answer_id
         raise AssertionError("Neither 'question' or 'answer' set")
 
     @property
@@ -40,9 +80,9 @@ class CommentPostIntermediate(models.Model):
         둘 다 없을 경우 raise AssertionError
         :return:
         """
-        if self.question:
+        if self.post_type == self.POST_TYPE_QUESTION:
             return self.question
-        if self.answer:
+        if self.post_type == self.POST_TYPE_ANSWER:
             return self.answer
         raise AssertionError("Neither 'question' or 'answer' set")
 
@@ -69,6 +109,8 @@ class Comment(MPTTModel):
 
     # Nested Comment
     parent = TreeForeignKey('self', null=True, blank=True, related_name='children_comments', db_index=True)
+    # COMMENT_TREE_BACKEND = 'path' 일 경우 사용하는 materialized path - 조상 pk들을 '.'으로 이어붙인 문자열
+    tree_path = models.CharField(max_length=1100, blank=True, default='', db_index=True)
 
     # Question / Answer Foreign Key
     comment_post_intermediate = models.ForeignKey(CommentPostIntermediate, on_delete=models.CASCADE)
@@ -77,6 +119,9 @@ class Comment(MPTTModel):
     upvote_count = models.IntegerField(null=False, default=0)
     downvote_count = models.IntegerField(null=False, default=0)
 
+    # relation이 생기거나 삭제될 때 increment_counters로만 변경되는 count 필드
+    counter_fields = ('upvote_count', 'downvote_count')
+
     @property
     def related_post(self):
         """
@@ -91,7 +136,7 @@ class Comment(MPTTModel):
         Instance 바로 밑에 있는 depth의 Comment object들을 반환
         :return:
         """
-        return self.get_children()
+        return get_comment_storage().get_children(self)
 
     @property
     def immediate_children_count(self):
@@ -99,7 +144,7 @@ class Comment(MPTTModel):
         Instancen 바로 밑에 있는 depth 의 Comment 개수를 반환
         :return:
         """
-        return self.get_children().count()
+        return self.immediate_children.count()
 
     @property
     def all_children(self):
@@ -107,7 +152,7 @@ class Comment(MPTTModel):
         Instance 밑에 있는 모든 Comment object들을 반환
         :return:
         """
-        return self.get_descendants(include_self=False)
+        return get_comment_storage().get_descendants(self)
 
     @property
     def all_children_count(self):
@@ -115,7 +160,7 @@ class Comment(MPTTModel):
         Instance 밑에 있는 모든 Comment 개수를 반환
         :return:
         """
-        return self.get_descendant_count()
+        return get_comment_storage().get_descendant_count(self)
 
     def __str__(self):
         return f'{self.user} - {self.content[:50]}'
@@ -127,14 +172,14 @@ class Comment(MPTTModel):
         :param kwargs:
         :return:
         """
-        model = self.comment_post_intermediate.post.__class__
-        # race condition 방지
-        with atomic():
-            post = model.objects.select_for_update().filter(
-                comment_post_intermediate=self.comment_post_intermediate
-            )
-            post.update(comment_count=F('comment_count') + 1)
-            super().save(*args, **kwargs)
+        # post를 가져오거나 잠그지 않고 CommentPostIntermediate의 post_type, pk로 UPDATE 한 번만 실행
+        intermediate = self.comment_post_intermediate
+        adding = self._state.adding
+        exclude_counter_fields(self, self.counter_fields, kwargs)
+        with counter_batch():
+            get_comment_storage().save(self, *args, **kwargs)
+            if adding:
+                increment_counters(intermediate.post_model, {'pk': intermediate.post_pk}, comment_count=1)
 
     def delete(self, *args, **kwargs):
         """
@@ -143,13 +188,9 @@ class Comment(MPTTModel):
         :param kwargs:
         :return:
         """
-        model = self.comment_post_intermediate.post.__class__
-
-        # race condition 방지
-        with atomic():
-            post = model.objects.select_for_update().filter(
-                comment_post_intermediate=self.comment_post_intermediate
-            )
-            post.update(comment_count=F('comment_count') - (self.all_children_count + 1))
-
-            super().delete(*args, **kwargs)
+        intermediate = self.comment_post_intermediate
+        # mptt의 경우 lft/rght로 계산하므로 쿼리가 실행되지 않음
+        deleted_count = self.all_children_count + 1
+        with counter_batch():
+            increment_counters(intermediate.post_model, {'pk': intermediate.post_pk}, comment_count=-deleted_count)
+            get_comment_storage().delete(self, *args, **kwargs)
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import models
+
+__all__ = (
+    'AnswerFeedEntry',
+)
+
+
+class AnswerFeedEntry(models.Model):
+    """
+    유저별 답변 메인 피드(Timeline) 한 줄에 대한 정보를 갖는 모델
+    답변이 publish 되는 시점에 해당 답변을 볼 유저들에게 fan-out 되어 저장되며,
+    피드 조회 시에는 (user, modified_at) index 에 대한 range scan 한 번으로 읽어옴
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                             related_name='answer_feed_entries')
+    answer = models.ForeignKey('Answer', on_delete=models.CASCADE, related_name='feed_entries')
+    # fan-out 당시 Answer의 modified_at - 피드 정렬 기준
+    modified_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'answer')
+        indexes = [
+            models.Index(fields=['user', '-modified_at'], name='posts_feed_user_modified_idx'),
+        ]
+
+    def __str__(self):
+        return f'user: {self.user_id}, answer: {self.answer_id}'
@@ -1,11 +1,16 @@
+from operator import attrgetter
+
 from bs4 import BeautifulSoup
 from django.conf import settings
 from django.contrib.postgres.fields import JSONField
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models
 from django.db.models import F
-from django.db.transaction import atomic
+from django.db.transaction import atomic, on_commit
 
 from topics.models import Topic
+from utils import exclude_counter_fields, invalidate_representation, run_task
 from ..post.question import Question
 from ...models import CommentPostIntermediate
 from ...utils.quill_js import DjangoQuill
@@ -28,10 +33,33 @@ class Answer(models.Model):
     downvote_count = models.IntegerField(null=False, default=0)
     bookmark_count = models.IntegerField(null=False, default=0)
     comment_count = models.IntegerField(null=False, default=0)
+    # content_html의 tag를 제거한 text와 검색용 tsvector - INSERT, content_html UPDATE 때 DB trigger가 채움 (posts.0042)
+    content_text = models.TextField(blank=True, default='', editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='posts_answer_search_gin'),
+        ]
+
+    # relation이 생기거나 삭제될 때 increment_counters로만 변경되는 count 필드
+    counter_fields = ('upvote_count', 'downvote_count', 'bookmark_count', 'comment_count')
+
+    # DB에서 불러왔을 당시의 published, modified_at 값 - 피드 fan-out 및 Timeline 갱신 여부 판단에 사용
+    _loaded_published = False
+    _loaded_modified_at = None
 
     def __str__(self):
         return f'user: {self.user}, content: {self.text_content[:30]}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded_values = dict(zip(field_names, values))
+        instance._loaded_published = loaded_values.get('published', False)
+        instance._loaded_modified_at = loaded_values.get('modified_at')
+        return instance
+
     @property
     def topics(self):
         return self.question.topics
@@ -42,7 +70,8 @@ class Answer(models.Model):
         Answer와 연결된 QuillDeltaOperation set을 가지고 와서 quillJS delta 형태로 반환
         :return:
         """
-        quill_delta_operation_querydict = self.quill_delta_operation_set.all().order_by('line_no')
+        # 목록에서 prefetch_related 된 경우 추가 쿼리 없이 정렬
+        quill_delta_operation_querydict = sorted(self.quill_delta_operation_set.all(), key=attrgetter('line_no'))
         if not quill_delta_operation_querydict:
             return ""
         delta_operation_list = list()
@@ -63,6 +92,7 @@ class Answer(models.Model):
 
     def save(self, *args, **kwargs):
         # Topic 과 Question의 answer_count increment
+        exclude_counter_fields(self, self.counter_fields, kwargs)
         topics_pk = self.topics.values_list('pk', flat=True)
 
         with atomic():
@@ -76,6 +106,28 @@ class Answer(models.Model):
             if not CommentPostIntermediate.objects.filter(answer=self).exists():
                 CommentPostIntermediate.objects.create(answer=self)
 
+        invalidate_representation(self)
+        self._update_feed()
+
+    def _update_feed(self):
+        """
+        published 값이 바뀌었을 경우 transaction commit 이후 유저들의 피드 Timeline에 fan-out 혹은 제거
+        이미 publish 된 답변의 modified_at(피드 정렬 기준)이 바뀐 경우에만 Timeline entry들의 modified_at을 갱신
+        :return:
+        """
+        from ...models import AnswerFeedEntry
+        from ...tasks import fan_out_answer_feed, remove_answer_feed
+
+        pk = self.pk
+        if self.published and not self._loaded_published:
+            on_commit(lambda: run_task(fan_out_answer_feed, pk))
+        elif not self.published and self._loaded_published:
+            on_commit(lambda: run_task(remove_answer_feed, pk))
+        elif self.published and self.modified_at != self._loaded_modified_at:
+            AnswerFeedEntry.objects.filter(answer=pk).update(modified_at=self.modified_at)
+        self._loaded_published = self.published
+        self._loaded_modified_at = self.modified_at
+
     def delete(self, *args, **kwargs):
         topics_pk = self.topics.values_list('pk', flat=True)
         with atomic():
@@ -85,9 +137,57 @@ class Answer(models.Model):
             question = Question.objects.select_for_update().filter(pk=self.question.pk)
             question.update(answer_count=F('answer_count') - 1)
 
+            invalidate_representation(self)
             super().delete(*args, **kwargs)
 
 
+class QuillDeltaOperationQuerySet(models.QuerySet):
+    def bulk_update_line_no(self, instances, batch_size=1000):
+        """
+        instances의 line_no를 UPDATE ... FROM (VALUES ...) 쿼리로 batch_size 개씩 한 번에 업데이트
+
+        :param instances: line_no가 변경된 QuillDeltaOperation list
+        :param batch_size: 쿼리 한 번에 업데이트할 row 수
+        :return: 업데이트된 row 수
+        """
+        instances = [instance for instance in instances if instance.pk]
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        updated = 0
+        with connection.cursor() as cursor:
+            for i in range(0, len(instances), batch_size):
+                batch = instances[i:i + batch_size]
+                values = ', '.join(['(%s, %s)'] * len(batch))
+                params = [param for instance in batch for param in (instance.pk, instance.line_no)]
+                cursor.execute(
+                    f'UPDATE {table} SET line_no = v.line_no '
+                    f'FROM (VALUES {values}) AS v(id, line_no) '
+                    f'WHERE {table}.id = v.id',
+                    params
+                )
+                updated += cursor.rowcount
+        return updated
+
+    def bulk_delete(self, instances):
+        """
+        instances를 DELETE ... WHERE id IN 쿼리 한 번으로 삭제
+        storage의 이미지들은 transaction commit 이후 한 번에 삭제
+
+        :param instances: 삭제할 QuillDeltaOperation list
+        :return: 삭제된 row 수
+        """
+        from ...tasks import delete_quill_delta_operation_images
+
+        pks = [instance.pk for instance in instances if instance.pk]
+        if not pks:
+            return 0
+        image_names = [instance.image.name for instance in instances if instance.image]
+        deleted, _ = self.filter(pk__in=pks).delete()
+        if image_names:
+            on_commit(lambda: run_task(delete_quill_delta_operation_images, image_names))
+        return deleted
+
+
 class QuillDeltaOperation(models.Model):
     """
     QuillJS 의 Content중 Operation 한 줄에 대한 정보를 갖는 모델
@@ -103,6 +203,8 @@ class QuillDeltaOperation(models.Model):
     image = models.ImageField(null=True, blank=True, upload_to='answer')
     answer = models.ForeignKey('Answer', on_delete=models.CASCADE, related_name='quill_delta_operation_set')
 
+    objects = QuillDeltaOperationQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.delta_operation}'
 
@@ -141,6 +243,6 @@ class QuillDeltaOperation(models.Model):
         :return:
         """
         if self.image:
-            storage, path = self.image.storage, self.image.path
-            storage.delete(path)
+            storage, name = self.image.storage, self.image.name
+            storage.delete(name)
         super().delete(*args, **kwargs)
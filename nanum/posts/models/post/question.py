@@ -1,9 +1,12 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.db.models import F
 from django.db.transaction import atomic
 
 from topics.models import Topic
+from utils import exclude_counter_fields, invalidate_representation
 from ...models import CommentPostIntermediate
 
 __all__ = (
@@ -28,9 +31,20 @@ class Question(models.Model):
     bookmark_count = models.IntegerField(null=False, default=0)
     follow_count = models.IntegerField(null=False, default=0)
     comment_count = models.IntegerField(null=False, default=0)
+    # content의 검색용 tsvector - INSERT, content UPDATE 때 DB trigger가 채움 (posts.0042)
+    search_vector = SearchVectorField(null=True, editable=False)
     objects = QuestionManager()
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='posts_question_search_gin'),
+        ]
+
+    # relation이 생기거나 삭제될 때 increment_counters로만 변경되는 count 필드
+    counter_fields = ('answer_count', 'bookmark_count', 'follow_count', 'comment_count')
+
     def save(self, *args, **kwargs):
+        exclude_counter_fields(self, self.counter_fields, kwargs)
         with atomic():
             super().save(*args, **kwargs)
             topics_pk = self.topics.values_list('pk', flat=True)
@@ -38,12 +52,14 @@ class Question(models.Model):
             topics.update(question_count=F('question_count') + 1)
 
             CommentPostIntermediate.objects.get_or_create(question=self)
+        invalidate_representation(self)
 
     def delete(self, *args, **kwargs):
         with atomic():
             topics_pk = self.topics.values_list('pk', flat=True)
             topics = Topic.objects.select_for_update().filter(pk__in=topics_pk)
             topics.update(question_count=F('question_count') - 1)
+            invalidate_representation(self)
             super().delete(*args, **kwargs)
 
     def __str__(self):
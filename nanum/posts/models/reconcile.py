@@ -0,0 +1,23 @@
+from django.db import models
+
+__all__ = (
+    'CounterReconcileRun',
+)
+
+
+class CounterReconcileRun(models.Model):
+    """
+    count 필드들을 실제 개수로 다시 계산한 기록
+    incremental 모드(reconcile_changed_counters)는 마지막 기록의 started_at 이후 변경된 row만 다시 계산
+    process마다 다른 cache가 아닌 DB에 저장하므로 어느 worker에서 실행되어도 같은 시각을 사용
+    """
+    # 다시 계산을 시작한 시각 - 이 시각 이후의 변경은 다음 실행에서 반영
+    started_at = models.DateTimeField(db_index=True)
+    finished_at = models.DateTimeField(auto_now_add=True)
+    # True일 경우 since 없이 전체를 다시 계산한 기록
+    full = models.BooleanField(default=False)
+    # UPDATE 된 row 수
+    updated = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{"full" if self.full else "incremental"} reconcile at {self.started_at}: {self.updated} rows'
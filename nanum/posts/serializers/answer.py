@@ -1,22 +1,29 @@
-from itertools import chain
-
+from django.db import models
 from django.db.models import QuerySet
-from django.db.transaction import atomic
+from django.db.transaction import atomic, on_commit
 from rest_framework import serializers
 from rest_framework.exceptions import ParseError
 from rest_framework.reverse import reverse
 
+from search.outbox import enqueue as enqueue_search_index
 from users.models import AnswerUpVoteRelation, AnswerBookmarkRelation
+from utils import (
+    BufferedCounterSerializerMixin, CachedRepresentationListSerializer, CachedRepresentationSerializerMixin,
+    invalidate_representation, run_task_in_background,
+)
 from ..models import Answer, QuillDeltaOperation, Question
+from ..tasks import process_answer_images
 from ..utils.quill_js import DjangoQuill
 
 __all__ = (
+    'AnswerListSerializer',
     'AnswerPostSerializer',
     'AnswerUpdateSerializer',
     'AnswerGetSerializer',
 )
 
-django_quill = DjangoQuill(model=QuillDeltaOperation, parent_model=Answer)
+# base64 이미지는 request 안에서 처리하지 않고 spool 한 뒤 transaction commit 이후 process_answer_images task에서 처리
+django_quill = DjangoQuill(model=QuillDeltaOperation, parent_model=Answer, spool_images=True)
 
 
 class QuestionHyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
@@ -31,7 +38,49 @@ class QuestionHyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
             raise ParseError({"error": "질문이 존재하지 않습니다."})
 
 
-class BaseAnswerSerializer(serializers.ModelSerializer):
+class AnswerListSerializer(CachedRepresentationListSerializer):
+    """
+    many=True로 Answer를 serialize 할 때 사용되는 ListSerializer
+    page 안의 Answer들에 대해 request.user의 upvote, bookmark relation pk를 relation 종류별로 한 번의 쿼리로 가져와
+    {answer_pk: relation_pk} 형태의 lookup map을 child serializer에 전달
+    (CachedRepresentationListSerializer - page 안의 Answer들의 cache된 serialize 결과도 한 번에 가져옴)
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        # QuerySet을 한 번만 evaluate하기 위해 list로 변환
+        answers = list(iterable)
+        self.child.upvote_relation_map, self.child.bookmark_relation_map = self._get_relation_maps(answers)
+        try:
+            return super().to_representation(answers)
+        finally:
+            self.child.upvote_relation_map = None
+            self.child.bookmark_relation_map = None
+
+    def _get_relation_maps(self, answers):
+        """
+        answers에 대한 request.user의 upvote, bookmark relation lookup map을 반환
+        로그인 하지 않은 유저일 경우 빈 map을 반환
+        :param answers: Answer instance list
+        :return: (upvote_relation_map, bookmark_relation_map)
+        """
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if not answers or not user or not user.is_authenticated:
+            return dict(), dict()
+
+        answer_pks = [answer.pk for answer in answers]
+        upvote_relation_map = dict(
+            AnswerUpVoteRelation.objects.filter(user=user, answer__in=answer_pks).values_list('answer_id', 'pk')
+        )
+        bookmark_relation_map = dict(
+            AnswerBookmarkRelation.objects.filter(user=user, answer__in=answer_pks).values_list('answer_id', 'pk')
+        )
+        return upvote_relation_map, bookmark_relation_map
+
+
+class BaseAnswerSerializer(BufferedCounterSerializerMixin, CachedRepresentationSerializerMixin,
+                           serializers.ModelSerializer):
     question = QuestionHyperlinkedRelatedField()
     user = serializers.HyperlinkedRelatedField(
         view_name='user:profile-main-detail',
@@ -45,6 +94,15 @@ class BaseAnswerSerializer(serializers.ModelSerializer):
         read_only=True,
     )
 
+    # AnswerListSerializer 를 통해 serialize 될 경우 채워지는 {answer_pk: relation_pk} lookup map
+    upvote_relation_map = None
+    bookmark_relation_map = None
+
+    # viewer에 따라 다른 필드와 queryset.update로 바뀌는 count 필드는 cache 하지 않음
+    uncached_fields = ('upvote_count', 'comment_count', 'user_upvote_relation', 'user_bookmark_relation')
+    # cache 되지 않은 답변의 content(QuillDeltaOperation)는 page 단위로 한 번에 가져옴
+    uncached_prefetch_related = ('quill_delta_operation_set',)
+
     class Meta:
         model = Answer
         fields = [
@@ -72,6 +130,7 @@ class BaseAnswerSerializer(serializers.ModelSerializer):
             'created_at',
             'modified_at'
         ]
+        list_serializer_class = AnswerListSerializer
 
     @property
     def request(self):
@@ -90,23 +149,35 @@ class BaseAnswerSerializer(serializers.ModelSerializer):
     # HyperlinkedRelationField 를 접목
     # Reuqest.user 가 Answer를 like 했을 경우, 해당 like relation의 링크를 가지고 옴 - 추후 delete 요청을 위함
     # 만약 like하지 않았을 경우, null값이 반환
+    # List로 serialize 될 경우 AnswerListSerializer가 미리 가져온 lookup map을 사용하고,
+    # 단일 객체일 경우에만 relation을 직접 조회
     def get_user_upvote_relation(self, obj):
-        try:
-            relation_pk = AnswerUpVoteRelation.objects.get(user=self.request_user, answer=obj).pk
-            view_name = 'user:answer-upvote-relation-detail'
-            kwargs = {'pk': relation_pk}
-            return reverse(view_name, kwargs=kwargs, request=self.request)
-        except AnswerUpVoteRelation.DoesNotExist:
-            return
+        if self.upvote_relation_map is not None:
+            relation_pk = self.upvote_relation_map.get(obj.pk)
+            if relation_pk is None:
+                return
+        else:
+            try:
+                relation_pk = AnswerUpVoteRelation.objects.get(user=self.request_user, answer=obj).pk
+            except AnswerUpVoteRelation.DoesNotExist:
+                return
+        view_name = 'user:answer-upvote-relation-detail'
+        kwargs = {'pk': relation_pk}
+        return reverse(view_name, kwargs=kwargs, request=self.request)
 
     def get_user_bookmark_relation(self, obj):
-        try:
-            relation_pk = AnswerBookmarkRelation.objects.get(user=self.request_user, answer=obj).pk
-            view_name = 'user:answer-bookmark-relation-detaiㅣ'
-            kwargs = {'pk': relation_pk}
-            return reverse(view_name, kwargs=kwargs, request=self.request)
-        except AnswerBookmarkRelation.DoesNotExist:
-            return
+        if self.bookmark_relation_map is not None:
+            relation_pk = self.bookmark_relation_map.get(obj.pk)
+            if relation_pk is None:
+                return
+        else:
+            try:
+                relation_pk = AnswerBookmarkRelation.objects.get(user=self.request_user, answer=obj).pk
+            except AnswerBookmarkRelation.DoesNotExist:
+                return
+        view_name = 'user:answer-bookmark-relation-detaiㅣ'
+        kwargs = {'pk': relation_pk}
+        return reverse(view_name, kwargs=kwargs, request=self.request)
 
 
 class AnswerGetSerializer(BaseAnswerSerializer):
@@ -166,16 +237,33 @@ class AnswerPostSerializer(BaseAnswerSerializer):
         :param answer_instance:
         :return:
         """
-        instances = django_quill.get_delta_operation_instances(
-            content=content,
-            parent_instance=answer_instance
-        )
+        try:
+            instances = list(django_quill.get_delta_operation_instances(
+                content=content,
+                parent_instance=answer_instance
+            ))
+        except ValueError as e:
+            raise ParseError({"error": str(e)})
         if not instances:
             raise ParseError({"error": "content가 잘못된 포맷입니다. "})
         try:
             QuillDeltaOperation.objects.bulk_create(instances)
         except:
             raise ParseError({"error": "Delta Operation을 저장하는데 문제가 있었습니다."})
+        self._schedule_image_processing(instances=instances, answer_instance=answer_instance)
+
+    def _schedule_image_processing(self, instances, answer_instance):
+        """
+        spool된 이미지가 있을 경우 transaction commit 이후 이미지 처리 task를 실행
+        처리가 끝나기 전까지 image_insert_value와 content_html에는 placeholder url이 들어감
+
+        :param instances: 새로 생성된 QuillDeltaOperation list
+        :param answer_instance:
+        :return:
+        """
+        if any(getattr(instance, 'spooled_image_token', None) for instance in instances):
+            answer_pk = answer_instance.pk
+            on_commit(lambda: run_task_in_background(process_answer_images, answer_pk))
 
     def _save_content_html(self, content_html, answer_instance):
         """
@@ -183,7 +271,7 @@ class AnswerPostSerializer(BaseAnswerSerializer):
         :param content_html:
         :return:
         """
-        img_delta_objs = self.instance.quill_delta_operation_set.exclude(image='').order_by('line_no')
+        img_delta_objs = answer_instance.quill_delta_operation_set.exclude(image_insert_value=None).order_by('line_no')
         html = django_quill.img_base64_to_link(
             objs=img_delta_objs,
             html=content_html
@@ -195,6 +283,10 @@ class AnswerPostSerializer(BaseAnswerSerializer):
             update(content_html=html, content_preview_html=preview_html)
         answer_instance.content_html = html
         answer_instance.content_preview_html = preview_html
+        # modified_at이 바뀌지 않고 post_save signal이 발생하지 않는 UPDATE 이므로
+        # cache된 serialize 결과를 직접 삭제하고 search index에 반영
+        invalidate_representation(answer_instance)
+        enqueue_search_index(Answer, [answer_instance.pk])
 
 
 class AnswerUpdateSerializer(AnswerPostSerializer):
@@ -216,17 +308,21 @@ class AnswerUpdateSerializer(AnswerPostSerializer):
 
     def _update_quill_delta_operation(self, queryset: QuerySet, content: dict):
         """
+        변경된 줄에 대해서만 line_no UPDATE, INSERT, DELETE 쿼리를 각각 한 번씩 실행
 
         :param queryset: self.instance와 연결되어있는 QuillDeltaOperation Queryset
         :param content: Update할 Content
         :return:
         """
-        to_update_list, to_create_list, to_delete_list = django_quill.update_delta_operation_list(
-            queryset=queryset,
-            content=content,
-            parent_instance=self.instance,
-        )
-        for inst in chain(to_update_list, to_create_list):
-            inst.save()
-        for inst in to_delete_list:
-            inst.delete()
+        try:
+            to_update_list, to_create_list, to_delete_list = django_quill.update_delta_operation_list(
+                queryset=queryset,
+                content=content,
+                parent_instance=self.instance,
+            )
+        except ValueError as e:
+            raise ParseError({"error": str(e)})
+        QuillDeltaOperation.objects.bulk_update_line_no(to_update_list)
+        QuillDeltaOperation.objects.bulk_create(to_create_list)
+        self._schedule_image_processing(instances=to_create_list, answer_instance=self.instance)
+        QuillDeltaOperation.objects.bulk_delete(to_delete_list)
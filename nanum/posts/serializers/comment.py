@@ -3,14 +3,19 @@ from rest_framework import serializers
 from rest_framework.exceptions import ParseError
 from rest_framework.reverse import reverse
 
+from posts.utils import comment_tree
+from posts.utils.comment_storage import get_comment_storage
 from posts.utils.filters import CommentFilter
 from posts.utils.pagination import CommentPagination
 from users.models import CommentUpVoteRelation, CommentDownVoteRelation
+from utils import BufferedCounterListSerializer, BufferedCounterSerializerMixin
 from ..models import Comment, CommentPostIntermediate, Answer, Question
 
 __all__ = (
     'CommentCreateSerializer',
     'CommentSerializer',
+    'CommentTreeSerializer',
+    'CommentThreadSerializer',
 )
 
 
@@ -24,7 +29,7 @@ class PostHyperLinkRelatedField(serializers.HyperlinkedRelatedField):
         return reverse(view_name, kwargs=url_kwargs, request=request, format=format)
 
 
-class BaseCommentserializer(serializers.HyperlinkedModelSerializer):
+class BaseCommentserializer(BufferedCounterSerializerMixin, serializers.HyperlinkedModelSerializer):
     user = serializers.HyperlinkedRelatedField(
         view_name='user:profile-main-detail',
         read_only=True,
@@ -72,6 +77,7 @@ class BaseCommentserializer(serializers.HyperlinkedModelSerializer):
             'upvote_count',
             'downvote_count',
         ]
+        list_serializer_class = BufferedCounterListSerializer
 
     @property
     def request(self):
@@ -85,25 +91,28 @@ class BaseCommentserializer(serializers.HyperlinkedModelSerializer):
         """
         return self.request.user
 
+    def _get_user_vote_relation(self, obj, key, model, view_name):
+        """
+        context에 comment_votes(posts.utils.comment_tree.get_viewer_votes)가 있을 경우 쿼리 없이 relation을 찾음
+        """
+        if not self.request_user.is_authenticated():
+            return
+        votes = self.context.get('comment_votes')
+        if votes is not None:
+            relation_pk = votes[key].get(obj.pk)
+        else:
+            relation_pk = model.objects.filter(user=self.request_user, comment=obj).values_list('pk', flat=True).first()
+        if relation_pk is None:
+            return
+        return reverse(view_name, kwargs={'pk': relation_pk}, request=self.request)
+
     def get_user_upvote_relation(self, obj):
-        if self.request_user.is_authenticated():
-            try:
-                relation_pk = CommentUpVoteRelation.objects.get(user=self.request_user, comment=obj).pk
-                view_name = 'user:comment-upvote-relation-detail'
-                kwargs = {'pk': relation_pk}
-                return reverse(view_name, kwargs=kwargs, request=self.request)
-            except CommentUpVoteRelation.DoesNotExist:
-                return
+        return self._get_user_vote_relation(
+            obj, 'upvote', CommentUpVoteRelation, 'user:comment-upvote-relation-detail')
 
     def get_user_downvote_relation(self, obj):
-        if self.request_user.is_authenticated():
-            try:
-                relation_pk = CommentDownVoteRelation.objects.get(user=self.request_user, comment=obj).pk
-                view_name = 'user:comment-downvote-relation-detail'
-                kwargs = {'pk': relation_pk}
-                return reverse(view_name, kwargs=kwargs, request=self.request)
-            except CommentDownVoteRelation.DoesNotExist:
-                return
+        return self._get_user_vote_relation(
+            obj, 'downvote', CommentDownVoteRelation, 'user:comment-downvote-relation-detail')
 
 
 class CommentGetSerializer(BaseCommentserializer):
@@ -179,6 +188,18 @@ class CommentCreateSerializer(BaseCommentserializer):
         )
 
 
+class CommentListSerializer(BufferedCounterListSerializer):
+    """
+    page 안 Comment들의 descendant 수(all_children_count)를 storage의 annotate_counts로 한 번에 계산
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, 'all') else data
+        instances = list(iterable)
+        get_comment_storage().annotate_counts(instances)
+        return super().to_representation(instances)
+
+
 class CommentSerializer(BaseCommentserializer):
     """
     METHOD: GET, PUT, PATCH
@@ -203,6 +224,7 @@ class CommentSerializer(BaseCommentserializer):
         read_only_fields = BaseCommentserializer.Meta.read_only_fields.copy()
         read_only_fields.extend(
             ['immediate_children', 'all_children', 'immediate_children_count', 'all_children_count'])
+        list_serializer_class = CommentListSerializer
 
     @property
     def view(self):
@@ -240,3 +262,65 @@ class CommentSerializer(BaseCommentserializer):
             for param in non_query_params:
                 self.fields.pop(param)
         super().__init__(*args, **kwargs)
+
+
+class CommentTreeSerializer(BaseCommentserializer):
+    """
+    METHOD: GET
+    posts.utils.comment_tree로 미리 구성된 트리(tree_children)를 쿼리 없이 중첩된 형태로 serialize
+    추천/비추천 relation은 context의 comment_votes에서 찾음
+    """
+    children = serializers.SerializerMethodField()
+    all_children_count = serializers.SerializerMethodField()
+
+    class Meta(BaseCommentserializer.Meta):
+        """
+        fields = __all__ + children + all_children_count
+        """
+        fields = BaseCommentserializer.Meta.fields.copy()
+        fields.extend(['all_children_count', 'children'])
+
+        read_only_fields = BaseCommentserializer.Meta.read_only_fields.copy()
+        read_only_fields.extend(['all_children_count', 'children'])
+
+    def get_all_children_count(self, obj):
+        # posts.utils.comment_tree에서 트리를 구성할 때 계산되므로 쿼리가 실행되지 않음
+        return obj.descendant_count
+
+    def get_children(self, obj):
+        return CommentTreeSerializer(obj.tree_children, many=True, context=self.context).data
+
+
+class CommentThreadSerializer(CommentTreeSerializer):
+    """
+    METHOD: GET
+    posts.utils.comment_tree.attach_thread로 depth, replies 만큼만 구성된 트리를 serialize
+    remaining_children_count: 보여주지 않은 subtree의 Comment 수
+    continuation: 보여주지 않은 children을 이어서 가져오는 url
+    """
+    remaining_children_count = serializers.SerializerMethodField()
+    continuation = serializers.SerializerMethodField()
+
+    class Meta(CommentTreeSerializer.Meta):
+        """
+        fields = __all__ + all_children_count + remaining_children_count + continuation + children
+        """
+        fields = CommentTreeSerializer.Meta.fields.copy()
+        fields[-1:-1] = ['remaining_children_count', 'continuation']
+
+        read_only_fields = CommentTreeSerializer.Meta.read_only_fields.copy()
+        read_only_fields.extend(['remaining_children_count', 'continuation'])
+
+    def get_remaining_children_count(self, obj):
+        return comment_tree.get_remaining_children_count(obj)
+
+    def get_continuation(self, obj):
+        if not comment_tree.has_more_children(obj):
+            return
+        depth, replies = self.context['thread_params']
+        url = reverse('post:comment:comment-detail', kwargs={'pk': obj.pk}, request=self.request)
+        token = comment_tree.encode_continuation(obj)
+        return f'{url}?thread=true&depth={depth}&replies={replies}&continuation={token}'
+
+    def get_children(self, obj):
+        return CommentThreadSerializer(obj.tree_children, many=True, context=self.context).data
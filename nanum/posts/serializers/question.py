@@ -3,6 +3,9 @@ from rest_framework import serializers
 from six import BytesIO
 
 from topics.models import Topic
+from utils import (
+    BufferedCounterSerializerMixin, CachedRepresentationListSerializer, CachedRepresentationSerializerMixin,
+)
 from ..models import Question
 
 __all__ = (
@@ -12,7 +15,8 @@ __all__ = (
 )
 
 
-class QuestionGetSerializer(serializers.ModelSerializer):
+class QuestionGetSerializer(BufferedCounterSerializerMixin, CachedRepresentationSerializerMixin,
+                            serializers.ModelSerializer):
     # 해당 질문의 detail 페이지
     url = serializers.HyperlinkedIdentityField(
         lookup_field='pk',
@@ -33,6 +37,11 @@ class QuestionGetSerializer(serializers.ModelSerializer):
         view_name='topic:topic-detail',
     )
 
+    # queryset.update로 바뀌는 count 필드는 cache 하지 않음
+    uncached_fields = ('bookmark_count', 'follow_count', 'comment_count')
+    # cache 되지 않은 질문의 topics는 page 단위로 한 번에 가져옴
+    uncached_prefetch_related = ('topics',)
+
     class Meta:
         model = Question
         fields = (
@@ -53,6 +62,7 @@ class QuestionGetSerializer(serializers.ModelSerializer):
             'created_at',
             'modified_at',
         )
+        list_serializer_class = CachedRepresentationListSerializer
 
     def to_representation(self, instance):
         ret = super().to_representation(instance)
@@ -0,0 +1,53 @@
+from celery import shared_task
+from django.core.files.storage import default_storage
+
+from utils import counters, delete_files
+from .utils import answer_image, feed, reconcile
+
+
+@shared_task(name='fan_out_answer_feed')
+def fan_out_answer_feed(answer_pk):
+    return feed.fan_out_answer(answer_pk)
+
+
+@shared_task(name='remove_answer_feed')
+def remove_answer_feed(answer_pk):
+    return feed.remove_answer(answer_pk)
+
+
+@shared_task(name='backfill_answer_feed')
+def backfill_answer_feed(user_pk):
+    return feed.backfill_user_feed(user_pk)
+
+
+@shared_task(name='prune_answer_feed')
+def prune_answer_feed(user_pk):
+    return feed.prune_user_feed(user_pk)
+
+
+@shared_task(name='delete_quill_delta_operation_images')
+def delete_quill_delta_operation_images(names):
+    return delete_files(default_storage, names)
+
+
+@shared_task(name='process_answer_images')
+def process_answer_images(answer_pk):
+    return answer_image.process_answer_images(answer_pk)
+
+
+@shared_task(name='flush_counter_buffer')
+def flush_counter_buffer():
+    counter_buffer = counters.get_counter_buffer()
+    # process 메모리 buffer는 worker가 아닌 delta를 쌓은 process가 flush
+    if counter_buffer is None or counter_buffer.flush_in_process:
+        return 0
+    return counters.flush_counter_buffer()
+
+
+@shared_task(name='reconcile_counters')
+def reconcile_counters(full=False):
+    if full:
+        result = reconcile.reconcile_all_counters()
+    else:
+        result = reconcile.reconcile_changed_counters()
+    return {f'{label}.{field}': len(diffs) for (label, field), diffs in result.items()}
@@ -1,3 +1,4 @@
+from .main_feed import *
 from .list import *
 from .post import *
 from .update import *
@@ -1,15 +1,20 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
 from posts.models import Answer
+from users.models import AnswerUpVoteRelation
 from posts.serializers import AnswerGetSerializer, AnswerPostSerializer
+from utils.query_budget import QueryBudgetTestMixin
 from ...custom_base import CustomBaseTest
 
 User = get_user_model()
 
 
-class AnswerListTest(CustomBaseTest):
+class AnswerListTest(QueryBudgetTestMixin, CustomBaseTest):
     """
     url :       /post/answer/
     method :    GET
@@ -96,7 +101,7 @@ class AnswerListTest(CustomBaseTest):
         """
         user = User.objects.first()
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + user.token)
-        response = self.client.get(f'{self.URL_API_ANSWER_LIST_CREATE}?topic=1')
+        response = self.client.get(f'{self.URL_API_ANSWER_LIST_CREATE}?topic=1&page=1')
         self.assertEqual(response.data.get('count'), Answer.objects.filter(question__topics=1).count())
 
     def test_get_list_view_query_user(self):
@@ -106,7 +111,7 @@ class AnswerListTest(CustomBaseTest):
         """
         user = User.objects.first()
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + user.token)
-        response = self.client.get(f'{self.URL_API_ANSWER_LIST_CREATE}?user=1')
+        response = self.client.get(f'{self.URL_API_ANSWER_LIST_CREATE}?user=1&page=1')
         self.assertEqual(response.data.get('count'), Answer.objects.filter(user=1).count())
 
     def test_get_list_view_query_bookmarked_by(self):
@@ -145,7 +150,7 @@ class AnswerListTest(CustomBaseTest):
         """
         user = User.objects.first()
         self.client.force_authenticate(user=user)
-        response = self.client.get(f'{self.URL_API_ANSWER_LIST_CREATE}?user=1,2')
+        response = self.client.get(f'{self.URL_API_ANSWER_LIST_CREATE}?user=1,2&page=1')
         answers_by_users = Answer.objects.filter(user=1) | Answer.objects.filter(user=2)
         self.assertEqual(response.data.get('count'), answers_by_users.count())
 
@@ -158,3 +163,115 @@ class AnswerListTest(CustomBaseTest):
         self.client.force_authenticate(user=user)
         response = self.client.get(self.URL_API_ANSWER_LIST_CREATE)
         self.assertEqual(len(response.data['results']), 5)
+
+    def test_get_list_user_upvote_relation(self):
+        """
+        List 결과의 user_upvote_relation이 request.user가 추천한 답변에만 채워지는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.URL_API_ANSWER_LIST_CREATE)
+        answer = Answer.objects.get(pk=response.data['results'][0]['pk'])
+        relation = AnswerUpVoteRelation.objects.create(user=user, answer=answer)
+        response = self.client.get(self.URL_API_ANSWER_LIST_CREATE)
+
+        for result in response.data['results']:
+            if result['pk'] == answer.pk:
+                self.assertTrue(result['user_upvote_relation'].endswith(f'/{relation.pk}/'))
+            else:
+                self.assertIsNone(result['user_upvote_relation'])
+
+    def test_get_list_relation_query_count(self):
+        """
+        한 page의 답변 개수와 상관없이 user relation을 relation 종류별로 한 번의 쿼리로 가져오는지 확인
+        :return:
+        """
+        def relation_query_count(queries):
+            relation_tables = ('users_answerupvoterelation', 'users_answerbookmarkrelation')
+            return len([q for q in queries if any(table in q['sql'] for table in relation_tables)])
+
+        user = User.objects.first()
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.URL_API_ANSWER_LIST_CREATE)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(relation_query_count(context.captured_queries), 2)
+
+    def test_get_list_queries_do_not_scale_with_page_size(self):
+        """
+        목록의 쿼리 수가 page_size에 따라 늘어나지 않는지(N+1이 없는지) 확인
+        :return:
+        """
+        user = User.objects.first()
+        self.client.force_authenticate(user=user)
+        self.assertQueriesDoNotScale(self.URL_API_ANSWER_LIST_CREATE)
+
+    @override_settings(REPRESENTATION_CACHE_ENABLED=True, REPRESENTATION_CACHE_VERSION='test-answer-list')
+    def test_get_list_representation_cache(self):
+        """
+        두번째 요청부터 cache된 serialize 결과를 사용하여 쿼리 수가 줄어들고,
+        viewer 필드와 count 필드는 요청마다 다시 계산되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(self.URL_API_ANSWER_LIST_CREATE)
+        with CaptureQueriesContext(connection) as second:
+            cached_response = self.client.get(self.URL_API_ANSWER_LIST_CREATE)
+        self.assertEqual(cached_response.data['results'], response.data['results'])
+        self.assertLess(len(second), len(first))
+
+        answer = Answer.objects.get(pk=response.data['results'][0]['pk'])
+        relation = AnswerUpVoteRelation.objects.create(user=user, answer=answer)
+        response = self.client.get(self.URL_API_ANSWER_LIST_CREATE)
+        result = next(result for result in response.data['results'] if result['pk'] == answer.pk)
+        self.assertTrue(result['user_upvote_relation'].endswith(f'/{relation.pk}/'))
+        self.assertEqual(result['upvote_count'], answer.upvote_count + 1)
+
+    def test_get_list_cursor_pagination(self):
+        """
+        next cursor를 따라가면 모든 답변을 중복 없이 가져오고, count를 반환하지 않는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        self.client.force_authenticate(user=user)
+        url = f'{self.URL_API_ANSWER_LIST_CREATE}?ordering=-modified_at'
+        answer_pks = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            answer_pks.extend(result['pk'] for result in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(len(answer_pks), len(set(answer_pks)))
+        self.assertEqual(len(answer_pks), Answer.objects.filter(published=True).count())
+
+    def test_get_list_cursor_pagination_previous(self):
+        """
+        두번째 페이지의 previous cursor가 첫번째 페이지를 반환하는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        self.client.force_authenticate(user=user)
+        first_page = self.client.get(f'{self.URL_API_ANSWER_LIST_CREATE}?ordering=created_at')
+        second_page = self.client.get(first_page.data['next'])
+        previous_page = self.client.get(second_page.data['previous'])
+
+        self.assertIsNone(first_page.data['previous'])
+        self.assertEqual(
+            [result['pk'] for result in previous_page.data['results']],
+            [result['pk'] for result in first_page.data['results']],
+        )
+
+    def test_get_list_with_invalid_cursor(self):
+        """
+        잘못된 cursor가 왔을 때 400 에러가 반환되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        self.client.force_authenticate(user=user)
+        response = self.client.get(f'{self.URL_API_ANSWER_LIST_CREATE}?cursor=invalid')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,195 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import override_settings
+from rest_framework import status
+
+from posts.models import Answer, AnswerFeedEntry
+from posts.utils import feed
+from topics.models import Topic
+from users.models import InterestFollowRelation, ExpertiseFollowRelation, UserFollowRelation
+from utils.query_budget import QueryBudgetTestMixin
+from ...custom_base import CustomBaseTest
+
+User = get_user_model()
+
+
+class AnswerMainFeedTest(QueryBudgetTestMixin, CustomBaseTest):
+    """
+    url :       /post/answer/main_feed/
+    method :    GET
+
+    Answer Main Feed(Timeline)에 대한 테스트
+    """
+
+    def test_fan_out_answer_to_topic_followers(self):
+        """
+        답변이 fan-out 될 때 질문의 토픽을 팔로우하는 유저의 Timeline에 추가되고 작성자에게는 추가되지 않는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        topic = Topic.objects.get(creator=user)
+        answer = Answer.objects.filter(question__topics=topic).exclude(user=user).first()
+        feed.fan_out_answer(answer.pk)
+
+        self.assertTrue(AnswerFeedEntry.objects.filter(user=user, answer=answer).exists())
+        self.assertFalse(AnswerFeedEntry.objects.filter(user=answer.user, answer=answer).exists())
+
+    def test_remove_answer_from_timeline(self):
+        """
+        publish가 취소된 답변이 Timeline에서 제거되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        topic = Topic.objects.get(creator=user)
+        answer = Answer.objects.filter(question__topics=topic).exclude(user=user).first()
+        feed.fan_out_answer(answer.pk)
+        feed.remove_answer(answer.pk)
+
+        self.assertFalse(AnswerFeedEntry.objects.filter(answer=answer).exists())
+
+    def test_main_feed_reads_timeline(self):
+        """
+        Backfill 된 Timeline의 답변들만 최신순으로 피드에 반환되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        created = feed.backfill_user_feed(user.pk)
+        self.client.force_authenticate(user=user)
+        response = self.client.get(f'{self.URL_API_ANSWER_MAIN_FEED_LIST}?page=1&page_size=100')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], created)
+        timeline_answer_pks = set(AnswerFeedEntry.objects.filter(user=user).values_list('answer', flat=True))
+        for result in response.data['results']:
+            self.assertIn(result['pk'], timeline_answer_pks)
+
+    @override_settings(FEED_FANOUT_TOPIC_FOLLOWER_LIMIT=1)
+    def test_main_feed_queries_do_not_scale_with_page_size(self):
+        """
+        피드의 쿼리 수가 page_size에 따라 늘어나지 않는지(N+1이 없는지) 확인
+        :return:
+        """
+        user = User.objects.first()
+        feed.backfill_user_feed(user.pk)
+        self.client.force_authenticate(user=user)
+        self.assertQueriesDoNotScale(self.URL_API_ANSWER_MAIN_FEED_LIST)
+
+    def test_popular_topic_answers_pulled_on_read(self):
+        """
+        Popular 토픽의 답변은 fan-out 되지 않고 피드를 읽을 때 pull 되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        topic = Topic.objects.get(creator=user)
+        answer = Answer.objects.filter(question__topics=topic).exclude(user=user).first()
+
+        self.assertEqual(feed.fan_out_answer(answer.pk), 0)
+        self.assertIn(answer, feed.get_feed_queryset(user))
+
+    @override_settings(FEED_FANOUT_TOPIC_FOLLOWER_LIMIT=1)
+    def test_popular_topic_answers_merged_with_timeline_by_cursor(self):
+        """
+        Timeline과 popular 토픽의 답변이 cursor 페이지마다 합쳐져 중복 없이 모두 반환되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        feed.backfill_user_feed(user.pk)
+        self.assertEqual(len(feed.get_feed_querysets(user)), 2)
+        expected_pks = set(feed.get_feed_queryset(user).values_list('pk', flat=True))
+
+        self.client.force_authenticate(user=user)
+        pks = []
+        url = f'{self.URL_API_ANSWER_MAIN_FEED_LIST}?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pks.extend(result['pk'] for result in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(len(pks), len(set(pks)))
+        self.assertEqual(set(pks), expected_pks)
+
+    def test_timeline_modified_at_updated_on_answer_edit(self):
+        """
+        이미 fan-out 된 답변이 수정되면 Timeline entry의 modified_at도 갱신되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        topic = Topic.objects.get(creator=user)
+        answer = Answer.objects.filter(question__topics=topic).exclude(user=user).first()
+        feed.fan_out_answer(answer.pk)
+
+        answer = Answer.objects.get(pk=answer.pk)
+        answer.save()
+        self.assertEqual(
+            set(AnswerFeedEntry.objects.filter(answer=answer).values_list('modified_at', flat=True)),
+            {answer.modified_at},
+        )
+
+    def test_timeline_not_updated_when_modified_at_not_saved(self):
+        """
+        modified_at을 저장하지 않는 수정에서는 Timeline entry를 갱신하지 않는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        topic = Topic.objects.get(creator=user)
+        answer = Answer.objects.filter(question__topics=topic).exclude(user=user).first()
+        feed.fan_out_answer(answer.pk)
+        AnswerFeedEntry.objects.filter(answer=answer).update(modified_at=F('modified_at') - datetime.timedelta(days=1))
+        entry_modified_at = AnswerFeedEntry.objects.get(user=user, answer=answer).modified_at
+
+        answer = Answer.objects.get(pk=answer.pk)
+        answer.save(update_fields=['content_html'])
+        self.assertEqual(AnswerFeedEntry.objects.get(user=user, answer=answer).modified_at, entry_modified_at)
+
+    def test_unfollow_prunes_timeline(self):
+        """
+        유저/토픽 팔로우를 취소하면 더 이상 팔로우하지 않는 답변들이 Timeline에서 제거되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        topic = Topic.objects.get(creator=user)
+        answer = Answer.objects.filter(question__topics=topic).exclude(user=user).first()
+        feed.fan_out_answer(answer.pk)
+        # 여전히 팔로우 중인 토픽의 답변은 남아있음
+        feed.prune_user_feed(user.pk)
+        self.assertTrue(AnswerFeedEntry.objects.filter(user=user, answer=answer).exists())
+
+        UserFollowRelation.objects.filter(user=user).delete()
+        InterestFollowRelation.objects.filter(user=user).delete()
+        relation = ExpertiseFollowRelation.objects.filter(user=user).last()
+        ExpertiseFollowRelation.objects.filter(user=user).exclude(pk=relation.pk).delete()
+
+        self.client.force_authenticate(user=user)
+        response = self.client.delete(f'/user/topic-expertise-follow-relation/{relation.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(AnswerFeedEntry.objects.filter(user=user).exists())
+
+    def test_page_and_cursor_use_same_order(self):
+        """
+        ?page= 와 cursor 요청이 Timeline entry의 modified_at을 같은 정렬 기준으로 사용하는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        feed.backfill_user_feed(user.pk)
+        # Timeline entry의 modified_at이 답변의 modified_at과 다른 경우
+        entry = AnswerFeedEntry.objects.filter(user=user).order_by('-modified_at').first()
+        AnswerFeedEntry.objects.filter(pk=entry.pk).update(modified_at=F('modified_at') - datetime.timedelta(days=1))
+
+        self.client.force_authenticate(user=user)
+        with self.settings(FEED_FANOUT_TOPIC_FOLLOWER_LIMIT=1):
+            response = self.client.get(f'{self.URL_API_ANSWER_MAIN_FEED_LIST}?page=1&page_size=100')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            page_pks = [result['pk'] for result in response.data['results']]
+
+            cursor_pks = []
+            url = f'{self.URL_API_ANSWER_MAIN_FEED_LIST}?page_size=2'
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                cursor_pks.extend(result['pk'] for result in response.data['results'])
+                url = response.data['next']
+
+        self.assertEqual(page_pks, cursor_pks)
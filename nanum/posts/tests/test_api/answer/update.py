@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
-from posts.models import Answer
+from posts.models import Answer, QuillDeltaOperation
 from posts.serializers import AnswerGetSerializer, AnswerUpdateSerializer
 from ...custom_base import CustomBaseTest
 
@@ -130,3 +132,39 @@ class AnswerUpdateTest(CustomBaseTest):
         }
         response = self.client.patch(self.URL_API_ANSWER_DETAIL.format(pk=answer.pk), data=data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_long_answer_query_count(self):
+        """
+        긴 답변의 맨 앞에 줄을 추가하고 중간의 줄을 지웠을 때
+        QuillDeltaOperation 에 대한 write 쿼리가 줄 수와 상관없이 UPDATE, INSERT, DELETE 한 번씩인지 확인
+        :return:
+        """
+        user = User.objects.first()
+        answer = Answer.objects.filter(user=user).first()
+        self.client.force_authenticate(user=user)
+        answer.quill_delta_operation_set.all().delete()
+        QuillDeltaOperation.objects.bulk_create([
+            QuillDeltaOperation(answer=answer, line_no=line_no, insert_value=f'line {line_no}\n')
+            for line_no in range(1, 301)
+        ])
+
+        ops = [{"insert": f"line {line_no}\n"} for line_no in range(1, 301)]
+        del ops[150]
+        ops.insert(0, {"attributes": {"bold": True}, "insert": "new"})
+        content = {"ops": ops}
+        data = {
+            'content': content,
+            'content_html': self.ANSWER_HTML,
+        }
+        table = QuillDeltaOperation._meta.db_table
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(self.URL_API_ANSWER_DETAIL.format(pk=answer.pk), data=data, format='json')
+        write_queries = [
+            query['sql'] for query in context.captured_queries
+            if table in query['sql'] and not query['sql'].startswith('SELECT')
+        ]
+        answer = Answer.objects.get(pk=answer.pk)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(write_queries), 3)
+        self.assertEqual(dict(answer.content), content)
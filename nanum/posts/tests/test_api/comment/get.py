@@ -1,7 +1,12 @@
+import base64
+import json
+
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from rest_framework import status
 
 from posts.models import Comment, Answer
+from posts.utils.comment_storage import build_paths_from_mptt
 from posts.tests.custom_base import CustomBaseTest
 
 User = get_user_model()
@@ -114,4 +119,104 @@ class CommentGetTest(CustomBaseTest):
         self.client.force_authenticate(user=user)
         response = self.client.get(f'{self.URL_API_COMMENT_DETAIL.format(pk=1)}?immediate_children=True')
         self.assertEqual(response.data["immediate_children_count"], 10)
-        self.assertEqual("immediate_children" in response.data, True)
\ No newline at end of file
+        self.assertEqual("immediate_children" in response.data, True)
+
+    def test_comment_retrieve_tree(self):
+        """
+        ?tree=true 일 경우 children 수와 상관없이 일정한 쿼리 수로 subtree 전체가 중첩된 형태로 반환되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        parent = Comment.objects.get(pk=1)
+        self.client.force_authenticate(user=user)
+        url = f'{self.URL_API_COMMENT_DETAIL.format(pk=parent.pk)}?tree=true&page_size=10'
+
+        # comment + subtree + 추천/비추천 relation 2 (+ 인증 관련 쿼리)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['all_children_count'], parent.get_descendant_count())
+        children = response.data['children']['results']
+        self.assertEqual(len(children), parent.get_children().count())
+        self.assertEqual(
+            sum(len(child['children']) + 1 for child in children),
+            parent.get_descendant_count()
+        )
+
+    def test_comment_retrieve_thread(self):
+        """
+        ?thread=true 일 경우 replies개의 children만 반환되고,
+        보여주지 않은 Comment 수와 continuation url로 나머지 children을 이어서 가져올 수 있는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        parent = Comment.objects.get(pk=1)
+        self.client.force_authenticate(user=user)
+        url = f'{self.URL_API_COMMENT_DETAIL.format(pk=parent.pk)}?thread=true&depth=1&replies=4'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['children']), 4)
+        self.assertEqual(response.data['remaining_children_count'], parent.get_descendant_count() - 4)
+        # depth=1 이므로 children의 children은 continuation으로 가져옴
+        self.assertIsNotNone(response.data['children'][0]['continuation'])
+
+        # 각 child의 subtree 크기 - continuation 이후 남은 Comment 수 확인에 사용
+        subtree_counts = {child.pk: 1 + child.get_descendant_count() for child in parent.get_children()}
+        shown = [child['pk'] for child in response.data['children']]
+        while response.data['continuation']:
+            response = self.client.get(response.data['continuation'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            remaining_count = sum(count for pk, count in subtree_counts.items() if pk not in shown)
+            self.assertEqual(response.data['remaining_children_count'],
+                             remaining_count - len(response.data['children']))
+            shown.extend(child['pk'] for child in response.data['children'])
+        self.assertEqual(shown, list(parent.get_children().values_list('pk', flat=True)))
+
+    def test_comment_retrieve_thread_with_invalid_continuation(self):
+        """
+        다른 Comment에 대한 continuation이나 잘못된 형식의 continuation일 경우 400을 반환하는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        parent = Comment.objects.get(pk=1)
+        self.client.force_authenticate(user=user)
+        url = f'{self.URL_API_COMMENT_DETAIL.format(pk=parent.pk)}?thread=true&depth=1&replies=1'
+        tokens = [
+            'invalid',
+            base64.urlsafe_b64encode(json.dumps([1, 2]).encode('utf-8')).decode('ascii'),
+            base64.urlsafe_b64encode(json.dumps({'pk': parent.pk + 1, 'after': 0}).encode('utf-8')).decode('ascii'),
+            base64.urlsafe_b64encode(json.dumps({'pk': parent.pk, 'after': 'a'}).encode('utf-8')).decode('ascii'),
+        ]
+        for token in tokens:
+            response = self.client.get(f'{url}&continuation={token}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_comment_retrieve_thread_path_backend(self):
+        """
+        COMMENT_TREE_BACKEND = 'path' 일 경우에도 continuation으로 보여주지 않은 children을 빠짐없이 이어서 가져오는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        parent = Comment.objects.get(pk=1)
+        build_paths_from_mptt()
+        self.client.force_authenticate(user=user)
+        url = f'{self.URL_API_COMMENT_DETAIL.format(pk=parent.pk)}?thread=true&depth=2&replies=3'
+
+        with override_settings(COMMENT_TREE_BACKEND='path'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['all_children_count'], parent.get_descendant_count())
+            shown_count = sum(1 + len(child['children']) for child in response.data['children'])
+            self.assertEqual(response.data['remaining_children_count'], parent.get_descendant_count() - shown_count)
+
+            subtree_counts = {child.pk: 1 + child.get_descendant_count() for child in parent.get_children()}
+            shown = [child['pk'] for child in response.data['children']]
+            while response.data['continuation']:
+                response = self.client.get(response.data['continuation'])
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                remaining_count = sum(count for pk, count in subtree_counts.items() if pk not in shown)
+                shown_count = sum(1 + len(child['children']) for child in response.data['children'])
+                self.assertEqual(response.data['remaining_children_count'], remaining_count - shown_count)
+                shown.extend(child['pk'] for child in response.data['children'])
+        self.assertEqual(shown, list(parent.get_children().values_list('pk', flat=True)))
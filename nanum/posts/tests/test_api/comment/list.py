@@ -3,12 +3,13 @@ from django.urls import reverse
 from rest_framework import status
 
 from posts.serializers import CommentCreateSerializer, CommentSerializer
+from utils.query_budget import QueryBudgetTestMixin
 from ...custom_base import CustomBaseTest
 
 User = get_user_model()
 
 
-class CommentListTest(CustomBaseTest):
+class CommentListTest(QueryBudgetTestMixin, CustomBaseTest):
     """
     url :       /post/comment/
     method :    GET
@@ -91,3 +92,12 @@ class CommentListTest(CustomBaseTest):
         for query in query_paramters:
             response = self.client.get(f'{self.URL_API_COMMENT_LIST_CREATE}?{query}=1')
             self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_tree_list_queries_do_not_scale_with_page_size(self):
+        """
+        ?tree=true 목록의 쿼리 수가 page_size에 따라 늘어나지 않는지(N+1이 없는지) 확인
+        :return:
+        """
+        user = User.objects.first()
+        self.client.force_authenticate(user=user)
+        self.assertQueriesDoNotScale(f'{self.URL_API_COMMENT_LIST_CREATE}?tree=true')
@@ -7,18 +7,20 @@ from rest_framework import status
 from posts.apis import (
     QuestionListCreateView,
 )
+from utils.query_budget import QueryBudgetTestMixin
 from ..base import QuestionBaseTest
 
 User = get_user_model()
 
 
-class QuestionListCreateCommonViewTest(QuestionBaseTest):
+class QuestionListCreateCommonViewTest(QueryBudgetTestMixin, QuestionBaseTest):
     """
     1. URL name으로 원하는 URL과 실제로 만들어지는 URL이 같은지 테스트(test_question_create_url_name_reverse)
     2. URL이 실제 URL name을 참조하고 있는지 테스트(test_question_create_url_name_resolve)
     3. 사용이 예상되는 view class와 실제로 사용되는 view class가 같은지 테스트(test_question_create_url_resolve_view_class)
     4. user가 None이면 쿼리에서 제외되는지 테스트(test_get_question_list_exclude_user_is_none)
     5. query parameters로 filter가 잘 작동하는지 테스트(test_get_question_list_filter_is_working)
+    6. page_size에 따라 쿼리 수가 늘어나지 않는지 테스트(test_get_question_list_queries_do_not_scale_with_page_size)
     """
 
     VIEW_CLASS = QuestionListCreateView
@@ -62,7 +64,7 @@ class QuestionListCreateCommonViewTest(QuestionBaseTest):
         for i in range(num_questions):
             self.create_question(user=user)
 
-        response = self.client.get(self.URL_API_QUESTION_LIST_CREATE)
+        response = self.client.get(f'{self.URL_API_QUESTION_LIST_CREATE}?page=1')
         counted_question = response.data.get('count')
         # user가 없는 Question객체는 response에 포함되지 않는지 확인
         self.assertEqual(counted_question, num_questions)
@@ -82,7 +84,7 @@ class QuestionListCreateCommonViewTest(QuestionBaseTest):
         self.create_question(user=temp_user)
         temp_topic = self.create_topic(creator=temp_user)
         url = reverse(self.URL_API_QUESTION_LIST_CREATE_NAME)
-        response = self.client.get(url)
+        response = self.client.get(f'{url}?page=1')
         num_of_questions = response.data.get('count')
         max_page = int((num_of_questions / 5)) + 1
 
@@ -121,3 +123,16 @@ class QuestionListCreateCommonViewTest(QuestionBaseTest):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         print('\ncascade한 query parameters에 대한 테스트 성공!\n')
+
+    # N+1 쿼리 확인
+    def test_get_question_list_queries_do_not_scale_with_page_size(self):
+        """
+        목록의 쿼리 수가 page_size에 따라 늘어나지 않는지(질문마다 topics를 가져오지 않는지) 확인
+        :return:
+        """
+        user = self.create_user()
+        topic = self.create_topic(creator=user)
+        for i in range(10):
+            self.create_question(user=user).topics.add(topic)
+        self.client.force_authenticate(user=user)
+        self.assertQueriesDoNotScale(self.URL_API_QUESTION_LIST_CREATE)
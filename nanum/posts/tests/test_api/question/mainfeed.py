@@ -1,6 +1,9 @@
 from django.urls import reverse, resolve
 
 from posts.apis import QuestionMainFeedListView
+from posts.models import Question
+from users.models import InterestFollowRelation
+from utils.query_budget import QueryRecorder
 from .base import QuestionBaseTest
 
 
@@ -45,3 +48,24 @@ class QuestionMainFeedListViewTest(QuestionBaseTest):
     # main-feed
     def test_get_question_main_feed_list(self):
         pass
+
+    def test_get_question_main_feed_queries_do_not_scale(self):
+        """
+        main-feed는 pagination이 없으므로 질문 수가 늘어나도 쿼리 수가 같은지(N+1이 없는지) 확인
+        :return:
+        """
+        user = self.create_user(email='reader@user.com')
+        writer = self.create_user(email='writer@user.com')
+        topic = self.create_topic(creator=writer)
+        InterestFollowRelation.objects.create(user=user, topic=topic)
+        self.client.force_authenticate(user=user)
+
+        counts = []
+        for num_of_questions in (2, 10):
+            while Question.objects.filter(user=writer).count() < num_of_questions:
+                self.create_question(user=writer).topics.add(topic)
+            with QueryRecorder() as recorder:
+                response = self.client.get(self.URL_API_QUESTION_MAIN_FEED_LIST)
+            self.assertEqual(len(response.data), num_of_questions)
+            counts.append(recorder.count)
+        self.assertEqual(counts[0], counts[1])
@@ -1,14 +1,23 @@
 import base64
 import json
 import os
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from rest_framework import status
 
 from config.settings import BASE_DIR
-from posts.models import Answer, Question
+from posts.models import Answer, CounterReconcileRun, Question
+from posts.serializers.answer import django_quill
+from posts.utils.answer_image import process_answer_images
+from posts.utils.reconcile import (
+    get_counter_specs, reconcile_all_counters, reconcile_changed_counters, reconcile_counters,
+)
 from posts.tests.custom_base import CustomBaseTest
 from topics.models import Topic
+from users.models import AnswerDownVoteRelation, AnswerUpVoteRelation
+from utils import flush_counter_buffer, get_counter_buffer, get_pending_counts
 
 User = get_user_model()
 
@@ -119,6 +128,56 @@ class QuillDeltaOperationModelTest(CustomBaseTest):
                                       return_response=True)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    @override_settings(QUILL_IMAGE_MAX_BYTES=1024)
+    def test_oversized_image_rejected(self):
+        """
+        QUILL_IMAGE_MAX_BYTES 보다 큰 이미지는 decode 전에 400에러가 반환되는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        question = Question.objects.first()
+        img_path = os.path.join(BASE_DIR, 'posts', 'tests', 'test_api', 'answer', 'image.jpg')
+        image_base64 = "data:image/jpeg;base64," + base64.b64encode(open(img_path, "rb").read()).decode()
+        content = {"ops": [{"insert": "Test Text\n"}, {"insert": {"image": image_base64}}]}
+        content_html = '<div class="ql-editor"><p>Test Text</p>' \
+                       f'<img src="{image_base64}">' \
+                       '</div>'
+        response = self.create_answer(user=user, question=question, content=content, content_html=content_html,
+                                      return_response=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_image_processed_after_commit(self):
+        """
+        base64 이미지는 placeholder url로 먼저 저장되고,
+        process_answer_images 실행 후 image_insert_value와 content_html이 실제 url로 바뀌는지 확인
+        :return:
+        """
+        user = User.objects.first()
+        question = Question.objects.first()
+        img_path = os.path.join(BASE_DIR, 'posts', 'tests', 'test_api', 'answer', 'image.jpg')
+        image_base64 = "data:image/jpeg;base64," + base64.b64encode(open(img_path, "rb").read()).decode()
+        content = {"ops": [{"insert": "Test Text\n"}, {"insert": {"image": image_base64}}]}
+        content_html = '<div class="ql-editor"><p>Test Text</p>' \
+                       f'<img src="{image_base64}">' \
+                       '</div>'
+        self.create_answer(user=user, question=question, content=content, content_html=content_html)
+        answer = Answer.objects.filter(user=user).order_by('-pk').first()
+        qdo = answer.quill_delta_operation_set.get(line_no=2)
+        placeholder = qdo.image_insert_value['image']
+
+        self.assertFalse(qdo.image)
+        self.assertIsNotNone(django_quill.get_placeholder_token(placeholder))
+        self.assertIn(placeholder, answer.content_html)
+
+        self.assertEqual(process_answer_images(answer.pk), 1)
+        answer.refresh_from_db()
+        qdo.refresh_from_db()
+
+        self.assertTrue(qdo.image)
+        self.assertNotEqual(qdo.image_insert_value['image'], placeholder)
+        self.assertNotIn(placeholder, answer.content_html)
+        self.assertIn(qdo.image_insert_value['image'], answer.content_html)
+
 
 class AnswerModelTest(CustomBaseTest):
     def test_answer_string_method(self):
@@ -201,3 +260,150 @@ class AnswerModelTest(CustomBaseTest):
 
         self.assertEqual(question_answer_count_before - question_answer_count_after, 1)
         self.assertEqual(related_topics_answer_count_before - related_topics_answer_count_after, related_topics.count())
+
+
+class AnswerVoteRelationModelTest(CustomBaseTest):
+    def test_vote_counts_updated_atomically(self):
+        """
+        Upvote 후 Downvote 시 Upvote가 취소되고, count가 음수가 되지 않는지 확인
+        :return:
+        """
+        answer = Answer.objects.first()
+        user = User.objects.exclude(pk=answer.user.pk).first()
+
+        AnswerUpVoteRelation.objects.create(user=user, answer=answer)
+        answer.refresh_from_db()
+        self.assertEqual((answer.upvote_count, answer.downvote_count), (1, 0))
+
+        downvote = AnswerDownVoteRelation.objects.create(user=user, answer=answer)
+        answer.refresh_from_db()
+        self.assertEqual((answer.upvote_count, answer.downvote_count), (0, 1))
+        self.assertFalse(AnswerUpVoteRelation.objects.filter(user=user, answer=answer).exists())
+
+        Answer.objects.filter(pk=answer.pk).update(downvote_count=0)
+        downvote.delete()
+        answer.refresh_from_db()
+        self.assertEqual(answer.downvote_count, 0)
+
+    @override_settings(COUNTER_BUFFER_ENABLED=True, COUNTER_BUFFER_BACKEND='utils.counter_buffer.LocalCounterBuffer',
+                       COUNTER_BUFFER_FLUSH_INTERVAL=0)
+    def test_buffered_counts_merged_and_flushed(self):
+        """
+        buffer에 쌓인 count delta가 serialize 결과에 더해지고, flush 이후 DB에 반영되는지 확인
+        :return:
+        """
+        answer = Answer.objects.first()
+        counter_buffer = get_counter_buffer()
+        counter_buffer.drain()
+        counter_buffer.add((Answer._meta.label, 'pk', answer.pk), {'upvote_count': 3})
+
+        response = self.client.get(self.URL_API_ANSWER_DETAIL.format(pk=answer.pk))
+        self.assertEqual(response.data['upvote_count'], answer.upvote_count + 3)
+
+        flush_counter_buffer()
+        self.assertEqual(Answer.objects.get(pk=answer.pk).upvote_count, answer.upvote_count + 3)
+        self.assertEqual(get_pending_counts(Answer, {'pk': answer.pk}), {})
+
+    @override_settings(COUNTER_BUFFER_ENABLED=True, COUNTER_BUFFER_BACKEND='utils.counter_buffer.LocalCounterBuffer',
+                       COUNTER_BUFFER_FLUSH_INTERVAL=0)
+    def test_buffered_counts_read_once_per_page(self):
+        """
+        list 응답에서 page 안 답변들의 buffer delta를 get_many 한 번으로 가져와 더하는지 확인
+        :return:
+        """
+        answer = Answer.objects.filter(published=True).first()
+        counter_buffer = get_counter_buffer()
+        counter_buffer.drain()
+        counter_buffer.add((Answer._meta.label, 'pk', answer.pk), {'upvote_count': 2})
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {answer.user.token}')
+        with patch.object(counter_buffer, 'get_many', wraps=counter_buffer.get_many) as get_many:
+            response = self.client.get(self.URL_API_ANSWER_LIST_CREATE, {'user': answer.user.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_many.call_count, 1)
+        upvote_counts = {result['pk']: result['upvote_count'] for result in response.data['results']}
+        self.assertEqual(upvote_counts[answer.pk], answer.upvote_count + 2)
+        counter_buffer.drain()
+
+    def test_drifted_counts_reconciled(self):
+        """
+        실제 개수와 달라진 count가 dry_run에서는 차이만 반환되고, 이후 실제 개수로 업데이트 되는지 확인
+        :return:
+        """
+        answer = Answer.objects.first()
+        user = User.objects.exclude(pk=answer.user.pk).first()
+        AnswerUpVoteRelation.objects.create(user=user, answer=answer)
+        Answer.objects.filter(pk=answer.pk).update(upvote_count=5, bookmark_count=-2)
+
+        result = reconcile_counters(dry_run=True)
+        self.assertIn((answer.pk, 5, 1), result[('posts.Answer', 'upvote_count')])
+        self.assertIn((answer.pk, -2, 0), result[('posts.Answer', 'bookmark_count')])
+        self.assertEqual(Answer.objects.get(pk=answer.pk).upvote_count, 5)
+
+        reconcile_counters()
+        answer.refresh_from_db()
+        self.assertEqual((answer.upvote_count, answer.bookmark_count), (1, 0))
+        self.assertEqual(reconcile_counters(dry_run=True)[('posts.Answer', 'upvote_count')], [])
+
+    @override_settings(COUNTER_BUFFER_ENABLED=True, COUNTER_BUFFER_BACKEND='utils.counter_buffer.LocalCounterBuffer',
+                       COUNTER_BUFFER_FLUSH_INTERVAL=0)
+    def test_reconcile_with_buffered_counts(self):
+        """
+        buffer에 남아있는 delta가 reconcile 이후의 flush에서 실제 개수에 다시 더해지지 않는지 확인
+        :return:
+        """
+        answer = Answer.objects.first()
+        user = User.objects.exclude(pk=answer.user.pk).first()
+        counter_buffer = get_counter_buffer()
+        counter_buffer.drain()
+        Answer.objects.filter(pk=answer.pk).update(upvote_count=0)
+        # TestCase에서는 commit 되지 않으므로 commit 이후 buffer에 쌓이는 delta를 직접 추가
+        AnswerUpVoteRelation.objects.create(user=user, answer=answer)
+        counter_buffer.add((Answer._meta.label, 'pk', answer.pk), {'upvote_count': 1})
+
+        reconcile_counters(specs=[spec for spec in get_counter_specs() if spec.model is Answer])
+        flush_counter_buffer()
+        answer.refresh_from_db()
+        self.assertEqual(answer.upvote_count, 1)
+        self.assertEqual(get_pending_counts(Answer, {'pk': answer.pk}), {})
+
+    def test_incremental_reconcile_since_last_run(self):
+        """
+        incremental 모드가 DB에 저장된 마지막 실행 시각 이후의 변경만 다시 계산하고,
+        relation 삭제로 생긴 차이는 전체 다시 계산에서 반영되는지 확인
+        :return:
+        """
+        answer = Answer.objects.first()
+        user = User.objects.exclude(pk=answer.user.pk).first()
+        reconcile_changed_counters()
+        self.assertTrue(CounterReconcileRun.objects.filter(full=True).exists())
+
+        relation = AnswerUpVoteRelation.objects.create(user=user, answer=answer)
+        Answer.objects.filter(pk=answer.pk).update(upvote_count=5)
+        result = reconcile_changed_counters()
+        self.assertIn((answer.pk, 5, 1), result[('posts.Answer', 'upvote_count')])
+        self.assertEqual(CounterReconcileRun.objects.filter(full=False).count(), 1)
+
+        AnswerUpVoteRelation.objects.filter(pk=relation.pk).delete()
+        Answer.objects.filter(pk=answer.pk).update(upvote_count=1)
+        result = reconcile_changed_counters()
+        self.assertEqual(result[('posts.Answer', 'upvote_count')], [])
+
+        reconcile_all_counters()
+        answer.refresh_from_db()
+        self.assertEqual(answer.upvote_count, 0)
+
+    def test_full_save_keeps_counts(self):
+        """
+        vote 이전에 불러온 Answer를 save 해도 DB에서 증가된 count를 덮어쓰지 않는지 확인
+        :return:
+        """
+        answer = Answer.objects.first()
+        user = User.objects.exclude(pk=answer.user.pk).first()
+
+        AnswerUpVoteRelation.objects.create(user=user, answer=answer)
+        answer.published = True
+        answer.save()
+        answer.refresh_from_db()
+        self.assertEqual(answer.upvote_count, 1)
+        self.assertTrue(answer.published)
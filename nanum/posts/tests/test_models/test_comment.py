@@ -1,6 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
 
 from posts.models import *
+from posts.utils.comment_storage import build_mptt_from_paths, build_path, build_paths_from_mptt
 from topics.models import Topic
 from ..custom_base import CustomBaseTest
 
@@ -83,6 +88,21 @@ class CommentPostIntermediateModelTest(CustomBaseTest):
         self.assertEqual(cpi_question.post_type, 'question')
         self.assertEqual(cpi_answer.post_type, 'answer')
 
+    def test_post_type_field_without_query(self):
+        """
+        CommentPostIntermediate 모델 post_type 필드로 post를 가져오지 않고 post의 model, pk를 알 수 있는지 확인
+        :return:
+        """
+        question = Question.objects.first()
+        answer = Answer.objects.first()
+
+        cpi_question = CommentPostIntermediate.objects.get(question=question)
+        cpi_answer = CommentPostIntermediate.objects.get(answer=answer)
+
+        with self.assertNumQueries(0):
+            self.assertEqual((cpi_question.post_model, cpi_question.post_pk), (Question, question.pk))
+            self.assertEqual((cpi_answer.post_model, cpi_answer.post_pk), (Answer, answer.pk))
+
     def test_post_property(self):
         """
         CommentPostIntermediate 모델 post property 테스트
@@ -341,3 +361,51 @@ class CommentModelTest(CustomBaseTest):
 
         self.assertEqual(q_comment_count_before - q_comment_count_after, q_children_count)
         self.assertEqual(a_comment_count_before - a_comment_count_after, a_children_count)
+
+    def test_comment_tree_path_backend(self):
+        """
+        COMMENT_TREE_BACKEND = 'path' 일 경우 tree_path로 children/descendant를 구할 수 있고,
+        MPTT column과 tree_path 간의 변환 결과가 기존 트리와 같은지 확인
+        :return:
+        """
+        ac1 = Comment.objects.get(content="답변 코멘트")
+        build_paths_from_mptt()
+
+        with override_settings(COMMENT_TREE_BACKEND='path'):
+            ac1.refresh_from_db()
+            reply = Comment.objects.create(
+                user=ac1.user,
+                content="path 코멘트",
+                comment_post_intermediate=ac1.comment_post_intermediate,
+                parent=ac1,
+            )
+            self.assertTrue(reply.tree_path.startswith(ac1.tree_path + '.'))
+            self.assertIn(reply, ac1.immediate_children)
+            self.assertEqual(ac1.all_children_count, 4)
+
+            build_mptt_from_paths()
+            ac1.refresh_from_db()
+            self.assertEqual(ac1.get_descendant_count(), 4)
+            self.assertEqual(list(ac1.get_descendants()), list(ac1.all_children))
+
+    def test_migrate_comment_tree_command(self):
+        """
+        migrate_comment_tree 명령어로 tree 범위를 나누어 변환해도 tree_path와 MPTT column이 같은 트리를 나타내는지 확인
+        :return:
+        """
+        comments = list(Comment.objects.all())
+        descendants = {c.pk: set(c.get_descendants().values_list('pk', flat=True)) for c in comments}
+        levels = {c.pk: c.level for c in comments}
+
+        call_command('migrate_comment_tree', '--to', 'path', '--chunk-size', '1', stdout=StringIO())
+        paths = dict(Comment.objects.values_list('pk', 'tree_path'))
+        for comment in comments:
+            parent_path = paths[comment.parent_id] if comment.parent_id else ''
+            self.assertEqual(paths[comment.pk], build_path(parent_path, comment.pk))
+
+        Comment.objects.update(lft=0, rght=0, level=0, tree_id=0)
+        call_command('migrate_comment_tree', '--to', 'mptt', '--chunk-size', '2', stdout=StringIO())
+        for comment in Comment.objects.all():
+            self.assertEqual(set(comment.get_descendants().values_list('pk', flat=True)), descendants[comment.pk])
+            self.assertEqual(comment.level, levels[comment.pk])
+            self.assertEqual(comment.tree_id, comment.get_root().pk)
@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from posts.models import Answer, Comment, Question
+from posts.utils.benchmark import compare_results
+from posts.utils.benchmark_data import BenchmarkScale, clear_benchmark_data, get_benchmark_users, seed_benchmark_data
+
+SCALE = BenchmarkScale(users=20, topics=5, questions=10, answers=2, delta_lines=3,
+                       comments=4, comment_depth=3, votes=3, follows=4, feed_users=2)
+
+
+class BenchmarkDataTest(TestCase):
+    def test_seeded_data_is_consistent(self):
+        """
+        bulk_create로 생성한 Comment 트리의 MPTT 값과 count 필드들이 실제 데이터와 일치하는지 확인
+        :return:
+        """
+        result = seed_benchmark_data(SCALE, seed=1, batch_size=7)
+        self.assertEqual(get_benchmark_users().count(), SCALE.users)
+        self.assertEqual(result['answers'], Answer.objects.count())
+
+        for comment in Comment.objects.all():
+            self.assertEqual(comment.get_descendant_count(), Comment.objects.filter(
+                tree_id=comment.tree_id, lft__gt=comment.lft, rght__lt=comment.rght).count())
+            if comment.parent_id is not None:
+                self.assertEqual(comment.level, comment.parent.level + 1)
+        for question in Question.objects.all():
+            self.assertEqual(question.answer_count, question.answer_set.count())
+
+        clear_benchmark_data()
+        self.assertFalse(get_benchmark_users().exists())
+        self.assertFalse(Question.objects.exists())
+
+    def test_compare_results(self):
+        """
+        쿼리 수가 늘었거나 p95가 threshold 이상 느려진 endpoint만 회귀로 반환하는지 확인
+        :return:
+        """
+        baseline = {'endpoints': {'a': {'queries': 5, 'p95': 10.0}, 'b': {'queries': 5, 'p95': 10.0}}}
+        current = {'endpoints': {'a': {'queries': 6, 'p95': 11.0}, 'b': {'queries': 5, 'p95': 11.0},
+                                 'c': {'queries': 50, 'p95': 100.0}}}
+        self.assertEqual(compare_results(baseline, current, threshold=0.2), ['a: queries 5 -> 6'])
@@ -0,0 +1,73 @@
+import time
+
+from django.test import SimpleTestCase
+
+from posts.utils.delta_diff import Shift, diff_keys, diff_operations
+
+
+class DeltaDiffTest(SimpleTestCase):
+    def test_insert_shifts_following_lines(self):
+        """
+        중간에 한 줄을 추가하면 뒤의 줄들은 하나의 shift 구간으로 묶이는지 확인
+        :return:
+        """
+        diff = diff_keys('abcd', 'abxcd')
+        self.assertEqual(diff.inserts, [2])
+        self.assertEqual(diff.deletes, [])
+        self.assertEqual(diff.moves, [])
+        self.assertEqual(diff.shifts, [Shift(2, 3, 1)])
+
+    def test_moved_line_is_not_recreated(self):
+        """
+        같은 내용의 줄이 다른 위치로 옮겨진 경우 삭제 후 생성이 아닌 move로 처리되는지 확인
+        :return:
+        """
+        diff = diff_keys('abcd', 'bcda')
+        self.assertEqual(diff.inserts, [])
+        self.assertEqual(diff.deletes, [])
+        self.assertEqual(diff.moves, [(0, 3)])
+
+    def test_operation_key_order_independent(self):
+        """
+        dict의 key 순서가 달라도 같은 operation으로 취급하는지 확인
+        :return:
+        """
+        old = [{"attributes": {"bold": True}, "insert": "bold"}, {"insert": "\n"}]
+        new = [{"insert": "bold", "attributes": {"bold": True}}, {"insert": "\n"}]
+        diff = diff_operations(old, new)
+        self.assertEqual(diff.matches, [(0, 0), (1, 1)])
+        self.assertEqual(diff.inserts, [])
+        self.assertEqual(diff.deletes, [])
+
+    def test_large_unrelated_documents(self):
+        """
+        전혀 다른 큰 문서끼리 비교해도 MAX_EDIT_DISTANCE에서 멈추어 빠르게 끝나고,
+        순서가 뒤집힌 문서는 삭제 후 생성 없이 move로 처리되는지 확인
+        :return:
+        """
+        old = [f'old {i}' for i in range(5000)]
+        new = [f'new {i}' for i in range(5000)]
+        started = time.perf_counter()
+        diff = diff_keys(old, new)
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual(len(diff.inserts), 5000)
+        self.assertEqual(len(diff.deletes), 5000)
+
+        diff = diff_keys(old, old[::-1])
+        self.assertEqual(diff.inserts, [])
+        self.assertEqual(diff.deletes, [])
+        self.assertEqual(len(diff.matches) + len(diff.moves), 5000)
+
+    def test_large_document_with_few_edits(self):
+        """
+        큰 문서의 일부 줄만 바뀐 경우 바뀐 줄만 삭제/생성되는지 확인
+        :return:
+        """
+        old = [f'line {i}' for i in range(5000)]
+        new = list(old)
+        for i in range(0, 5000, 100):
+            new[i] = f'edited {i}'
+        diff = diff_keys(old, new)
+        self.assertEqual(diff.inserts, list(range(0, 5000, 100)))
+        self.assertEqual(diff.deletes, list(range(0, 5000, 100)))
+        self.assertEqual(len(diff.matches), 4950)
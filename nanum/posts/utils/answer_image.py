@@ -0,0 +1,55 @@
+from django.db.transaction import atomic
+
+from utils import invalidate_representations
+from ..models import Answer, QuillDeltaOperation
+from ..utils.quill_js import DjangoQuill
+
+__all__ = (
+    'process_answer_images',
+)
+
+django_quill = DjangoQuill(model=QuillDeltaOperation, parent_model=Answer)
+
+
+def process_answer_images(answer_pk):
+    """
+    answer에 spool된 이미지들을 resize 하여 storage에 저장하고
+    QuillDeltaOperation.image_insert_value와 Answer.content_html의 placeholder url을 실제 url로 교체
+
+    :param answer_pk: Answer pk
+    :return: 처리된 이미지 수
+    """
+    qdos = QuillDeltaOperation.objects.filter(answer=answer_pk, image='').exclude(image_insert_value=None)
+    replacements = dict()
+    for qdo in qdos:
+        placeholder = qdo.image_insert_value.get('image')
+        token = django_quill.get_placeholder_token(placeholder)
+        if not token:
+            continue
+        try:
+            url = django_quill.process_spooled_image(qdo, token=token, filename=f'{answer_pk}/{token}.jpeg')
+        except FileNotFoundError:
+            # 이미 다른 worker가 처리한 경우
+            continue
+        QuillDeltaOperation.objects.filter(pk=qdo.pk).update(
+            image=qdo.image.name,
+            image_insert_value=qdo.image_insert_value,
+        )
+        replacements[placeholder] = url
+
+    if not replacements:
+        return 0
+
+    with atomic():
+        answer = Answer.objects.select_for_update().only('content_html', 'content_preview_html').get(pk=answer_pk)
+        content_html, content_preview_html = answer.content_html, answer.content_preview_html
+        for placeholder, url in replacements.items():
+            content_html = content_html.replace(placeholder, url)
+            content_preview_html = content_preview_html.replace(placeholder, url)
+        Answer.objects.filter(pk=answer_pk).update(
+            content_html=content_html,
+            content_preview_html=content_preview_html,
+        )
+    # modified_at이 바뀌지 않는 UPDATE 이므로 cache된 serialize 결과를 직접 삭제
+    invalidate_representations(Answer, [answer_pk])
+    return len(replacements)
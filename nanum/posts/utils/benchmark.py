@@ -0,0 +1,142 @@
+"""
+API benchmark - 목록 API들의 응답 시간(p50/p95)과 쿼리 수를 측정하여 JSON baseline으로 저장하고 이전 baseline과 비교
+"""
+import statistics
+import subprocess
+import time
+from collections import namedtuple
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from topics.models import Topic
+from utils.query_budget import QueryRecorder
+from ..models import Answer, Comment, Question
+
+__all__ = (
+    'Endpoint',
+    'get_endpoints',
+    'run_benchmark',
+    'compare_results',
+)
+
+Endpoint = namedtuple('Endpoint', ['name', 'url'])
+
+
+def get_endpoints(user):
+    """
+    측정할 목록 API들 - user의 피드/팔로우 목록과, 가장 Comment가 많은 질문의 Comment 목록
+
+    :param user: 요청을 보낼 유저
+    :return: Endpoint list
+    """
+    question = Question.objects.order_by('-comment_count', 'pk').first()
+    comment = Comment.objects.filter(parent=None).order_by('-rght', 'pk').first()
+    endpoints = [
+        Endpoint('answer-list', reverse('post:answer:answer-list')),
+        Endpoint('answer-main-feed', reverse('post:answer:answer-main')),
+        Endpoint('question-list', reverse('post:question:list')),
+        Endpoint('question-main-feed', reverse('post:question:main-feed')),
+        Endpoint('user-followers', reverse('user:user-followers', kwargs={'pk': user.pk})),
+        Endpoint('user-followings', reverse('user:user-followings', kwargs={'pk': user.pk})),
+        Endpoint('user-following-interests', reverse('user:following-interests', kwargs={'pk': user.pk})),
+    ]
+    if question is not None:
+        comment_list = reverse('post:comment:comment-list')
+        endpoints += [
+            Endpoint('comment-list', f'{comment_list}?question={question.pk}'),
+            Endpoint('comment-list-tree', f'{comment_list}?question={question.pk}&tree=true'),
+        ]
+    if comment is not None:
+        comment_detail = reverse('post:comment:comment-detail', kwargs={'pk': comment.pk})
+        endpoints += [
+            Endpoint('comment-detail-tree', f'{comment_detail}?tree=true'),
+            Endpoint('comment-detail-thread', f'{comment_detail}?thread=true'),
+        ]
+    return endpoints
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def _measure(client, endpoint, iterations, warmup):
+    for _ in range(warmup):
+        client.get(endpoint.url)
+
+    latencies, queries, status_code = [], [], None
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = client.get(endpoint.url)
+        latencies.append((time.perf_counter() - started_at) * 1000)
+        queries.append(recorder.count)
+        status_code = response.status_code
+    return {
+        'url': endpoint.url,
+        'status': status_code,
+        'queries': max(queries),
+        'p50': round(statistics.median(latencies), 2),
+        'p95': round(_percentile(latencies, 95), 2),
+        'mean': round(statistics.mean(latencies), 2),
+        'iterations': iterations,
+    }
+
+
+def _get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(user, endpoints=None, iterations=20, warmup=3):
+    """
+    endpoints 마다 warmup 번 요청한 뒤 iterations 번 요청하여 응답 시간과 쿼리 수를 측정
+
+    :param user: 요청을 보낼 유저 (force_authenticate)
+    :param endpoints: Endpoint list, None일 경우 get_endpoints(user)
+    :return: JSON으로 저장할 수 있는 dict {'meta': {...}, 'endpoints': {name: {...}}}
+    """
+    client = APIClient()
+    client.force_authenticate(user=user)
+    endpoints = endpoints or get_endpoints(user)
+    # 측정 중에는 query budget으로 요청이 실패하지 않도록 함
+    with override_settings(ALLOWED_HOSTS=['testserver'], QUERY_BUDGET_ENFORCE=False):
+        results = {endpoint.name: _measure(client, endpoint, iterations, warmup) for endpoint in endpoints}
+    return {
+        'meta': {
+            'commit': _get_commit(),
+            'created_at': timezone.now().isoformat(),
+            'user': user.pk,
+            'rows': {
+                model._meta.label: model.objects.count()
+                for model in (user.__class__, Topic, Question, Answer, Comment)
+            },
+        },
+        'endpoints': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.2):
+    """
+    baseline과 비교하여 쿼리 수가 늘었거나 p95가 threshold 비율 이상 느려진 endpoint를 반환
+
+    :param baseline: 이전 run_benchmark 결과
+    :param current: 현재 run_benchmark 결과
+    :param threshold: 허용하는 p95 증가 비율
+    :return: 회귀 내용 string list
+    """
+    regressions = []
+    for name, result in current['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        if result['queries'] > previous['queries']:
+            regressions.append(f'{name}: queries {previous["queries"]} -> {result["queries"]}')
+        if result['p95'] > previous['p95'] * (1 + threshold):
+            regressions.append(f'{name}: p95 {previous["p95"]}ms -> {result["p95"]}ms')
+    return regressions
@@ -0,0 +1,357 @@
+"""
+API benchmark용 대량 데이터 생성
+
+model의 save()를 거치지 않고 bulk_create로 batch_size 개씩 INSERT 하므로
+count 필드, Comment 트리(MPTT column), 피드 Timeline은 생성 후 한 번에 계산
+- count 필드: reconcile_counters
+- Comment 트리: 트리 모양을 메모리에서 만들어 lft/rght/level/tree_id를 직접 계산 (path 방식일 경우 build_paths_from_mptt)
+- 피드: 측정에 사용할 유저들에 대해서만 backfill_user_feed
+
+benchmark 전용 DB에서 실행하며, 생성된 유저/토픽은 BENCHMARK_EMAIL_DOMAIN, BENCHMARK_TOPIC_PREFIX로 구분
+"""
+import random
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+
+from topics.models import Topic
+from users.models import (
+    AnswerUpVoteRelation, AnswerDownVoteRelation,
+    CommentUpVoteRelation, CommentDownVoteRelation,
+    ExpertiseFollowRelation, InterestFollowRelation, QuestionFollowRelation, UserFollowRelation,
+    Profile,
+)
+from .comment_storage import build_paths_from_mptt
+from .feed import backfill_user_feed
+from .reconcile import reconcile_counters
+from ..models import Answer, Comment, CommentPostIntermediate, Question, QuillDeltaOperation
+
+__all__ = (
+    'BENCHMARK_EMAIL_DOMAIN',
+    'BENCHMARK_TOPIC_PREFIX',
+    'BenchmarkScale',
+    'get_benchmark_users',
+    'seed_benchmark_data',
+    'clear_benchmark_data',
+)
+
+User = get_user_model()
+
+BENCHMARK_EMAIL_DOMAIN = 'benchmark.nanum'
+BENCHMARK_TOPIC_PREFIX = 'benchmark-'
+BENCHMARK_PASSWORD = 'benchmark'
+
+# users: 유저 수
+# topics: 토픽 수
+# questions: 질문 수
+# answers: 질문 당 평균 답변 수
+# delta_lines: 답변 당 Quill delta operation 수
+# comments: post(질문/답변) 당 평균 Comment 수
+# comment_depth: Comment 트리의 최대 depth
+# votes: 답변/Comment 당 평균 추천 수
+# follows: 유저 당 평균 팔로우(유저, 토픽, 질문) 수
+# feed_users: 피드를 backfill 할 유저 수 (측정에 사용하는 유저)
+BenchmarkScale = namedtuple('BenchmarkScale', [
+    'users', 'topics', 'questions', 'answers', 'delta_lines',
+    'comments', 'comment_depth', 'votes', 'follows', 'feed_users',
+])
+
+WORDS = (
+    '나눔', '질문', '답변', '경험', '공부', '개발', '회사', '학교', '여행', '음식',
+    'django', 'python', 'postgres', 'query', 'index', 'cache', 'feed', 'topic',
+)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _bulk_create(model, objects, batch_size):
+    """
+    objects(generator 가능)를 batch_size 개씩 bulk_create
+    :return: 생성된 객체들의 pk list
+    """
+    pks, batch = [], []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            pks.extend(o.pk for o in model.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        pks.extend(o.pk for o in model.objects.bulk_create(batch))
+    return pks
+
+
+def _sentence(rng, words=8):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _sample(rng, population, k):
+    return rng.sample(population, min(k, len(population)))
+
+
+def _count(rng, mean):
+    """
+    평균이 mean인 0 이상의 정수 - 일부 post/유저에 몰리도록 지수분포 사용
+    """
+    if mean <= 0:
+        return 0
+    return int(rng.expovariate(1 / mean))
+
+
+def _create_users(scale, run_id, batch_size):
+    password = make_password(BENCHMARK_PASSWORD)
+    user_pks = _bulk_create(User, (
+        User(email=f'{run_id}-{i}@{BENCHMARK_EMAIL_DOMAIN}', name=f'benchmark {i}', password=password)
+        for i in range(scale.users)
+    ), batch_size)
+    _bulk_create(Profile, (Profile(user_id=pk) for pk in user_pks), batch_size)
+    return user_pks
+
+
+def _create_topics(scale, run_id, user_pks, rng, batch_size):
+    return _bulk_create(Topic, (
+        Topic(name=f'{BENCHMARK_TOPIC_PREFIX}{run_id}-{i}', description=_sentence(rng), creator_id=rng.choice(user_pks))
+        for i in range(scale.topics)
+    ), batch_size)
+
+
+def _create_questions(scale, user_pks, topic_pks, rng, batch_size):
+    question_pks = _bulk_create(Question, (
+        Question(user_id=rng.choice(user_pks), content=_sentence(rng)[:150])
+        for _ in range(scale.questions)
+    ), batch_size)
+    through = Question.topics.through
+    _bulk_create(through, (
+        through(question_id=question_pk, topic_id=topic_pk)
+        for question_pk in question_pks
+        for topic_pk in _sample(rng, topic_pks, rng.randint(1, 3))
+    ), batch_size)
+    _bulk_create(CommentPostIntermediate, (
+        CommentPostIntermediate(question_id=pk, post_type=CommentPostIntermediate.POST_TYPE_QUESTION)
+        for pk in question_pks
+    ), batch_size)
+    return question_pks
+
+
+def _create_answers(scale, user_pks, question_pks, rng, batch_size):
+    """
+    답변과 답변의 Quill delta operation들을 생성
+    content_html은 delta의 줄들을 <p>로 감싼 html
+    """
+    answer_pks = []
+    for question_chunk in _chunks(question_pks, batch_size):
+        answers, lines = [], []
+        for question_pk in question_chunk:
+            for _ in range(_count(rng, scale.answers)):
+                answer_lines = [_sentence(rng, rng.randint(4, 20)) for _ in range(scale.delta_lines)]
+                html = ''.join(f'<p>{line}</p>' for line in answer_lines)
+                answers.append(Answer(
+                    user_id=rng.choice(user_pks), question_id=question_pk, published=True,
+                    content_html=html, content_preview_html=html[:200],
+                ))
+                lines.append(answer_lines)
+        pks = _bulk_create(Answer, answers, batch_size)
+        _bulk_create(QuillDeltaOperation, (
+            QuillDeltaOperation(
+                answer_id=answer_pk, line_no=line_no, insert_value=f'{line}\n',
+                attributes_value={'bold': True} if line_no == 0 else None,
+            )
+            for answer_pk, answer_lines in zip(pks, lines)
+            for line_no, line in enumerate(answer_lines)
+        ), batch_size)
+        answer_pks.extend(pks)
+    _bulk_create(CommentPostIntermediate, (
+        CommentPostIntermediate(answer_id=pk, post_type=CommentPostIntermediate.POST_TYPE_ANSWER)
+        for pk in answer_pks
+    ), batch_size)
+    return answer_pks
+
+
+def _random_tree(size, max_depth, rng):
+    """
+    size개의 node를 가진 임의의 트리를 만들고 preorder 순서로 MPTT 값을 계산
+    :return: [(parent index, level, lft, rght), ...] - 부모가 항상 자식보다 앞에 오는 순서
+    """
+    levels, children = [0], [[]]
+    for i in range(1, size):
+        candidates = [j for j in range(i) if levels[j] < max_depth]
+        parent = rng.choice(candidates)
+        levels.append(levels[parent] + 1)
+        children.append([])
+        children[parent].append(i)
+
+    parents = [None] * size
+    for parent, node_children in enumerate(children):
+        for child in node_children:
+            parents[child] = parent
+
+    lft, rght, counter = [0] * size, [0] * size, 1
+    stack = [(0, False)]
+    while stack:
+        node, visited = stack.pop()
+        if visited:
+            rght[node] = counter
+            counter += 1
+            continue
+        lft[node] = counter
+        counter += 1
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children[node]))
+    return [(parents[i], levels[i], lft[i], rght[i]) for i in range(size)]
+
+
+def _create_comments(scale, user_pks, rng, batch_size):
+    """
+    모든 post에 평균 scale.comments개의 Comment 트리를 생성
+    트리 모양과 MPTT 값은 메모리에서 계산하고, level 별로 bulk_create 하여 부모의 pk를 parent_id로 사용
+    :return: 생성된 Comment pk list
+    """
+    tree_id = Comment.objects.aggregate(max_tree_id=Max('tree_id'))['max_tree_id'] or 0
+    first_tree_id = tree_id + 1
+    intermediate_pks = list(CommentPostIntermediate.objects.values_list('pk', flat=True))
+    comment_pks = []
+    for intermediate_chunk in _chunks(intermediate_pks, max(1, batch_size // max(1, scale.comments))):
+        levels = [[] for _ in range(scale.comment_depth + 1)]
+        for intermediate_pk in intermediate_chunk:
+            remaining = _count(rng, scale.comments)
+            while remaining > 0:
+                size = min(remaining, rng.randint(1, 20))
+                remaining -= size
+                tree_id += 1
+                nodes = []
+                for parent_index, level, lft, rght in _random_tree(size, scale.comment_depth, rng):
+                    comment = Comment(
+                        user_id=rng.choice(user_pks), content=_sentence(rng),
+                        comment_post_intermediate_id=intermediate_pk,
+                        tree_id=tree_id, level=level, lft=lft, rght=rght,
+                    )
+                    comment.parent_node = nodes[parent_index] if parent_index is not None else None
+                    nodes.append(comment)
+                    levels[level].append(comment)
+        for level_comments in levels:
+            for comment in level_comments:
+                if comment.parent_node is not None:
+                    comment.parent_id = comment.parent_node.pk
+            comment_pks.extend(_bulk_create(Comment, level_comments, batch_size))
+    if getattr(settings, 'COMMENT_TREE_BACKEND', 'mptt') == 'path' and tree_id >= first_tree_id:
+        build_paths_from_mptt((first_tree_id, tree_id))
+    return comment_pks
+
+
+def _create_votes(scale, user_pks, answer_pks, comment_pks, rng, batch_size):
+    for relation_model, fk, target_pks in ((AnswerUpVoteRelation, 'answer_id', answer_pks),
+                                           (CommentUpVoteRelation, 'comment_id', comment_pks)):
+        _bulk_create(relation_model, (
+            relation_model(user_id=user_pk, **{fk: target_pk})
+            for target_pk in target_pks
+            for user_pk in _sample(rng, user_pks, _count(rng, scale.votes))
+        ), batch_size)
+    # 비추천은 추천의 1/5 정도, 같은 유저가 추천과 비추천을 동시에 하지 않도록 추천하지 않은 유저 중에서 선택
+    for relation_model, upvote_model, fk, target_pks in (
+            (AnswerDownVoteRelation, AnswerUpVoteRelation, 'answer_id', answer_pks),
+            (CommentDownVoteRelation, CommentUpVoteRelation, 'comment_id', comment_pks)):
+        downvote_targets = sorted(_sample(rng, target_pks, len(target_pks) // 5))
+        for target_chunk in _chunks(downvote_targets, batch_size):
+            upvoted = set(upvote_model.objects.filter(**{f'{fk}__in': target_chunk}).values_list(fk, 'user_id'))
+            _bulk_create(relation_model, (
+                relation_model(user_id=user_pk, **{fk: target_pk})
+                for target_pk in target_chunk
+                for user_pk in _sample(rng, user_pks, _count(rng, scale.votes / 5) + 1)
+                if (target_pk, user_pk) not in upvoted
+            ), batch_size)
+
+
+def _create_follows(scale, user_pks, topic_pks, question_pks, rng, batch_size):
+    _bulk_create(UserFollowRelation, (
+        UserFollowRelation(user_id=user_pk, target_id=target_pk)
+        for user_pk in user_pks
+        for target_pk in _sample(rng, user_pks, _count(rng, scale.follows) + 1)
+        if target_pk != user_pk
+    ), batch_size)
+    for relation_model in (InterestFollowRelation, ExpertiseFollowRelation):
+        _bulk_create(relation_model, (
+            relation_model(user_id=user_pk, topic_id=topic_pk)
+            for user_pk in user_pks
+            for topic_pk in _sample(rng, topic_pks, _count(rng, scale.follows / 2) + 1)
+        ), batch_size)
+    _bulk_create(QuestionFollowRelation, (
+        QuestionFollowRelation(user_id=user_pk, question_id=question_pk)
+        for user_pk in user_pks
+        for question_pk in _sample(rng, question_pks, _count(rng, scale.follows / 2))
+    ), batch_size)
+
+
+def get_benchmark_users():
+    """
+    benchmark 데이터로 생성된 유저들 - pk 순서
+    """
+    return User.objects.filter(email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').order_by('pk')
+
+
+def seed_benchmark_data(scale, seed=0, batch_size=5000, log=None):
+    """
+    scale 만큼의 유저, 토픽, 질문, 답변(Quill delta), Comment 트리, 추천, 팔로우를 생성
+
+    :param scale: BenchmarkScale
+    :param seed: random seed - 같은 seed와 scale이면 같은 모양의 데이터
+    :param batch_size: bulk_create 한 번에 INSERT 할 row 수
+    :param log: 진행 상황을 출력할 함수(str)
+    :return: {단계 이름: 생성된 row 수}
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    run_id = uuid.uuid4().hex[:8]
+    result = dict()
+
+    user_pks = _create_users(scale, run_id, batch_size)
+    result['users'] = len(user_pks)
+    log(f'users: {len(user_pks)}')
+
+    topic_pks = _create_topics(scale, run_id, user_pks, rng, batch_size)
+    result['topics'] = len(topic_pks)
+    log(f'topics: {len(topic_pks)}')
+
+    question_pks = _create_questions(scale, user_pks, topic_pks, rng, batch_size)
+    result['questions'] = len(question_pks)
+    log(f'questions: {len(question_pks)}')
+
+    answer_pks = _create_answers(scale, user_pks, question_pks, rng, batch_size)
+    result['answers'] = len(answer_pks)
+    log(f'answers: {len(answer_pks)}')
+
+    comment_pks = _create_comments(scale, user_pks, rng, batch_size)
+    result['comments'] = len(comment_pks)
+    log(f'comments: {len(comment_pks)}')
+
+    _create_votes(scale, user_pks, answer_pks, comment_pks, rng, batch_size)
+    log('votes: done')
+    _create_follows(scale, user_pks, topic_pks, question_pks, rng, batch_size)
+    log('follows: done')
+
+    diffs = reconcile_counters()
+    result['reconciled'] = sum(len(rows) for rows in diffs.values())
+    log(f'reconciled counters: {result["reconciled"]}')
+
+    result['feed_entries'] = sum(backfill_user_feed(pk) for pk in user_pks[:scale.feed_users])
+    log(f'feed entries: {result["feed_entries"]}')
+    return result
+
+
+def clear_benchmark_data():
+    """
+    benchmark 데이터로 생성된 유저, 토픽과 그 유저들이 작성한 질문/답변/Comment를 삭제
+    (ForeignKey의 CASCADE로 relation, Comment 트리, 피드도 함께 삭제됨)
+    """
+    users = get_benchmark_users()
+    Answer.objects.filter(user__in=users).delete()
+    Question.objects.filter(user__in=users).delete()
+    Comment.objects.filter(user__in=users).delete()
+    Topic.objects.filter(name__startswith=BENCHMARK_TOPIC_PREFIX).delete()
+    users.delete()
+    reconcile_counters()
@@ -0,0 +1,302 @@
+"""
+Comment 트리 저장 방식
+
+mptt: django-mptt의 (tree_id, lft, rght, level) - 조회는 범위 쿼리 한 번이지만,
+      Comment를 추가할 때마다 같은 tree_id에서 오른쪽에 있는 모든 node의 lft/rght를 UPDATE 하므로
+      같은 thread에 동시에 쓰는 요청들이 서로를 기다림
+path: materialized path(tree_path) - 조상 pk들을 이어붙인 문자열
+      Comment 추가 시 자기 자신의 row 하나만 INSERT/UPDATE 하므로 다른 node를 잠그지 않음 (O(depth) 길이의 path)
+      subtree 조회는 tree_path prefix 범위 쿼리, preorder 정렬은 tree_path 정렬
+
+COMMENT_TREE_BACKEND 설정으로 선택하며, 저장 방식을 바꿀 때는 migrate_comment_tree 명령어로 기존 트리를 변환
+"""
+from django.conf import settings
+from django.db import connection, models
+from django.db.models.functions import Substr
+from mptt.models import MPTTModel
+
+from ..models import Comment
+
+__all__ = (
+    'PATH_SEPARATOR',
+    'PATH_SEGMENT_WIDTH',
+    'build_path',
+    'MPTTCommentStorage',
+    'PathCommentStorage',
+    'get_comment_storage',
+    'build_paths_from_mptt',
+    'build_mptt_from_paths',
+)
+
+PATH_SEPARATOR = '.'
+# 0으로 채운 pk - 문자열 정렬이 pk 정렬과 같도록 고정 길이로 사용
+PATH_SEGMENT_WIDTH = 10
+
+
+def build_path(parent_path, pk):
+    """
+    :param parent_path: 부모 Comment의 tree_path, 최상위 Comment일 경우 빈 문자열
+    :param pk: Comment의 pk
+    :return: '0000000001.0000000005' 형태의 string
+    """
+    segment = str(pk).zfill(PATH_SEGMENT_WIDTH)
+    return f'{parent_path}{PATH_SEPARATOR}{segment}' if parent_path else segment
+
+
+def _table():
+    return connection.ops.quote_name(Comment._meta.db_table)
+
+
+class MPTTCommentStorage:
+    name = 'mptt'
+    # 같은 부모의 children 정렬, continuation 위치 비교에 사용하는 column
+    order_column = 'lft'
+
+    def save(self, comment, *args, **kwargs):
+        if comment._state.adding and comment.parent_id is not None:
+            self._lock_tree(comment.parent)
+        MPTTModel.save(comment, *args, **kwargs)
+
+    def _lock_tree(self, parent):
+        """
+        같은 tree에 동시에 추가되는 Comment들이 lft/rght를 겹치게 계산하지 않도록
+        tree의 최상위 Comment row와 부모 row를 쿼리 한 번으로 잠그고, 잠근 시점의 부모 lft/rght로 갱신
+        """
+        fields = ('lft', 'rght', 'level', 'tree_id')
+        rows = (
+            Comment.objects.select_for_update()
+            .filter(models.Q(tree_id=parent.tree_id, parent=None) | models.Q(pk=parent.pk))
+            .values_list('pk', *fields)
+        )
+        for pk, *values in rows:
+            if pk == parent.pk:
+                for field, value in zip(fields, values):
+                    setattr(parent, field, value)
+
+    def delete(self, comment, *args, **kwargs):
+        MPTTModel.delete(comment, *args, **kwargs)
+
+    def get_children(self, comment):
+        return comment.get_children()
+
+    def get_descendants(self, comment):
+        return comment.get_descendants(include_self=False)
+
+    def get_descendant_count(self, comment):
+        # lft/rght 값으로 계산하므로 쿼리가 실행되지 않음
+        return (comment.rght - comment.lft - 1) // 2
+
+    def get_roots_descendants(self, roots):
+        """
+        최상위 Comment들의 모든 descendant - MPTT에서 최상위 Comment는 각각 자신만의 tree_id를 가짐
+        """
+        return Comment.objects.filter(
+            tree_id__in={root.tree_id for root in roots}, level__gt=0).order_by('tree_id', 'lft')
+
+    def get_subtree(self, comment):
+        return Comment.objects.filter(
+            tree_id=comment.tree_id, lft__gt=comment.lft, lft__lt=comment.rght).order_by('lft')
+
+    def annotate_counts(self, nodes):
+        for node in nodes:
+            node.descendant_count = self.get_descendant_count(node)
+
+    def get_continuation_position(self, node):
+        """
+        보여준 마지막 child 이후의 children을 가져오기 위한 위치
+        MPTT에서 children은 부모의 (lft, rght) 안에 순서대로 이어져 있으므로 마지막 child의 rght
+        """
+        return node.tree_children[-1].rght if node.tree_children else node.lft
+
+    def has_more_children(self, node):
+        return self.get_continuation_position(node) < node.rght - 1
+
+    def get_descendant_count_after(self, node, position):
+        """
+        continuation 위치 이후의 descendant 수 - (position, rght) 사이의 node들로 lft/rght 값으로 계산
+        """
+        return (node.rght - max(position, node.lft) - 1) // 2
+
+    def is_valid_continuation(self, node, position):
+        return node.lft <= position < node.rght
+
+
+class PathCommentStorage:
+    name = 'path'
+    order_column = 'id'
+
+    def save(self, comment, *args, **kwargs):
+        adding = comment._state.adding
+        # lft/rght를 계산하거나 다른 node를 UPDATE 하지 않음
+        with Comment._tree_manager.disable_mptt_updates():
+            MPTTModel.save(comment, *args, **kwargs)
+        if adding:
+            comment.tree_path = self._set_path(comment.pk)
+
+    def _set_path(self, pk):
+        """
+        부모의 tree_path 뒤에 pk를 붙여 저장 - 부모 row를 잠그지 않고 UPDATE 한 번으로 처리
+        """
+        table = _table()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} c SET tree_path = '
+                f'COALESCE((SELECT p.tree_path || %s FROM {table} p WHERE p.id = c.parent_id), \'\') '
+                f'|| LPAD(c.id::text, %s, \'0\') '
+                f'WHERE c.id = %s RETURNING c.tree_path',
+                [PATH_SEPARATOR, PATH_SEGMENT_WIDTH, pk]
+            )
+            return cursor.fetchone()[0]
+
+    def delete(self, comment, *args, **kwargs):
+        # MPTT의 lft/rght gap을 닫는 UPDATE 없이 삭제 - descendant는 parent ForeignKey의 CASCADE로 삭제됨
+        models.Model.delete(comment, *args, **kwargs)
+
+    def _descendants_filter(self, comment):
+        return Comment.objects.filter(tree_path__startswith=comment.tree_path + PATH_SEPARATOR)
+
+    def get_children(self, comment):
+        return Comment.objects.filter(parent=comment).order_by('pk')
+
+    def get_descendants(self, comment):
+        return self._descendants_filter(comment).order_by('tree_path')
+
+    def get_descendant_count(self, comment):
+        # annotate_counts로 page 안의 Comment들을 한 번에 계산한 경우 Comment마다 COUNT 하지 않음
+        descendant_count = getattr(comment, 'descendant_count', None)
+        if descendant_count is not None:
+            return descendant_count
+        return self._descendants_filter(comment).count()
+
+    def get_roots_descendants(self, roots):
+        condition = models.Q()
+        for root in roots:
+            condition |= models.Q(tree_path__startswith=root.tree_path + PATH_SEPARATOR)
+        return Comment.objects.filter(condition).order_by('tree_path')
+
+    def get_subtree(self, comment):
+        return self.get_descendants(comment)
+
+    def annotate_counts(self, nodes):
+        """
+        nodes의 descendant 수와 마지막 child의 pk를 쿼리 한 번으로 가져옴
+        node마다 tree_path를 literal prefix로 넣은 LIKE 'prefix%' SELECT를 UNION ALL로 이어서,
+        tree_path index의 범위 검색으로 descendant만 읽도록 함 (column을 이어붙인 LIKE는 index를 사용하지 못함)
+        """
+        nodes = [node for node in nodes if node.tree_path]
+        if not nodes:
+            return
+        table = _table()
+        selects, params = [], []
+        for node in nodes:
+            selects.append(
+                f'SELECT %s, COUNT(*), MAX(CASE WHEN parent_id = %s THEN id END) FROM {table} '
+                f'WHERE tree_path LIKE %s'
+            )
+            params += [node.pk, node.pk, node.tree_path + PATH_SEPARATOR + '%']
+        with connection.cursor() as cursor:
+            cursor.execute(' UNION ALL '.join(selects), params)
+            counts = {pk: (count, last_child_pk) for pk, count, last_child_pk in cursor.fetchall()}
+        for node in nodes:
+            node.descendant_count, node.last_child_pk = counts.get(node.pk, (0, None))
+
+    def get_continuation_position(self, node):
+        return node.tree_children[-1].pk if node.tree_children else 0
+
+    def get_descendant_count_after(self, node, position):
+        """
+        continuation 위치 이후의 descendant 수 - pk가 position보다 큰 children의 subtree들
+        tree_path에서 node 바로 아래 child의 segment(고정 길이 숫자)를 잘라 position과 비교
+        """
+        if not position:
+            return self.get_descendant_count(node)
+        start = len(node.tree_path) + len(PATH_SEPARATOR) + 1
+        return self._descendants_filter(node) \
+            .annotate(child_segment=Substr('tree_path', start, PATH_SEGMENT_WIDTH)) \
+            .filter(child_segment__gt=str(position).zfill(PATH_SEGMENT_WIDTH)) \
+            .count()
+
+    def has_more_children(self, node):
+        last_child_pk = getattr(node, 'last_child_pk', None)
+        return last_child_pk is not None and self.get_continuation_position(node) < last_child_pk
+
+    def is_valid_continuation(self, node, position):
+        return position >= 0
+
+
+_storages = {
+    MPTTCommentStorage.name: MPTTCommentStorage(),
+    PathCommentStorage.name: PathCommentStorage(),
+}
+
+
+def get_comment_storage(name=None):
+    """
+    COMMENT_TREE_BACKEND 설정에 해당하는 Comment 트리 저장 방식
+    :param name: 'mptt' | 'path', None일 경우 설정값
+    """
+    return _storages[name or getattr(settings, 'COMMENT_TREE_BACKEND', MPTTCommentStorage.name)]
+
+
+def build_paths_from_mptt(tree_ids=None):
+    """
+    MPTT column(tree_id, lft, rght)으로 tree_path를 계산하여 저장
+    같은 tree에서 lft <= node.lft 이고 rght >= node.rght 인 node들이 조상(자기 자신 포함)
+
+    :param tree_ids: (시작, 끝) tree_id 범위, None일 경우 전체
+    :return: 업데이트된 row 수
+    """
+    condition, params = '', [PATH_SEGMENT_WIDTH, PATH_SEPARATOR]
+    if tree_ids is not None:
+        condition = 'WHERE c.tree_id BETWEEN %s AND %s'
+        params.extend(tree_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {_table()} c SET tree_path = ('
+            f'SELECT string_agg(LPAD(a.id::text, %s, \'0\'), %s ORDER BY a.lft) FROM {_table()} a '
+            f'WHERE a.tree_id = c.tree_id AND a.lft <= c.lft AND a.rght >= c.rght'
+            f') {condition}',
+            params
+        )
+        return cursor.rowcount
+
+
+def build_mptt_from_paths(root_ids=None):
+    """
+    tree_path로 MPTT column(tree_id, lft, rght, level)을 계산하여 저장
+    tree_path 순서가 preorder 이므로 tree 안에서 i번째(0부터) node는
+    lft = 2 * i - level + 1, rght = lft + 2 * (descendant 수) + 1
+
+    descendant 수는 node마다 tree_path의 조상 pk들을 펼쳐 조상별로 세므로 O(node 수 * depth)이며,
+    tree_id는 최상위 Comment의 pk를 사용하므로 root_ids 범위마다 나누어 실행해도 겹치지 않음
+
+    :param root_ids: (시작, 끝) 최상위 Comment pk 범위, None일 경우 전체
+    :return: 업데이트된 row 수
+    """
+    root = f"split_part(tree_path, '{PATH_SEPARATOR}', 1)"
+    condition, condition_params = '', []
+    if root_ids is not None:
+        # 고정 길이 segment 이므로 첫 segment의 범위가 tree_path의 문자열 범위와 같음 (tree_path index 사용)
+        condition = 'WHERE tree_path >= %s AND tree_path < %s'
+        start, end = root_ids
+        condition_params = [str(start).zfill(PATH_SEGMENT_WIDTH), str(end + 1).zfill(PATH_SEGMENT_WIDTH)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH n AS ('
+            f'SELECT id, tree_path, '
+            f'ROW_NUMBER() OVER (PARTITION BY {root} ORDER BY tree_path) - 1 AS idx, '
+            f"LENGTH(tree_path) - LENGTH(REPLACE(tree_path, %s, '')) AS lvl, "
+            f'{root}::bigint AS tid '
+            f'FROM {_table()} {condition}'
+            f'), d AS ('
+            f'SELECT a.seg::bigint AS id, COUNT(*) AS cnt '
+            f'FROM n, unnest(string_to_array(n.tree_path, %s)) WITH ORDINALITY AS a(seg, pos) '
+            f'WHERE a.pos <= n.lvl GROUP BY a.seg'
+            f') '
+            f'UPDATE {_table()} c SET '
+            f'lft = 2 * n.idx - n.lvl + 1, rght = 2 * n.idx - n.lvl + 2 + 2 * COALESCE(d.cnt, 0), '
+            f'level = n.lvl, tree_id = n.tid '
+            f'FROM n LEFT JOIN d ON d.id = n.id WHERE c.id = n.id',
+            [PATH_SEPARATOR, *condition_params, PATH_SEPARATOR]
+        )
+        return cursor.rowcount
@@ -0,0 +1,238 @@
+import base64
+import binascii
+import json
+
+from django.db import connection
+from rest_framework.exceptions import ParseError
+
+from users.models import CommentUpVoteRelation, CommentDownVoteRelation
+from .comment_storage import get_comment_storage
+from ..models import Comment
+
+__all__ = (
+    'TREE_RELATED_FIELDS',
+    'build_tree',
+    'attach_descendants',
+    'get_subtree',
+    'get_viewer_votes',
+    'get_thread_params',
+    'attach_thread',
+    'has_more_children',
+    'get_remaining_children_count',
+    'encode_continuation',
+    'decode_continuation',
+)
+
+# thread 모드에서 기본으로 보여줄 depth와 node 당 reply 수, 요청 가능한 최대값
+THREAD_DEPTH = 2
+THREAD_MAX_DEPTH = 5
+THREAD_REPLIES = 3
+THREAD_MAX_REPLIES = 20
+
+# serialize 시 related_post를 쿼리 없이 구하기 위해 함께 가져오는 필드
+TREE_RELATED_FIELDS = (
+    'comment_post_intermediate__question',
+    'comment_post_intermediate__answer',
+)
+
+
+def build_tree(roots, descendants):
+    """
+    preorder 등 부모가 자식보다 먼저 오도록 정렬된 descendants를 각 node의 tree_children list에 연결
+    부모가 항상 자식보다 먼저 오므로 한 번의 순회로 트리를 구성할 수 있음
+
+    :param roots: 트리의 최상위 Comment list
+    :param descendants: roots 아래의 Comment list - 부모가 항상 자식보다 앞에 오는 순서
+    :return: roots
+    """
+    nodes = dict()
+    for node in roots:
+        node.tree_children = []
+        nodes[node.pk] = node
+    for node in descendants:
+        node.tree_children = []
+        parent = nodes.get(node.parent_id)
+        # 부모가 roots의 subtree 밖에 있는 경우(범위 밖의 node)는 무시
+        if parent is None:
+            continue
+        # 같은 post의 Comment이므로 related_post를 구할 때 쿼리가 실행되지 않도록 부모의 객체를 공유
+        if node.comment_post_intermediate_id == parent.comment_post_intermediate_id:
+            node.comment_post_intermediate = parent.comment_post_intermediate
+        parent.tree_children.append(node)
+        nodes[node.pk] = node
+    return roots
+
+
+def _count_descendants(node):
+    """
+    subtree 전체가 메모리에 구성된 경우 쿼리 없이 각 node의 descendant_count를 계산
+    """
+    node.descendant_count = sum(1 + _count_descendants(child) for child in node.tree_children)
+    return node.descendant_count
+
+
+def attach_descendants(roots):
+    """
+    최상위 Comment(level 0)들의 모든 descendant를 쿼리 한 번으로 가져와 트리를 구성
+    mptt: tree_id 조건 (최상위 Comment는 각각 자신만의 tree_id를 가짐), path: tree_path prefix 조건
+
+    :param roots: parent가 None인 Comment list
+    :return: 트리에 포함된 모든 Comment list (roots 포함)
+    """
+    roots = list(roots)
+    if not roots:
+        return []
+    descendants = list(get_comment_storage().get_roots_descendants(roots))
+    build_tree(roots, descendants)
+    for root in roots:
+        _count_descendants(root)
+    return roots + descendants
+
+
+def get_subtree(comment):
+    """
+    comment의 모든 descendant를 범위 쿼리 한 번으로 가져와 comment.tree_children에 트리를 구성
+    mptt: lft < descendant.lft < rght, path: tree_path prefix
+
+    :param comment: Comment
+    :return: subtree에 포함된 모든 Comment list (comment 포함)
+    """
+    descendants = list(get_comment_storage().get_subtree(comment))
+    build_tree([comment], descendants)
+    _count_descendants(comment)
+    return [comment] + descendants
+
+
+def get_viewer_votes(user, comments):
+    """
+    user가 comments에 한 추천/비추천 relation의 pk를 쿼리 두 번으로 가져옴
+
+    :param user: request.user
+    :param comments: Comment list
+    :return: {'upvote': {comment pk: relation pk}, 'downvote': {comment pk: relation pk}}
+    """
+    votes = {'upvote': {}, 'downvote': {}}
+    if not user.is_authenticated():
+        return votes
+    comment_pks = [comment.pk for comment in comments]
+    for key, model in (('upvote', CommentUpVoteRelation), ('downvote', CommentDownVoteRelation)):
+        votes[key] = dict(
+            model.objects.filter(user=user, comment__in=comment_pks).values_list('comment_id', 'pk')
+        )
+    return votes
+
+
+def get_thread_params(query_params):
+    """
+    thread 모드의 depth, replies query parameter를 검사
+    :return: (depth, replies)
+    """
+    params = []
+    for name, default, maximum in (('depth', THREAD_DEPTH, THREAD_MAX_DEPTH),
+                                   ('replies', THREAD_REPLIES, THREAD_MAX_REPLIES)):
+        try:
+            value = int(query_params.get(name, default))
+        except ValueError:
+            raise ParseError({"error": f"{name}는 Integer로 변환가능한 값이어야 합니다."})
+        if not 1 <= value <= maximum:
+            raise ParseError({"error": f"{name}는 1 이상 {maximum} 이하여야 합니다."})
+        params.append(value)
+    return tuple(params)
+
+
+def _get_first_children(parents, replies, after=None):
+    """
+    parents 각각의 children 중 순서대로(mptt: lft, path: pk) 앞의 replies개를 쿼리 한 번으로 가져옴
+    after가 주어질 경우 after 이후의(이미 보여준 children 이후의) children만 가져옴
+    """
+    table = connection.ops.quote_name(Comment._meta.db_table)
+    order_column = get_comment_storage().order_column
+    after_condition = f'AND c.{order_column} > %s' if after is not None else ''
+    params = [[parent.pk for parent in parents]]
+    if after is not None:
+        params.append(after)
+    params.append(replies)
+    return list(Comment.objects.raw(
+        f'SELECT * FROM ('
+        f'SELECT c.*, ROW_NUMBER() OVER (PARTITION BY c.parent_id ORDER BY c.{order_column}) AS row_number '
+        f'FROM {table} c WHERE c.parent_id = ANY(%s) {after_condition}'
+        f') t WHERE t.row_number <= %s ORDER BY t.parent_id, t.{order_column}',
+        params
+    ))
+
+
+def attach_thread(roots, depth, replies, after=None):
+    """
+    roots 아래로 depth 단계까지, node 마다 앞의 replies개의 children만 가져와 tree_children에 트리를 구성
+    depth 단계마다 쿼리 한 번 - subtree 크기와 상관없이 가져오는 node 수가 제한됨
+
+    :param roots: 트리의 최상위로 보여줄 Comment list
+    :param depth: roots 아래로 가져올 단계 수
+    :param replies: node 당 가져올 최대 children 수
+    :param after: 첫 단계 children에 대한 continuation 위치
+    :return: 트리에 포함된 모든 Comment list (roots 포함)
+    """
+    roots = list(roots)
+    for node in roots:
+        node.tree_children = []
+    nodes = list(roots)
+    parents = roots
+    for level in range(depth):
+        if not parents:
+            break
+        children = _get_first_children(parents, replies, after=after if level == 0 else None)
+        build_tree(parents, children)
+        nodes += children
+        parents = children
+    for node in nodes:
+        if not hasattr(node, 'tree_children'):
+            node.tree_children = []
+    storage = get_comment_storage()
+    storage.annotate_counts(nodes)
+    if after is not None:
+        # 이전 요청에서 보여준 children의 subtree는 남은 Comment 수에서 제외
+        for node in roots:
+            node.descendant_count_after = storage.get_descendant_count_after(node, after)
+    return nodes
+
+
+def has_more_children(node):
+    """
+    tree_children 이후에 보여주지 않은 children이 남아있는지 여부
+    """
+    return get_comment_storage().has_more_children(node)
+
+
+def get_remaining_children_count(node):
+    """
+    continuation 위치 이후의 Comment 수(continuation이 없으면 subtree 전체)에서 tree_children으로 보여준 Comment 수를 뺀 값
+    """
+    def shown_count(n):
+        return sum(1 + shown_count(child) for child in n.tree_children)
+    return getattr(node, 'descendant_count_after', node.descendant_count) - shown_count(node)
+
+
+def encode_continuation(node):
+    """
+    node의 children 중 아직 보여주지 않은 children을 이어서 가져오기 위한 token
+    :return: string
+    """
+    cursor = {'pk': node.pk, 'after': get_comment_storage().get_continuation_position(node)}
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+
+
+def decode_continuation(token, node):
+    """
+    token이 node에 대한 올바른 continuation인지 확인 후 이어서 가져올 위치를 반환
+    """
+    error = ParseError({"error": "잘못된 continuation 입니다."})
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+        pk, after = cursor['pk'], cursor['after']
+    except (KeyError, TypeError, ValueError, UnicodeError, binascii.Error):
+        raise error
+    if pk != node.pk or not isinstance(after, int) or isinstance(after, bool):
+        raise error
+    if not get_comment_storage().is_valid_continuation(node, after):
+        raise error
+    return after
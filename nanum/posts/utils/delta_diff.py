@@ -0,0 +1,215 @@
+"""
+Quill Delta Operation list 간의 diff 계산
+
+Django에 의존하지 않는 순수 Python 모듈이므로 benchmark 등 Django 밖에서도 그대로 사용 가능
+"""
+import json
+from collections import defaultdict, deque, namedtuple
+
+__all__ = (
+    'DeltaDiff',
+    'Shift',
+    'operation_key',
+    'diff_keys',
+    'diff_operations',
+)
+
+# matches: LCS로 유지되는 (old index, new index) list
+# moves: LCS에는 속하지 않지만 같은 내용이 다른 위치로 이동한 (old index, new index) list
+# inserts: 새로 생성해야 하는 new index list
+# deletes: 삭제해야 하는 old index list
+# shifts: matches 중 연속된 old index가 같은 offset만큼 이동한 구간 list
+DeltaDiff = namedtuple('DeltaDiff', ['matches', 'moves', 'inserts', 'deletes', 'shifts'])
+
+# old_start ~ old_end (inclusive) 구간의 operation들이 모두 offset 만큼 이동
+Shift = namedtuple('Shift', ['old_start', 'old_end', 'offset'])
+
+
+def operation_key(operation):
+    """
+    Delta Operation을 비교 가능한 canonical string으로 변환
+    dict의 key 순서와 상관없이 같은 operation은 같은 key를 가짐
+
+    :param operation: {"attributes": {"bold": true}, "insert": "Gandalf"}
+    :return: string
+    """
+    return json.dumps(operation, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+# 한 구간에서 찾는 최대 edit distance - 넘을 경우 해당 구간은 LCS를 구하지 않고
+# diff_keys의 key별 짝짓기(move)로 처리하여 전혀 다른 문서끼리 비교해도 O((N+M) * MAX_EDIT_DISTANCE) 이내로 끝남
+MAX_EDIT_DISTANCE = 256
+
+
+def _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, max_d):
+    """
+    Myers의 linear space 알고리즘 - 앞/뒤에서 동시에 탐색하여 최단 edit script의 가운데 snake를 찾음
+    V 배열 두 개만 유지하므로 메모리는 O(N+M)
+
+    :return: (edit distance, snake 시작 x, 시작 y, 끝 x, 끝 y) - 구간 내 상대 좌표
+             edit distance가 max_d를 넘을 경우 None
+    """
+    n, m = a_hi - a_lo, b_hi - b_lo
+    delta = n - m
+    odd = delta % 2 != 0
+    forward = {1: 0}
+    backward = {1: 0}
+    for d in range(min((n + m + 1) // 2, max_d // 2 + 1) + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[k - 1] < forward[k + 1]):
+                x = forward[k + 1]
+            else:
+                x = forward[k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[k] = x
+            if odd and delta - (d - 1) <= k <= delta + (d - 1) and x + backward[delta - k] >= n:
+                return 2 * d - 1, start_x, start_y, x, y
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[k - 1] < backward[k + 1]):
+                x = backward[k + 1]
+            else:
+                x = backward[k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            backward[k] = x
+            if not odd and -d <= delta - k <= d and x + forward[delta - k] >= n:
+                return 2 * d, n - x, m - y, n - start_x, m - start_y
+    return None
+
+
+def _collect_matches(a, a_lo, a_hi, b, b_lo, b_hi, matches, max_d):
+    """
+    a[a_lo:a_hi], b[b_lo:b_hi] 구간의 LCS를 가운데 snake 기준으로 나누어 재귀적으로 matches에 추가
+    """
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        matches.append((a_lo, b_lo))
+        a_lo += 1
+        b_lo += 1
+    suffix = 0
+    while a_lo < a_hi - suffix and b_lo < b_hi - suffix and a[a_hi - suffix - 1] == b[b_hi - suffix - 1]:
+        suffix += 1
+    a_hi, b_hi = a_hi - suffix, b_hi - suffix
+
+    if a_lo < a_hi and b_lo < b_hi:
+        snake = _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, max_d)
+        if snake is not None:
+            _, x, y, u, v = snake
+            _collect_matches(a, a_lo, a_lo + x, b, b_lo, b_lo + y, matches, max_d)
+            matches.extend((a_lo + x + i, b_lo + y + i) for i in range(u - x))
+            _collect_matches(a, a_lo + u, a_hi, b, b_lo + v, b_hi, matches, max_d)
+
+    matches.extend((a_hi + i, b_hi + i) for i in range(suffix))
+
+
+def _myers_matches(old_keys, new_keys, max_d=MAX_EDIT_DISTANCE):
+    """
+    Myers의 O((N+M)D) diff 알고리즘(linear space)으로 두 sequence의 LCS를 구함
+    edit distance가 max_d를 넘는 구간은 LCS에서 제외
+
+    :param old_keys: hashable한 key의 sequence
+    :param new_keys: hashable한 key의 sequence
+    :return: LCS에 속하는 (old index, new index) list - index 오름차순
+    """
+    matches = []
+    _collect_matches(old_keys, 0, len(old_keys), new_keys, 0, len(new_keys), matches, max_d)
+    return matches
+
+
+def _get_shifts(matches):
+    """
+    matches 중 old index가 연속이고 이동한 offset이 같은 구간들을 반환
+    offset이 0인 구간(이동하지 않은 구간)은 제외
+
+    :param matches: (old index, new index) list - index 오름차순
+    :return: Shift list
+    """
+    shifts = []
+    start = prev = None
+    for old_index, new_index in matches:
+        offset = new_index - old_index
+        if prev is not None and old_index == prev[0] + 1 and offset == prev[1]:
+            prev = (old_index, offset)
+            continue
+        if prev is not None and prev[1]:
+            shifts.append(Shift(start, prev[0], prev[1]))
+        start, prev = old_index, (old_index, offset)
+    if prev is not None and prev[1]:
+        shifts.append(Shift(start, prev[0], prev[1]))
+    return shifts
+
+
+def diff_keys(old_keys, new_keys):
+    """
+    두 key sequence의 diff를 계산
+    1. 공통 prefix/suffix는 비교 없이 match 처리
+    2. 나머지 구간에 대해 Myers diff로 LCS를 구함 (edit distance가 MAX_EDIT_DISTANCE를 넘는 구간은 제외)
+    3. LCS에 속하지 않는 old/new 중 같은 key는 move로 처리하여 삭제 후 재생성을 피함
+
+    :param old_keys: 기존 operation들의 key sequence
+    :param new_keys: 새 operation들의 key sequence
+    :return: DeltaDiff
+    """
+    old_keys, new_keys = list(old_keys), list(new_keys)
+    n, m = len(old_keys), len(new_keys)
+
+    prefix = 0
+    while prefix < n and prefix < m and old_keys[prefix] == new_keys[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < n - prefix and suffix < m - prefix and \
+            old_keys[n - suffix - 1] == new_keys[m - suffix - 1]:
+        suffix += 1
+
+    middle = _myers_matches(old_keys[prefix:n - suffix], new_keys[prefix:m - suffix])
+    matches = [(i, i) for i in range(prefix)]
+    matches.extend((old_index + prefix, new_index + prefix) for old_index, new_index in middle)
+    matches.extend((n - suffix + i, m - suffix + i) for i in range(suffix))
+
+    matched_old = {old_index for old_index, _ in matches}
+    matched_new = {new_index for _, new_index in matches}
+
+    # LCS 밖에 남은 기존 operation을 key별로 모아두고 새 operation과 순서대로 짝지음
+    unmatched_old = defaultdict(deque)
+    for old_index, key in enumerate(old_keys):
+        if old_index not in matched_old:
+            unmatched_old[key].append(old_index)
+
+    moves = []
+    inserts = []
+    for new_index, key in enumerate(new_keys):
+        if new_index in matched_new:
+            continue
+        if unmatched_old[key]:
+            moves.append((unmatched_old[key].popleft(), new_index))
+        else:
+            inserts.append(new_index)
+
+    deletes = sorted(old_index for old_indexes in unmatched_old.values() for old_index in old_indexes)
+    return DeltaDiff(
+        matches=matches,
+        moves=moves,
+        inserts=inserts,
+        deletes=deletes,
+        shifts=_get_shifts(matches),
+    )
+
+
+def diff_operations(old_operations, new_operations, key=operation_key):
+    """
+    두 Delta Operation list의 diff를 계산
+    각 operation은 key 함수로 한 번씩만 변환
+
+    :param old_operations: 기존 Delta Operation list
+    :param new_operations: 새 Delta Operation list
+    :param key: operation을 hashable한 값으로 변환하는 함수
+    :return: DeltaDiff
+    """
+    return diff_keys(map(key, old_operations), map(key, new_operations))
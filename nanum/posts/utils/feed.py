@@ -0,0 +1,207 @@
+from django.conf import settings
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.transaction import atomic
+
+from topics.models import Topic
+from users.models import InterestFollowRelation, ExpertiseFollowRelation, UserFollowRelation
+from ..models import Answer, AnswerFeedEntry, Question
+
+__all__ = (
+    'get_popular_topic_pks',
+    'fan_out_answer',
+    'remove_answer',
+    'backfill_user_feed',
+    'prune_user_feed',
+    'get_feed_querysets',
+    'get_feed_queryset',
+)
+
+
+def _get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_popular_topic_pks(topic_pks=None):
+    """
+    팔로워 수(expert_count + interest_count)가 FEED_FANOUT_TOPIC_FOLLOWER_LIMIT 이상인 토픽의 pk set을 반환
+    해당 토픽들의 답변은 fan-out 하지 않고 피드를 읽는 시점에 pull 함
+
+    :param topic_pks: 주어질 경우 해당 토픽들 중에서만 확인
+    :return: set of topic pk
+    """
+    limit = _get_setting('FEED_FANOUT_TOPIC_FOLLOWER_LIMIT', 10000)
+    topics = Topic.objects.all()
+    if topic_pks is not None:
+        topics = topics.filter(pk__in=topic_pks)
+    return set(
+        topics.annotate(follower_count=F('expert_count') + F('interest_count'))
+            .filter(follower_count__gte=limit)
+            .values_list('pk', flat=True)
+    )
+
+
+def _get_subscriber_pks(answer):
+    """
+    answer를 피드로 받아야 하는 유저들의 pk set을 반환
+    답변 작성자를 팔로우하는 유저들 + 질문의 토픽(popular 토픽 제외)을 관심/전문분야로 팔로우하는 유저들
+
+    :param answer: Answer instance
+    :return: set of user pk
+    """
+    topic_pks = set(answer.question.topics.values_list('pk', flat=True))
+    fan_out_topic_pks = topic_pks - get_popular_topic_pks(topic_pks)
+
+    subscriber_pks = set(
+        UserFollowRelation.objects.filter(target=answer.user_id).values_list('user_id', flat=True)
+    )
+    if fan_out_topic_pks:
+        for relation_model in (InterestFollowRelation, ExpertiseFollowRelation):
+            subscriber_pks.update(
+                relation_model.objects.filter(topic__in=fan_out_topic_pks).values_list('user_id', flat=True)
+            )
+    subscriber_pks.discard(answer.user_id)
+    return subscriber_pks
+
+
+def fan_out_answer(answer_pk):
+    """
+    publish 된 답변을 구독하는 유저들의 Timeline에 추가
+    이미 fan-out 되어 있는 답변일 경우 기존 entry를 지우고 새로 생성
+
+    :param answer_pk: Answer pk
+    :return: 생성된 AnswerFeedEntry 개수
+    """
+    try:
+        answer = Answer.objects.get(pk=answer_pk, published=True)
+    except Answer.DoesNotExist:
+        return 0
+
+    entries = [
+        AnswerFeedEntry(user_id=user_pk, answer=answer, modified_at=answer.modified_at)
+        for user_pk in _get_subscriber_pks(answer)
+    ]
+    with atomic():
+        AnswerFeedEntry.objects.filter(answer=answer).delete()
+        AnswerFeedEntry.objects.bulk_create(entries, batch_size=_get_setting('FEED_FANOUT_BATCH_SIZE', 1000))
+    return len(entries)
+
+
+def remove_answer(answer_pk):
+    """
+    publish가 취소된 답변을 모든 유저의 Timeline에서 제거
+    :param answer_pk: Answer pk
+    :return: 삭제된 AnswerFeedEntry 개수
+    """
+    deleted, _ = AnswerFeedEntry.objects.filter(answer=answer_pk).delete()
+    return deleted
+
+
+def _get_following_topic_pks(user_pk):
+    """
+    유저가 관심분야/전문분야로 팔로우하는 토픽의 pk set을 반환
+    """
+    topic_pks = set(InterestFollowRelation.objects.filter(user=user_pk).values_list('topic_id', flat=True))
+    topic_pks.update(ExpertiseFollowRelation.objects.filter(user=user_pk).values_list('topic_id', flat=True))
+    return topic_pks
+
+
+def backfill_user_feed(user_pk):
+    """
+    새로 팔로우한 유저/토픽의 최근 답변들을 유저의 Timeline에 채워넣음
+    FEED_BACKFILL_LIMIT 개의 최신 답변 중 Timeline에 없는 답변만 추가
+
+    :param user_pk: User pk
+    :return: 생성된 AnswerFeedEntry 개수
+    """
+    topic_pks = _get_following_topic_pks(user_pk)
+    fan_out_topic_pks = topic_pks - get_popular_topic_pks(topic_pks)
+    following_user_pks = UserFollowRelation.objects.filter(user=user_pk).values_list('target_id', flat=True)
+
+    answers = Answer.objects.filter(published=True) \
+        .filter(Q(question__topics__in=fan_out_topic_pks) | Q(user__in=following_user_pks)) \
+        .exclude(user=user_pk) \
+        .exclude(feed_entries__user=user_pk) \
+        .order_by('-modified_at') \
+        .values_list('pk', 'modified_at') \
+        .distinct()[:_get_setting('FEED_BACKFILL_LIMIT', 200)]
+
+    entries = [
+        AnswerFeedEntry(user_id=user_pk, answer_id=answer_pk, modified_at=modified_at)
+        for answer_pk, modified_at in answers
+    ]
+    AnswerFeedEntry.objects.bulk_create(entries, batch_size=_get_setting('FEED_FANOUT_BATCH_SIZE', 1000))
+    return len(entries)
+
+
+def prune_user_feed(user_pk):
+    """
+    팔로우를 취소한 유저/토픽의 답변들을 유저의 Timeline에서 제거
+    여전히 팔로우하는 유저의 답변이거나 팔로우하는 토픽의 질문에 대한 답변인 entry는 남김
+
+    :param user_pk: User pk
+    :return: 삭제된 AnswerFeedEntry 개수
+    """
+    following_user_pks = UserFollowRelation.objects.filter(user=user_pk).values('target_id')
+    following_question_pks = Question.topics.through.objects \
+        .filter(topic__in=_get_following_topic_pks(user_pk)).values('question_id')
+
+    deleted, _ = AnswerFeedEntry.objects.filter(user=user_pk) \
+        .exclude(answer__user__in=following_user_pks) \
+        .exclude(answer__question__in=following_question_pks) \
+        .delete()
+    return deleted
+
+
+def get_feed_querysets(user):
+    """
+    유저의 답변 메인 피드를 이루는 queryset list를 반환 - 각각 feed_modified_at 최신순
+    1. Timeline(AnswerFeedEntry) - (user, modified_at) index에 대한 range scan
+    2. popular 토픽을 팔로우하는 경우 Timeline에 없는 해당 토픽의 답변들 - 읽는 시점에 pull
+
+    feed_modified_at은 Timeline에 있는 답변이면 entry의 modified_at, 아니면 답변의 modified_at으로
+    get_feed_queryset과 같은 정렬 기준
+
+    두 queryset을 OR 조건 하나로 합치면 모든 유저의 Timeline entry를 join 하게 되므로
+    KeysetPagination이 각각 한 페이지씩 가져와 합침
+
+    :param user: request.user
+    :return: Answer queryset list
+    """
+    timeline = Answer.objects.filter(published=True, feed_entries__user=user) \
+        .annotate(feed_modified_at=F('feed_entries__modified_at')) \
+        .order_by('-feed_modified_at')
+
+    popular_topic_pks = get_popular_topic_pks(_get_following_topic_pks(user.pk))
+    if not popular_topic_pks:
+        return [timeline]
+
+    popular_question_pks = Question.topics.through.objects.filter(topic__in=popular_topic_pks).values('question_id')
+    popular = Answer.objects.filter(published=True, question__in=popular_question_pks) \
+        .exclude(user=user) \
+        .exclude(feed_entries__user=user) \
+        .annotate(feed_modified_at=F('modified_at')) \
+        .order_by('-feed_modified_at')
+    return [timeline, popular]
+
+
+def get_feed_queryset(user):
+    """
+    get_feed_querysets의 queryset들을 하나로 합친 queryset
+    ?page= 로 요청하는 기존 클라이언트처럼 전체 개수가 필요한 경우에 사용
+
+    :param user: request.user
+    :return: Answer queryset
+    """
+    querysets = get_feed_querysets(user)
+    if len(querysets) == 1:
+        return querysets[0].order_by('-feed_modified_at', '-pk')
+
+    condition = Q()
+    for queryset in querysets:
+        condition |= Q(pk__in=queryset.values('pk').order_by())
+    # get_feed_querysets와 같은 정렬 기준 - Timeline entry가 있으면 entry의 modified_at
+    entry_modified_at = AnswerFeedEntry.objects.filter(user=user, answer=OuterRef('pk')).values('modified_at')
+    return Answer.objects.filter(condition) \
+        .annotate(feed_modified_at=Coalesce(Subquery(entry_modified_at), F('modified_at'))) \
+        .order_by('-feed_modified_at', '-pk')
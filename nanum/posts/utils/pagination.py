@@ -1,19 +1,20 @@
 from __future__ import unicode_literals
 from __future__ import unicode_literals
 
-from collections import OrderedDict
-
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.response import Response
+
+from utils.pagination import KeysetPagination
 
 __all__ = (
     'CommentPagination',
+    'CommentTreePagination',
 )
 
 
-class CustomPagination(PageNumberPagination):
+class CustomPagination(KeysetPagination):
     """
     Custom Pagination Class
+    (modified_at | created_at, pk) 에 대한 Keyset Pagination
     """
     page_size = 5
     page_size_query_param = 'page_size'
@@ -28,25 +29,21 @@ class ListPagination(CustomPagination):
 
 
 class CommentPagination(CustomPagination):
-    def get_paginated_response(self, data):
-        """
-        추후 immediate_children count에 대한 처리 논의
-        :param data:
-        :return:
-        """
-        # immediate_children = self.request.query_params.get('immediate_children')
-        # if immediate_children:
-        #     return Response(OrderedDict([
-        #         ('immediate_cihldren_count', self.page.paginator.count),
-        #         ('results', data),
-        #         ('next', self.get_next_link()),
-        #         ('previous', self.get_previous_link())
-        #     ]))
-        return Response(OrderedDict([
-            ('results', data),
-            ('next', self.get_next_link()),
-            ('previous', self.get_previous_link())
-        ]))
+    """
+    Comment의 children에 대한 Pagination
+    추후 immediate_children count에 대한 처리 논의
+    """
+    pass
+
+
+class CommentTreePagination(PageNumberPagination):
+    """
+    메모리에 구성된 Comment 트리의 children list에 대한 Pagination
+    이미 가져온 list를 자르기만 하므로 쿼리가 실행되지 않음
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 
 class QuestionPagination(PageNumberPagination):
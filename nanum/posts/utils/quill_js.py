@@ -1,10 +1,14 @@
-import base64
+import binascii
 import json
+import os
 import random
 import re
 import string
-from collections import OrderedDict, defaultdict
+import tempfile
+import uuid
+from collections import OrderedDict
 from io import BytesIO
+from itertools import chain
 
 from PIL import Image as pil
 from bs4 import BeautifulSoup
@@ -12,10 +16,18 @@ from django.conf import settings
 from django.db.models.query import QuerySet
 from w3lib.url import url_query_cleaner
 
+from .delta_diff import diff_operations
+
 __all__ = (
     'DjangoQuill',
 )
 
+BASE64_HEADER_PATTERN = re.compile(r'\w+:image/[\w.+-]+;\w+,')
+BASE64_HEADER_MAX_LENGTH = 64
+# 4의 배수여야 chunk 단위로 decode 가능
+BASE64_CHUNK_SIZE = 64 * 1024
+BASE64_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'BMP', 'WEBP')
+
 
 class DjangoQuill:
     """
@@ -23,10 +35,18 @@ class DjangoQuill:
     custom field -
     """
 
-    def __init__(self, model=None, parent_model=None):
+    PENDING_IMAGE_PATH = 'pending-image'
+
+    def __init__(self, model=None, parent_model=None, spool_images=False):
+        """
+        :param spool_images: True일 경우 base64 이미지를 request 안에서 resize/upload 하지 않고
+                            local temp 디렉토리에 spool 한 뒤 placeholder url을 저장
+                            실제 처리는 process_spooled_image 를 통해 request 밖에서 실행
+        """
         self.model = model
         self.parent_model = parent_model
         self.parent_instance = None
+        self.spool_images = spool_images
 
     #     self._validate()
     #
@@ -178,9 +198,14 @@ class DjangoQuill:
         image_value = insert_value.get('image') if type(insert_value) == dict else None
         if image_value:
             try:
-                decoded_data = self._parse_base64(image_base64=image_value)
+                if self.spool_images:
+                    token = self.spool_image(image_value)
+                    instance.spooled_image_token = token
+                    instance.image_insert_value = {"image": self.get_placeholder_url(token)}
+                    return instance
                 filename = self._generate_filename(**kwargs)
-                image = self._image_process(data=decoded_data, max_size=600)
+                with self._parse_base64(image_base64=image_value) as decoded_file:
+                    image = self._image_process(data=decoded_file, max_size=600)
                 instance.image.save(
                     filename,
                     image,
@@ -193,7 +218,7 @@ class DjangoQuill:
             # url 주소일 경유 담겨있을 경우 image_insert_value에 url 추가
             # image 가 base64도 아니고 link도 아닌 잘못된 형식일 경우 ValueError
             except AttributeError:
-                if image_value[:4] == "http" or image_value[:6] == settings.MEDIA_URL:
+                if image_value[:4] == "http" or image_value.startswith(settings.MEDIA_URL):
                     instance.image_insert_value = {"image": f"{image_value}"}
                 else:
                     raise ValueError("올바른 형태의 이미지 Base64가 아닙니다. data:image/png;base64로 시작하는지 확인해주세요 ")
@@ -202,21 +227,61 @@ class DjangoQuill:
             instance.insert_value = insert_value
         return instance
 
-    def _parse_base64(self, image_base64):
+    def _parse_base64(self, image_base64, output=None):
         """
-        Base64 형태의 image를 받아서 이미지 format과 decoded_data를 분리해서 반환
-        :param image_base64: base64 형태의 이미지 데이터 string
-        :return:
+        Base64 형태의 image를 받아서 decode된 이미지 데이터가 담긴 file object를 반환
+        전체 데이터를 한 번에 복사/decode 하지 않고 BASE64_CHUNK_SIZE 단위로 decode 하여
+        output(기본값은 SpooledTemporaryFile)에 기록하므로 이미지 크기와 상관없이 추가로 필요한 메모리가 일정함
+
+        :param image_base64: base64 형태의 이미지 데이터 (string 혹은 bytes)
+        :param output: decode된 데이터를 기록할 file object
+        :return: 처음 위치로 seek 된 file object
         """
-        data = re.match(r'\w+:image\/\w+;\w+,(.+)', image_base64)
-        # 정규표현식으로 매치된 이미지 저장 포맷과 이미지 데이터를 나눔
-        byte_data_string = data.group(1)
-        # image_data_string 파싱에 실패 했을 경우
-        if not byte_data_string:
+        # 정규표현식은 data URI의 header 부분에만 적용
+        # header 파싱에 실패 했을 경우 AttributeError
+        header = image_base64[:BASE64_HEADER_MAX_LENGTH]
+        if isinstance(header, (bytes, bytearray)):
+            header = header.decode('ascii', 'ignore')
+        match = BASE64_HEADER_PATTERN.match(header)
+        if not match:
             raise AttributeError
-        byte_data_base64 = bytes(byte_data_string, 'utf-8')
-        decoded_data = base64.b64decode(byte_data_base64)
-        return decoded_data
+        start = match.end()
+
+        # decode 전에 base64 길이로 decode 후 크기를 계산하여 너무 큰 이미지는 미리 거절
+        max_bytes = getattr(settings, 'QUILL_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+        if (len(image_base64) - start) * 3 // 4 > max_bytes:
+            raise ValueError(f"이미지 크기는 {max_bytes // (1024 * 1024)}MB 이하여야 합니다.")
+
+        if output is None:
+            output = tempfile.SpooledTemporaryFile(
+                max_size=getattr(settings, 'QUILL_IMAGE_SPOOL_MEMORY_SIZE', 1024 * 1024)
+            )
+        data = memoryview(image_base64) if isinstance(image_base64, (bytes, bytearray)) else image_base64
+        try:
+            for i in range(start, len(data), BASE64_CHUNK_SIZE):
+                output.write(binascii.a2b_base64(data[i:i + BASE64_CHUNK_SIZE]))
+            output.seek(0)
+            self._validate_image_header(output)
+        except (binascii.Error, ValueError):
+            output.close()
+            raise ValueError("올바른 형태의 이미지 Base64가 아닙니다. data:image/png;base64로 시작하는지 확인해주세요 ")
+        output.seek(0)
+        return output
+
+    def _validate_image_header(self, image_file):
+        """
+        이미지의 header만 읽어 format과 크기를 확인, 전체 이미지를 decode 하지 않음
+        :param image_file: decode된 이미지 데이터가 담긴 file object
+        :return:
+        """
+        try:
+            img = pil.open(image_file)
+        except (IOError, SyntaxError):
+            raise ValueError
+        max_pixels = getattr(settings, 'QUILL_IMAGE_MAX_PIXELS', 40 * 1000 * 1000)
+        width, height = img.size
+        if img.format not in BASE64_IMAGE_FORMATS or width * height > max_pixels:
+            raise ValueError
 
     def _generate_filename(self, **kwargs) -> string:
         """
@@ -234,15 +299,17 @@ class DjangoQuill:
 
         return filename
 
-    def _image_process(self, data: base64, max_size: int):
+    def _image_process(self, data, max_size: int):
         """
-        base64 이미지 데이터를 받아 height, width 중 긴 쪽을 max_size에 맞추고 다른 쪽을 Ratio에 따라 줄여서 jpeg형식으로 반환
+        이미지 데이터를 받아 height, width 중 긴 쪽을 max_size에 맞추고 다른 쪽을 Ratio에 따라 줄여서 jpeg형식으로 반환
 
-        :param data:
+        :param data: 이미지 byte 데이터 혹은 file object
         :return:
         """
-        original_img = BytesIO(data)
+        original_img = BytesIO(data) if isinstance(data, bytes) else data
         img = pil.open(original_img)
+        # JPEG의 경우 max_size에 가까운 크기로 decode 하여 전체 해상도로 decode 하지 않음
+        img.draft('RGB', (max_size, max_size))
         if img.mode != 'RGB':
             img = img.convert('RGB')
 
@@ -265,18 +332,85 @@ class DjangoQuill:
         img.save(output_img, 'JPEG')
         return output_img
 
+    @classmethod
+    def get_spool_dir(cls):
+        """
+        base64 이미지가 처리되기 전까지 저장되는 local temp 디렉토리
+        Celery worker가 같은 host에서 실행되어야 spool된 파일에 접근 가능
+        """
+        spool_dir = getattr(settings, 'QUILL_IMAGE_SPOOL_DIR', None) or \
+            os.path.join(tempfile.gettempdir(), 'quill-image-spool')
+        os.makedirs(spool_dir, exist_ok=True)
+        return spool_dir
+
+    @classmethod
+    def get_spool_path(cls, token: str):
+        return os.path.join(cls.get_spool_dir(), os.path.basename(token))
+
+    def spool_image(self, image_base64):
+        """
+        base64 이미지를 decode 하여 spool 디렉토리에 저장하고 token을 반환
+        :param image_base64: base64 형태의 이미지 데이터 string
+        :return: token - spool된 파일 이름
+        """
+        token = uuid.uuid4().hex
+        path = self.get_spool_path(token)
+        try:
+            with open(path, 'w+b') as spool_file:
+                self._parse_base64(image_base64=image_base64, output=spool_file)
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return token
+
+    @classmethod
+    def get_placeholder_url(cls, token: str):
+        """
+        이미지 처리가 끝나기 전까지 image_insert_value와 content_html에 들어갈 placeholder url
+        """
+        return f'{settings.MEDIA_URL}{cls.PENDING_IMAGE_PATH}/{token}'
+
+    @classmethod
+    def get_placeholder_token(cls, url: str):
+        """
+        placeholder url에서 token을 반환, placeholder url이 아닐 경우 None
+        """
+        prefix = f'{settings.MEDIA_URL}{cls.PENDING_IMAGE_PATH}/'
+        if url and url.startswith(prefix):
+            return url[len(prefix):]
+
+    def process_spooled_image(self, instance, token: str, filename: str):
+        """
+        spool된 이미지를 resize 하여 instance.image에 저장하고 spool된 파일을 삭제
+        instance를 DB에 save 하지는 않음
+
+        :param instance: self.model instance
+        :param token: spool_image 에서 반환된 token
+        :param filename: storage에 저장될 파일 이름
+        :return: 저장된 이미지의 url
+        """
+        path = self.get_spool_path(token)
+        with open(path, 'rb') as spool_file:
+            image = self._image_process(data=spool_file, max_size=600)
+        instance.image.save(filename, image, save=False)
+        url = url_query_cleaner(instance.image.url)
+        instance.image_insert_value = {"image": f"{url}"}
+        os.remove(path)
+        return url
+
     def img_base64_to_link(self, objs: QuerySet, html: str):
         """
         HTML String의 Base64 이미지들을 objs의 Queryset에 있는 이미지 url로 replace하여 새 HTML String을 반환
-        :param objs:
+        :param objs: image_insert_value가 있는 instance들 - line_no 순서
         :param html:
         :return:
         """
         soup = BeautifulSoup(html, 'html.parser')
         img_tags = soup.find_all("img")
         for obj, img_tag in zip(objs, img_tags):
-            # Get rid of Amazon Token
-            url = url_query_cleaner(obj.image.url)
+            # image_insert_value의 url은 저장 시 Amazon Token이 제거된 상태
+            url = obj.image_insert_value['image']
             new_img_tag = soup.new_tag('img', src=url)
             img_tag.replace_with(new_img_tag)
         return str(soup)
@@ -302,110 +436,34 @@ class DjangoQuill:
                                     content: dict, parent_instance):
         """
         전달받은 model에 대해 update, delete create을 실행
+        기존 operation과 새 operation의 diff(delta_diff.diff_operations)를 구하여
+        실제로 변경된 줄에 대해서만 instance를 반환
 
         :param queryset: Quill Operation 이 담겨있는 Queryset
         :param content: request.data의 content
         :param parent_instance: Quill Operation 와 ForeignKey로 연결되는 parent_instance
-        :return:
+        :return: (line_no가 바뀐 instance list, 새로 생성할 instance list, 삭제할 instance list)
         """
+        instances = list(queryset.order_by('line_no'))
+        operations = self.get_delta_operation_list(content)
+        diff = diff_operations([instance.delta_operation for instance in instances], operations)
 
-        # Queryset 에서 {Quill operation : instance, ...} 형식의 dict 생성
-        # Quill operation 은 json dumps를 통한 string 형태
-        operation_instance_dict = defaultdict(list)
-        for qdo_instance in queryset:
-            operation_instance_dict[json.dumps(qdo_instance.delta_operation)].append(qdo_instance)
-
-        # Request.data.content 에서 {Quill operation : line_number, ...} 형식의 dict 생성
-        # Quill operation 은 json dumps를 통한 string 형태
-        operation_lineno_dict = defaultdict(list)
-        for line_no, qdo in enumerate(self.get_delta_operation_list(content, iterator=True), start=1):
-            operation_lineno_dict[json.dumps(qdo)].append(line_no)
-
-        # 델타 줄의 string들에 대해서 set operation을 실행,
-        # to_update: 같은 내용의 경우, line number를 update 해야 되는 내용
+        # to_update: 같은 내용이지만 line number가 바뀐 instance
         # to_create: 새로운 내용일 경우, 새 instance를 create 해야 되는 내용
         # to_delete: 지워야 하는 내용일 경우, 지워진 내용
-        instance_delta_list = list()
-        for item in operation_instance_dict.items():
-            for i in range(len(item[1])):
-                instance_delta_list.append(item[0])
-        request_delta_list = list()
-        for item in operation_lineno_dict.items():
-            for i in range(len(item[1])):
-                request_delta_list.append(item[0])
-        set_i = set(instance_delta_list)
-        set_r = set(request_delta_list)
-        to_update = [item for item in instance_delta_list if item in set_i and item in set_r]
-        to_create = [item for item in request_delta_list if item not in set_i]
-        to_delete = [item for item in instance_delta_list if item not in set_r]
-        to_update_list = self._get_instantces_to_update(
-            to_update=to_update,
-            operation_lineno_dict=operation_lineno_dict,
-            operation_instance_dict=operation_instance_dict
-        )
-        to_create_list = self._get_instantces_to_create(
-            to_create=to_create,
-            operation_lineno_dict=operation_lineno_dict,
-            parent_instance=parent_instance
-        )
-        to_delete_list = self._get_instantces_to_delete(
-            to_delete=to_delete,
-            operation_instance_dict=operation_instance_dict
-        )
-        return to_update_list, to_create_list, to_delete_list
-
-    def _get_instantces_to_update(self, to_update: list, operation_lineno_dict: dict, operation_instance_dict: dict):
-        """
-        이미 존재하는 operation에 대해 line number을 업데이트
-
-        :param to_update:
-        :param operation_lineno_dict:
-        :param operation_instance_dict:
-        :return:
-        """
-        result = list()
-        # update
-        # replace instance line_no with request line_no
-        for delta_operation in to_update:
-            new_line_nos = operation_lineno_dict[delta_operation]
-            dt_instances = operation_instance_dict[delta_operation]
-            for instance, line_no in zip(dt_instances, new_line_nos):
-                instance.line_no = line_no
-                yield instance
-
-    def _get_instantces_to_create(self, to_create: list, operation_lineno_dict: dict, parent_instance):
-        """
-
-        :param to_create:
-        :param operation_lineno_dict:
-        :param instance:
-        :return:
-        """
-        # create
-        # create instance with request line_no
-
-        for delta_operation_str in to_create:
-            # Get line_no
-            # Get delta_operation
-            # instantiate model for bulk create
-            line_no = operation_lineno_dict[delta_operation_str].pop()
-            quill_delta_operation = json.loads(json.loads((json.dumps(delta_operation_str))))
-            instance = self._instantiate_model(
-                quill_delta_operation=quill_delta_operation,
-                line_no=line_no,
+        to_update_list = list()
+        for old_index, new_index in chain(diff.matches, diff.moves):
+            instance = instances[old_index]
+            if instance.line_no != new_index + 1:
+                instance.line_no = new_index + 1
+                to_update_list.append(instance)
+        to_create_list = [
+            self._instantiate_model(
+                quill_delta_operation=operations[new_index],
+                line_no=new_index + 1,
                 parent_instance=parent_instance
             )
-            yield instance
-
-    def _get_instantces_to_delete(self, to_delete: list, operation_instance_dict: dict):
-        """
-
-        :param to_delete:
-        :param operation_instance_dict:
-        :return:
-        """
-        # delete
-        # delete instance with delta op value
-        for delta_operation in to_delete:
-            instance = operation_instance_dict[delta_operation].pop()
-            yield instance
+            for new_index in diff.inserts
+        ]
+        to_delete_list = [instances[old_index] for old_index in diff.deletes]
+        return to_update_list, to_create_list, to_delete_list
@@ -0,0 +1,277 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from topics.models import Topic
+from users.models import (
+    AnswerUpVoteRelation, AnswerDownVoteRelation, AnswerBookmarkRelation,
+    CommentUpVoteRelation, CommentDownVoteRelation,
+    QuestionBookmarkRelation, QuestionFollowRelation,
+    ExpertiseFollowRelation, InterestFollowRelation, UserFollowRelation,
+    Profile,
+)
+from utils import flush_counter_buffer
+from ..models import Answer, Comment, CommentPostIntermediate, CounterReconcileRun, Question
+
+__all__ = (
+    'CounterSpec',
+    'get_counter_specs',
+    'reconcile_counters',
+    'reconcile_changed_counters',
+    'reconcile_all_counters',
+)
+
+# model: count 필드를 가진 model
+# field: count 필드 이름
+# count_sql: {where} 조건을 만족하는 target_id 별 실제 개수를 구하는 SELECT (target_id, cnt)
+# target_column: count_sql의 where 조건이 걸리는 column
+# changed_sql: since(%s) 이후 변경되었을 가능성이 있는 target_id를 구하는 SELECT
+CounterSpec = namedtuple('CounterSpec', ['model', 'field', 'count_sql', 'target_column', 'changed_sql'])
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _column(model, field_name):
+    return connection.ops.quote_name(model._meta.get_field(field_name).column)
+
+
+def _relation_spec(model, field, relation_model, fk_name, timestamp_name='created_at'):
+    """
+    relation_model의 ForeignKey(fk_name) 개수를 세는 CounterSpec
+    """
+    table, fk = _table(relation_model), _column(relation_model, fk_name)
+    return CounterSpec(
+        model=model,
+        field=field,
+        count_sql=f'SELECT r.{fk} AS target_id, COUNT(*) AS cnt FROM {table} r WHERE {{where}} GROUP BY r.{fk}',
+        target_column=f'r.{fk}',
+        changed_sql=f'SELECT DISTINCT r.{fk} FROM {table} r '
+                    f'WHERE r.{_column(relation_model, timestamp_name)} >= %s',
+    )
+
+
+def _comment_spec(post_model, post_field_name):
+    """
+    Answer/Question의 comment_count CounterSpec - CommentPostIntermediate를 거쳐 Comment 개수를 셈
+    """
+    comment, intermediate = _table(Comment), _table(CommentPostIntermediate)
+    post_fk = _column(CommentPostIntermediate, post_field_name)
+    intermediate_fk = _column(Comment, 'comment_post_intermediate')
+    join = f'FROM {comment} c JOIN {intermediate} i ON c.{intermediate_fk} = i.id'
+    return CounterSpec(
+        model=post_model,
+        field='comment_count',
+        count_sql=f'SELECT i.{post_fk} AS target_id, COUNT(*) AS cnt {join} WHERE {{where}} GROUP BY i.{post_fk}',
+        target_column=f'i.{post_fk}',
+        changed_sql=f'SELECT DISTINCT i.{post_fk} {join} WHERE c.{_column(Comment, "modified_at")} >= %s',
+    )
+
+
+def _topic_specs():
+    """
+    Topic의 question_count, answer_count CounterSpec - Question.topics의 through table을 거쳐 셈
+    """
+    through = Question.topics.through
+    through_table = _table(through)
+    topic_fk, question_fk = _column(through, 'topic'), _column(through, 'question')
+    question_table, answer_table = _table(Question), _table(Answer)
+    answer_question_fk = _column(Answer, 'question')
+    return [
+        CounterSpec(
+            model=Topic,
+            field='question_count',
+            count_sql=f'SELECT qt.{topic_fk} AS target_id, COUNT(*) AS cnt FROM {through_table} qt '
+                      f'WHERE {{where}} GROUP BY qt.{topic_fk}',
+            target_column=f'qt.{topic_fk}',
+            changed_sql=f'SELECT DISTINCT qt.{topic_fk} FROM {through_table} qt '
+                        f'JOIN {question_table} q ON qt.{question_fk} = q.id WHERE q.modified_at >= %s',
+        ),
+        CounterSpec(
+            model=Topic,
+            field='answer_count',
+            count_sql=f'SELECT qt.{topic_fk} AS target_id, COUNT(*) AS cnt FROM {through_table} qt '
+                      f'JOIN {answer_table} a ON a.{answer_question_fk} = qt.{question_fk} '
+                      f'WHERE {{where}} GROUP BY qt.{topic_fk}',
+            target_column=f'qt.{topic_fk}',
+            changed_sql=f'SELECT DISTINCT qt.{topic_fk} FROM {through_table} qt '
+                        f'JOIN {answer_table} a ON a.{answer_question_fk} = qt.{question_fk} '
+                        f'WHERE a.modified_at >= %s',
+        ),
+    ]
+
+
+def get_counter_specs():
+    """
+    모든 비정규화된 count 필드에 대한 CounterSpec list
+    """
+    return [
+        _relation_spec(Answer, 'upvote_count', AnswerUpVoteRelation, 'answer'),
+        _relation_spec(Answer, 'downvote_count', AnswerDownVoteRelation, 'answer'),
+        _relation_spec(Answer, 'bookmark_count', AnswerBookmarkRelation, 'answer'),
+        _comment_spec(Answer, 'answer'),
+        _relation_spec(Question, 'answer_count', Answer, 'question', timestamp_name='modified_at'),
+        _relation_spec(Question, 'bookmark_count', QuestionBookmarkRelation, 'question'),
+        _relation_spec(Question, 'follow_count', QuestionFollowRelation, 'question'),
+        _comment_spec(Question, 'question'),
+        _relation_spec(Comment, 'upvote_count', CommentUpVoteRelation, 'comment'),
+        _relation_spec(Comment, 'downvote_count', CommentDownVoteRelation, 'comment'),
+        *_topic_specs(),
+        _relation_spec(Topic, 'expert_count', ExpertiseFollowRelation, 'topic'),
+        _relation_spec(Topic, 'interest_count', InterestFollowRelation, 'topic'),
+        _relation_spec(Profile, 'follower_count', UserFollowRelation, 'target'),
+        _relation_spec(Profile, 'following_count', UserFollowRelation, 'user'),
+    ]
+
+
+def _diff_sql(spec, target_where, count_where):
+    """
+    target_where 조건의 row 중 저장된 count와 실제 개수가 다른 row의 (pk, 저장된 값, 실제 값)을 구하는 SELECT
+    """
+    table, pk, field = _table(spec.model), _column(spec.model, spec.model._meta.pk.name), _column(spec.model, spec.field)
+    count_sql = spec.count_sql.format(where=count_where)
+    return (
+        f'SELECT t.{pk} AS id, t.{field} AS stored, COALESCE(s.cnt, 0) AS actual FROM {table} t '
+        f'LEFT JOIN ({count_sql}) s ON s.target_id = t.{pk} '
+        f'WHERE {target_where} AND t.{field} IS DISTINCT FROM COALESCE(s.cnt, 0)'
+    )
+
+
+def _reconcile(spec, target_where, count_where, params, dry_run):
+    """
+    UPDATE ... FROM (SELECT ... GROUP BY) 한 번으로 target_where 범위의 count를 실제 개수로 맞춤
+    :return: [(pk, 저장된 값, 실제 값), ...] - dry_run이 아닐 경우 UPDATE 된 row들
+    """
+    table, pk, field = _table(spec.model), _column(spec.model, spec.model._meta.pk.name), _column(spec.model, spec.field)
+    diff_sql = _diff_sql(spec, target_where, count_where)
+    with connection.cursor() as cursor:
+        if dry_run:
+            cursor.execute(diff_sql, params)
+        else:
+            cursor.execute(
+                f'UPDATE {table} u SET {field} = d.actual FROM ({diff_sql}) d '
+                f'WHERE u.{pk} = d.id RETURNING d.id, d.stored, d.actual',
+                params
+            )
+        return cursor.fetchall()
+
+
+def _get_changed_pks(spec, since):
+    """
+    since 이후 relation이 추가/수정되었거나, row 자체가 수정된 pk list
+    """
+    model = spec.model
+    sql = spec.changed_sql
+    params = [since]
+    if any(field.name == 'modified_at' for field in model._meta.fields):
+        pk_column = _column(model, model._meta.pk.name)
+        sql += f' UNION SELECT t.{pk_column} FROM {_table(model)} t WHERE t.{_column(model, "modified_at")} >= %s'
+        params.append(since)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return sorted(row[0] for row in cursor.fetchall() if row[0] is not None)
+
+
+def reconcile_counters(specs=None, pks=None, since=None, chunk_size=None, dry_run=False):
+    """
+    비정규화된 count 필드들을 실제 개수로 다시 계산
+    pk 범위를 chunk_size 단위로 나누어 범위마다 UPDATE 한 번으로 적용
+
+    since가 주어질 경우 그 이후 relation이 추가되었거나 row가 수정된 row만 다시 계산
+    (relation 삭제로 인한 차이는 since 없이 전체를 다시 계산할 때 반영됨)
+
+    write-behind buffer(COUNTER_BUFFER_ENABLED)에 남은 delta는 이미 존재하는 relation을 반영한 값이므로
+    실제 개수로 맞춘 뒤 다시 더해지지 않도록 먼저 DB에 flush 함
+
+    :param specs: CounterSpec list, None일 경우 모든 count 필드
+    :param pks: 다시 계산할 row의 pk list, None일 경우 전체
+    :param since: datetime - incremental 모드
+    :param chunk_size: 쿼리 한 번에 처리할 pk 개수(범위), 기본값 RECONCILE_COUNTERS_CHUNK_SIZE
+    :param dry_run: True일 경우 UPDATE 하지 않고 차이만 반환
+    :return: {(model label, field): [(pk, 저장된 값, 실제 값), ...]}
+    """
+    chunk_size = chunk_size or getattr(settings, 'RECONCILE_COUNTERS_CHUNK_SIZE', 10000)
+    if not dry_run:
+        flush_counter_buffer()
+    result = dict()
+    for spec in specs or get_counter_specs():
+        pk_column = _column(spec.model, spec.model._meta.pk.name)
+        diffs = []
+        if pks is not None or since is not None:
+            target_pks = sorted(pks) if pks is not None else _get_changed_pks(spec, since)
+            for i in range(0, len(target_pks), chunk_size):
+                chunk = target_pks[i:i + chunk_size]
+                diffs += _reconcile(
+                    spec,
+                    target_where=f't.{pk_column} = ANY(%s)',
+                    count_where=f'{spec.target_column} = ANY(%s)',
+                    params=[chunk, chunk],
+                    dry_run=dry_run,
+                )
+        else:
+            bounds = spec.model._base_manager.aggregate(min_pk=Min('pk'), max_pk=Max('pk'))
+            if bounds['min_pk'] is not None:
+                for low in range(bounds['min_pk'], bounds['max_pk'] + 1, chunk_size):
+                    high = low + chunk_size - 1
+                    diffs += _reconcile(
+                        spec,
+                        target_where=f't.{pk_column} BETWEEN %s AND %s',
+                        count_where=f'{spec.target_column} BETWEEN %s AND %s',
+                        params=[low, high, low, high],
+                        dry_run=dry_run,
+                    )
+        result[(spec.model._meta.label, spec.field)] = diffs
+    return result
+
+
+def _record_run(started_at, result, full):
+    """
+    실행 기록을 저장하고 RECONCILE_COUNTERS_HISTORY_DAYS 보다 오래된 기록은 삭제
+    """
+    CounterReconcileRun.objects.create(
+        started_at=started_at,
+        full=full,
+        updated=sum(len(diffs) for diffs in result.values()),
+    )
+    history_days = getattr(settings, 'RECONCILE_COUNTERS_HISTORY_DAYS', 7)
+    CounterReconcileRun.objects.filter(started_at__lt=started_at - timedelta(days=history_days)).delete()
+
+
+def reconcile_changed_counters(specs=None, chunk_size=None, dry_run=False):
+    """
+    마지막으로 실행된 시각 이후 변경된 row들의 count만 다시 계산
+    처음 실행될 경우 전체를 다시 계산하며, 모든 count 필드를 다시 계산한 경우 실행 시각을 CounterReconcileRun에 저장
+    relation 삭제로 인한 차이는 찾을 수 없으므로 reconcile_all_counters를 주기적으로 함께 실행해야 함
+
+    :return: reconcile_counters의 결과
+    """
+    started_at = timezone.now()
+    since = CounterReconcileRun.objects.order_by('-started_at').values_list('started_at', flat=True).first()
+    result = reconcile_counters(
+        specs=specs,
+        since=since,
+        chunk_size=chunk_size,
+        dry_run=dry_run,
+    )
+    if not dry_run and specs is None:
+        _record_run(started_at, result, full=since is None)
+    return result
+
+
+def reconcile_all_counters(chunk_size=None, dry_run=False):
+    """
+    모든 count 필드를 since 없이 전체 다시 계산 (relation 삭제로 인한 차이까지 반영)
+    이후의 incremental 모드는 이 실행을 시작한 시각 이후 변경된 row만 다시 계산
+
+    :return: reconcile_counters의 결과
+    """
+    started_at = timezone.now()
+    result = reconcile_counters(chunk_size=chunk_size, dry_run=dry_run)
+    if not dry_run:
+        _record_run(started_at, result, full=True)
+    return result
@@ -1,3 +1,5 @@
+default_app_config = 'search.apps.SearchConfig'
+
 from elasticsearch import Elasticsearch
 from elasticsearch_dsl.connections import connections
 
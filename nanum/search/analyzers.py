@@ -17,6 +17,15 @@ edge_ngram_tokenizer = tokenizer(
     token_chars=["letter", "digit", "punctuation", "symbol"]
 )
 
+# autocomplete - 단어 앞부분(최대 20자)으로 색인하고, 검색어는 단어 단위로만 나눔
+autocomplete_tokenizer = tokenizer(
+    'autocomplete_tokenizer',
+    'edgeNGram',
+    min_gram=1,
+    max_gram=20,
+    token_chars=["letter", "digit"]
+)
+
 korean = analyzer(
     'korean',
     type='custom',
@@ -37,6 +46,20 @@ edge_ngram_analyzer = analyzer(
     filter=["lowercase", "trim"]
 )
 
+autocomplete = analyzer(
+    'autocomplete_analyzer',
+    type='custom',
+    tokenizer=autocomplete_tokenizer,
+    filter=["lowercase"]
+)
+
+autocomplete_search = analyzer(
+    'autocomplete_search_analyzer',
+    type='custom',
+    tokenizer='standard',
+    filter=["lowercase"]
+)
+
 edge_ngram_analyzer_reverse = analyzer(
     'edge_ngram_analyzer_reverse',
     type='custom',
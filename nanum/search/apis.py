@@ -1,17 +1,21 @@
+from django.contrib.postgres.search import TrigramSimilarity
 from rest_framework import generics, permissions
 from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
 from topics.models import Topic
 from topics.serializers import TopicSerializer
-from . import search
+from .autocomplete import AUTOCOMPLETE_TYPES
+from .backends import get_search_backend
+from .search import SEARCH_TYPES, InvalidCursor, InvalidSize, parse_size
 
 
 class TopicSearchAPIView(generics.RetrieveAPIView):
     queryset = Topic.objects.all()
     serializer_class = TopicSerializer
-    authentication_classes = (
+    permission_classes = (
         permissions.IsAuthenticated,
     )
 
@@ -21,7 +25,10 @@ class TopicSearchAPIView(generics.RetrieveAPIView):
         if not topic_name:
             raise ParseError(detail={"error": "name 필드가 비어있습니다."})
 
-        queryset = Topic.objects.filter(name__contains=topic_name)
+        # 이름에 검색어가 포함된 토픽 - UPPER(name) LIKE 쿼리는 search.0002의 trigram index를 사용
+        queryset = Topic.objects.filter(name__icontains=topic_name) \
+            .annotate(similarity=TrigramSimilarity('name', topic_name)) \
+            .order_by('-similarity', '-question_count', 'pk')
 
         if not queryset:
             return Response({"result": "결과가 없습니다."})
@@ -31,16 +38,72 @@ class TopicSearchAPIView(generics.RetrieveAPIView):
         return Response(result)
 
 
+class AutocompleteAPIView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, format=None):
+        """
+        입력 중인 검색어로 토픽(기본), 유저, 질문 후보를 반환
+        질문 작성 화면의 토픽 선택 등에서 키 입력마다 요청
+
+        :param request: query, type(topic | user | question), size
+        :return:
+        """
+        query_params = self.request.query_params
+        query = query_params.get("query", None)
+        if not query:
+            raise ParseError({"error": "query 필드가 비어있습니다."})
+        autocomplete_type = query_params.get("type", "topic")
+        if autocomplete_type not in AUTOCOMPLETE_TYPES:
+            raise ParseError({"error": f"type은 {', '.join(AUTOCOMPLETE_TYPES)} 중 하나여야 합니다."})
+        try:
+            size = parse_size(query_params.get("size"))
+        except InvalidSize:
+            raise ParseError({"error": "size는 1 이상의 숫자여야 합니다."})
+        return Response({"results": get_search_backend().autocomplete(query, autocomplete_type, size=size)})
+
+
 class SearchAPIView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request, format=None):
         """
-        Return a list of all users.
+        query로 질문, 답변, 토픽, 유저를 검색
+        type이 없을 경우 type 별 첫 페이지를, 있을 경우 해당 type의 페이지를 반환
+        다음 페이지는 응답의 next url(cursor)로 요청
+
+        :param request: query, type(question | answer | topic | user), page_size, cursor
+        :return:
         """
         query_params = self.request.query_params
         query = query_params.get("query", None)
         if not query:
             raise ParseError({"error": "query 필드가 비어있습니다."})
-        result = search.search(query)
-        return Response(result)
+        search_type = query_params.get("type", None)
+        if search_type is not None and search_type not in SEARCH_TYPES:
+            raise ParseError({"error": f"type은 {', '.join(SEARCH_TYPES)} 중 하나여야 합니다."})
+        try:
+            page_size = parse_size(query_params.get("page_size"))
+        except InvalidSize:
+            raise ParseError({"error": "page_size는 1 이상의 숫자여야 합니다."})
+
+        if search_type is None:
+            pages = get_search_backend().search_all(query, request=request)
+            return Response({name: self.get_page_data(name, page) for name, page in pages.items()})
+        try:
+            page = get_search_backend().search(
+                query, search_type, size=page_size, cursor=query_params.get("cursor"), request=request)
+        except InvalidCursor:
+            raise ParseError({"error": "cursor가 올바르지 않습니다."})
+        return Response(self.get_page_data(search_type, page))
+
+    def get_page_data(self, search_type, page):
+        next_url = None
+        if page['next_cursor']:
+            next_url = replace_query_param(self.request.build_absolute_uri(), 'type', search_type)
+            next_url = replace_query_param(next_url, 'cursor', page['next_cursor'])
+        return {
+            'count': page['total'],
+            'next': next_url,
+            'results': page['results'],
+        }
@@ -0,0 +1,216 @@
+"""
+autocomplete service
+
+입력 중인 검색어로 토픽, 유저, 질문 후보를 찾음 (질문 작성 화면의 토픽 선택 등 키 입력마다 호출)
+- Elasticsearch의 autocomplete(edge-ngram) 필드에서 _source의 필드만으로 결과를 만들어 DB 쿼리 없이 응답
+- 자주 입력되는 prefix의 결과는 process 메모리의 LRU cache에 AUTOCOMPLETE_CACHE_TIMEOUT 초 동안 저장
+- Elasticsearch를 사용할 수 없을 경우 PostgreSQL의 trigram index(search.0002 migration)로 검색하고,
+  AUTOCOMPLETE_ELASTICSEARCH_RETRY_INTERVAL 초 동안은 Elasticsearch에 요청하지 않음
+"""
+import logging
+import threading
+import time
+from collections import namedtuple, OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import F
+from elasticsearch.exceptions import TransportError
+from elasticsearch_dsl import Search
+
+from posts.models import Question
+from topics.models import Topic
+from .client import get_client
+from .documents import get_index_spec
+from .search import get_size
+
+__all__ = (
+    'AutocompleteType',
+    'AUTOCOMPLETE_TYPES',
+    'PrefixCache',
+    'get_prefix_cache',
+    'CircuitBreaker',
+    'elasticsearch_breaker',
+    'autocomplete',
+)
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# name: index 이름, field: autocomplete sub field가 있는 document 필드
+# get_fallback_queryset: (검색어) -> Elasticsearch를 사용할 수 없을 때 (pk, field 값)을 가져올 queryset
+AutocompleteType = namedtuple('AutocompleteType', ['name', 'field', 'get_fallback_queryset'])
+
+
+def _topic_fallback(query):
+    return Topic.objects.filter(name__istartswith=query) \
+        .annotate(similarity=TrigramSimilarity('name', query)) \
+        .order_by('-similarity', '-question_count', 'pk') \
+        .values_list('pk', 'name')
+
+
+def _user_fallback(query):
+    return User.objects.filter(is_active=True, name__istartswith=query) \
+        .annotate(similarity=TrigramSimilarity('name', query)) \
+        .order_by('-similarity', F('profile__follower_count').desc(nulls_last=True), 'pk') \
+        .values_list('pk', 'name')
+
+
+def _question_fallback(query):
+    return Question.objects.filter(content__icontains=query) \
+        .annotate(similarity=TrigramSimilarity('content', query)) \
+        .order_by('-similarity', '-answer_count', 'pk') \
+        .values_list('pk', 'content')
+
+
+AUTOCOMPLETE_TYPES = OrderedDict((autocomplete_type.name, autocomplete_type) for autocomplete_type in (
+    AutocompleteType('topic', 'name', _topic_fallback),
+    AutocompleteType('user', 'name', _user_fallback),
+    AutocompleteType('question', 'content', _question_fallback),
+))
+
+
+class PrefixCache:
+    """
+    (type, 검색어, 결과 수) 별 autocomplete 결과를 저장하는 LRU cache
+    키 입력마다 같은 prefix가 반복해서 요청되므로 짧은 시간 동안만 저장하며,
+    새로 만들어진 토픽 등은 최대 timeout 초 후에 결과에 나타남
+    """
+
+    def __init__(self, timeout=60, max_entries=5000):
+        self._timeout = timeout
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, results = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def set(self, key, results):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self._timeout, results)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_config = None
+_cache_lock = threading.Lock()
+
+
+def get_prefix_cache():
+    """
+    AUTOCOMPLETE_CACHE_* 설정으로 생성한 PrefixCache
+    AUTOCOMPLETE_CACHE_TIMEOUT이 0일 경우 None
+    """
+    global _cache, _cache_config
+    config = (
+        getattr(settings, 'AUTOCOMPLETE_CACHE_TIMEOUT', 60),
+        getattr(settings, 'AUTOCOMPLETE_CACHE_MAX_ENTRIES', 5000),
+    )
+    if not config[0]:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache_config != config:
+            _cache = PrefixCache(timeout=config[0], max_entries=config[1])
+            _cache_config = config
+    return _cache
+
+
+class CircuitBreaker:
+    """
+    요청이 실패하면 retry_interval 초 동안 실패를 기억하는 circuit breaker
+    Elasticsearch가 내려가 있는 동안 키 입력마다 connection timeout을 기다리지 않고 바로 fallback 하기 위해 사용
+    """
+
+    def __init__(self):
+        self._open_until = 0
+
+    def is_open(self):
+        return time.monotonic() < self._open_until
+
+    def record_failure(self, retry_interval):
+        self._open_until = time.monotonic() + retry_interval
+
+    def reset(self):
+        self._open_until = 0
+
+
+elasticsearch_breaker = CircuitBreaker()
+
+
+def _normalize(query):
+    return ' '.join(query.lower().split())
+
+
+def _search_elasticsearch(autocomplete_type, query, size):
+    spec = get_index_spec(autocomplete_type.name)
+    response = Search(using=get_client(), index=spec.name, doc_type=spec.doc_type) \
+        .query('match', **{f'{autocomplete_type.field}.autocomplete': {'query': query, 'operator': 'and'}}) \
+        .source([autocomplete_type.field]) \
+        .extra(size=size) \
+        .execute()
+    return [
+        (int(hit['_id']), hit['_source'][autocomplete_type.field])
+        for hit in response.to_dict()['hits']['hits']
+    ]
+
+
+def autocomplete(query, autocomplete_type, size=None, use_elasticsearch=True):
+    """
+    :param query: 입력 중인 검색어
+    :param autocomplete_type: topic | user | question
+    :param size: 결과 수 - AUTOCOMPLETE_MAX_SIZE를 넘지 않음
+    :param use_elasticsearch: False일 경우 PostgreSQL에서만 검색 (PostgresSearchBackend)
+    :return: [{'pk', 'type', topic/user의 경우 'name', question의 경우 'content'}]
+    :raise InvalidSize: size가 1보다 작을 경우
+    """
+    autocomplete_type = AUTOCOMPLETE_TYPES[autocomplete_type]
+    size = get_size(size, getattr(settings, 'AUTOCOMPLETE_SIZE', 10), getattr(settings, 'AUTOCOMPLETE_MAX_SIZE', 20))
+    query = _normalize(query)
+    if not query:
+        return []
+
+    cache = get_prefix_cache()
+    key = (autocomplete_type.name, query, size, use_elasticsearch)
+    if cache is not None:
+        results = cache.get(key)
+        if results is not None:
+            return results
+
+    rows = None
+    if use_elasticsearch and not elasticsearch_breaker.is_open():
+        try:
+            rows = _search_elasticsearch(autocomplete_type, query, size)
+        except TransportError as e:
+            logger.warning('autocomplete: elasticsearch unavailable, falling back to postgres (%s)', e)
+            elasticsearch_breaker.record_failure(getattr(settings, 'AUTOCOMPLETE_ELASTICSEARCH_RETRY_INTERVAL', 5))
+    if rows is None:
+        # fallback 결과는 cache 하지 않음 - Elasticsearch가 복구되면 바로 사용
+        if use_elasticsearch:
+            cache = None
+        rows = list(autocomplete_type.get_fallback_queryset(query)[:size])
+
+    results = [
+        OrderedDict([('pk', pk), ('type', autocomplete_type.name), (autocomplete_type.field, value)])
+        for pk, value in rows
+    ]
+    if cache is not None:
+        cache.set(key, results)
+    return results
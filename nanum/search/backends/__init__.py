@@ -0,0 +1,26 @@
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .elastic import *
+from .postgres import *
+
+_backend = None
+_backend_path = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """
+    SEARCH_BACKEND 설정에 해당하는 검색 backend
+    - search.backends.ElasticsearchSearchBackend (기본)
+    - search.backends.PostgresSearchBackend - Elasticsearch 없이 PostgreSQL full-text, trigram 검색
+    """
+    global _backend, _backend_path
+    path = getattr(settings, 'SEARCH_BACKEND', 'search.backends.ElasticsearchSearchBackend')
+    with _backend_lock:
+        if _backend is None or _backend_path != path:
+            _backend = import_string(path)()
+            _backend_path = path
+    return _backend
@@ -0,0 +1,24 @@
+from ..autocomplete import autocomplete
+from ..search import search, search_all
+
+__all__ = (
+    'ElasticsearchSearchBackend',
+)
+
+
+class ElasticsearchSearchBackend:
+    """
+    Elasticsearch index(search outbox, reindex 명령으로 색인)에서 검색
+    autocomplete는 Elasticsearch를 사용할 수 없을 경우 PostgreSQL로 검색
+    """
+    # 변경 사항을 search outbox에 쌓아 index에 반영해야 하는지 여부
+    uses_index = True
+
+    def search(self, query, search_type, size=None, cursor=None, request=None):
+        return search(query, search_type, size=size, cursor=cursor, request=request)
+
+    def search_all(self, query, size=None, request=None):
+        return search_all(query, size=size, request=request)
+
+    def autocomplete(self, query, autocomplete_type, size=None):
+        return autocomplete(query, autocomplete_type, size=size)
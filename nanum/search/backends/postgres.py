@@ -0,0 +1,157 @@
+"""
+Elasticsearch 없이 PostgreSQL로 검색하는 backend
+
+- Question: content의 tsvector(search_vector, GIN) full-text 검색 + UPPER(content) trigram index의 부분 일치
+- Answer: content_html에서 만든 plain text(content_text)의 tsvector(search_vector, GIN) full-text 검색
+- Topic, User: name의 trigram index로 부분 일치, 유사도(%) 검색
+search_vector, content_text는 DB trigger가 채우며(posts.0042), 결과는 ElasticsearchSearchBackend와 같은 형태
+"""
+import html
+import re
+from collections import namedtuple, OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from posts.models import Answer, Question
+from topics.models import Topic
+from ..autocomplete import autocomplete
+from ..search import SEARCH_TYPES, decode_cursor, encode_cursor, get_size
+
+__all__ = (
+    'PostgresSearchBackend',
+)
+
+User = get_user_model()
+
+# text search configuration - 한국어 사전이 없으므로 공백 단위로 나누는 simple 사용 (posts.0042의 trigger와 같아야 함)
+TEXT_SEARCH_CONFIG = 'simple'
+
+# name: search.search.SEARCH_TYPES의 type 이름
+# get_queryset: (검색어) -> 검색어에 맞는 row들의 queryset
+# get_rank: (검색어) -> 정렬에 사용할 점수 expression
+# values: SEARCH_TYPES의 values 외에 _source, highlight를 만들 때 필요한 values() 필드
+# to_source: (row) -> Elasticsearch의 _source와 같은 형태의 dict
+# highlight_field: highlight 할 text가 있는 values() 필드
+PostgresSearchType = namedtuple('PostgresSearchType', [
+    'name', 'get_queryset', 'get_rank', 'values', 'to_source', 'highlight_field',
+])
+
+
+def _search_query(query):
+    return SearchQuery(query, config=TEXT_SEARCH_CONFIG)
+
+
+def _similarity_queryset(queryset, field, query):
+    return queryset.filter(Q(**{f'{field}__icontains': query}) | Q(**{f'{field}__trigram_similar': query}))
+
+
+POSTGRES_SEARCH_TYPES = OrderedDict((search_type.name, search_type) for search_type in (
+    PostgresSearchType(
+        'question',
+        lambda query: Question.objects.filter(Q(search_vector=_search_query(query)) | Q(content__icontains=query)),
+        lambda query: SearchRank(F('search_vector'), _search_query(query)) + TrigramSimilarity('content', query),
+        ('content',),
+        lambda row: {'content': row['content']},
+        'content',
+    ),
+    PostgresSearchType(
+        'answer',
+        lambda query: Answer.objects.filter(published=True, search_vector=_search_query(query)),
+        lambda query: SearchRank(F('search_vector'), _search_query(query)),
+        ('question__content', 'user__name', 'created_at', 'content_text'),
+        lambda row: {'question': row['question__content'], 'user': row['user__name'] or '',
+                     'created_at': row['created_at']},
+        'content_text',
+    ),
+    PostgresSearchType(
+        'topic',
+        lambda query: _similarity_queryset(Topic.objects.all(), 'name', query),
+        lambda query: TrigramSimilarity('name', query),
+        ('name',),
+        lambda row: {'name': row['name']},
+        'name',
+    ),
+    PostgresSearchType(
+        'user',
+        lambda query: _similarity_queryset(User.objects.filter(is_active=True), 'name', query),
+        lambda query: TrigramSimilarity('name', query),
+        ('name',),
+        lambda row: {'name': row['name']},
+        'name',
+    ),
+))
+
+
+def highlight(text, query, fragment_size=100):
+    """
+    text에서 검색어가 처음 나오는 부분의 fragment_size 글자를 검색어를 <em>으로 감싸 반환
+    클라이언트에서 HTML로 표시되므로 <em> 외의 text는 escape (Elasticsearch의 encoder='html'과 같음)
+    :return: 검색어가 없을 경우 None
+    """
+    terms = [term for term in query.split() if term]
+    if not text or not terms:
+        return None
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    match = pattern.search(text)
+    if match is None:
+        return None
+    start = max(match.start() - fragment_size // 4, 0)
+    fragment = text[start:start + fragment_size]
+    pieces, end = [], 0
+    for match in pattern.finditer(fragment):
+        pieces.append(html.escape(fragment[end:match.start()]))
+        pieces.append(f'<em>{html.escape(match.group(0))}</em>')
+        end = match.end()
+    pieces.append(html.escape(fragment[end:]))
+    return ''.join(pieces)
+
+
+class PostgresSearchBackend:
+    """
+    PostgreSQL full-text(tsvector), trigram index로 검색하는 backend
+    페이지는 (점수, pk) 정렬의 keyset cursor로 넘김
+    """
+    # DB를 바로 검색하므로 search outbox에 쌓지 않음
+    uses_index = False
+
+    def _get_page(self, postgres_type, query, size, cursor, request):
+        search_type = SEARCH_TYPES[postgres_type.name]
+        queryset = postgres_type.get_queryset(query)
+        total = queryset.count()
+        # ts_rank, similarity는 real 이므로 cursor로 주고받을 때 값이 바뀌지 않도록 double precision으로 변환
+        queryset = queryset.annotate(rank=Cast(postgres_type.get_rank(query), FloatField()))
+        if cursor:
+            rank, pk = decode_cursor(cursor, value_types=((int, float), int))
+            queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, pk__lt=pk))
+        rows = list(
+            queryset.order_by('-rank', '-pk')
+                .values('pk', 'rank', *search_type.values, *postgres_type.values)[:size]
+        )
+        results = [
+            search_type.to_result(
+                postgres_type.to_source(row), row, highlight(row[postgres_type.highlight_field], query), request)
+            for row in rows
+        ]
+        next_cursor = None
+        if len(rows) == size:
+            next_cursor = encode_cursor([rows[-1]['rank'], rows[-1]['pk']])
+        return {'total': total, 'results': results, 'next_cursor': next_cursor}
+
+    def search(self, query, search_type, size=None, cursor=None, request=None):
+        size = get_size(size, getattr(settings, 'SEARCH_PAGE_SIZE', 10), getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 50))
+        return self._get_page(POSTGRES_SEARCH_TYPES[search_type], query, size, cursor, request)
+
+    def search_all(self, query, size=None, request=None):
+        size = get_size(
+            size, getattr(settings, 'SEARCH_PREVIEW_SIZE', 3), getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 50))
+        return OrderedDict(
+            (name, self._get_page(postgres_type, query, size, None, request))
+            for name, postgres_type in POSTGRES_SEARCH_TYPES.items()
+        )
+
+    def autocomplete(self, query, autocomplete_type, size=None):
+        return autocomplete(query, autocomplete_type, size=size, use_elasticsearch=False)
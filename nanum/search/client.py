@@ -0,0 +1,37 @@
+import threading
+
+from django.conf import settings
+from elasticsearch import Elasticsearch
+
+__all__ = (
+    'get_client',
+    'reset_client',
+)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    ELASTICSEARCH_HOSTS 설정으로 생성한 Elasticsearch client
+    process 안에서 하나의 client(host 별 최대 ELASTICSEARCH_MAXSIZE 개의 connection pool)를 공유
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = Elasticsearch(
+                hosts=getattr(settings, 'ELASTICSEARCH_HOSTS', None),
+                timeout=getattr(settings, 'ELASTICSEARCH_TIMEOUT', 10),
+                maxsize=getattr(settings, 'ELASTICSEARCH_MAXSIZE', 10),
+            )
+    return _client
+
+
+def reset_client():
+    """
+    fork 된 process에서 부모 process의 connection을 사용하지 않도록 client를 버림
+    """
+    global _client
+    with _client_lock:
+        _client = None
@@ -0,0 +1,113 @@
+"""
+Elasticsearch에 저장되는 model 별 index와 document
+outbox(실시간 반영)와 reindex(전체 다시 색인)가 같은 정의를 사용
+
+document는 model instance가 아닌 values() 결과(dict)로 만들어
+ForeignKey 객체나 BeautifulSoup parse 없이 필요한 column만 가져옴
+"""
+import html
+import re
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+
+from posts.models import Answer, Question
+from topics.models import Topic
+from .indexes import AnswerDocument, QuestionDocument, TopicDocType, UserDocType
+
+__all__ = (
+    'IndexSpec',
+    'html_to_text',
+    'get_index_specs',
+    'get_index_spec',
+)
+
+User = get_user_model()
+
+# name: index alias 이름, doc_type: document type, document: mapping을 정의한 DocType
+# model: 색인하는 model
+# get_queryset: 색인할 row의 queryset - 여기에 포함되지 않는 row는 index에서 삭제
+# fields: document를 만들 때 필요한 values() 필드
+# to_document: values() 결과를 document(dict)로 변환
+# modified_field: reindex 도중 변경된 row를 찾기 위한 시각 필드
+IndexSpec = namedtuple('IndexSpec', [
+    'name', 'doc_type', 'document', 'model', 'get_queryset', 'fields', 'to_document', 'modified_field',
+])
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def html_to_text(value):
+    """
+    html의 tag를 제거한 text - row마다 BeautifulSoup으로 parse 하지 않도록 정규식 사용
+    """
+    return _WHITESPACE_RE.sub(' ', html.unescape(_TAG_RE.sub(' ', value or ''))).strip()
+
+
+def _answer_document(row):
+    return {
+        'user': row['user__name'] or '',
+        'question': row['question__content'],
+        'text_content': html_to_text(row['content_html']),
+        'created_at': row['created_at'],
+        'modified_at': row['modified_at'],
+    }
+
+
+def _question_document(row):
+    return {
+        'user': row['user__name'] or '',
+        'content': row['content'],
+        'modified_at': row['modified_at'],
+    }
+
+
+def _topic_document(row):
+    return {
+        'name': row['name'],
+    }
+
+
+def _user_document(row):
+    return {
+        'name': row['name'],
+    }
+
+
+def get_index_specs():
+    """
+    :return: {model label: IndexSpec}
+    """
+    specs = (
+        IndexSpec('answer', 'answer', AnswerDocument, Answer,
+                  lambda: Answer.objects.filter(published=True),
+                  ('pk', 'user__name', 'question__content', 'content_html', 'created_at', 'modified_at'),
+                  _answer_document, 'modified_at'),
+        IndexSpec('question', 'question', QuestionDocument, Question,
+                  lambda: Question.objects.all(),
+                  ('pk', 'user__name', 'content', 'modified_at'),
+                  _question_document, 'modified_at'),
+        IndexSpec('topic', 'topic', TopicDocType, Topic,
+                  lambda: Topic.objects.all(),
+                  ('pk', 'name'),
+                  _topic_document, 'modified_at'),
+        IndexSpec('user', 'user', UserDocType, User,
+                  lambda: User.objects.filter(is_active=True),
+                  ('pk', 'name'),
+                  _user_document, 'date_joined'),
+    )
+    return {spec.model._meta.label: spec for spec in specs}
+
+
+def get_index_spec(model):
+    """
+    :param model: model class, model label 혹은 index 이름
+    :return: IndexSpec, 색인하지 않는 model일 경우 None
+    """
+    specs = get_index_specs()
+    if not isinstance(model, str):
+        return specs.get(model._meta.label)
+    if model in specs:
+        return specs[model]
+    return next((spec for spec in specs.values() if spec.name == model), None)
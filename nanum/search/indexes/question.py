@@ -20,7 +20,14 @@ class QuestionDocument(DocType):
         fields={
             'text_ngram': Text(
                 analyzer='edge_ngram_analyzer'
-            )
+            ),
+            'autocomplete': Text(
+                analyzer='autocomplete_analyzer',
+                search_analyzer='autocomplete_search_analyzer'
+            ),
         }
     )
     modified_at = Date()
+
+    class Meta:
+        doc_type = 'question'
@@ -10,6 +10,13 @@ class TopicDocType(DocType):
         fields={
             'text_ngram': Text(
                 analyzer='edge_ngram_analyzer'
-            )
+            ),
+            'autocomplete': Text(
+                analyzer='autocomplete_analyzer',
+                search_analyzer='autocomplete_search_analyzer'
+            ),
         }
-    )
\ No newline at end of file
+    )
+
+    class Meta:
+        doc_type = 'topic'
@@ -10,6 +10,13 @@ class UserDocType(DocType):
         fields={
             'text_ngram': Text(
                 analyzer='edge_ngram_analyzer'
-            )
+            ),
+            'autocomplete': Text(
+                analyzer='autocomplete_analyzer',
+                search_analyzer='autocomplete_search_analyzer'
+            ),
         }
     )
+
+    class Meta:
+        doc_type = 'user'
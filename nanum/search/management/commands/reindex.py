@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search.reindex import ReindexFailed, reindex
+
+INDEXES = ('answer', 'question', 'topic', 'user')
+
+
+class Command(BaseCommand):
+    help = '새 버전의 index를 만들어 전체 다시 색인한 후 alias를 옮김 (색인 도중에도 검색, 실시간 색인은 계속 동작)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--index', nargs='*', choices=INDEXES, dest='indexes',
+                            help='다시 색인할 index, 주어지지 않을 경우 전체')
+        parser.add_argument('--workers', type=int, dest='workers',
+                            help='색인 process 수, 주어지지 않을 경우 CPU 수')
+        parser.add_argument('--slice-size', type=int, default=50000, dest='slice_size',
+                            help='process 하나가 한 번에 맡는 pk 범위')
+        parser.add_argument('--batch-size', type=int, default=1000, dest='batch_size',
+                            help='bulk 요청 하나에 담는 document 수')
+        parser.add_argument('--keep-old', action='store_true', dest='keep_old',
+                            help='alias를 옮긴 후 기존 index를 삭제하지 않음')
+        parser.add_argument('--retries', type=int, default=1, dest='retries',
+                            help='실패한 document가 있는 slice를 다시 색인할 횟수, 그래도 실패하면 alias를 옮기지 않음')
+
+    def handle(self, *args, **options):
+        for name in options['indexes'] or INDEXES:
+            try:
+                result = reindex(
+                    name,
+                    workers=options['workers'],
+                    slice_size=options['slice_size'],
+                    chunk_size=options['batch_size'],
+                    keep_old=options['keep_old'],
+                    retries=options['retries'],
+                    log=self.stdout.write,
+                )
+            except ReindexFailed as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {result["documents"]} documents ({result["failed"]} failed) into {result["index"]} '
+                f'in {result["seconds"]}s, {result["throughput"]} docs/s'
+            ))
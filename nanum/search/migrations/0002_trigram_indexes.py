@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('posts', '0041_commentpostintermediate_post_type'),
+        ('topics', '0008_auto_20171229_2346'),
+        ('users', '0021_auto_20171219_1900'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Elasticsearch를 사용할 수 없을 때 autocomplete fallback의 UPPER(...) LIKE 쿼리에 사용되는 index
+        migrations.RunSQL(
+            sql="CREATE INDEX search_topic_name_trgm ON topics_topic USING gin (UPPER(name) gin_trgm_ops)",
+            reverse_sql="DROP INDEX IF EXISTS search_topic_name_trgm",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX search_user_name_trgm ON users_user USING gin (UPPER(name) gin_trgm_ops)",
+            reverse_sql="DROP INDEX IF EXISTS search_user_name_trgm",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX search_question_content_trgm ON posts_question USING gin (UPPER(content) gin_trgm_ops)",
+            reverse_sql="DROP INDEX IF EXISTS search_question_content_trgm",
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_trigram_indexes'),
+    ]
+
+    operations = [
+        # PostgresSearchBackend의 trigram_similar(%) 쿼리에 사용되는 index
+        migrations.RunSQL(
+            sql="CREATE INDEX search_topic_name_similarity_trgm ON topics_topic USING gin (name gin_trgm_ops)",
+            reverse_sql="DROP INDEX IF EXISTS search_topic_name_similarity_trgm",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX search_user_name_similarity_trgm ON users_user USING gin (name gin_trgm_ops)",
+            reverse_sql="DROP INDEX IF EXISTS search_user_name_similarity_trgm",
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import models
+
+__all__ = (
+    'SearchOutbox',
+)
+
+
+class SearchOutbox(models.Model):
+    """
+    Elasticsearch에 반영해야 할 변경 사항
+    model의 save/delete와 같은 transaction 안에서 INSERT 되고, drain_search_outbox task가 batch로 읽어 bulk 요청 후 삭제
+    write 요청은 Elasticsearch를 기다리지 않음
+    """
+    ACTION_INDEX = 'index'
+    ACTION_DELETE = 'delete'
+    ACTION_CHOICES = (
+        (ACTION_INDEX, 'Index'),
+        (ACTION_DELETE, 'Delete'),
+    )
+
+    # model label - ex) posts.Answer
+    model = models.CharField(max_length=50)
+    object_pk = models.IntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        index_together = ('model', 'object_pk')
+
+    def __str__(self):
+        return f'{self.action} {self.model}:{self.object_pk}'
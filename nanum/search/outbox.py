@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+from django.db.transaction import atomic, on_commit
+from elasticsearch import helpers
+
+from utils import run_task_in_background
+from .client import get_client
+from .documents import get_index_specs
+from .models import SearchOutbox
+
+__all__ = (
+    'REINDEXING_ALIAS',
+    'get_client',
+    'enqueue',
+    'enqueue_queryset',
+    'drain_outbox',
+    'drain_outbox_until_empty',
+)
+
+logger = logging.getLogger(__name__)
+
+# reindex 도중 새로 만들어지는 index를 가리키는 alias - outbox는 기존 alias와 이 alias의 index에 모두 씀
+REINDEXING_ALIAS = '{name}-reindexing'
+# reindexing alias를 다시 확인하는 간격(초)
+REINDEXING_ALIAS_TTL = 5
+
+_drain_lock = threading.Lock()
+_last_drained_at = time.monotonic()
+_reindexing_indexes = dict()
+
+
+def _is_enabled():
+    """
+    SEARCH_INDEXING_ENABLED가 None일 경우 SEARCH_BACKEND가 Elasticsearch index를 사용할 때만 outbox에 쌓음
+    """
+    enabled = getattr(settings, 'SEARCH_INDEXING_ENABLED', None)
+    if enabled is None:
+        from .backends import get_search_backend
+        return get_search_backend().uses_index
+    return enabled
+
+
+def _schedule_drain():
+    """
+    Celery broker가 있을 경우 beat의 drain_search_outbox task가 주기적으로 처리하고,
+    없을 경우 SEARCH_OUTBOX_DRAIN_INTERVAL 초마다 현재 process의 thread pool에서 처리
+    """
+    global _last_drained_at
+    if getattr(settings, 'CELERY_BROKER_URL', None):
+        return
+    interval = getattr(settings, 'SEARCH_OUTBOX_DRAIN_INTERVAL', 2)
+    with _drain_lock:
+        if time.monotonic() - _last_drained_at < interval:
+            return
+        _last_drained_at = time.monotonic()
+    from .tasks import drain_search_outbox
+    run_task_in_background(drain_search_outbox)
+
+
+def enqueue(model, pks, action=SearchOutbox.ACTION_INDEX):
+    """
+    model의 pks에 해당하는 document를 다시 색인(혹은 삭제)하도록 outbox에 추가
+    호출한 transaction과 함께 commit 되며 Elasticsearch에 요청하지 않음
+    """
+    if not _is_enabled():
+        return
+    label = model._meta.label
+    SearchOutbox.objects.bulk_create([
+        SearchOutbox(model=label, object_pk=pk, action=action) for pk in pks
+    ])
+    on_commit(_schedule_drain)
+
+
+def enqueue_queryset(queryset, action=SearchOutbox.ACTION_INDEX):
+    """
+    queryset의 row들을 INSERT ... SELECT 쿼리 한 번으로 outbox에 추가
+    """
+    if not _is_enabled():
+        return 0
+    sql, params = queryset.values_list('pk').query.sql_with_params()
+    table = connection.ops.quote_name(SearchOutbox._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (model, object_pk, action, created_at) '
+            f'SELECT %s, t.*, %s, NOW() FROM ({sql}) t',
+            [queryset.model._meta.label, action] + list(params)
+        )
+        count = cursor.rowcount
+    on_commit(_schedule_drain)
+    return count
+
+
+def _get_reindexing_indexes(client, spec):
+    """
+    reindex 도중일 경우 새로 만들어지고 있는 index 이름들 - REINDEXING_ALIAS_TTL 초 동안 기억
+    """
+    cached = _reindexing_indexes.get(spec.name)
+    if cached is not None and time.monotonic() - cached[0] < REINDEXING_ALIAS_TTL:
+        return cached[1]
+    aliases = client.indices.get_alias(name=REINDEXING_ALIAS.format(name=spec.name), ignore=404)
+    indexes = [index for index in aliases if index != 'error' and index != 'status'] if aliases else []
+    _reindexing_indexes[spec.name] = (time.monotonic(), indexes)
+    return indexes
+
+
+def _build_actions(changes, client):
+    """
+    변경 사항들을 bulk action으로 변환
+    색인할 row는 model 별로 values() 쿼리 한 번으로 가져오며, queryset에 없는(삭제 혹은 비공개) row는 delete action
+    reindex 도중일 경우 새로 만들어지고 있는 index에도 같은 action을 추가
+
+    :param changes: {(model label, pk): action}
+    :return: bulk action list
+    """
+    specs = get_index_specs()
+    pks_by_label = OrderedDict()
+    documents = dict()
+    for (label, pk), action in changes.items():
+        if label not in specs:
+            continue
+        if action == SearchOutbox.ACTION_INDEX:
+            pks_by_label.setdefault(label, []).append(pk)
+        documents[(label, pk)] = None
+
+    for label, pks in pks_by_label.items():
+        spec = specs[label]
+        for row in spec.get_queryset().filter(pk__in=pks).values(*spec.fields):
+            documents[(label, row['pk'])] = spec.to_document(row)
+
+    actions = []
+    for (label, pk), document in documents.items():
+        spec = specs[label]
+        for index in [spec.name] + _get_reindexing_indexes(client, spec):
+            if document is None:
+                actions.append({'_op_type': 'delete', '_index': index, '_type': spec.doc_type, '_id': pk})
+            else:
+                actions.append({'_op_type': 'index', '_index': index, '_type': spec.doc_type, '_id': pk,
+                                '_source': document})
+    return actions
+
+
+def _get_failed_ids(errors):
+    """
+    bulk 요청 실패 항목 중 다시 시도해야 할 (doc_type, id) - 이미 없는 document의 삭제(404)는 성공으로 봄
+    응답의 _index는 alias가 아닌 실제 index 이름이므로 doc_type으로 구분
+    """
+    failed = set()
+    for error in errors:
+        (op_type, item), = error.items()
+        if op_type == 'delete' and item.get('status') == 404:
+            continue
+        failed.add((item.get('_type'), str(item.get('_id'))))
+    return failed
+
+
+def drain_outbox(batch_size=None, client=None):
+    """
+    outbox에서 batch_size 개의 변경 사항을 가져와 Elasticsearch에 bulk 요청 한 번으로 반영
+    같은 document에 대한 여러 변경은 마지막 하나로 합쳐지며, 색인 시점의 DB 값으로 document를 만듦
+    여러 worker가 동시에 실행할 수 있도록 SELECT ... FOR UPDATE SKIP LOCKED 로 가져오고,
+    실패한 document의 row는 남겨두어 다음 실행 때 다시 시도
+
+    :return: {'processed': 처리한 row 수, 'actions': bulk action 수, 'failed': 실패한 document 수}
+    """
+    batch_size = batch_size or getattr(settings, 'SEARCH_OUTBOX_BATCH_SIZE', 500)
+    with atomic():
+        rows = list(SearchOutbox.objects.select_for_update(skip_locked=True).order_by('pk')[:batch_size])
+        if not rows:
+            return {'processed': 0, 'actions': 0, 'failed': 0}
+
+        changes = OrderedDict()
+        for row in rows:
+            key = (row.model, row.object_pk)
+            # 마지막 action이 적용되도록 순서를 뒤로 옮김
+            changes.pop(key, None)
+            changes[key] = row.action
+        client = client or get_client()
+        actions = _build_actions(changes, client)
+        _, errors = helpers.bulk(client, actions, raise_on_error=False, stats_only=False)
+        failed = _get_failed_ids(errors)
+
+        specs = get_index_specs()
+        done = [
+            row.pk for row in rows
+            if row.model not in specs or (specs[row.model].doc_type, str(row.object_pk)) not in failed
+        ]
+        SearchOutbox.objects.filter(pk__in=done).delete()
+    if failed:
+        logger.warning('search outbox: %d documents failed, will retry', len(failed))
+    return {'processed': len(done), 'actions': len(actions), 'failed': len(failed)}
+
+
+def drain_outbox_until_empty(batch_size=None, max_batches=None):
+    """
+    outbox가 빌 때까지(최대 max_batches 번) drain_outbox를 반복
+    :return: 처리한 row 수
+    """
+    max_batches = max_batches or getattr(settings, 'SEARCH_OUTBOX_MAX_BATCHES', 20)
+    processed = 0
+    for _ in range(max_batches):
+        result = drain_outbox(batch_size=batch_size)
+        processed += result['processed']
+        if not result['processed']:
+            break
+    return processed
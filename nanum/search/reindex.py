@@ -0,0 +1,210 @@
+"""
+무중단 전체 reindex
+
+1. {name}_{timestamp} 이름의 새 index를 만들고 {name}-reindexing alias로 가리킴 (outbox가 새 index에도 씀)
+2. pk 범위를 slice_size 단위로 나누어 process pool에서 색인
+   - slice 마다 server-side cursor(QuerySet.iterator())로 values() 필드만 읽어 bulk 요청
+   - 색인 도중에는 refresh, replica를 끄고 끝난 후 되돌림
+   - 실패한 document가 있는 slice는 retries 번 다시 색인하고, 그래도 실패가 남으면 중단
+   - 중단되거나 worker에서 예외가 발생할 경우 새 index(와 reindexing alias)를 삭제하고 기존 alias는 그대로 둠
+3. {name} alias를 기존 index에서 새 index로 한 번의 요청으로 옮기고 기존 index 삭제
+4. 색인을 시작한 이후 변경된 row를 outbox에 다시 추가하여, 색인 도중의 변경이 새 index에 반영되도록 함
+   - 남아있는 row만 다시 추가하므로, slice가 읽은 직후 삭제된 row의 document는 새 index에 남을 수 있음
+     (검색 결과는 DB에 없는 hit을 제외하므로 결과에는 나타나지 않고 total에만 포함되며, 다음 reindex에서 정리됨)
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import timezone
+from elasticsearch import helpers
+from elasticsearch_dsl import Index
+
+from . import analyzers
+from .client import get_client, reset_client
+from .documents import get_index_spec
+from .outbox import REINDEXING_ALIAS, enqueue_queryset
+
+__all__ = (
+    'ReindexFailed',
+    'create_index',
+    'index_slice',
+    'swap_alias',
+    'reindex',
+)
+
+
+def create_index(spec, client):
+    """
+    spec의 DocType mapping과 analyzer로 새 버전의 index를 생성
+    색인 도중에는 refresh, replica를 끔
+    :return: 생성된 index 이름
+    """
+    name = f'{spec.name}_{timezone.now().strftime("%Y%m%d%H%M%S")}'
+    index = Index(name)
+    index.settings(
+        number_of_replicas=0,
+        refresh_interval='-1',
+    )
+    for analyzer in (analyzers.korean, analyzers.ngram, analyzers.edge_ngram_analyzer,
+                     analyzers.autocomplete, analyzers.autocomplete_search):
+        index.analyzer(analyzer)
+    index.doc_type(spec.document)
+    index.create(using=client)
+    client.indices.put_alias(index=name, name=REINDEXING_ALIAS.format(name=spec.name))
+    return name
+
+
+class ReindexFailed(RuntimeError):
+    pass
+
+
+_worker_pid = None
+
+
+def _init_worker():
+    """
+    fork 된 process가 부모의 DB connection, Elasticsearch client를 공유하지 않도록 process 마다 한 번 새로 만듦
+    Python 3.6의 ProcessPoolExecutor에는 initializer가 없으므로 index_slice에서 호출하며, 부모 process에서는 무시
+    """
+    global _worker_pid
+    if multiprocessing.current_process().name == 'MainProcess' or _worker_pid == os.getpid():
+        return
+    connections.close_all()
+    reset_client()
+    _worker_pid = os.getpid()
+
+
+def index_slice(label, index_name, low, high, chunk_size):
+    """
+    pk가 low 이상 high 미만인 row들을 index_name에 색인 (process pool에서 실행)
+    QuerySet.iterator()는 PostgreSQL에서 server-side cursor를 사용하므로 slice 전체를 메모리에 올리지 않음
+
+    :return: (색인된 document 수, 실패한 document 수)
+    """
+    _init_worker()
+    spec = get_index_spec(label)
+    rows = spec.get_queryset().filter(pk__gte=low, pk__lt=high).order_by('pk').values(*spec.fields).iterator()
+    actions = (
+        {'_index': index_name, '_type': spec.doc_type, '_id': row['pk'], '_source': spec.to_document(row)}
+        for row in rows
+    )
+    success, errors = helpers.bulk(get_client(), actions, chunk_size=chunk_size, raise_on_error=False)
+    return success, len(errors)
+
+
+def swap_alias(client, alias, index_name):
+    """
+    alias를 기존 index들에서 index_name으로 한 번의 요청으로 옮김
+    alias 이름과 같은 실제 index(예전에 자동 생성된 index)가 있을 경우 같은 요청에서 삭제
+    :return: 기존 index 이름 list
+    """
+    actions = [{'add': {'index': index_name, 'alias': alias}}]
+    old_indexes = []
+    if client.indices.exists_alias(name=alias):
+        old_indexes = list(client.indices.get_alias(name=alias))
+        actions = [{'remove': {'index': index, 'alias': alias}} for index in old_indexes] + actions
+    elif client.indices.exists(index=alias):
+        actions.append({'remove_index': {'index': alias}})
+    reindexing_alias = REINDEXING_ALIAS.format(name=alias)
+    actions.append({'remove': {'index': index_name, 'alias': reindexing_alias}})
+    client.indices.update_aliases(body={'actions': actions})
+    return old_indexes
+
+
+def reindex(name, workers=None, slice_size=50000, chunk_size=1000, keep_old=False, retries=1, log=None):
+    """
+    name index를 새 버전의 index로 다시 색인하고 alias를 옮김
+    색인하는 동안 검색은 기존 index를 사용하므로 중단되지 않음
+
+    :param name: index 이름 - answer | question | topic | user
+    :param workers: process 수, None일 경우 CPU 수
+    :param slice_size: process 하나가 한 번에 맡는 pk 범위
+    :param chunk_size: bulk 요청 하나에 담는 document 수
+    :param keep_old: True일 경우 기존 index를 삭제하지 않음
+    :param retries: 실패한 document가 있는 slice를 다시 색인할 횟수
+    :param log: 진행 상황을 출력할 함수(str)
+    :return: {'index', 'documents', 'failed', 'seconds', 'throughput'}
+    :raise ReindexFailed: 다시 색인한 후에도 실패한 document가 있을 경우 - 새 index는 삭제되고 alias는 그대로
+    (worker의 DB, Elasticsearch 오류 등 다른 예외도 새 index를 삭제한 후 그대로 raise)
+    """
+    log = log or (lambda message: None)
+    spec = get_index_spec(name)
+    client = get_client()
+    started_at = timezone.now()
+    started = time.perf_counter()
+
+    index_name = create_index(spec, client)
+    log(f'{name}: created {index_name}')
+
+    try:
+        bounds = spec.get_queryset().aggregate(min_pk=Min('pk'), max_pk=Max('pk'))
+        slices = []
+        if bounds['min_pk'] is not None:
+            slices = [(low, low + slice_size) for low in range(bounds['min_pk'], bounds['max_pk'] + 1, slice_size)]
+
+        # slice (low, high) 별 (색인된 document 수, 실패한 document 수)
+        results = dict()
+        # 부모 process의 connection을 자식 process가 물려받지 않도록 fork 전에 닫음
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers or multiprocessing.cpu_count()) as pool:
+            futures = {
+                pool.submit(index_slice, spec.model._meta.label, index_name, low, high, chunk_size): (low, high)
+                for low, high in slices
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                documents = sum(success for success, _ in results.values())
+                elapsed = time.perf_counter() - started
+                log(f'{name}: {done}/{len(futures)} slices, {documents} documents, '
+                    f'{documents / elapsed:.0f} docs/s')
+
+        # 같은 _id로 다시 색인하므로 slice 전체를 다시 보내도 document가 중복되지 않음
+        for attempt in range(1, retries + 1):
+            failed_slices = [key for key, (_, errors) in results.items() if errors]
+            if not failed_slices:
+                break
+            log(f'{name}: retrying {len(failed_slices)} slices (attempt {attempt})')
+            for low, high in failed_slices:
+                results[(low, high)] = index_slice(spec.model._meta.label, index_name, low, high, chunk_size)
+
+        documents = sum(success for success, _ in results.values())
+        failed = sum(errors for _, errors in results.values())
+        if failed:
+            raise ReindexFailed(f'{name}: {failed} documents failed after {retries} retries, '
+                                f'deleted {index_name} and kept alias {spec.name}')
+
+        client.indices.put_settings(index=index_name, body={
+            'index': {
+                'number_of_replicas': getattr(settings, 'ELASTICSEARCH_NUMBER_OF_REPLICAS', 1),
+                'refresh_interval': '1s',
+            }
+        })
+        client.indices.refresh(index=index_name)
+        old_indexes = swap_alias(client, spec.name, index_name)
+    except BaseException:
+        # 새 index와 reindexing alias가 남아 있으면 outbox가 계속 새 index에도 쓰므로 삭제 (alias는 index와 함께 삭제됨)
+        client.indices.delete(index=index_name, ignore=404)
+        log(f'{name}: deleted {index_name}')
+        raise
+    log(f'{name}: alias {spec.name} -> {index_name}')
+    if old_indexes and not keep_old:
+        client.indices.delete(index=','.join(old_indexes))
+        log(f'{name}: deleted {", ".join(old_indexes)}')
+
+    # 색인 도중 slice가 읽은 이후에 변경된 row를 다시 색인
+    requeued = enqueue_queryset(spec.get_queryset().filter(**{f'{spec.modified_field}__gte': started_at}))
+    log(f'{name}: requeued {requeued} rows changed during reindex')
+
+    elapsed = time.perf_counter() - started
+    return {
+        'index': index_name,
+        'documents': documents,
+        'failed': failed,
+        'seconds': round(elapsed, 1),
+        'throughput': round(documents / elapsed, 1) if elapsed else 0,
+    }
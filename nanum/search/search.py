@@ -1,23 +1,269 @@
-from elasticsearch import Elasticsearch
-from elasticsearch_dsl.search import Search
-
-my_search = Search(using=Elasticsearch())
-
-
-def search(query):
-    query = my_search.query(
-        "multi_match",
-        query=query,
-        fields=[
-            'user',
-            'question',
-            'text_content',
-            '*text_ngram',
-        ]
-    )
-    response = query.execute()
-    return response.to_dict()
+"""
+검색 service
+
+type(question, answer, topic, user) 별로 검색 필드, Elasticsearch에서 가져올 _source 필드, highlight 필드와
+DB에서 가져올 필드를 정의하고 결과를 화면에 필요한 형태로 만듦
+
+- 페이지는 (_score, _uid) 정렬의 search_after cursor로 넘기므로 뒤 페이지로 갈수록 느려지지 않음
+- Elasticsearch의 결과는 type 별 values() 쿼리 한 번으로 DB의 값(pk, count 등)과 합쳐지며,
+  DB에서 삭제(혹은 비공개)된 document는 결과에서 제외
+"""
+import base64
+import binascii
+import json
+from collections import namedtuple, OrderedDict
+
+from django.conf import settings
+from elasticsearch_dsl import MultiSearch, Search
+from rest_framework.reverse import reverse
+
+from .client import get_client
+from .documents import get_index_spec
+
+__all__ = (
+    'SearchType',
+    'SEARCH_TYPES',
+    'InvalidCursor',
+    'InvalidSize',
+    'parse_size',
+    'get_size',
+    'encode_cursor',
+    'decode_cursor',
+    'search',
+    'search_all',
+)
+
+# name: index 이름, query_fields: multi_match 필드, source: Elasticsearch에서 가져올 _source 필드
+# highlight: highlight 할 필드, values: DB에서 가져올 values() 필드
+# to_result: (_source, DB row, highlight, request)를 결과(dict)로 변환
+SearchType = namedtuple('SearchType', ['name', 'query_fields', 'source', 'highlight', 'values', 'to_result'])
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidSize(ValueError):
+    pass
+
+
+def _question_result(source, row, highlight, request):
+    return OrderedDict([
+        ('type', 'question'),
+        ('pk', row['pk']),
+        ('url', reverse('post:question:question-detail', kwargs={'pk': row['pk']}, request=request)),
+        ('content', source.get('content')),
+        ('highlight', highlight),
+        ('answer_count', row['answer_count']),
+        ('follow_count', row['follow_count']),
+    ])
+
+
+def _answer_result(source, row, highlight, request):
+    user = None
+    if row['user_id'] is not None:
+        user = OrderedDict([
+            ('pk', row['user_id']),
+            ('url', reverse('user:profile-main-detail', kwargs={'pk': row['user_id']}, request=request)),
+            ('name', source.get('user')),
+        ])
+    return OrderedDict([
+        ('type', 'answer'),
+        ('pk', row['pk']),
+        ('url', reverse('post:answer:answer-detail', kwargs={'pk': row['pk']}, request=request)),
+        ('question', OrderedDict([
+            ('pk', row['question_id']),
+            ('url', reverse('post:question:question-detail', kwargs={'pk': row['question_id']}, request=request)),
+            ('content', source.get('question')),
+        ])),
+        ('user', user),
+        ('highlight', highlight),
+        ('upvote_count', row['upvote_count']),
+        ('comment_count', row['comment_count']),
+        ('created_at', source.get('created_at')),
+    ])
+
+
+def _topic_result(source, row, highlight, request):
+    return OrderedDict([
+        ('type', 'topic'),
+        ('pk', row['pk']),
+        ('url', reverse('topic:topic-detail', kwargs={'pk': row['pk']}, request=request)),
+        ('name', source.get('name')),
+        ('highlight', highlight),
+        ('question_count', row['question_count']),
+        ('interest_count', row['interest_count']),
+    ])
+
+
+def _user_result(source, row, highlight, request):
+    return OrderedDict([
+        ('type', 'user'),
+        ('pk', row['pk']),
+        ('url', reverse('user:profile-main-detail', kwargs={'pk': row['pk']}, request=request)),
+        ('name', source.get('name')),
+        ('highlight', highlight),
+        ('main_credential', row['profile__main_credential']),
+        ('follower_count', row['profile__follower_count']),
+    ])
 
 
-def all_docs(query):
-    return my_search.query('match_all').execute().to_dict()
+SEARCH_TYPES = OrderedDict((search_type.name, search_type) for search_type in (
+    SearchType(
+        'question',
+        ('content^2', 'content.text_ngram'),
+        ('content',),
+        'content',
+        ('answer_count', 'follow_count'),
+        _question_result,
+    ),
+    SearchType(
+        'answer',
+        ('text_content', 'text_content.text_content_ngram', 'question', 'question.question_ngram', 'user'),
+        ('question', 'user', 'created_at'),
+        'text_content',
+        ('question_id', 'user_id', 'upvote_count', 'comment_count'),
+        _answer_result,
+    ),
+    SearchType(
+        'topic',
+        ('name^2', 'name.text_ngram'),
+        ('name',),
+        'name',
+        ('question_count', 'interest_count'),
+        _topic_result,
+    ),
+    SearchType(
+        'user',
+        ('name^2', 'name.text_ngram'),
+        ('name',),
+        'name',
+        ('profile__main_credential', 'profile__follower_count'),
+        _user_result,
+    ),
+))
+
+
+def parse_size(size):
+    """
+    query parameter 등으로 받은 결과 수를 정수로 변환
+    :return: 없을 경우 None
+    :raise InvalidSize: 정수가 아니거나 1보다 작을 경우
+    """
+    if size is None or size == '':
+        return None
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise InvalidSize(size)
+    if size < 1:
+        raise InvalidSize(size)
+    return size
+
+
+def get_size(size, default, maximum):
+    """
+    parse_size로 검사한 결과 수 - 없을 경우 default이며 maximum을 넘지 않음
+    :raise InvalidSize:
+    """
+    return min(parse_size(size) or default, maximum)
+
+
+def encode_cursor(sort_values):
+    """
+    마지막 hit의 sort 값을 url에 넣을 수 있는 문자열로 변환
+    """
+    return base64.urlsafe_b64encode(json.dumps(sort_values).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, value_types=((int, float), str)):
+    """
+    :param value_types: sort 값 별 type - 기본값은 Elasticsearch의 (_score, _uid)
+    :raise InvalidCursor: encode_cursor로 만들어지지 않았거나 sort 값의 type이 다를 경우
+    """
+    try:
+        sort_values = json.loads(base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode('ascii')))
+    except (ValueError, UnicodeError, binascii.Error):
+        raise InvalidCursor(cursor)
+    if not isinstance(sort_values, list) or len(sort_values) != len(value_types):
+        raise InvalidCursor(cursor)
+    for value, types in zip(sort_values, value_types):
+        # json의 true/false는 int의 subclass인 bool로 decode 됨
+        if isinstance(value, bool) or not isinstance(value, types):
+            raise InvalidCursor(cursor)
+    return sort_values
+
+
+def _build_search(search_type, query, size, search_after=None):
+    # highlight는 클라이언트에서 HTML로 표시되므로 fragment의 원문은 escape 하고 <em> 태그만 남김 (encoder는 전체 옵션)
+    spec = get_index_spec(search_type.name)
+    s = Search(using=get_client(), index=spec.name, doc_type=spec.doc_type) \
+        .query('multi_match', query=query, fields=list(search_type.query_fields)) \
+        .source(list(search_type.source)) \
+        .sort('_score', {'_uid': 'asc'}) \
+        .highlight(search_type.highlight, fragment_size=100, number_of_fragments=1) \
+        .highlight_options(encoder='html') \
+        .extra(size=size)
+    if search_after:
+        s = s.extra(search_after=search_after)
+    return s
+
+
+def _to_page(search_type, response, size, request):
+    """
+    Elasticsearch 응답을 DB row와 합쳐 결과 페이지로 변환
+    :return: {'total', 'results', 'next_cursor'}
+    """
+    hits = response.to_dict()['hits']
+    spec = get_index_spec(search_type.name)
+    pks = [int(hit['_id']) for hit in hits['hits']]
+    rows = {
+        row['pk']: row for row in spec.get_queryset().filter(pk__in=pks).values('pk', *search_type.values)
+    }
+    results = []
+    for hit in hits['hits']:
+        row = rows.get(int(hit['_id']))
+        # 아직 outbox가 index에서 삭제하지 않은 document
+        if row is None:
+            continue
+        fragments = hit.get('highlight', {}).get(search_type.highlight)
+        results.append(search_type.to_result(
+            hit.get('_source', {}), row, fragments[0] if fragments else None, request))
+
+    next_cursor = None
+    if len(hits['hits']) == size:
+        next_cursor = encode_cursor(hits['hits'][-1]['sort'])
+    return {'total': hits['total'], 'results': results, 'next_cursor': next_cursor}
+
+
+def search(query, search_type, size=None, cursor=None, request=None):
+    """
+    search_type 한 종류를 검색
+    :param search_type: question | answer | topic | user
+    :param size: 페이지 크기 - SEARCH_MAX_PAGE_SIZE를 넘지 않음
+    :param cursor: 이전 페이지의 next_cursor
+    :return: {'total', 'results', 'next_cursor'}
+    :raise InvalidSize: size가 1보다 작을 경우
+    :raise InvalidCursor:
+    """
+    search_type = SEARCH_TYPES[search_type]
+    size = get_size(size, getattr(settings, 'SEARCH_PAGE_SIZE', 10), getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 50))
+    search_after = decode_cursor(cursor) if cursor else None
+    response = _build_search(search_type, query, size, search_after).execute()
+    return _to_page(search_type, response, size, request)
+
+
+def search_all(query, size=None, request=None):
+    """
+    모든 type을 msearch 요청 한 번으로 검색하여 type 별 첫 페이지를 반환
+    :return: {search_type: {'total', 'results', 'next_cursor'}}
+    """
+    size = get_size(size, getattr(settings, 'SEARCH_PREVIEW_SIZE', 3), getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 50))
+    multi_search = MultiSearch(using=get_client())
+    for search_type in SEARCH_TYPES.values():
+        multi_search = multi_search.add(_build_search(search_type, query, size))
+    responses = multi_search.execute()
+    return OrderedDict(
+        (search_type.name, _to_page(search_type, response, size, request))
+        for search_type, response in zip(SEARCH_TYPES.values(), responses)
+    )
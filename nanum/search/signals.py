@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.models import Answer, Question
+from topics.models import Topic
+from .models import SearchOutbox
+from .outbox import enqueue, enqueue_queryset
+
+User = get_user_model()
+
+INDEXED_MODELS = (Answer, Question, Topic, User)
+
+# 다른 model의 document에 복사되는 필드 - (sender, 필드, instance -> 다시 색인할 document의 queryset)
+# Answer document의 question__content, user__name / Question document의 user__name
+DEPENDENT_DOCUMENTS = (
+    (Question, 'content', lambda instance: Answer.objects.filter(published=True, question=instance)),
+    (User, 'name', lambda instance: Answer.objects.filter(published=True, user=instance)),
+    (User, 'name', lambda instance: Question.objects.filter(user=instance)),
+)
+
+
+def _save_handler(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    # fixture loading 혹은 로그인 시각만 바뀌는 경우 등 색인할 필드가 바뀌지 않은 경우 제외
+    if raw or (update_fields and set(update_fields) <= {'last_login', 'password'}):
+        return
+    enqueue(sender, [instance.pk], SearchOutbox.ACTION_INDEX)
+    if created:
+        return
+    for model, field, get_queryset in DEPENDENT_DOCUMENTS:
+        if model is sender and (not update_fields or field in update_fields):
+            enqueue_queryset(get_queryset(instance))
+
+
+def _delete_handler(sender, instance, **kwargs):
+    enqueue(sender, [instance.pk], SearchOutbox.ACTION_DELETE)
+
+
+for model in INDEXED_MODELS:
+    receiver(post_save, sender=model, dispatch_uid=f'search-outbox-save-{model._meta.label}')(_save_handler)
+    receiver(post_delete, sender=model, dispatch_uid=f'search-outbox-delete-{model._meta.label}')(_delete_handler)
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from . import outbox
+
+
+@shared_task(name='drain_search_outbox')
+def drain_search_outbox():
+    return outbox.drain_outbox_until_empty()
@@ -1,3 +1,512 @@
-from django.test import TestCase
+import json
+from concurrent.futures import Future
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from elasticsearch.exceptions import ConnectionError
+from elasticsearch.serializer import JSONSerializer
+from rest_framework.test import APITestCase
+
+from posts.models import Answer, Question
+from topics.models import Topic
+from .autocomplete import autocomplete, elasticsearch_breaker, get_prefix_cache
+from .backends import PostgresSearchBackend
+from .backends.postgres import highlight
+from .models import SearchOutbox
+from .outbox import drain_outbox
+from .reindex import ReindexFailed, index_slice, reindex, swap_alias
+from .search import InvalidSize, decode_cursor, encode_cursor, search
+
+User = get_user_model()
+
+
+class RecordingElasticsearch:
+    """
+    bulk 요청의 action들을 기록하고 모두 성공으로 응답하는 client
+    failures: {document _id: 실패로 응답할 횟수}
+    """
+
+    class Transport:
+        serializer = JSONSerializer()
+
+    class Indices:
+        """
+        index, alias를 메모리에 저장하는 indices API
+        """
+
+        def __init__(self):
+            self.indexes = set()
+            self.aliases = dict()
+            self.settings = dict()
+            self.alias_updates = []
+
+        def create(self, index, body=None, **kwargs):
+            self.indexes.add(index)
+
+        def exists(self, index, **kwargs):
+            return index in self.indexes
+
+        def delete(self, index, ignore=None, **kwargs):
+            for name in index.split(','):
+                if name not in self.indexes and ignore == 404:
+                    continue
+                self.indexes.remove(name)
+                for indexes in self.aliases.values():
+                    indexes.discard(name)
+
+        def put_alias(self, index, name, **kwargs):
+            self.aliases.setdefault(name, set()).add(index)
+
+        def exists_alias(self, name, **kwargs):
+            return bool(self.aliases.get(name))
+
+        def get_alias(self, name=None, **kwargs):
+            return {index: {'aliases': {name: {}}} for index in self.aliases.get(name, ())}
+
+        def update_aliases(self, body, **kwargs):
+            self.alias_updates.append(body['actions'])
+            for action in body['actions']:
+                (op_type, params), = action.items()
+                if op_type == 'add':
+                    self.put_alias(params['index'], params['alias'])
+                elif op_type == 'remove':
+                    self.aliases.get(params['alias'], set()).discard(params['index'])
+                elif op_type == 'remove_index':
+                    self.delete(params['index'])
+
+        def put_settings(self, index, body, **kwargs):
+            self.settings[index] = body
+
+        def refresh(self, index, **kwargs):
+            pass
+
+    transport = Transport()
+
+    def __init__(self, hits=(), failures=None):
+        self.actions = []
+        self.hits = list(hits)
+        self.searches = []
+        self.failures = dict(failures or {})
+        self.indices = self.Indices()
+
+    def _status(self, meta):
+        if self.failures.get(meta['_id']):
+            self.failures[meta['_id']] -= 1
+            return 500
+        return 200
+
+    def bulk(self, body, **kwargs):
+        lines = [json.loads(line) for line in body.strip().split('\n')]
+        actions = [line for line in lines if len(line) == 1 and next(iter(line)) in ('index', 'delete')]
+        self.actions.extend(actions)
+        items = [
+            {op_type: dict(meta, status=self._status(meta))} for action in actions for op_type, meta in action.items()
+        ]
+        return {
+            'errors': any(item[op_type]['status'] >= 300 for item in items for op_type in item),
+            'items': items,
+        }
+
+    def search(self, body=None, **kwargs):
+        self.searches.append(body)
+        return {'hits': {'total': len(self.hits), 'hits': self.hits}}
+
+
+class SearchOutboxTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(name='user', email='user@nanum.com', password='password')
+
+    def test_changes_collapsed_into_one_bulk_request(self):
+        """
+        같은 document에 대한 여러 변경이 bulk action 하나로 합쳐지고, 처리된 outbox row가 삭제되는지 확인
+        :return:
+        """
+        topic = Topic.objects.create(creator=self.user, name='topic')
+        topic.description = 'description'
+        topic.save()
+        self.assertEqual(SearchOutbox.objects.filter(model='topics.Topic', object_pk=topic.pk).count(), 2)
+
+        client = RecordingElasticsearch()
+        drain_outbox(client=client)
+        topic_actions = [action for action in client.actions if action.get('index', {}).get('_index') == 'topic']
+        self.assertEqual(len(topic_actions), 1)
+        self.assertFalse(SearchOutbox.objects.exists())
+
+        topic_pk = topic.pk
+        topic.delete()
+        client = RecordingElasticsearch()
+        drain_outbox(client=client)
+        self.assertEqual(client.actions, [{'delete': {'_index': 'topic', '_type': 'topic', '_id': topic_pk}}])
+
+    def test_dependent_documents_requeued(self):
+        """
+        질문 내용이나 유저 이름이 바뀌면 그 값이 복사된 답변, 질문 document도 다시 색인되는지 확인
+        :return:
+        """
+        question = Question.objects.create(user=self.user, content='question')
+        answer = Answer.objects.create(user=self.user, question=question, published=True, content_html='<p>a</p>')
+        SearchOutbox.objects.all().delete()
+
+        question.content = 'edited question'
+        question.save()
+        self.assertEqual(
+            set(SearchOutbox.objects.values_list('model', 'object_pk')),
+            {('posts.Question', question.pk), ('posts.Answer', answer.pk)},
+        )
+        SearchOutbox.objects.all().delete()
+
+        self.user.name = 'renamed'
+        self.user.save()
+        self.assertEqual(
+            set(SearchOutbox.objects.values_list('model', 'object_pk')),
+            {(self.user._meta.label, self.user.pk), ('posts.Question', question.pk), ('posts.Answer', answer.pk)},
+        )
+
+        client = RecordingElasticsearch()
+        drain_outbox(client=client)
+        indexes = {action['index']['_index'] for action in client.actions if 'index' in action}
+        self.assertEqual(indexes, {'user', 'question', 'answer'})
+
+
+class ImmediateExecutor:
+    """
+    submit 된 함수를 현재 process에서 바로 실행하는 ProcessPoolExecutor 대신 사용할 executor
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+# reindex는 process pool로 fork 하기 전에 DB connection을 닫으므로 test transaction 밖에서 실행
+class ReindexTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(name='user', email='user@nanum.com', password='password')
+        self.topics = [Topic.objects.create(creator=self.user, name=f'topic{i}') for i in range(5)]
+
+    def reindex(self, client, **kwargs):
+        with patch('search.reindex.get_client', return_value=client), \
+                patch('search.reindex.ProcessPoolExecutor', ImmediateExecutor):
+            return reindex('topic', slice_size=2, chunk_size=2, **kwargs)
+
+    def test_index_slice(self):
+        """
+        pk 범위 안의 row들만 values() 필드로 만든 document로 색인되는지 확인
+        :return:
+        """
+        client = RecordingElasticsearch()
+        low, high = self.topics[1].pk, self.topics[3].pk
+        with patch('search.reindex.get_client', return_value=client):
+            self.assertEqual(index_slice('topics.Topic', 'topic_new', low, high, 1), (2, 0))
+        self.assertEqual(
+            client.actions,
+            [{'index': {'_index': 'topic_new', '_type': 'topic', '_id': topic.pk}} for topic in self.topics[1:3]],
+        )
+
+    def test_swap_alias(self):
+        """
+        기존 index들에서 새 index로 alias를 한 번의 요청으로 옮기고, 같은 이름의 실제 index는 삭제하는지 확인
+        :return:
+        """
+        client = RecordingElasticsearch()
+        client.indices.indexes.update({'topic_old', 'topic_new'})
+        client.indices.put_alias('topic_old', 'topic')
+        client.indices.put_alias('topic_new', 'topic-reindexing')
+        self.assertEqual(swap_alias(client, 'topic', 'topic_new'), ['topic_old'])
+        self.assertEqual(len(client.indices.alias_updates), 1)
+        self.assertEqual(client.indices.aliases, {'topic': {'topic_new'}, 'topic-reindexing': set()})
+
+        client = RecordingElasticsearch()
+        client.indices.indexes.update({'topic', 'topic_new'})
+        self.assertEqual(swap_alias(client, 'topic', 'topic_new'), [])
+        self.assertEqual(client.indices.indexes, {'topic_new'})
+        self.assertEqual(client.indices.aliases['topic'], {'topic_new'})
+
+    def test_reindex_swaps_alias(self):
+        """
+        모든 row가 새 index에 색인된 후 alias가 옮겨지고 기존 index가 삭제되는지 확인
+        :return:
+        """
+        client = RecordingElasticsearch()
+        client.indices.indexes.add('topic_old')
+        client.indices.put_alias('topic_old', 'topic')
+        result = self.reindex(client)
+
+        self.assertEqual(result['documents'], len(self.topics))
+        self.assertEqual(result['failed'], 0)
+        self.assertEqual(client.indices.indexes, {result['index']})
+        self.assertEqual(client.indices.aliases['topic'], {result['index']})
+        self.assertEqual(client.indices.settings[result['index']]['index']['refresh_interval'], '1s')
+        self.assertEqual({action['index']['_id'] for action in client.actions}, {topic.pk for topic in self.topics})
+
+    def test_reindex_retries_failed_slice(self):
+        """
+        실패한 document가 있는 slice를 다시 색인한 후 alias를 옮기는지 확인
+        :return:
+        """
+        client = RecordingElasticsearch(failures={self.topics[0].pk: 1})
+        result = self.reindex(client)
+        self.assertEqual((result['documents'], result['failed']), (len(self.topics), 0))
+        self.assertEqual(client.indices.aliases['topic'], {result['index']})
+
+    def test_reindex_aborted_before_swap(self):
+        """
+        다시 색인해도 실패한 document가 남으면 새 index를 삭제하고 기존 alias를 그대로 두는지 확인
+        :return:
+        """
+        client = RecordingElasticsearch(failures={self.topics[0].pk: 2})
+        client.indices.indexes.add('topic_old')
+        client.indices.put_alias('topic_old', 'topic')
+        with self.assertRaises(ReindexFailed):
+            self.reindex(client, retries=1)
+        self.assertEqual(client.indices.indexes, {'topic_old'})
+        self.assertEqual(client.indices.aliases['topic'], {'topic_old'})
+        self.assertEqual(client.indices.aliases['topic-reindexing'], set())
+        self.assertEqual(client.indices.alias_updates, [])
+
+    def test_reindex_cleaned_up_on_worker_error(self):
+        """
+        worker에서 예외가 발생할 경우 새 index와 reindexing alias를 삭제하고 예외를 그대로 raise 하는지 확인
+        :return:
+        """
+        client = RecordingElasticsearch()
+        client.indices.indexes.add('topic_old')
+        client.indices.put_alias('topic_old', 'topic')
+        with patch('search.reindex.index_slice', side_effect=ConnectionError('N/A', 'unavailable')):
+            with self.assertRaises(ConnectionError):
+                self.reindex(client)
+        self.assertEqual(client.indices.indexes, {'topic_old'})
+        self.assertEqual(client.indices.aliases['topic'], {'topic_old'})
+        self.assertEqual(client.indices.aliases['topic-reindexing'], set())
+
+
+class SearchServiceTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(name='user', email='user@nanum.com', password='password')
+
+    def test_hits_hydrated_with_one_query_and_next_cursor(self):
+        """
+        hit들이 values() 쿼리 한 번으로 DB 값과 합쳐지고, DB에 없는 hit은 제외되며,
+        마지막 hit의 sort 값이 next_cursor로 반환되는지 확인
+        :return:
+        """
+        topics = [Topic.objects.create(creator=self.user, name=f'topic{i}') for i in range(2)]
+        hits = [
+            {'_id': str(topic.pk), '_source': {'name': topic.name}, 'sort': [1.0, f'topic#{topic.pk}'],
+             'highlight': {'name': [f'<em>{topic.name}</em>']}}
+            for topic in topics
+        ]
+        hits.append({'_id': str(topics[-1].pk + 100), '_source': {'name': 'deleted'}, 'sort': [0.5, 'topic#0']})
+        client = RecordingElasticsearch(hits=hits)
+
+        with patch('search.search.get_client', return_value=client), self.assertNumQueries(1):
+            page = search('topic', 'topic', size=3)
+
+        self.assertEqual([result['pk'] for result in page['results']], [topic.pk for topic in topics])
+        self.assertEqual(page['results'][0]['highlight'], '<em>topic0</em>')
+        self.assertEqual(decode_cursor(page['next_cursor']), [0.5, 'topic#0'])
+        self.assertEqual(client.searches[0]['_source'], ['name'])
+        self.assertEqual(client.searches[0]['highlight']['encoder'], 'html')
+        self.assertNotIn('search_after', client.searches[0])
+
+        with patch('search.search.get_client', return_value=client):
+            search('topic', 'topic', size=3, cursor=page['next_cursor'])
+        self.assertEqual(client.searches[1]['search_after'], [0.5, 'topic#0'])
+
+
+class SearchAPITest(APITestCase):
+    URL_API_SEARCH = '/search/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(name='user', email='user@nanum.com', password='password')
+        self.client.force_authenticate(user=self.user)
+
+    def test_invalid_page_size_and_cursor(self):
+        """
+        1보다 작은 page_size, sort 값의 type이 다른 cursor가 Elasticsearch에 요청되지 않고 400인지 확인
+        :return:
+        """
+        for page_size in ('-1', '0', 'abc'):
+            response = self.client.get(self.URL_API_SEARCH, {'query': 'topic', 'type': 'topic', 'page_size': page_size})
+            self.assertEqual(response.status_code, 400)
+
+        for sort_values in ([{'a': 1}, 'topic#1'], [1.0, 2], [True, 'topic#1'], [1.0]):
+            response = self.client.get(
+                self.URL_API_SEARCH, {'query': 'topic', 'type': 'topic', 'cursor': encode_cursor(sort_values)})
+            self.assertEqual(response.status_code, 400)
+
+        with self.assertRaises(InvalidSize):
+            search('topic', 'topic', size=-1)
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(name='user', email='user@nanum.com', password='password')
+
+    def setUp(self):
+        get_prefix_cache().clear()
+        elasticsearch_breaker.reset()
+
+    def test_prefix_results_cached(self):
+        """
+        같은 검색어의 두 번째 요청은 Elasticsearch에 요청하지 않는지 확인
+        :return:
+        """
+        client = RecordingElasticsearch(hits=[{'_id': '1', '_source': {'name': '파이썬'}}])
+        with patch('search.autocomplete.get_client', return_value=client):
+            first = autocomplete('파이', 'topic')
+            second = autocomplete(' 파이 ', 'topic')
+        self.assertEqual(len(client.searches), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]['name'], '파이썬')
+
+    def test_postgres_fallback_when_elasticsearch_unavailable(self):
+        """
+        Elasticsearch에 연결할 수 없을 경우 DB에서 prefix로 검색하고 결과를 cache 하지 않으며,
+        retry interval 동안은 Elasticsearch에 다시 요청하지 않는지 확인
+        :return:
+        """
+        topic = Topic.objects.create(creator=self.user, name='Python')
+        Topic.objects.create(creator=self.user, name='Java')
+        error = ConnectionError('N/A', 'unavailable')
+        with patch('search.autocomplete._search_elasticsearch', side_effect=error) as search_elasticsearch:
+            self.assertEqual([result['pk'] for result in autocomplete('pyt', 'topic')], [topic.pk])
+            self.assertEqual([result['pk'] for result in autocomplete('pyth', 'topic')], [topic.pk])
+            self.assertEqual(search_elasticsearch.call_count, 1)
+
+            # retry interval이 지나면 다시 Elasticsearch에 요청
+            elasticsearch_breaker.reset()
+            with override_settings(AUTOCOMPLETE_ELASTICSEARCH_RETRY_INTERVAL=0):
+                autocomplete('pyth', 'topic')
+                autocomplete('pyth', 'topic')
+        self.assertEqual(search_elasticsearch.call_count, 3)
+
+
+class AutocompleteAPITest(APITestCase):
+    URL_API_AUTOCOMPLETE = '/search/autocomplete/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(name='user', email='user@nanum.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        elasticsearch_breaker.reset()
+
+    def test_invalid_size(self):
+        """
+        1보다 작은 size가 Elasticsearch, fallback 쿼리에 전달되지 않고 400인지 확인
+        :return:
+        """
+        client = RecordingElasticsearch()
+        with patch('search.autocomplete.get_client', return_value=client):
+            for size in ('-1', '0', 'abc'):
+                response = self.client.get(self.URL_API_AUTOCOMPLETE, {'query': '파이', 'size': size})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(client.searches, [])
+        self.assertFalse(elasticsearch_breaker.is_open())
+
+
+class TopicSearchAPITest(APITestCase):
+    URL_API_TOPIC_SEARCH = '/search/topic/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(name='user', email='user@nanum.com', password='password')
+        self.client.force_authenticate(user=self.user)
+
+    def test_topics_containing_name(self):
+        """
+        대소문자와 상관없이 이름에 검색어가 포함된 토픽을 모두 반환하는지 확인
+        :return:
+        """
+        topics = [Topic.objects.create(creator=self.user, name=name) for name in ('Python', 'CPython', 'Java')]
+        response = self.client.get(self.URL_API_TOPIC_SEARCH, {'name': 'PYTHON'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({result['pk'] for result in response.data['result']}, {topics[0].pk, topics[1].pk})
+
+        response = self.client.get(self.URL_API_TOPIC_SEARCH, {'name': 'ruby'})
+        self.assertEqual(response.data, {'result': '결과가 없습니다.'})
+
+
+class PostgresSearchBackendTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(name='user', email='user@nanum.com', password='password')
+
+    def test_search_questions_with_cursor(self):
+        """
+        search_vector로 검색된 질문들이 cursor를 따라 중복 없이 모두 반환되는지 확인
+        :return:
+        """
+        questions = [Question.objects.create(user=self.user, content=f'django question {i}') for i in range(3)]
+        Question.objects.create(user=self.user, content='flask question')
+        backend = PostgresSearchBackend()
+
+        pks, cursor = [], None
+        for _ in range(3):
+            page = backend.search('django', 'question', size=1, cursor=cursor)
+            self.assertEqual(page['total'], 3)
+            pks.extend(result['pk'] for result in page['results'])
+            cursor = page['next_cursor']
+        self.assertEqual(sorted(pks), sorted(question.pk for question in questions))
+        self.assertEqual(page['results'][0]['highlight'][:15], '<em>django</em>')
+
+    def test_answer_content_text_filled_by_trigger(self):
+        """
+        content_html을 queryset.update로 바꾸어도 trigger가 content_text, search_vector를 채우는지 확인
+        :return:
+        """
+        question = Question.objects.create(user=self.user, content='question')
+        answer = Answer.objects.create(user=self.user, question=question, published=True,
+                                       content_html='<p>first</p>')
+        Answer.objects.filter(pk=answer.pk).update(content_html='<p>Tom &amp; Jerry</p>')
+        answer.refresh_from_db()
+        self.assertEqual(answer.content_text, 'Tom & Jerry')
+
+        page = PostgresSearchBackend().search('jerry', 'answer')
+        self.assertEqual([result['pk'] for result in page['results']], [answer.pk])
+
+    def test_invalid_size(self):
+        """
+        1보다 작은 size가 queryset slice에 전달되지 않고 InvalidSize인지 확인
+        :return:
+        """
+        backend = PostgresSearchBackend()
+        for size in (-1, 0):
+            with self.assertRaises(InvalidSize):
+                backend.search('django', 'question', size=size)
+            with self.assertRaises(InvalidSize):
+                backend.search_all('django', size=size)
+
+    def test_highlight_escaped(self):
+        """
+        highlight의 text와 검색어가 escape 되고 <em> 태그만 남는지 확인
+        :return:
+        """
+        self.assertEqual(
+            highlight('<script>alert(1)</script> Tom & <b>Jerry</b>', 'jerry <b>', fragment_size=200),
+            '&lt;script&gt;alert(1)&lt;/script&gt; Tom &amp; <em>&lt;b&gt;</em><em>Jerry</em>&lt;/b&gt;',
+        )
+
+    @override_settings(SEARCH_BACKEND='search.backends.PostgresSearchBackend', SEARCH_INDEXING_ENABLED=None)
+    def test_outbox_skipped(self):
+        """
+        DB를 바로 검색하는 backend에서는 변경 사항을 search outbox에 쌓지 않는지 확인
+        :return:
+        """
+        Topic.objects.create(creator=self.user, name='topic')
+        self.assertFalse(SearchOutbox.objects.exists())
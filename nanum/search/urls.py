@@ -4,5 +4,6 @@ from search import apis
 
 urlpatterns = [
     url(r'^topic/$', apis.TopicSearchAPIView.as_view(), name='topic'),
+    url(r'^autocomplete/$', apis.AutocompleteAPIView.as_view(), name='autocomplete'),
     url(r'^$', apis.SearchAPIView.as_view(), name='search'),
 ]
\ No newline at end of file
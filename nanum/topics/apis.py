@@ -1,13 +1,16 @@
 from collections import OrderedDict
 
-from django.db.transaction import atomic
+from django.db.transaction import on_commit
 from django.shortcuts import get_object_or_404
-from rest_framework import generics, permissions
-from rest_framework.exceptions import ParseError
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.response import Response
 
+from utils import run_task_in_background
 from .models import Topic
-from .serializers import TopicSerializer
+from .serializers import TopicMergeJobSerializer, TopicSerializer
+from .tasks import merge_topics
+from .utils import merge
 from .utils.pagination import ListPagination
 from .utils.permissions import IsAdminUserOrAuthenticatedReadOnly
 
@@ -48,6 +51,8 @@ class TopicMergeView(generics.GenericAPIView):
     """
     Topic 1 = from
     Topic 2 = to
+
+    merge는 background job으로 실행되며, 반환된 job의 url로 진행 상황을 확인
     """
     queryset = Topic.objects.all()
     serializer_class = TopicSerializer
@@ -78,64 +83,51 @@ class TopicMergeView(generics.GenericAPIView):
         # get object
         topic_from_instance = self.get_object()
         topic_to_instance = get_object_or_404(Topic, pk=to_pk)
+        if topic_from_instance.pk == topic_to_instance.pk:
+            raise ParseError(detail={"error": "같은 Topic끼리는 merge 할 수 없습니다."})
 
         serializer_from = {"from": self.get_serializer(topic_from_instance).data}
         serializer_to = {"to": self.get_serializer(topic_to_instance).data}
 
         # Merge
-        instance = self.merge_instances(from_instance=topic_from_instance, to_instance=topic_to_instance)
-        serializer = {"result": self.get_serializer(instance).data}
+        job_id = self.merge_instances(from_instance=topic_from_instance, to_instance=topic_to_instance)
+        job = {"job": TopicMergeJobSerializer(merge.get_merge_job(job_id), context=self.get_serializer_context()).data}
 
-        result = OrderedDict(**serializer_from, **serializer_to, **serializer)
-        return Response(result)
+        result = OrderedDict(**serializer_from, **serializer_to, **job)
+        return Response(result, status=status.HTTP_202_ACCEPTED)
 
-    @atomic
     def merge_instances(self, from_instance, to_instance):
         """
-        from_instance와 연결된 모든 related instance 들에 대해 정보를 to_instance로 변경
-        count 정보 update
+        from_instance와 연결된 모든 related instance 들에 대해 정보를 to_instance로 변경하는 job을 생성하고
+        transaction commit 이후 background에서 실행
 
         :param from_instance:
         :param to_instance:
-        :return:
-        """
-        # Topic과 연결되어 있는 mtm(Through field로 지정되어 있는 필드는 제외한), mto 필드들을 갖고 옴
-        relation_fields = [
-            field for field in from_instance._meta.get_fields()
-            if field.one_to_many or (field.many_to_many and field.through._meta.auto_created)
-        ]
-        self._merge(relation_fields=relation_fields, from_instance=from_instance, to_instance=to_instance)
-        from_instance.recount()
-        to_instance.recount()
-
-        return to_instance
-
-    @atomic
-    def _merge(self, relation_fields, from_instance, to_instance):
+        :return: merge job id
         """
-        topic.<mtm / mto 필드>.all()을 실행하여 queryset이 존재할 경우
-        queryset 안의 instance들에 대햐여
-        그 instance들의 topic을 from_instance에서 to_instance로 변경
-
-        예를 들어,
-        merge 하는 토픽(없어지는) : topic1 = Topic.objects.first()
-        merge 당하는 토픽(추가되는 : topic2 = Topic.objects.last()
-        topic1.questions.all() 에 있는 question_instance 들에 대해
-        question_instance.topics.add(topic2)
-        question_instance.topics.remove(topic1)
-        :param relation_fields:
-        :param from_instance:
-        :param to_instance:
-        :return:
-        """
-        for field in relation_fields:
-            field_name = field.get_accessor_name() or field.name
-            reverse_field_name = field.field.name
-            queryset = getattr(from_instance, field_name).all().iterator()
-            if queryset:
-                for rel_instance in queryset:
-                    try:
-                        getattr(rel_instance, reverse_field_name).add(to_instance)
-                        getattr(rel_instance, reverse_field_name).remove(from_instance)
-                    except:
-                        setattr(rel_instance, reverse_field_name, to_instance)
+        job_id = merge.create_merge_job(from_instance.pk, to_instance.pk)
+        on_commit(lambda: run_task_in_background(merge_topics, from_instance.pk, to_instance.pk, job_id=job_id))
+        return job_id
+
+
+class TopicMergeJobView(generics.GenericAPIView):
+    """
+    Topic merge job의 진행 상황
+    status: pending -> running -> done / failed
+    step / total: 완료된 단계 수 / 전체 단계 수
+    merged: {관계 이름: 옮겨진 row 수}
+    """
+    queryset = Topic.objects.all()
+    serializer_class = TopicSerializer
+    permission_classes = (
+        permissions.IsAdminUser,
+    )
+
+    def get(self, request, *args, **kwargs):
+        job = merge.get_merge_job(kwargs['job_id'])
+        if job is None:
+            raise NotFound(detail={"error": "존재하지 않는 merge job입니다."})
+        data = TopicMergeJobSerializer(job, context=self.get_serializer_context()).data
+        if job.status == job.DONE:
+            data['result'] = self.get_serializer(Topic.objects.get(pk=job.topic_to)).data
+        return Response(data)
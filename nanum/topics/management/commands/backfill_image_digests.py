@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from topics.models import Topic
+from users.models import Profile
+from utils import backfill_image_digests
+
+
+class Command(BaseCommand):
+    help = 'image_digest가 저장되지 않은 토픽/프로필 이미지의 원본을 읽어 digest를 저장 (resize url에 사용)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', nargs='*', dest='models', choices=('topic', 'profile'),
+                            help='backfill 할 model, 주어지지 않을 경우 모두')
+
+    def handle(self, *args, **options):
+        querysets = (
+            ('topic', Topic.objects.all()),
+            ('profile', Profile.objects.all()),
+        )
+        for name, queryset in querysets:
+            if options['models'] and name not in options['models']:
+                continue
+            updated, failed = backfill_image_digests(queryset)
+            self.stdout.write(f'{name}: {updated} digests saved, {failed} images could not be read')
+        self.stdout.write(self.style.SUCCESS('Backfilled image digests'))
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('topics', '0008_auto_20171229_2346'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='image_digest',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import uuid
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('topics', '0009_topic_image_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicMergeJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('topic_from', models.IntegerField()),
+                ('topic_to', models.IntegerField()),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=10)),
+                ('step', models.IntegerField(default=0)),
+                ('total', models.IntegerField(null=True)),
+                ('merged', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('error', models.TextField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
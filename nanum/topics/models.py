@@ -1,7 +1,11 @@
+import uuid
 from io import BytesIO
 
 from django.conf import settings
+from django.contrib.postgres.fields import JSONField
 from django.db import models
+
+from utils import exclude_counter_fields, invalidate_representation
 from .utils import fields
 
 # Create your models here.
@@ -18,6 +22,8 @@ class Topic(models.Model):
     description = models.TextField(max_length=300, blank=True)
     image = fields.DefaultStaticImageField(upload_to='topic', blank=True, null=True,
                                            default_image_path='default_topic_image/topic_image_300.png')
+    # image 내용의 sha1 - resize url(utils.get_resized_image_url)에 사용
+    image_digest = models.CharField(max_length=40, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
     answer_count = models.IntegerField(null=False, default=0)
@@ -25,6 +31,9 @@ class Topic(models.Model):
     expert_count = models.IntegerField(null=False, default=0)
     interest_count = models.IntegerField(null=False, default=0)
 
+    # relation이 생기거나 삭제될 때 increment_counters로만 변경되는 count 필드
+    counter_fields = ('answer_count', 'question_count', 'expert_count', 'interest_count')
+
     def save(self, *args, **kwargs):
         """
         Topic을 제작한 사람은 자동으로 follow
@@ -32,35 +41,65 @@ class Topic(models.Model):
         :param kwargs:
         :return:
         """
+        exclude_counter_fields(self, self.counter_fields, kwargs)
         super().save(*args, **kwargs)
-        self.expertisefollowrelation_set.get_or_create(user=self.creator, topic=self)
-        self.interestfollowrelation_set.get_or_create(user=self.creator, topic=self)
+        _, expertise_created = self.expertisefollowrelation_set.get_or_create(user=self.creator, topic=self)
+        _, interest_created = self.interestfollowrelation_set.get_or_create(user=self.creator, topic=self)
+        if expertise_created or interest_created:
+            # follow로 DB에서 증가된 count를 반영 - 이후의 save, 응답에 이전 값이 사용되지 않도록
+            self.refresh_from_db(fields=['expert_count', 'interest_count'])
+        invalidate_representation(self)
+
+    def delete(self, *args, **kwargs):
+        invalidate_representation(self)
+        return super().delete(*args, **kwargs)
 
     def recount(self, hard_answer_count=False):
         """
-        Topic의 count 필드들의 값을 다시 계산하여 저장
-        hard 가 true 일 경우, count 함수를 호출하여 count
-        :param field:
+        Topic의 count 필드들의 값을 실제 개수로 다시 계산하여 저장
+        count 필드마다 GROUP BY 쿼리 한 번으로 계산하므로 hard_answer_count와 상관없이 실제 답변 수를 셈
+        :param hard_answer_count: 이전 버전과의 호환을 위해 남겨둠
         :return:
         """
-        questions = self.questions.all()
-        answer_count = 0
-        if hard_answer_count:
-            for question in questions:
-                answer_count += question.answer_set.count()
-        else:
-            for question in questions:
-                answer_count += question.answer_count
-
-        question_count = self.questions.count()
-        expert_count = self.users_with_expertise.count()
-        interest_count = self.users_with_interest.count()
-
-        self.answer_count = answer_count
-        self.question_count = question_count
-        self.expert_count = expert_count
-        self.interest_count = interest_count
-        self.save()
+        from posts.utils.reconcile import get_counter_specs, reconcile_counters
+        specs = [spec for spec in get_counter_specs() if spec.model is Topic]
+        reconcile_counters(specs=specs, pks=[self.pk])
+        self.refresh_from_db(fields=[spec.field for spec in specs])
 
     def __str__(self):
         return f'{self.name}, creator:{self.creator}'
+
+
+class TopicMergeJob(models.Model):
+    """
+    Topic merge job의 진행 상황
+    merge는 background(Celery worker 혹은 thread)에서 실행되므로 어느 process에서도 읽을 수 있도록 DB에 저장
+    status: pending -> running -> done / failed
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'pending'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (FAILED, 'failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # merge 이후 Topic이 삭제되어도 기록이 남도록 ForeignKey 대신 pk를 저장
+    topic_from = models.IntegerField()
+    topic_to = models.IntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # 완료된 단계 수 / 전체 단계 수
+    step = models.IntegerField(default=0)
+    total = models.IntegerField(null=True)
+    # {관계 이름: 옮겨진 row 수}
+    merged = JSONField(default=dict)
+    error = models.TextField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'merge {self.topic_from} -> {self.topic_to}: {self.status}'
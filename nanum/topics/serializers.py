@@ -2,19 +2,27 @@ from django.db.transaction import atomic
 from rest_framework import serializers
 from rest_framework.exceptions import ParseError
 from rest_framework.fields import ImageField
+from rest_framework.reverse import reverse
 
 import utils
 from topics.utils.fields import DefaultStaticImageSerializerField
-from .models import Topic
+from utils import (
+    BufferedCounterSerializerMixin, CachedRepresentationListSerializer, CachedRepresentationSerializerMixin,
+    ResizedImageField,
+)
+from .models import Topic, TopicMergeJob
 
 
-class BaseTopicSerializer(serializers.ModelSerializer):
+class BaseTopicSerializer(BufferedCounterSerializerMixin, CachedRepresentationSerializerMixin,
+                          serializers.ModelSerializer):
     image = ImageField(
         max_length=None,
         allow_empty_file=False,
         use_url=True,
         required=False,
     )
+    # 토픽 이미지는 200x200으로 rescale 되어 저장되므로 더 큰 크기는 제외
+    resized_image = ResizedImageField(max_size=(200, 200))
     creator = serializers.HyperlinkedRelatedField(
         view_name='user:profile-main-detail',
         read_only=True,
@@ -24,6 +32,9 @@ class BaseTopicSerializer(serializers.ModelSerializer):
         read_only=True,
     )
 
+    # queryset.update로 바뀌는 count 필드는 cache 하지 않음
+    uncached_fields = ('answer_count', 'question_count', 'expert_count', 'interest_count')
+
     class Meta:
         model = Topic
         fields = (
@@ -33,6 +44,7 @@ class BaseTopicSerializer(serializers.ModelSerializer):
             'name',
             'description',
             'image',
+            'resized_image',
             'answer_count',
             'question_count',
             'expert_count',
@@ -53,6 +65,7 @@ class BaseTopicSerializer(serializers.ModelSerializer):
             'created_at',
             'modified_at',
         )
+        list_serializer_class = CachedRepresentationListSerializer
 
 
 class TopicSerializer(BaseTopicSerializer):
@@ -105,6 +118,37 @@ class TopicSerializer(BaseTopicSerializer):
                 super().save(**kwargs)
                 resized_image = utils.rescale(data=image.read(), width=200, height=200)
                 filename = f"{self.instance.pk}/{image.name}"
-                self.instance.image.save(filename, resized_image, save=True)
+                self.instance.image_digest = utils.compute_image_digest(resized_image.getvalue())
+                self.instance.image.save(filename, resized_image, save=False)
+                self.instance.save(update_fields=['image', 'image_digest', 'modified_at'])
             except:
                 raise ParseError({"error": "이미지 저장에 실패했습니다."})
+
+
+class TopicMergeJobSerializer(serializers.ModelSerializer):
+    """
+    Topic merge job의 진행 상황
+    """
+    id = serializers.SerializerMethodField()
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TopicMergeJob
+        fields = (
+            'id',
+            'url',
+            'status',
+            'topic_from',
+            'topic_to',
+            'step',
+            'total',
+            'merged',
+            'error',
+        )
+        read_only_fields = fields
+
+    def get_id(self, obj):
+        return obj.id.hex
+
+    def get_url(self, obj):
+        return reverse('topic:topic-merge-job', kwargs={'job_id': obj.id.hex}, request=self.context.get('request'))
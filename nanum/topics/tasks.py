@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from .utils import merge
+
+
+@shared_task(name='merge_topics')
+def merge_topics(from_pk, to_pk, job_id=None):
+    return merge.merge_topics(from_pk, to_pk, job_id=job_id)
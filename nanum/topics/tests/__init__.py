@@ -1 +1,2 @@
-from .test_models import *
\ No newline at end of file
+from .test_api import *
+from .test_models import *
@@ -0,0 +1,140 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from posts.models import Question
+from utils import run_task
+from utils.query_budget import QueryBudgetTestMixin
+from ..models import Topic, TopicMergeJob
+
+__all__ = (
+    'TopicListAPITest',
+    'TopicCreateAPITest',
+    'TopicMergeAPITest',
+)
+
+User = get_user_model()
+
+
+class TopicListAPITest(QueryBudgetTestMixin, APITestCase):
+    URL_API_TOPIC_LIST = '/topic/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='abc1@abc.com', password='password', name='abc1')
+        for i in range(10):
+            Topic.objects.create(creator=self.user, name=f'토픽 {i}')
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_queries_do_not_scale_with_page_size(self):
+        """
+        토픽 목록의 쿼리 수가 page_size에 따라 늘어나지 않는지(N+1이 없는지) 확인
+        :return:
+        """
+        self.assertQueriesDoNotScale(self.URL_API_TOPIC_LIST)
+
+
+class TopicCreateAPITest(APITestCase):
+    URL_API_TOPIC_LIST_CREATE = '/topic/'
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(email='abc1@abc.com', password='password', name='abc1')
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_create_with_image_keeps_follow_counts(self):
+        """
+        이미지와 함께 토픽을 만들 때 이미지 저장이 제작자의 follow로 증가된 count를 0으로 덮어쓰지 않는지 확인
+        :return:
+        """
+        image_file = BytesIO()
+        Image.new('RGB', (300, 300), color='red').save(image_file, 'PNG')
+        image = SimpleUploadedFile('image.png', image_file.getvalue(), content_type='image/png')
+        response = self.client.post(self.URL_API_TOPIC_LIST_CREATE, {'name': '토픽', 'image': image},
+                                    format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['expert_count'], response.data['interest_count']), (1, 1))
+
+        topic = Topic.objects.get(pk=response.data['pk'])
+        self.assertEqual((topic.expert_count, topic.interest_count), (1, 1))
+        self.assertTrue(topic.image_digest)
+
+
+class TopicMergeAPITest(APITransactionTestCase):
+    URL_API_TOPIC_MERGE = '/topic/merge/{pk}/'
+    URL_API_TOPIC_MERGE_JOB = '/topic/merge/jobs/{job_id}/'
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@abc.com', password='password', name='admin')
+        self.user = User.objects.create_user(email='abc1@abc.com', password='password', name='abc1')
+        self.topic_from = Topic.objects.create(creator=self.admin, name='컴공')
+        self.topic_to = Topic.objects.create(creator=self.user, name='컴퓨터공학')
+
+        contents = ('from만 연결된 질문', '둘 다 연결된 질문', 'to만 연결된 질문')
+        self.questions = [Question.objects.create(user=self.user, content=content) for content in contents]
+        self.questions[0].topics.add(self.topic_from)
+        self.questions[1].topics.add(self.topic_from, self.topic_to)
+        self.questions[2].topics.add(self.topic_to)
+        self.client.force_authenticate(user=self.admin)
+
+    def test_merge_job_polled_until_done(self):
+        """
+        merge 요청 후 반환된 job url로 진행 상황을 확인할 수 있고,
+        완료된 job에 중복 없이 옮겨진 관계와 다시 계산된 count가 반영되어 있는지 확인
+        :return:
+        """
+        # broker 없이 background thread 대신 현재 process에서 바로 실행
+        with patch('topics.apis.run_task_in_background', run_task):
+            response = self.client.put(self.URL_API_TOPIC_MERGE.format(pk=self.topic_from.pk),
+                                       {'topic_to': self.topic_to.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = response.data['job']
+        self.assertEqual((job['topic_from'], job['topic_to']), (self.topic_from.pk, self.topic_to.pk))
+
+        response = self.client.get(job['url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], TopicMergeJob.DONE)
+        self.assertEqual(response.data['step'], response.data['total'])
+        self.assertIsNone(response.data['error'])
+        self.assertEqual(response.data['result']['pk'], self.topic_to.pk)
+        self.assertEqual(response.data['result']['question_count'], 3)
+        self.assertEqual(response.data['result']['interest_count'], 2)
+
+        for question in self.questions:
+            self.assertEqual(list(question.topics.values_list('pk', flat=True)), [self.topic_to.pk])
+        self.topic_from.refresh_from_db()
+        self.assertEqual((self.topic_from.question_count, self.topic_from.interest_count), (0, 0))
+
+    def test_pending_job_visible_to_other_process(self):
+        """
+        실행되기 전의 job이 DB에 pending 상태로 저장되어 있는지 확인
+        :return:
+        """
+        with patch('topics.apis.run_task_in_background') as run_task_in_background:
+            response = self.client.put(self.URL_API_TOPIC_MERGE.format(pk=self.topic_from.pk),
+                                       {'topic_to': self.topic_to.pk}, format='json')
+        self.assertEqual(run_task_in_background.call_count, 1)
+        job_id = response.data['job']['id']
+        self.assertEqual(TopicMergeJob.objects.get(pk=job_id).status, TopicMergeJob.PENDING)
+
+        response = self.client.get(self.URL_API_TOPIC_MERGE_JOB.format(job_id=job_id))
+        self.assertEqual(response.data['status'], TopicMergeJob.PENDING)
+        self.assertNotIn('result', response.data)
+
+    def test_unknown_job(self):
+        for job_id in ('abc', '0' * 32):
+            response = self.client.get(self.URL_API_TOPIC_MERGE_JOB.format(job_id=job_id))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
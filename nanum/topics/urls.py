@@ -5,5 +5,6 @@ from . import apis
 urlpatterns = [
     url(r'^$', apis.TopicListCreateView.as_view(), name='topic-list'),
     url(r'^(?P<pk>\d+)/$', apis.TopicRetrieveUpdateDestroyView.as_view(), name='topic-detail'),
+    url(r'^merge/jobs/(?P<job_id>[0-9a-f]+)/$', apis.TopicMergeJobView.as_view(), name='topic-merge-job'),
     url(r'^merge/(?P<pk>\d+)/', apis.TopicMergeView.as_view(), name='topic-merge'),
 ]
\ No newline at end of file
@@ -0,0 +1,150 @@
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from utils import invalidate_representations
+
+__all__ = (
+    'get_topic_relations',
+    'merge_topics',
+    'create_merge_job',
+    'get_merge_job',
+    'update_merge_job',
+)
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _is_unique_with_other_fields(model, fk):
+    """
+    fk가 model의 unique 제약 조건(unique_together)에 포함되어 있는지 여부
+    포함되어 있을 경우 UPDATE 시 이미 to_topic과 연결된 row와 충돌할 수 있음
+    """
+    return fk.unique or any(fk.name in fields for fields in model._meta.unique_together)
+
+
+def get_topic_relations():
+    """
+    Topic을 가리키는 모든 (model, ForeignKey) list
+    ManyToManyField의 경우 자동으로 생성된 through model의 ForeignKey를,
+    through가 지정된 ManyToManyField의 경우 through model의 ForeignKey를 (one_to_many 관계로) 포함
+
+    :return: [(model, ForeignKey), ...]
+    """
+    from ..models import Topic
+    relations = []
+    for field in Topic._meta.get_fields():
+        if field.one_to_many or field.one_to_one:
+            relations.append((field.related_model, field.field))
+        elif field.many_to_many and field.through._meta.auto_created:
+            through = field.through
+            fk = next(f for f in through._meta.fields if f.is_relation and f.related_model is Topic)
+            relations.append((through, fk))
+    return relations
+
+
+def _merge_relation(model, fk, from_pk, to_pk):
+    """
+    model의 fk가 from_pk를 가리키는 row들을 to_pk를 가리키도록 변경
+
+    unique 제약 조건에 포함되지 않은 ForeignKey(EmploymentCredential.company 등)는 UPDATE 한 번으로 변경하고,
+    포함된 경우(Question.topics, ExpertiseFollowRelation 등)는
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING 으로 이미 to_pk와 연결된 row를 제외하고 옮긴 뒤 기존 row를 DELETE
+
+    :return: 영향받은 row 수
+    """
+    table = _quote(model._meta.db_table)
+    fk_column = _quote(fk.column)
+    with connection.cursor() as cursor:
+        if not _is_unique_with_other_fields(model, fk):
+            cursor.execute(f'UPDATE {table} SET {fk_column} = %s WHERE {fk_column} = %s', [to_pk, from_pk])
+            return cursor.rowcount
+
+        columns = [f.column for f in model._meta.concrete_fields if not f.primary_key]
+        insert_columns = ', '.join(_quote(column) for column in columns)
+        select_columns = ', '.join('%s' if column == fk.column else _quote(column) for column in columns)
+        cursor.execute(
+            f'INSERT INTO {table} ({insert_columns}) '
+            f'SELECT {select_columns} FROM {table} WHERE {fk_column} = %s '
+            f'ON CONFLICT DO NOTHING',
+            [to_pk, from_pk]
+        )
+        cursor.execute(f'DELETE FROM {table} WHERE {fk_column} = %s', [from_pk])
+        return cursor.rowcount
+
+
+def merge_topics(from_pk, to_pk, job_id=None):
+    """
+    from_pk Topic과 연결된 모든 관계를 to_pk Topic으로 옮기고 두 Topic의 count를 다시 계산
+    관계마다 쿼리 한두 번으로 처리하므로 연결된 row 수와 상관없이 쿼리 수가 일정함
+
+    관계마다 별도의 transaction에서 옮기고 진행 상황을 함께 commit 하므로 진행 중에도 job으로 확인할 수 있음
+    단계마다 from_pk를 가리키는 row만 옮기므로, 중간에 실패한 경우 다시 실행하면 남은 row들이 옮겨짐
+
+    :param from_pk: 합쳐져서 없어지는 Topic의 pk
+    :param to_pk: 합쳐지는 Topic의 pk
+    :param job_id: 진행 상황을 기록할 TopicMergeJob의 id
+    :return: {관계 이름: 옮겨진 row 수}
+    """
+    from posts.models import Question
+    from posts.utils.reconcile import get_counter_specs, reconcile_counters
+    from ..models import Topic, TopicMergeJob
+
+    relations = get_topic_relations()
+    # 관계마다 한 단계 + count 재계산 한 단계
+    total = len(relations) + 1
+    update_merge_job(job_id, status=TopicMergeJob.RUNNING, step=0, total=total, error=None)
+
+    merged = dict()
+    try:
+        for step, (model, fk) in enumerate(relations, start=1):
+            with atomic():
+                merged[f'{model._meta.label}.{fk.name}'] = _merge_relation(model, fk, from_pk, to_pk)
+                update_merge_job(job_id, step=step, merged=merged)
+
+        with atomic():
+            specs = [spec for spec in get_counter_specs() if spec.model is Topic]
+            reconcile_counters(specs=specs, pks=[from_pk, to_pk])
+            update_merge_job(job_id, status=TopicMergeJob.DONE, step=total, merged=merged)
+        # 옮겨진 질문들의 topics 링크가 바뀌었으므로 cache된 serialize 결과 삭제 (cache를 사용하지 않으면 쿼리하지 않음)
+        invalidate_representations(
+            Question, Question.topics.through.objects.filter(topic_id=to_pk).values_list('question_id', flat=True))
+    except Exception as e:
+        update_merge_job(job_id, status=TopicMergeJob.FAILED, error=str(e))
+        raise
+    return merged
+
+
+def create_merge_job(from_pk, to_pk):
+    """
+    pending 상태의 TopicMergeJob을 생성
+    :return: job id (hex)
+    """
+    from ..models import TopicMergeJob
+    return TopicMergeJob.objects.create(topic_from=from_pk, topic_to=to_pk).id.hex
+
+
+def get_merge_job(job_id):
+    """
+    :return: TopicMergeJob, 없을 경우 None
+    """
+    from ..models import TopicMergeJob
+    try:
+        return TopicMergeJob.objects.filter(pk=job_id).first()
+    except ValidationError:
+        # uuid 형식이 아닌 id
+        return None
+
+
+def update_merge_job(job_id, **kwargs):
+    """
+    merge job의 진행 상황을 UPDATE 한 번으로 업데이트
+    job_id가 None일 경우(job 없이 직접 merge_topics를 호출한 경우) 아무것도 하지 않음
+    """
+    from ..models import TopicMergeJob
+    if job_id is None:
+        return
+    TopicMergeJob.objects.filter(pk=job_id).update(modified_at=timezone.now(), **kwargs)
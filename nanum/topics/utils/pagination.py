@@ -1,19 +1,17 @@
 from __future__ import unicode_literals
 from __future__ import unicode_literals
 
-from collections import OrderedDict
-
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.response import Response
+from utils.pagination import KeysetPagination
 
 __all__ = (
     'CommentPagination',
 )
 
 
-class CustomPagination(PageNumberPagination):
+class CustomPagination(KeysetPagination):
     """
     Custom Pagination Class
+    (modified_at | created_at, pk) 에 대한 Keyset Pagination
     """
     page_size = 5
     page_size_query_param = 'page_size'
@@ -1,15 +1,19 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from rest_framework import status, generics
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from posts.tasks import backfill_answer_feed, prune_answer_feed
+from topics.models import Topic
 from users.models import InterestFollowRelation, ExpertiseFollowRelation, UserFollowRelation, QuestionFollowRelation
 from users.serializers.relation.follow import UserFollowRelationSerializer, QuestionFollowRelationSerializer, \
     UserFollowParticipantSerializer, FollowingTopicSerializer
 from users.utils.pagination import UserFollowParticipantPagination, FollowingTopicPagination
 from users.utils.permissions import IsUserWhoTookAction
+from utils import run_task
 from ...serializers import TopicFollowRelationSerializer
 
 User = get_user_model()
@@ -45,6 +49,8 @@ class InterestFollowRelationCreateView(APIView):
         serializer.is_valid(raise_exception=True)
         print(serializer.validated_data)
         topic_follow_relations = serializer.save(user=request.user)
+        # 새로 팔로우한 주제의 답변들을 피드에 추가
+        run_task(backfill_answer_feed, request.user.pk)
         # ListSerializer 사용 (many=True)
         serializer = TopicFollowRelationSerializer(topic_follow_relations, many=True)
         # 유저 - 관심주제 팔로우 성공했을 경우
@@ -63,6 +69,11 @@ class InterestFollowRelationDetailView(generics.RetrieveDestroyAPIView):
     queryset = InterestFollowRelation.objects.all()
     serializer_class = TopicFollowRelationSerializer
 
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        # 팔로우를 취소한 주제의 답변들을 피드에서 제거
+        run_task(prune_answer_feed, self.request.user.pk)
+
 
 class ExpertiseFollowRelationCreateView(APIView):
     """
@@ -76,6 +87,8 @@ class ExpertiseFollowRelationCreateView(APIView):
         serializer.is_valid(raise_exception=True)
         print(serializer.validated_data)
         topic_follow_relations = serializer.save(user=request.user)
+        # 새로 팔로우한 주제의 답변들을 피드에 추가
+        run_task(backfill_answer_feed, request.user.pk)
         # ListSerializer 사용 (many=True)
         serializer = TopicFollowRelationSerializer(topic_follow_relations, many=True)
         # 유저 - 관심주제 팔로우 성공했을 경우
@@ -94,6 +107,11 @@ class ExpertiseFollowRelationDetailView(generics.RetrieveDestroyAPIView):
     queryset = ExpertiseFollowRelation.objects.all()
     serializer_class = TopicFollowRelationSerializer
 
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        # 팔로우를 취소한 주제의 답변들을 피드에서 제거
+        run_task(prune_answer_feed, self.request.user.pk)
+
 
 class FollowingInterestListView(generics.ListAPIView):
     """
@@ -106,9 +124,14 @@ class FollowingInterestListView(generics.ListAPIView):
     def get_queryset(self):
         user = get_object_or_404(User, pk=self.kwargs.get('pk'))
         # 가장 최신에 follow한 순으로 topic list하기
-        interest_follow_relations = user.interestfollowrelation_set.order_by('-created_at')
-        topics = [relation.topic for relation in interest_follow_relations]
-        return topics
+        # 요청한 유저의 팔로우 관계는 page의 topic들에 대해 한 번에 가져옴 (FollowingTopicSerializer)
+        return Topic.objects.filter(interestfollowrelation__user=user) \
+            .order_by('-interestfollowrelation__created_at') \
+            .prefetch_related(Prefetch(
+                'interestfollowrelation_set',
+                queryset=InterestFollowRelation.objects.filter(user=self.request.user),
+                to_attr='request_user_follow_relations',
+            ))
     def get_serializer_context(self):
         """
         Extra context provided to the serializer class.
@@ -130,9 +153,14 @@ class FollowingExpertiseListView(generics.ListAPIView):
     def get_queryset(self):
         user = get_object_or_404(User, pk=self.kwargs.get('pk'))
         # 가장 최신에 follow한 순으로 topic list하기
-        expertise_follow_relations = user.expertisefollowrelation_set.order_by('-created_at')
-        topics = [relation.topic for relation in expertise_follow_relations]
-        return topics
+        # 요청한 유저의 팔로우 관계는 page의 topic들에 대해 한 번에 가져옴 (FollowingTopicSerializer)
+        return Topic.objects.filter(expertisefollowrelation__user=user) \
+            .order_by('-expertisefollowrelation__created_at') \
+            .prefetch_related(Prefetch(
+                'expertisefollowrelation_set',
+                queryset=ExpertiseFollowRelation.objects.filter(user=self.request.user),
+                to_attr='request_user_follow_relations',
+            ))
 
     def get_serializer_context(self):
         """
@@ -155,6 +183,8 @@ class UserFollowRelationCreateView(APIView):
         serializer = UserFollowRelationSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         serializer.save(user=request.user)
+        # 새로 팔로우한 유저의 답변들을 피드에 추가
+        run_task(backfill_answer_feed, request.user.pk)
         # 유저 - 다른 유저 팔로우 성공했을 경우
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -171,6 +201,11 @@ class UserFollowRelationDetailView(generics.RetrieveDestroyAPIView):
     queryset = UserFollowRelation.objects.all()
     serializer_class = UserFollowRelationSerializer
 
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        # 팔로우를 취소한 유저의 답변들을 피드에서 제거
+        run_task(prune_answer_feed, self.request.user.pk)
+
 
 class UserFollowerListView(generics.ListAPIView):
     """
@@ -182,7 +217,12 @@ class UserFollowerListView(generics.ListAPIView):
 
     def get_queryset(self):
         user = get_object_or_404(User, pk=self.kwargs.get('pk'))
-        return user.followers.all()
+        # profile과 요청한 유저의 팔로우 관계는 page의 유저들에 대해 한 번에 가져옴 (UserFollowParticipantSerializer)
+        return user.followers.select_related('profile').prefetch_related(Prefetch(
+            'follower_relations',
+            queryset=UserFollowRelation.objects.filter(user=self.request.user),
+            to_attr='request_user_follow_relations',
+        ))
 
 
 class UserFollowingListView(generics.ListAPIView):
@@ -195,7 +235,12 @@ class UserFollowingListView(generics.ListAPIView):
 
     def get_queryset(self):
         user = get_object_or_404(User, pk=self.kwargs.get('pk'))
-        return user.following.all()
+        # profile과 요청한 유저의 팔로우 관계는 page의 유저들에 대해 한 번에 가져옴 (UserFollowParticipantSerializer)
+        return user.following.select_related('profile').prefetch_related(Prefetch(
+            'follower_relations',
+            queryset=UserFollowRelation.objects.filter(user=self.request.user),
+            to_attr='request_user_follow_relations',
+        ))
 
 
 # Question Follow
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0021_auto_20171219_1900'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='image_digest',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+    ]
@@ -3,7 +3,7 @@ from django.db import models
 from django.db.models import Sum
 from django.utils import timezone
 
-from utils import rescale
+from utils import compute_image_digest, exclude_counter_fields, rescale_multiple
 from ..utils import fields
 from ..utils import (
     user_img_path,
@@ -20,6 +20,8 @@ __all__ = (
 
 User = settings.AUTH_USER_MODEL
 
+THUMBNAIL_SIZES = ((200, 200), (50, 50), (25, 25))
+
 HIGHSCHOOL = 'HS'
 BACHELOR = 'BA'
 MASTERS = 'MA'
@@ -60,6 +62,8 @@ class Profile(models.Model):
     """
     user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE)
     image = models.ImageField(upload_to=user_img_path, blank=True, null=True)
+    # image 원본 내용의 sha1 - resize url(utils.get_resized_image_url)에 사용
+    image_digest = models.CharField(max_length=40, blank=True)
     # A * A 픽셀별 썸네일 이미지
     thumbnail_image_200 = fields.DefaultStaticImageField(upload_to=user_thumb_img_200_path, blank=True, null=True,
                                                          default_image_path='default_profile_image/thumbnail_image_200.png')
@@ -79,6 +83,9 @@ class Profile(models.Model):
     follower_count = models.IntegerField(default=0)
     following_count = models.IntegerField(default=0)
 
+    # relation이 생기거나 삭제될 때 increment_counters로만 변경되는 count 필드
+    counter_fields = ('follower_count', 'following_count')
+
     @property
     def answer_count(self):
         return self.user.answer_set.count()
@@ -94,18 +101,22 @@ class Profile(models.Model):
     # 200 * 200 / 50 * 50 / 25 * 25의 rescale된 썸네일 이미지들 역시 별도의 필드에 저장됨
     def save(self, *args, **kwargs):
         status = kwargs.pop('status', None)
+        exclude_counter_fields(self, self.counter_fields, kwargs)
         if self.image:
             # ProfileSerializer update에서, image를 제외한 다른
             # Profile 필드들을 새로 업데이트하는 경우 resizing을 실시하지 않는다
             if status != 'same-image':
-                image_file_byte_data = self.image.read()
-                thumbnail_image_file_200 = rescale(image_file_byte_data, 200, 200, force=True)
-                thumbnail_image_file_50 = rescale(image_file_byte_data, 50, 50, force=True)
-                thumbnail_image_file_25 = rescale(image_file_byte_data, 25, 25, force=True)
-
-                self.thumbnail_image_200.save(f'{self.image.name}', thumbnail_image_file_200, save=False)
-                self.thumbnail_image_50.save(f'{self.image.name}', thumbnail_image_file_50, save=False)
-                self.thumbnail_image_25.save(f'{self.image.name}', thumbnail_image_file_25, save=False)
+                data = self.image.read()
+                self.image.seek(0)
+                self.image_digest = compute_image_digest(data)
+
+                # 이미지를 한 번만 decode 하여 200 -> 50 -> 25 순서로 썸네일 생성
+                thumbnail_image_files = rescale_multiple(data, THUMBNAIL_SIZES)
+
+                # S3Boto3Storage의 boto3 resource는 thread-safe 하지 않으므로 순서대로 저장
+                thumbnail_fields = (self.thumbnail_image_200, self.thumbnail_image_50, self.thumbnail_image_25)
+                for field, image_file in zip(thumbnail_fields, thumbnail_image_files):
+                    field.save(f'{self.image.name}', image_file, save=False)
 
         super().save(*args, **kwargs)
 
@@ -1,9 +1,8 @@
 from django.conf import settings
 from django.db import models
-from django.db.models import F
-from django.db.transaction import atomic
 
-from posts.models import Answer
+from posts.models import Answer, Question
+from utils import counter_batch, increment_counters
 
 __all__ = (
     'QuestionBookmarkRelation',
@@ -25,20 +24,16 @@ class QuestionBookmarkRelation(models.Model):
         unique_together = ('user', 'question')
 
     def save(self, *args, **kwargs):
-        super().save()
-        if self.question.bookmark_count < 0:
-            self.question.bookmark_count = 1
-        else:
-            self.question.bookmark_count += 1
-        self.question.save()
+        adding = self._state.adding
+        with counter_batch():
+            super().save(*args, **kwargs)
+            if adding:
+                increment_counters(Question, {'pk': self.question_id}, bookmark_count=1)
 
     def delete(self, *args, **kwargs):
-        super().delete()
-        if self.question.bookmark_count > 0:
-            self.question.bookmark_count -= 1
-        else:
-            self.question.bookmark_count = 0
-        self.question.save()
+        with counter_batch():
+            super().delete(*args, **kwargs)
+            increment_counters(Question, {'pk': self.question_id}, bookmark_count=-1)
 
 
 # 답변 북마크
@@ -56,17 +51,13 @@ class AnswerBookmarkRelation(models.Model):
         unique_together = ('user', 'answer')
 
     def save(self, *args, **kwargs):
-        with atomic():
-            Answer.objects.select_for_update().\
-                filter(pk=self.answer.pk).\
-                update(bookmark_count=F('bookmark_count')+1)
+        adding = self._state.adding
+        with counter_batch():
             super().save(*args, **kwargs)
-
+            if adding:
+                increment_counters(Answer, {'pk': self.answer_id}, bookmark_count=1)
 
     def delete(self, *args, **kwargs):
-        with atomic():
-            Answer.objects.select_for_update().\
-                filter(pk=self.answer.pk).\
-                update(bookmark_count=F('bookmark_count')-1)
+        with counter_batch():
             super().delete(*args, **kwargs)
-
+            increment_counters(Answer, {'pk': self.answer_id}, bookmark_count=-1)
@@ -1,6 +1,11 @@
 from django.conf import settings
 from django.db import models
 
+from posts.models import Question
+from topics.models import Topic
+from utils import counter_batch, increment_counters
+from ..profile import Profile
+
 __all__ = (
     'UserFollowRelation',
     'TopicFollowRelation',
@@ -24,18 +29,18 @@ class UserFollowRelation(models.Model):
         unique_together = ('user', 'target')
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.user.profile.following_count += 1
-        self.target.profile.follower_count += 1
-        self.user.profile.save()
-        self.target.profile.save()
+        adding = self._state.adding
+        with counter_batch():
+            super().save(*args, **kwargs)
+            if adding:
+                increment_counters(Profile, {'user': self.user_id}, following_count=1)
+                increment_counters(Profile, {'user': self.target_id}, follower_count=1)
 
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        self.user.profile.following_count -= 1
-        self.target.profile.follower_count -= 1
-        self.user.profile.save()
-        self.target.profile.save()
+        with counter_batch():
+            super().delete(*args, **kwargs)
+            increment_counters(Profile, {'user': self.user_id}, following_count=-1)
+            increment_counters(Profile, {'user': self.target_id}, follower_count=-1)
 
 
 class TopicFollowRelation(models.Model):
@@ -57,20 +62,16 @@ class ExpertiseFollowRelation(TopicFollowRelation):
         unique_together = ('user', 'topic')
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.topic.expert_count < 0:
-            self.topic.expert_count = 1
-        else:
-            self.topic.expert_count += 1
-        self.topic.save()
+        adding = self._state.adding
+        with counter_batch():
+            super().save(*args, **kwargs)
+            if adding:
+                increment_counters(Topic, {'pk': self.topic_id}, expert_count=1)
 
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        if self.topic.expert_count > 0:
-            self.topic.expert_count -= 1
-        else:
-            self.topic.expert_count = 0
-        self.topic.save()
+        with counter_batch():
+            super().delete(*args, **kwargs)
+            increment_counters(Topic, {'pk': self.topic_id}, expert_count=-1)
 
 
 class InterestFollowRelation(TopicFollowRelation):
@@ -78,20 +79,16 @@ class InterestFollowRelation(TopicFollowRelation):
         unique_together = ('user', 'topic')
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.topic.interest_count < 0:
-            self.topic.interest_count = 1
-        else:
-            self.topic.interest_count += 1
-        self.topic.save()
+        adding = self._state.adding
+        with counter_batch():
+            super().save(*args, **kwargs)
+            if adding:
+                increment_counters(Topic, {'pk': self.topic_id}, interest_count=1)
 
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        if self.topic.interest_count > 0:
-            self.topic.interest_count -= 1
-        else:
-            self.topic.interest_count = 0
-        self.topic.save()
+        with counter_batch():
+            super().delete(*args, **kwargs)
+            increment_counters(Topic, {'pk': self.topic_id}, interest_count=-1)
 
 
 class QuestionFollowRelation(models.Model):
@@ -109,17 +106,13 @@ class QuestionFollowRelation(models.Model):
         unique_together = ('user', 'question')
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.question.follow_count < 0:
-            self.question.follow_count = 1
-        else:
-            self.question.follow_count += 1
-        self.question.save()
+        adding = self._state.adding
+        with counter_batch():
+            super().save(*args, **kwargs)
+            if adding:
+                increment_counters(Question, {'pk': self.question_id}, follow_count=1)
 
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        if self.question.follow_count > 0:
-            self.question.follow_count -= 1
-        else:
-            self.question.follow_count = 0
-        self.question.save()
+        with counter_batch():
+            super().delete(*args, **kwargs)
+            increment_counters(Question, {'pk': self.question_id}, follow_count=-1)
@@ -1,6 +1,9 @@
 from django.conf import settings
 from django.db import models
 
+from posts.models import Answer, Comment
+from utils import counter_batch, increment_counters
+
 __all__ = (
     # 답변
     'BaseAnswerVoteRelation',
@@ -38,28 +41,19 @@ class AnswerUpVoteRelation(BaseAnswerVoteRelation):
         unique_together = ('user', 'answer')
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # 만일 user가 이미 Downvote를 한 상황이면, Upvote 시에
-        # AnswerDownVoteRelation 인스턴스 삭제하기
-        try:
-            answer_downvote_relation = AnswerDownVoteRelation.objects.get(user=self.user, answer=self.answer)
-        except AnswerDownVoteRelation.DoesNotExist:
-            pass
-        else:
-            answer_downvote_relation.delete()
-        if self.answer.upvote_count < 0:
-            self.answer.upvote_count = 1
-        else:
-            self.answer.upvote_count += 1
-        self.answer.save()
+        adding = self._state.adding
+        with counter_batch():
+            super().save(*args, **kwargs)
+            if adding:
+                # 만일 user가 이미 Downvote를 한 상황이면, Upvote 시에
+                # AnswerDownVoteRelation 인스턴스 삭제하기
+                deleted, _ = AnswerDownVoteRelation.objects.filter(user=self.user_id, answer=self.answer_id).delete()
+                increment_counters(Answer, {'pk': self.answer_id}, upvote_count=1, downvote_count=-deleted)
 
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        if self.answer.upvote_count > 0:
-            self.answer.upvote_count -= 1
-        else:
-            self.answer.upvote_count = 0
-        self.answer.save()
+        with counter_batch():
+            super().delete(*args, **kwargs)
+            increment_counters(Answer, {'pk': self.answer_id}, upvote_count=-1)
 
 
 class AnswerDownVoteRelation(BaseAnswerVoteRelation):
@@ -71,31 +65,19 @@ class AnswerDownVoteRelation(BaseAnswerVoteRelation):
         unique_together = ('user', 'answer')
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # 만일 user가 이미 Upvote를 한 상황이면, Downvote 시에
-        # AnswerUpVoteRelation 인스턴스 삭제하기
-        try:
-            answer_upvote_relation = AnswerUpVoteRelation.objects.get(user=self.user, answer=self.answer)
-        except AnswerUpVoteRelation.DoesNotExist:
-            pass
-        else:
-            answer_upvote_relation.delete()
-        if self.answer.downvote_count < 0:
-            self.answer.downvote_count = 1
-        else:
-            self.answer.downvote_count += 1
-
-        if self.answer.upvote_count > 0:
-            self.answer.upvote_count -= 1
-        self.answer.save()
+        adding = self._state.adding
+        with counter_batch():
+            super().save(*args, **kwargs)
+            if adding:
+                # 만일 user가 이미 Upvote를 한 상황이면, Downvote 시에
+                # AnswerUpVoteRelation 인스턴스 삭제하기
+                deleted, _ = AnswerUpVoteRelation.objects.filter(user=self.user_id, answer=self.answer_id).delete()
+                increment_counters(Answer, {'pk': self.answer_id}, downvote_count=1, upvote_count=-deleted)
 
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        if self.answer.downvote_count > 0:
-            self.answer.downvote_count -= 1
-        else:
-            self.answer.downvote_count = 0
-        self.answer.save()
+        with counter_batch():
+            super().delete(*args, **kwargs)
+            increment_counters(Answer, {'pk': self.answer_id}, downvote_count=-1)
 
 
 # 댓글 추천/비추천
@@ -118,20 +100,16 @@ class CommentUpVoteRelation(BaseCommentVoteRelation):
         unique_together = ('user', 'comment')
 
     def save(self, *args, **kwargs):
-        super().save()
-        if self.comment.upvote_count < 0:
-            self.comment.upvote_count = 1
-        else:
-            self.comment.upvote_count += 1
-        self.comment.save()
+        adding = self._state.adding
+        with counter_batch():
+            super().save(*args, **kwargs)
+            if adding:
+                increment_counters(Comment, {'pk': self.comment_id}, upvote_count=1)
 
     def delete(self, *args, **kwargs):
-        super().delete()
-        if self.comment.upvote_count > 0:
-            self.comment.upvote_count -= 1
-        else:
-            self.comment.upvote_count = 0
-        self.comment.save()
+        with counter_batch():
+            super().delete(*args, **kwargs)
+            increment_counters(Comment, {'pk': self.comment_id}, upvote_count=-1)
 
 
 class CommentDownVoteRelation(BaseCommentVoteRelation):
@@ -139,20 +117,13 @@ class CommentDownVoteRelation(BaseCommentVoteRelation):
         unique_together = ('user', 'comment')
 
     def save(self, *args, **kwargs):
-        super().save(self, *args, **kwargs)
-        if self.comment.downvote_count < 0:
-            self.comment.downvote_count = 1
-        else:
-            self.comment.downvote_count += 1
-
-        if self.comment.upvote_count > 0:
-            self.comment.upvote_count -= 1
-        self.comment.save()
+        adding = self._state.adding
+        with counter_batch():
+            super().save(*args, **kwargs)
+            if adding:
+                increment_counters(Comment, {'pk': self.comment_id}, downvote_count=1)
 
     def delete(self, *args, **kwargs):
-        super().delete(self, *args, **kwargs)
-        if self.comment.downvote_count > 0:
-            self.comment.downvote_count -= 1
-        else:
-            self.comment.downvote_count = 0
-        self.comment.save()
+        with counter_batch():
+            super().delete(*args, **kwargs)
+            increment_counters(Comment, {'pk': self.comment_id}, downvote_count=-1)
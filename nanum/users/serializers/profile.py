@@ -5,6 +5,7 @@ from topics.models import Topic
 from users.models import Profile, UserFollowRelation, EmploymentCredential, EducationCredential
 from users.utils import ParameterisedHyperlinkedIdentityField
 from users.utils.fields import DefaultStaticImageSerializerField
+from utils import BufferedCounterSerializerMixin, ResizedImageField
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -13,17 +14,20 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     update 시에는 일반 'image'를 업로드
     retrieve 시에는 200*200 사이즈의 'thumbnail_image_200' 가져오기
+    'resized_image'는 원본 'image'를 IMAGE_RESIZE_SIZES 크기로 resize 한 이미지들의 url
     """
     name = serializers.CharField(source='user.name', max_length=30)
     follow_relation_pk = serializers.SerializerMethodField()
     image = serializers.ImageField(write_only=True)
     thumbnail_image_200 = DefaultStaticImageSerializerField(read_only=True)
+    resized_image = ResizedImageField()
 
     class Meta:
         model = Profile
         fields = (
             'image',
             'thumbnail_image_200',
+            'resized_image',
             'name',
             'main_credential',
             'description',
@@ -74,7 +78,9 @@ class ProfileSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ProfileStatsSerializer(serializers.ModelSerializer):
+class ProfileStatsSerializer(BufferedCounterSerializerMixin, serializers.ModelSerializer):
+    counter_lookup = ('user', 'user_id')
+
     class Meta:
         model = Profile
         fields = (
@@ -90,6 +90,10 @@ class FollowingTopicSerializer(serializers.ModelSerializer):
         해당 유저가 팔로우하는 주제 보기를 "요청"한 유저와, 주제의, 팔로우 관계를 나타내는 pk
         해당 페이지에 있는 "주제 팔로우 버튼"이 어떻게 표시되는지를 결정한다
         """
+        # view에서 prefetch 한 경우 추가 쿼리 없이 사용
+        if hasattr(obj, 'request_user_follow_relations'):
+            relations = obj.request_user_follow_relations
+            return relations[0].pk if relations else None
         user = self.context.get('request').user
         if self.context.get('topic_type') == 'interest':
             try:
@@ -170,6 +174,10 @@ class UserFollowParticipantSerializer(serializers.ModelSerializer):
         해당 팔로워 리스트 보기를 "요청"한 유저와, 팔로워의, 팔로우 관계를 나타내는 pk
         해당 페이지에 있는 "유저 팔로우 버튼"이 어떻게 표시되는지를 결정한다
         """
+        # view에서 prefetch 한 경우 추가 쿼리 없이 사용
+        if hasattr(obj, 'request_user_follow_relations'):
+            relations = obj.request_user_follow_relations
+            return relations[0].pk if relations else None
         try:
             follower_relation = obj.follower_relations.get(user=self.context.get('request').user)
         except UserFollowRelation.DoesNotExist:
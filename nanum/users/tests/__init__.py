@@ -1 +1,3 @@
-from .test_models import *
\ No newline at end of file
+from .test_api import *
+from .test_image_resize import *
+from .test_models import *
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from topics.models import Topic
+from utils.query_budget import QueryBudgetTestMixin
+from ..models import ExpertiseFollowRelation, InterestFollowRelation, UserFollowRelation
+
+User = get_user_model()
+
+__all__ = (
+    'FollowListAPITest',
+)
+
+
+class FollowListAPITest(QueryBudgetTestMixin, APITestCase):
+    URL_API_USER_FOLLOWERS = '/user/{pk}/followers/'
+    URL_API_USER_FOLLOWINGS = '/user/{pk}/followings/'
+    URL_API_FOLLOWING_INTERESTS = '/user/{pk}/following-interests/'
+    URL_API_FOLLOWING_EXPERTISE = '/user/{pk}/following-expertise/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='abc@abc.com', password='password', name='abc')
+        self.viewer = User.objects.create_user(email='viewer@abc.com', password='password', name='viewer')
+        for i in range(10):
+            other = User.objects.create_user(email=f'abc{i}@abc.com', password='password', name=f'abc{i}')
+            UserFollowRelation.objects.create(user=other, target=self.user)
+            UserFollowRelation.objects.create(user=self.user, target=other)
+            topic = Topic.objects.create(creator=other, name=f'토픽 {i}')
+            InterestFollowRelation.objects.create(user=self.user, topic=topic)
+            ExpertiseFollowRelation.objects.create(user=self.user, topic=topic)
+            if i % 2:
+                UserFollowRelation.objects.create(user=self.viewer, target=other)
+                InterestFollowRelation.objects.create(user=self.viewer, topic=topic)
+        self.client.force_authenticate(user=self.viewer)
+
+    def test_follow_lists_queries_do_not_scale_with_page_size(self):
+        """
+        팔로워/팔로잉, 팔로우하는 주제 목록의 쿼리 수가 page_size에 따라 늘어나지 않는지(N+1이 없는지) 확인
+        :return:
+        """
+        for url in (self.URL_API_USER_FOLLOWERS, self.URL_API_USER_FOLLOWINGS,
+                    self.URL_API_FOLLOWING_INTERESTS, self.URL_API_FOLLOWING_EXPERTISE):
+            self.assertQueriesDoNotScale(url.format(pk=self.user.pk))
+
+    def test_follow_relation_pk_of_request_user(self):
+        """
+        prefetch 된 요청한 유저의 팔로우 관계가 follow_relation_pk에 채워지는지 확인
+        :return:
+        """
+        response = self.client.get(f'{self.URL_API_USER_FOLLOWERS.format(pk=self.user.pk)}?page_size=10')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for result in response.data['results']:
+            relation = UserFollowRelation.objects.filter(user=self.viewer, target=result['pk']).first()
+            self.assertEqual(result['follow_relation_pk'], relation.pk if relation else None)
+
+        response = self.client.get(f'{self.URL_API_FOLLOWING_INTERESTS.format(pk=self.user.pk)}?page_size=10')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        topic_pks = list(
+            self.user.interestfollowrelation_set.order_by('-created_at').values_list('topic', flat=True))
+        self.assertEqual([result['pk'] for result in response.data['results']], topic_pks)
+        for result in response.data['results']:
+            relation = InterestFollowRelation.objects.filter(user=self.viewer, topic=result['pk']).first()
+            self.assertEqual(result['follow_relation_pk'], relation.pk if relation else None)
@@ -0,0 +1,45 @@
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from users.models.profile import THUMBNAIL_SIZES
+from utils import rescale_multiple
+
+__all__ = (
+    'RescaleMultipleTest',
+)
+
+
+class RescaleMultipleTest(SimpleTestCase):
+    @staticmethod
+    def create_image(width, height, mode='RGBA', format='PNG'):
+        image_file = BytesIO()
+        Image.new(mode, (width, height), color=(255, 0, 0, 128) if mode == 'RGBA' else (255, 0, 0)).save(
+            image_file, format)
+        image_file.seek(0)
+        return image_file
+
+    def test_thumbnails_in_requested_order(self):
+        """
+        썸네일이 요청한 크기 순서대로, 투명도가 제거된 JPEG로 생성되는지 확인
+        :return:
+        """
+        sizes = tuple(reversed(THUMBNAIL_SIZES))
+        thumbnails = rescale_multiple(self.create_image(640, 480), sizes)
+
+        self.assertEqual(len(thumbnails), len(sizes))
+        for thumbnail, size in zip(thumbnails, sizes):
+            thumbnail.seek(0)
+            image = Image.open(thumbnail)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.mode, 'RGB')
+            self.assertEqual(image.size, size)
+
+    def test_duplicate_sizes_and_portrait_image(self):
+        """
+        같은 크기가 여러 번 요청되거나 세로로 긴 이미지도 비율에 맞게 crop 되는지 확인
+        :return:
+        """
+        thumbnails = rescale_multiple(self.create_image(300, 900, mode='RGB', format='JPEG'), [(50, 50), (50, 50)])
+        self.assertEqual([Image.open(thumbnail).size for thumbnail in thumbnails], [(50, 50), (50, 50)])
@@ -2,23 +2,29 @@ from rest_framework.pagination import (
     PageNumberPagination,
 )
 
+from utils.pagination import KeysetPagination
+
 __all__ = (
     'UserFollowParticipantPagination',
     'FollowingTopicPagination',
 )
 
 
-class UserFollowParticipantPagination(PageNumberPagination):
+class UserFollowParticipantPagination(KeysetPagination):
     """
     팔로워 또는 팔로우 List에 대한 Pagination Class
+    User pk 에 대한 Keyset Pagination
     """
     page_size = 10
     page_size_query_param = 'page_size'
+    ordering_fields = ()
+    ordering = '-pk'
 
 
 class FollowingTopicPagination(PageNumberPagination):
     """
     팔로우 하는 Topic에 대한 Pagination Class
+    Topic이 아닌 팔로우 관계의 created_at 순으로 정렬되기 때문에 PageNumberPagination 사용
     """
     page_size = 4
     page_size_query_param = 'page_size'
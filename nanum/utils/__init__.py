@@ -1 +1,6 @@
-from .image_resize import *
\ No newline at end of file
+from .image_resize import *
+from .task_runner import *
+from .storage import *
+from .image_service import *
+from .counters import *
+from .representation_cache import *
@@ -0,0 +1,143 @@
+import threading
+import zlib
+from collections import Counter, defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+
+__all__ = (
+    'LocalCounterBuffer',
+    'RedisCounterBuffer',
+)
+
+
+def _get_shard(key, shards):
+    return zlib.crc32(repr(key).encode('utf-8')) % shards
+
+
+class LocalCounterBuffer:
+    """
+    process 메모리에 count delta를 모아두는 buffer
+    key마다 shard를 나누어 lock 경합을 줄임
+    key: (model label, lookup 필드 이름, lookup 값)
+
+    다른 process의 delta는 읽거나 flush 할 수 없으므로 process가 하나인 환경(개발, 테스트)에서만 사용
+    """
+    # 다른 process에서 flush 할 수 없으므로 delta를 쌓은 process가 주기적으로, 그리고 종료할 때 flush
+    flush_in_process = True
+
+    def __init__(self, shards=16, **kwargs):
+        self._shards = [(threading.Lock(), defaultdict(Counter)) for _ in range(shards)]
+
+    def _shard(self, key):
+        return self._shards[_get_shard(key, len(self._shards))]
+
+    def add(self, key, deltas):
+        lock, counters = self._shard(key)
+        with lock:
+            counters[key].update(deltas)
+
+    def get(self, key):
+        lock, counters = self._shard(key)
+        with lock:
+            return dict(counters.get(key, {}))
+
+    def get_many(self, keys):
+        """
+        :return: keys 순서대로 {field: delta} list
+        """
+        return [self.get(key) for key in keys]
+
+    def drain(self):
+        """
+        buffer에 쌓인 모든 delta를 비우고 반환
+        :return: {key: {field: delta}}
+        """
+        drained = dict()
+        for i, (lock, counters) in enumerate(self._shards):
+            with lock:
+                self._shards[i] = (lock, defaultdict(Counter))
+            for key, deltas in counters.items():
+                drained.setdefault(key, Counter()).update(deltas)
+        return drained
+
+
+class RedisCounterBuffer:
+    """
+    Redis에 count delta를 모아두는 buffer
+    여러 process가 같은 buffer를 사용하므로 Celery beat의 flush_counter_buffer task로 flush 하며,
+    어느 process에서 읽어도 아직 반영되지 않은 모든 delta를 볼 수 있음
+    row마다 hash 하나에 field별 delta를 저장하고, shard마다 delta가 쌓인 row key의 set을 관리
+    """
+    flush_in_process = False
+    prefix = 'counter-buffer'
+
+    def __init__(self, shards=16, url=None, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('RedisCounterBuffer를 사용하려면 redis 패키지가 필요합니다.')
+        self._client = redis.StrictRedis.from_url(url or 'redis://localhost:6379/0')
+        self._shards = shards
+
+    def _row_key(self, key):
+        label, lookup_field, lookup_value = key
+        return f'{self.prefix}:row:{label}|{lookup_field}|{lookup_value}'
+
+    def _shard_key(self, shard):
+        return f'{self.prefix}:shard:{shard}'
+
+    def add(self, key, deltas):
+        row_key = self._row_key(key)
+        pipeline = self._client.pipeline(transaction=False)
+        for field, delta in deltas.items():
+            pipeline.hincrby(row_key, field, delta)
+        pipeline.sadd(self._shard_key(_get_shard(key, self._shards)), row_key)
+        pipeline.execute()
+
+    @staticmethod
+    def _decode(deltas):
+        return {field.decode('utf-8'): int(delta) for field, delta in deltas.items()}
+
+    def get(self, key):
+        return self._decode(self._client.hgetall(self._row_key(key)))
+
+    def get_many(self, keys):
+        """
+        row마다 HGETALL 하지 않고 pipeline 한 번으로 가져옴
+        :return: keys 순서대로 {field: delta} list
+        """
+        pipeline = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.hgetall(self._row_key(key))
+        return [self._decode(deltas) for deltas in pipeline.execute()]
+
+    def drain(self):
+        """
+        shard의 row key set을 :draining set으로 옮긴 뒤, row들의 HGETALL + DEL 을 MULTI 하나로 실행하여
+        flush 중에 들어온 delta가 유실되지 않도록 함
+        이전 flush가 중간에 실패하여 남아있는 :draining set은 덮어쓰지 않고 SUNIONSTORE 로 합쳐서 함께 반영
+        """
+        drained = dict()
+        row_prefix = f'{self.prefix}:row:'
+        for shard in range(self._shards):
+            shard_key = self._shard_key(shard)
+            draining_key = f'{shard_key}:draining'
+            pipeline = self._client.pipeline(transaction=True)
+            pipeline.sunionstore(draining_key, draining_key, shard_key)
+            pipeline.delete(shard_key)
+            pipeline.execute()
+
+            row_keys = list(self._client.smembers(draining_key))
+            if not row_keys:
+                continue
+            pipeline = self._client.pipeline(transaction=True)
+            for row_key in row_keys:
+                pipeline.hgetall(row_key)
+                pipeline.delete(row_key)
+            pipeline.delete(draining_key)
+            results = pipeline.execute()
+            for row_key, deltas in zip(row_keys, results[0:-1:2]):
+                label, lookup_field, lookup_value = row_key.decode('utf-8')[len(row_prefix):].split('|')
+                key = (label, lookup_field, int(lookup_value))
+                drained.setdefault(key, Counter()).update(self._decode(deltas))
+        return drained
@@ -0,0 +1,310 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.transaction import atomic, on_commit
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+__all__ = (
+    'increment_counters',
+    'counter_batch',
+    'exclude_counter_fields',
+    'get_counter_buffer',
+    'flush_counter_buffer',
+    'get_pending_counts',
+    'BufferedCounterListSerializer',
+    'BufferedCounterSerializerMixin',
+)
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+_buffer = None
+_buffer_config = None
+_buffer_lock = threading.Lock()
+_flusher = None
+
+
+def _get_batches():
+    if not hasattr(_local, 'batches'):
+        _local.batches = list()
+    return _local.batches
+
+
+def _clamped(field, delta):
+    """
+    음수가 된 count는 0으로 보고 delta를 더한 뒤, 결과가 음수가 되지 않도록 SQL 안에서 clamp
+    GREATEST(GREATEST(field, 0) + delta, 0)
+    """
+    return Greatest(Greatest(F(field), 0) + delta, 0)
+
+
+def _apply(model, lookup, deltas):
+    updates = {field: _clamped(field, delta) for field, delta in deltas.items() if delta}
+    if not updates:
+        return 0
+    # Question.objects 와 같이 일부 row를 제외하는 manager가 있으므로 _base_manager 사용
+    return model._base_manager.filter(**dict(lookup)).update(**updates)
+
+
+def get_counter_buffer():
+    """
+    COUNTER_BUFFER_BACKEND 설정에 해당하는 write-behind buffer를 반환
+    COUNTER_BUFFER_ENABLED가 False일 경우 None
+    """
+    global _buffer, _buffer_config
+    if not getattr(settings, 'COUNTER_BUFFER_ENABLED', False):
+        return None
+    config = (
+        getattr(settings, 'COUNTER_BUFFER_BACKEND', 'utils.counter_buffer.LocalCounterBuffer'),
+        getattr(settings, 'COUNTER_BUFFER_SHARDS', 16),
+        getattr(settings, 'COUNTER_BUFFER_REDIS_URL', None),
+    )
+    with _buffer_lock:
+        if _buffer is None or _buffer_config != config:
+            backend, shards, url = config
+            _buffer = import_string(backend)(shards=shards, url=url)
+            _buffer_config = config
+            if _buffer.flush_in_process:
+                _start_in_process_flusher()
+    return _buffer
+
+
+def _start_in_process_flusher():
+    """
+    process 메모리 buffer를 COUNTER_BUFFER_FLUSH_INTERVAL 초마다 flush 하는 daemon thread를 시작하고,
+    process가 종료될 때 남은 delta를 flush 하도록 등록
+    새 delta가 들어오지 않아도 쌓인 delta가 반영됨 (interval이 0일 경우 직접 flush 할 때만 반영)
+    """
+    global _flusher
+    interval = getattr(settings, 'COUNTER_BUFFER_FLUSH_INTERVAL', 5)
+    if _flusher is not None or not interval:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                flush_counter_buffer()
+            except Exception:
+                logger.exception('counter buffer: flush failed')
+            finally:
+                close_old_connections()
+
+    _flusher = threading.Thread(target=run, name='counter-buffer-flusher', daemon=True)
+    _flusher.start()
+    atexit.register(flush_counter_buffer)
+
+
+def _buffer_key(model, lookup):
+    # buffer에는 pk 혹은 ForeignKey 하나로 찾을 수 있는 row에 대한 delta만 저장
+    (lookup_field, lookup_value), = lookup
+    return model._meta.label, lookup_field, lookup_value
+
+
+def _write(model, lookup, deltas):
+    """
+    buffer가 설정되어 있을 경우 transaction commit 이후 buffer에 delta를 쌓고,
+    없을 경우 바로 UPDATE
+    """
+    counter_buffer = get_counter_buffer()
+    if counter_buffer is None or len(lookup) != 1:
+        _apply(model, lookup, deltas)
+        return
+
+    key = _buffer_key(model, lookup)
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas:
+        on_commit(lambda: counter_buffer.add(key, deltas))
+
+
+def flush_counter_buffer():
+    """
+    buffer에 쌓인 delta들을 row마다 UPDATE 한 번으로 DB에 반영
+    RedisCounterBuffer는 Celery beat의 flush_counter_buffer task가,
+    process 메모리 buffer는 delta를 쌓은 process의 flush thread가 주기적으로 호출
+
+    :return: 업데이트된 row 수
+    """
+    counter_buffer = get_counter_buffer()
+    if counter_buffer is None:
+        return 0
+    drained = counter_buffer.drain()
+    updated = 0
+    for key in sorted(drained, key=repr):
+        label, lookup_field, lookup_value = key
+        deltas = drained.pop(key)
+        try:
+            updated += _apply(apps.get_model(label), ((lookup_field, lookup_value),), deltas)
+        except Exception:
+            # 반영하지 못한 delta는 다음 flush 때 다시 반영되도록 buffer로 되돌림
+            counter_buffer.add(key, deltas)
+            for remaining_key, remaining_deltas in drained.items():
+                counter_buffer.add(remaining_key, remaining_deltas)
+            raise
+    return updated
+
+
+def get_pending_counts(model, lookup):
+    """
+    buffer에 쌓여 아직 DB에 반영되지 않은 delta를 반환
+    :return: {count 필드 이름: delta}
+    """
+    counter_buffer = get_counter_buffer()
+    if counter_buffer is None:
+        return {}
+    return counter_buffer.get(_buffer_key(model, tuple(lookup.items())))
+
+
+def _get_pending_counts_many(keys):
+    """
+    여러 row의 delta를 buffer에서 한 번에 가져옴
+    :param keys: [(model label, lookup 필드 이름, lookup 값)]
+    :return: {key: {count 필드 이름: delta}}
+    """
+    counter_buffer = get_counter_buffer()
+    if counter_buffer is None or not keys:
+        return {}
+    return dict(zip(keys, counter_buffer.get_many(keys)))
+
+
+def increment_counters(model, lookup, **deltas):
+    """
+    lookup에 해당하는 row의 count 필드들에 delta를 더함
+    row를 읽어서 save 하지 않고 UPDATE ... SET field = GREATEST(GREATEST(field, 0) + delta, 0) 로 적용
+    counter_batch 안에서 호출될 경우 batch가 끝날 때 한 번에 적용
+    COUNTER_BUFFER_ENABLED일 경우 UPDATE 대신 write-behind buffer에 쌓임
+
+    increment_counters(Answer, {'pk': 1}, upvote_count=1, downvote_count=-1)
+
+    :param model: count 필드를 가진 model class
+    :param lookup: 업데이트 할 row의 filter kwargs
+    :param deltas: {count 필드 이름: 더할 값}
+    :return:
+    """
+    batches = _get_batches()
+    if batches:
+        batches[-1].add(model, lookup, deltas)
+        return
+    _write(model, tuple(sorted(lookup.items())), deltas)
+
+
+def exclude_counter_fields(instance, counter_fields, kwargs):
+    """
+    이미 저장된 row를 update_fields 없이 save 할 경우, count 필드를 제외한 update_fields를 kwargs에 채움
+    count 필드는 increment_counters의 UPDATE로만 바뀌므로 메모리에 남아있는 이전 값으로 덮어쓰지 않음
+
+    def save(self, *args, **kwargs):
+        exclude_counter_fields(self, self.counter_fields, kwargs)
+        super().save(*args, **kwargs)
+
+    :param instance: 저장할 model instance
+    :param counter_fields: count 필드 이름들
+    :param kwargs: Model.save의 kwargs
+    :return: kwargs
+    """
+    if instance._state.adding or kwargs.get('force_insert') or kwargs.get('update_fields') is not None:
+        return kwargs
+    deferred_fields = instance.get_deferred_fields()
+    kwargs['update_fields'] = [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in counter_fields and field.attname not in deferred_fields
+    ]
+    return kwargs
+
+
+class _CounterBatch:
+    def __init__(self):
+        self.deltas = OrderedDict()
+
+    def add(self, model, lookup, deltas):
+        key = (model, tuple(sorted(lookup.items())))
+        self.deltas.setdefault(key, Counter()).update(deltas)
+
+    def flush(self):
+        # 여러 transaction이 같은 row들을 업데이트 할 때 deadlock이 생기지 않도록 항상 같은 순서로 업데이트
+        for model, lookup in sorted(self.deltas, key=lambda key: (key[0]._meta.label, repr(key[1]))):
+            _write(model, lookup, self.deltas[(model, lookup)])
+        self.deltas.clear()
+
+
+@contextmanager
+def counter_batch():
+    """
+    블록 안에서 호출된 increment_counters를 모아
+    같은 row에 대한 delta는 합쳐서, row마다 UPDATE 한 번으로 transaction 안에서 적용
+
+    with counter_batch():
+        increment_counters(Answer, {'pk': 1}, upvote_count=1)
+        increment_counters(Answer, {'pk': 1}, downvote_count=-1)
+    -> UPDATE 한 번
+    """
+    batches = _get_batches()
+    # 이미 batch 안에서 호출된 경우 바깥 batch에 합쳐서 함께 적용
+    if batches:
+        yield batches[-1]
+        return
+
+    batch = _CounterBatch()
+    batches.append(batch)
+    try:
+        with atomic():
+            yield batch
+            batch.flush()
+    finally:
+        batches.remove(batch)
+
+
+class BufferedCounterListSerializer(serializers.ListSerializer):
+    """
+    many=True로 serialize 할 때 page 안의 객체들의 buffer delta를 한 번에 가져와 child serializer에 전달
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, 'all') else data
+        instances = list(iterable)
+        if isinstance(self.child, BufferedCounterSerializerMixin):
+            self.child.prefetch_pending_counts(instances)
+        try:
+            return super().to_representation(instances)
+        finally:
+            self.child.pending_counts = None
+
+
+class BufferedCounterSerializerMixin:
+    """
+    write-behind buffer에 쌓여 아직 DB에 반영되지 않은 count delta를 serialize 결과에 더해주는 Serializer Mixin
+    counter_lookup: (filter 필드 이름, instance attribute 이름)
+    """
+    counter_lookup = ('pk', 'pk')
+    # BufferedCounterListSerializer가 채워주는 {buffer key: delta}
+    pending_counts = None
+
+    def _get_counter_key(self, instance):
+        lookup_field, attribute = self.counter_lookup
+        return _buffer_key(instance.__class__, ((lookup_field, getattr(instance, attribute)),))
+
+    def prefetch_pending_counts(self, instances):
+        self.pending_counts = _get_pending_counts_many([self._get_counter_key(instance) for instance in instances])
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.pending_counts is not None:
+            pending = self.pending_counts.get(self._get_counter_key(instance), {})
+        else:
+            lookup_field, attribute = self.counter_lookup
+            pending = get_pending_counts(instance.__class__, {lookup_field: getattr(instance, attribute)})
+        for field, delta in pending.items():
+            if isinstance(data.get(field), int):
+                data[field] = max(data[field] + delta, 0)
+        return data
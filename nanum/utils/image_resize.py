@@ -4,49 +4,89 @@ from PIL import Image as pil
 
 __all__ = (
     'rescale',
+    'rescale_multiple',
 )
 
 
-def rescale(data, width, height, force=True):
+def _open_image(data, draft_size=None):
     """
+    이미지를 열고 RGB로 변환
+    JPEG의 경우 draft_size 이상이 되는 가장 작은 크기로 decode 하여 전체 해상도로 decode 하지 않음
 
-    :param data: Image Byte Data
-    :param width: 원하는 가로 길이
-    :param height: 원하는 세로 길이
-    :param force: True일 경우, 가로 세로 비율 맞게, False일 경우 max값에 맞게 thumbnail화
-    :return:
+    :param data: Image Byte Data 혹은 file object
+    :param draft_size: (width, height) - decode 할 최소 크기
+    :return: PIL Image
     """
-    max_width = width
-    max_height = height
-
-    input_image_file = BytesIO(data)
-    img = pil.open(input_image_file)
+    img = pil.open(BytesIO(data) if isinstance(data, bytes) else data)
+    if draft_size:
+        img.draft('RGB', draft_size)
 
     # RGBA, A(투명도)를 포함한 PNG와 같은 파일이 올 경우, A를 제거하도록 변환함
     if img.mode != 'RGB':
         img = img.convert('RGB')
+    return img
+
 
-    if not force:
-        img.thumbnail((max_width, max_height), pil.ANTIALIAS)
+def _crop_to_ratio(img, width, height):
+    """
+    width:height 비율에 맞게 이미지를 crop
+    가로가 긴 경우 가운데를, 세로가 긴 경우 위쪽 1/3 지점을 기준으로 crop
+    """
+    src_width, src_height = img.size
+    src_ratio = float(src_width) / float(src_height)
+    dst_ratio = float(width) / float(height)
+
+    if dst_ratio < src_ratio:
+        crop_height = src_height
+        crop_width = crop_height * dst_ratio
+        x_offset = int(src_width - crop_width) // 2
+        y_offset = 0
     else:
-        src_width, src_height = img.size
-        src_ratio = float(src_width) / float(src_height)
-        dst_width, dst_height = max_width, max_height
-        dst_ratio = float(dst_width) / float(dst_height)
-
-        if dst_ratio < src_ratio:
-            crop_height = src_height
-            crop_width = crop_height * dst_ratio
-            x_offset = int(src_width - crop_width) // 2
-            y_offset = 0
-        else:
-            crop_width = src_width
-            crop_height = crop_width / dst_ratio
-            x_offset = 0
-            y_offset = int(src_height - crop_height) // 3
-        img = img.crop((x_offset, y_offset, x_offset + int(crop_width), y_offset + int(crop_height)))
-        img = img.resize((dst_width, dst_height), pil.ANTIALIAS)
+        crop_width = src_width
+        crop_height = crop_width / dst_ratio
+        x_offset = 0
+        y_offset = int(src_height - crop_height) // 3
+    return img.crop((x_offset, y_offset, x_offset + int(crop_width), y_offset + int(crop_height)))
+
 
+def _to_jpeg_file(img):
     output_image_file = BytesIO()
     img.save(output_image_file, 'JPEG')
     return output_image_file
+
+
+def rescale(data, width, height, force=True):
+    """
+
+    :param data: Image Byte Data 혹은 file object
+    :param width: 원하는 가로 길이
+    :param height: 원하는 세로 길이
+    :param force: True일 경우, 가로 세로 비율 맞게, False일 경우 max값에 맞게 thumbnail화
+    :return:
+    """
+    if force:
+        return rescale_multiple(data, [(width, height)])[0]
+
+    img = _open_image(data, draft_size=(width, height))
+    img.thumbnail((width, height), pil.ANTIALIAS)
+    return _to_jpeg_file(img)
+
+
+def rescale_multiple(data, sizes):
+    """
+    이미지를 한 번만 decode, crop 하여 여러 크기의 썸네일을 생성
+    큰 썸네일부터 만들고, 작은 썸네일은 바로 전 크기의 썸네일에서 resize 하여 생성
+
+    :param data: Image Byte Data 혹은 file object
+    :param sizes: [(width, height), ...] - 같은 비율의 썸네일 크기 list
+    :return: sizes 순서대로 JPEG 이미지가 담긴 BytesIO list
+    """
+    ordered_sizes = sorted(set(sizes), key=lambda size: size[0] * size[1], reverse=True)
+    img = _open_image(data, draft_size=ordered_sizes[0])
+
+    thumbnails = dict()
+    for width, height in ordered_sizes:
+        img = _crop_to_ratio(img, width, height)
+        img = img.resize((width, height), pil.ANTIALIAS)
+        thumbnails[(width, height)] = _to_jpeg_file(img)
+    return [thumbnails[size] for size in sizes]
@@ -0,0 +1,166 @@
+import base64
+import hashlib
+import logging
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from rest_framework import serializers
+
+from .image_resize import rescale
+from .representation_cache import invalidate_representations
+
+__all__ = (
+    'encode_image_key',
+    'decode_image_key',
+    'compute_image_digest',
+    'get_resized_image_url',
+    'get_resized_image',
+    'backfill_image_digests',
+    'ResizedImageField',
+)
+
+logger = logging.getLogger(__name__)
+
+_signer = signing.Signer(salt='utils.image_service')
+
+
+def encode_image_key(name, digest):
+    """
+    storage의 파일 name과 원본 내용의 digest를 서명하여 url에 사용할 수 있는 key로 변환
+    서명된 key만 허용하므로 임의의 파일을 resize 요청할 수 없으며,
+    원본 내용이 바뀌면 key(url)도 바뀌므로 resize 결과를 immutable로 cache 할 수 있음
+
+    :param name: 원본 이미지의 storage name
+    :param digest: 원본 이미지 내용의 sha1 hex digest
+    :return: urlsafe base64 string
+    """
+    signed = _signer.sign(f'{digest}:{name}')
+    return base64.urlsafe_b64encode(signed.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_image_key(key):
+    """
+    key를 원본 이미지의 storage name과 digest로 변환
+    잘못된 key일 경우 signing.BadSignature
+
+    :param key: encode_image_key 로 만든 key
+    :return: (storage name, digest)
+    """
+    try:
+        signed = base64.urlsafe_b64decode((key + '=' * (-len(key) % 4)).encode('ascii')).decode('utf-8')
+    except (ValueError, UnicodeError):
+        raise signing.BadSignature
+    digest, _, name = _signer.unsign(signed).partition(':')
+    return name, digest
+
+
+def compute_image_digest(data):
+    """
+    :param data: 원본 이미지 데이터
+    :return: sha1 hex digest
+    """
+    return hashlib.sha1(data).hexdigest()
+
+
+def get_resized_image_url(image, width, height, request=None, digest=None):
+    """
+    원본 이미지를 width x height 로 resize 한 이미지의 url
+    :param image: FieldFile 혹은 storage name
+    :param digest: 원본 내용의 digest - 모델에 저장된 값
+    :return: /img/<key>/<width>x<height>/, 이미지나 digest가 없을 경우 None
+    """
+    name = getattr(image, 'name', image)
+    if not name or not digest:
+        return None
+    key = encode_image_key(name, digest)
+    url = reverse('image-resize', kwargs={'key': key, 'width': width, 'height': height})
+    return request.build_absolute_uri(url) if request else url
+
+
+def _read(name):
+    with default_storage.open(name, 'rb') as image_file:
+        return image_file.read()
+
+
+def get_resized_image(name, width, height, digest):
+    """
+    원본 이미지를 width x height 로 resize 한 JPEG 데이터를 반환
+    resize 결과는 원본 내용의 digest를 key로 storage에 저장하여 같은 이미지/크기에 대해 한 번만 resize
+
+    :param name: 원본 이미지의 storage name
+    :param digest: url의 key에 담긴 원본 내용의 digest
+    :return: JPEG bytes, 원본 내용이 digest와 다를 경우(이미지가 교체된 이전 url) None
+    """
+    resized_name = f'{settings.IMAGE_RESIZE_CACHE_LOCATION}/{digest}/{width}x{height}.jpeg'
+    if default_storage.exists(resized_name):
+        return _read(resized_name)
+
+    data = _read(name)
+    if compute_image_digest(data) != digest:
+        return None
+    resized_data = rescale(data, width, height, force=True).getvalue()
+    default_storage.save(resized_name, ContentFile(resized_data))
+    return resized_data
+
+
+def backfill_image_digests(queryset, image_field='image', digest_field='image_digest'):
+    """
+    이미지는 있지만 digest_field가 비어있는(digest를 저장하기 이전에 업로드 된) row의 원본을 읽어 digest를 저장
+    serialize 할 때 storage를 읽지 않도록 배포 후 한 번 실행 (backfill_image_digests 명령)
+
+    :param queryset: backfill 할 model의 queryset
+    :return: (저장된 row 수, 원본을 읽지 못한 row 수)
+    """
+    model = queryset.model
+    rows = queryset.filter(**{digest_field: ''}).exclude(**{f'{image_field}__isnull': True}) \
+        .exclude(**{image_field: ''}).order_by('pk').values_list('pk', image_field)
+    updated, failed = 0, 0
+    for pk, name in rows.iterator():
+        try:
+            digest = compute_image_digest(_read(name))
+        except (IOError, OSError):
+            logger.warning('image digest: failed to read %s (%s %s)', name, model._meta.label, pk)
+            failed += 1
+            continue
+        # 그 사이에 이미지가 교체된 row는 save에서 저장된 digest를 유지
+        updated += model._base_manager.filter(**{'pk': pk, image_field: name, digest_field: ''}) \
+            .update(**{digest_field: digest})
+        invalidate_representations(model, [pk])
+    return updated, failed
+
+
+class ResizedImageField(serializers.Field):
+    """
+    image_field의 원본을 IMAGE_RESIZE_SIZES의 크기들로 resize 한 이미지 url
+    {'<width>x<height>': url, ...}, 이미지 혹은 저장된 digest가 없을 경우 None
+    url의 digest는 모델의 digest_field 값을 사용하므로 serialize 할 때 storage를 읽지 않음
+    max_size: 원본이 작게 저장되는 경우(ex. 토픽 이미지는 200x200) upscale 되지 않도록 그보다 큰 크기는 제외
+    """
+
+    def __init__(self, image_field='image', digest_field='image_digest', sizes=None, max_size=None, **kwargs):
+        self.image_field = image_field
+        self.digest_field = digest_field
+        self.sizes = sizes
+        self.max_size = max_size
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        digest = getattr(instance, self.digest_field, None)
+        if not getattr(image, 'name', image) or not digest:
+            return None
+        request = self.context.get('request')
+        sizes = self.sizes or settings.IMAGE_RESIZE_SIZES
+        if self.max_size:
+            max_width, max_height = self.max_size
+            sizes = [(width, height) for width, height in sizes if width <= max_width and height <= max_height]
+        return OrderedDict(
+            (f'{width}x{height}', get_resized_image_url(image, width, height, request=request, digest=digest))
+            for width, height in sizes
+        )
@@ -0,0 +1,210 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+__all__ = (
+    'KeysetPagination',
+)
+
+
+class KeysetPagination(BasePagination):
+    """
+    (정렬 필드, pk) 를 key로 하는 Keyset(Cursor) Pagination Class
+
+    OFFSET 없이 이전 페이지 마지막 객체의 (정렬 필드 값, pk) 보다 뒤에 있는 객체들을 가져오기 때문에
+    페이지 깊이와 상관없이 같은 비용이 들며, COUNT(*) 쿼리를 실행하지 않음
+
+    정렬 기준은 다음 순서로 결정
+    1. ordering query parameter (ordering_fields 에 있는 필드일 경우)
+    2. queryset 에 order_by 로 지정된 첫번째 필드 (FilterSet의 OrderingFilter 등)
+    3. pagination class 의 ordering
+
+    ?page= 가 올 경우 기존 클라이언트를 위해 PageNumberPagination으로 동작
+
+    queryset 대신 같은 model, 같은 정렬의 queryset list가 올 경우 각각 한 페이지씩 가져와 합침 (pk가 같은 객체는 하나만)
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    ordering_fields = ('modified_at', 'created_at')
+    ordering = '-created_at'
+
+    page_number_query_param = 'page'
+    page_number_pagination_class = PageNumberPagination
+
+    def __init__(self):
+        self.page_number_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number_paginator = None
+        querysets = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+        if self.page_number_query_param in request.query_params:
+            if len(querysets) > 1:
+                raise ParseError({"error": "page 대신 cursor로 요청해야 합니다."})
+            return self._paginate_by_page_number(querysets[0], request, view)
+
+        self.limit = self.get_page_size(request)
+        self.ordering_field = self.get_ordering(request, querysets[0])
+        self.cursor = self.decode_cursor(request)
+
+        field_name = self.ordering_field.lstrip('-')
+        descending = self.ordering_field.startswith('-')
+        # 이전 페이지를 가져올 경우 정렬 방향을 반대로 하여 가져온 뒤 결과를 뒤집음
+        if self.cursor and self.cursor['r']:
+            descending = not descending
+
+        results = []
+        for queryset in querysets:
+            queryset = queryset.order_by(*self._get_order_by(field_name, descending))
+            if self.cursor:
+                queryset = queryset.filter(self._get_keyset_filter(field_name, descending, self.cursor))
+            results.extend(queryset[:self.limit + 1])
+        if len(querysets) > 1:
+            results = self._merge(results, field_name, descending)
+
+        has_more = len(results) > self.limit
+        self.page = results[:self.limit]
+
+        if self.cursor and self.cursor['r']:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator:
+            return self.page_number_paginator.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('results', data),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_ordering(self, request, queryset):
+        """
+        Keyset의 기준이 될 정렬 필드를 반환 - 내림차순일 경우 '-' prefix
+        :param request:
+        :param queryset:
+        :return: '-created_at' 형태의 string
+        """
+        ordering = request.query_params.get(self.ordering_query_param)
+        if ordering and ordering.lstrip('-') in self.ordering_fields:
+            return ordering
+
+        order_by = queryset.query.order_by
+        if order_by and isinstance(order_by[0], str):
+            field_name = order_by[0].lstrip('-')
+            if '__' not in field_name or field_name in queryset.query.annotations:
+                return order_by[0]
+        return self.ordering
+
+    def _get_order_by(self, field_name, descending):
+        prefix = '-' if descending else ''
+        if field_name == 'pk':
+            return f'{prefix}pk',
+        return f'{prefix}{field_name}', f'{prefix}pk'
+
+    def _merge(self, results, field_name, descending):
+        """
+        여러 queryset에서 가져온 객체들을 (정렬 필드, pk) 순서로 합치고 pk가 같은 객체는 앞의 것만 남김
+        """
+        if field_name == 'pk':
+            key = lambda instance: instance.pk
+        else:
+            key = lambda instance: (getattr(instance, field_name), instance.pk)
+        merged, seen = [], set()
+        for instance in sorted(results, key=key, reverse=descending):
+            if instance.pk not in seen:
+                seen.add(instance.pk)
+                merged.append(instance)
+        return merged
+
+    def _get_keyset_filter(self, field_name, descending, cursor):
+        """
+        cursor 위치 이후의 객체들만 가져오는 조건 반환
+        (field, pk) 가 cursor의 (value, pk) 보다 뒤에 있는 객체
+        """
+        lookup = 'lt' if descending else 'gt'
+        if field_name == 'pk':
+            return Q(**{f'pk__{lookup}': cursor['pk']})
+        return Q(**{f'{field_name}__{lookup}': cursor['v']}) | \
+               Q(**{field_name: cursor['v'], f'pk__{lookup}': cursor['pk']})
+
+    def decode_cursor(self, request):
+        """
+        Base64로 인코딩된 cursor를 dict로 decode
+        cursor가 없을 경우 None, 잘못된 cursor이거나 현재 정렬 기준과 다른 cursor일 경우 ParseError
+        :param request:
+        :return: {'o': ordering, 'v': value, 'pk': pk, 'r': reverse}
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            assert cursor['o'] == self.ordering_field
+            assert isinstance(cursor['pk'], int)
+            cursor['r'] = bool(cursor.get('r'))
+        except (AssertionError, KeyError, TypeError, ValueError, UnicodeError, binascii.Error):
+            raise ParseError({"error": "잘못된 cursor 입니다."})
+        return cursor
+
+    def encode_cursor(self, instance, reverse):
+        """
+        instance의 (정렬 필드 값, pk)를 opaque한 cursor string으로 encode
+        """
+        value = getattr(instance, self.ordering_field.lstrip('-'))
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            value = value.isoformat()
+        cursor = {'o': self.ordering_field, 'v': value, 'pk': instance.pk, 'r': reverse}
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def _paginate_by_page_number(self, queryset, request, view):
+        """
+        ?page= 로 요청하는 기존 클라이언트를 위한 PageNumberPagination
+        """
+        self.page_number_paginator = self.page_number_pagination_class()
+        self.page_number_paginator.page_size = self.page_size
+        self.page_number_paginator.page_size_query_param = self.page_size_query_param
+        self.page_number_paginator.max_page_size = self.max_page_size
+        if not queryset.ordered:
+            ordering = self.ordering
+            queryset = queryset.order_by(*self._get_order_by(ordering.lstrip('-'), ordering.startswith('-')))
+        return self.page_number_paginator.paginate_queryset(queryset, request, view)
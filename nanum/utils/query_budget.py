@@ -0,0 +1,189 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+__all__ = (
+    'fingerprint_sql',
+    'QueryRecorder',
+    'QueryBudgetExceeded',
+    'QueryBudgetMiddleware',
+    'QueryBudgetTestMixin',
+)
+
+logger = logging.getLogger('nanum.query_budget')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint_sql(sql):
+    """
+    값만 다르고 모양이 같은 쿼리들이 같은 값을 가지도록 SQL의 literal을 ?로 바꿈
+    IN (1, 2, 3) 과 같은 list는 길이와 상관없이 (?...)로 바꿈
+
+    SELECT ... WHERE "id" = 3  ->  SELECT ... WHERE "id" = ?
+
+    :param sql: 실행된 SQL
+    :return: string
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(?...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """
+    블록 안에서 실행된 쿼리의 수, DB 시간, fingerprint 별 반복 횟수를 기록
+    Django debug cursor(connection.queries)를 사용하며, 블록이 끝나면 원래 설정으로 되돌림
+
+    with QueryRecorder() as recorder:
+        ...
+    recorder.count, recorder.duration, recorder.get_n_plus_one_suspects()
+    """
+
+    def __init__(self, using=None):
+        self.connections = [connections[using]] if using else connections.all()
+        self.queries = []
+
+    def __enter__(self):
+        self._states = []
+        for connection in self.connections:
+            self._states.append((connection, connection.force_debug_cursor, len(connection.queries_log)))
+            connection.force_debug_cursor = True
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed = time.perf_counter() - self.started_at
+        for connection, force_debug_cursor, start in self._states:
+            connection.force_debug_cursor = force_debug_cursor
+            queries_log = list(connection.queries_log)
+            self.queries.extend(queries_log[start:])
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        """
+        :return: DB에서 쿼리를 실행한 시간의 합(초)
+        """
+        return sum(float(query['time']) for query in self.queries)
+
+    def get_fingerprints(self):
+        return Counter(fingerprint_sql(query['sql']) for query in self.queries)
+
+    def get_n_plus_one_suspects(self, threshold=None):
+        """
+        같은 모양의 쿼리가 threshold번 이상 반복된 경우 N+1 의심 쿼리로 반환
+        :return: [(fingerprint, 반복 횟수), ...] - 반복 횟수 내림차순
+        """
+        if threshold is None:
+            threshold = getattr(settings, 'QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', 5)
+        return [
+            (fingerprint, count) for fingerprint, count in self.get_fingerprints().most_common()
+            if count >= threshold
+        ]
+
+
+class QueryBudgetMiddleware:
+    """
+    요청마다 실행된 쿼리 수, DB 시간, N+1 의심 쿼리를 기록하는 Middleware
+
+    - Server-Timing header: db(쿼리 수, DB 시간), app(전체 처리 시간)
+    - 'nanum.query_budget' logger에 JSON 한 줄로 기록
+    - view의 query_budget 속성 혹은 QUERY_BUDGETS[url name] 보다 쿼리가 많을 경우 warning,
+      QUERY_BUDGET_ENFORCE가 True일 경우(test) QueryBudgetExceeded
+
+    debug cursor로 모든 쿼리를 기록하므로 QUERY_BUDGET_ENABLED가 True인 환경(local, test)에서만 동작
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            return self.get_response(request)
+
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        view_name, budget = self.get_budget(request)
+        suspects = recorder.get_n_plus_one_suspects()
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+            f'app;dur={recorder.elapsed * 1000:.1f}',
+        ])
+
+        record = {
+            'event': 'query_budget',
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 1),
+            'total_ms': round(recorder.elapsed * 1000, 1),
+            'budget': budget,
+            'n_plus_one': [{'sql': fingerprint, 'count': count} for fingerprint, count in suspects],
+        }
+        over_budget = budget is not None and recorder.count > budget
+        if over_budget or suspects:
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+        if over_budget and getattr(settings, 'QUERY_BUDGET_ENFORCE', False):
+            raise QueryBudgetExceeded(
+                f'{view_name}: {recorder.count} queries (budget {budget})\n' +
+                '\n'.join(f'{count}x {fingerprint}' for fingerprint, count in recorder.get_fingerprints().most_common())
+            )
+        return response
+
+    def get_budget(self, request):
+        """
+        :return: (url name, 쿼리 budget 혹은 None)
+        """
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return None, None
+        view_name = resolver_match.view_name
+        view_class = getattr(resolver_match.func, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+        if budget is None:
+            budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        return view_name, budget
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase Mixin - 목록 API의 쿼리 수가 page size에 따라 늘어나지 않는지(N+1이 없는지) 확인
+    """
+
+    def assertQueriesDoNotScale(self, url, sizes=(2, 10), param='page_size'):
+        counts = []
+        for size in sizes:
+            separator = '&' if '?' in url else '?'
+            with QueryRecorder() as recorder:
+                response = self.client.get(f'{url}{separator}{param}={size}')
+            self.assertLess(response.status_code, 400, response.data)
+            counts.append((size, recorder.count, recorder.get_fingerprints()))
+
+        (small_size, small_count, _), (large_size, large_count, fingerprints) = counts[0], counts[-1]
+        if large_count > small_count:
+            repeated = '\n'.join(f'{count}x {fingerprint}' for fingerprint, count in fingerprints.most_common(5))
+            self.fail(f'{url}: page_size {small_size} -> {small_count} queries, '
+                      f'page_size {large_size} -> {large_count} queries\n{repeated}')
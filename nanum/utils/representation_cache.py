@@ -0,0 +1,280 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import prefetch_related_objects
+from django.db.transaction import on_commit
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+
+from .counters import BufferedCounterListSerializer
+
+__all__ = (
+    'LocalRepresentationCache',
+    'RedisRepresentationCache',
+    'get_representation_cache',
+    'invalidate_representation',
+    'invalidate_representations',
+    'CachedRepresentationListSerializer',
+    'CachedRepresentationSerializerMixin',
+)
+
+_cache = None
+_cache_config = None
+_cache_lock = threading.Lock()
+
+
+class LocalRepresentationCache:
+    """
+    process 메모리에 serialize 결과를 저장하는 LRU cache
+    key: (model label, pk), variant: (version, serializer, modified_at, base url) 별 serialize 결과
+
+    model의 save/delete에서 invalidate 되지만 다른 process의 cache는 지워지지 않으므로
+    Celery worker(CELERY_BROKER_URL)가 invalidate 하는 환경에서는 사용할 수 없음 - RedisRepresentationCache 사용
+    """
+    # 여러 process가 같은 cache를 사용하는지 여부
+    shared = False
+    # key 당 저장할 최대 variant 수
+    max_variants = 4
+
+    def __init__(self, timeout=3600, max_entries=10000, **kwargs):
+        self._timeout = timeout
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys, variant):
+        """
+        :param keys: (model label, pk) list
+        :return: {key: 저장된 serialize 결과}
+        """
+        now = time.monotonic()
+        found = dict()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, variants = entry
+                if expires_at < now:
+                    del self._entries[key]
+                    continue
+                if variant in variants:
+                    self._entries.move_to_end(key)
+                    found[key] = variants[variant]
+        return found
+
+    def set(self, key, variant, data):
+        with self._lock:
+            _, variants = self._entries.pop(key, (None, OrderedDict()))
+            variants[variant] = data
+            while len(variants) > self.max_variants:
+                variants.popitem(last=False)
+            self._entries[key] = (time.monotonic() + self._timeout, variants)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class RedisRepresentationCache:
+    """
+    Redis에 serialize 결과를 저장하는 cache - 여러 process가 같은 cache를 사용
+    (model label, pk) 마다 hash 하나에 variant 별 JSON을 저장하므로 invalidate는 DEL 한 번
+    """
+    shared = True
+    prefix = 'representation'
+
+    def __init__(self, timeout=3600, url=None, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('RedisRepresentationCache를 사용하려면 redis 패키지가 필요합니다.')
+        self._client = redis.StrictRedis.from_url(url or 'redis://localhost:6379/0')
+        self._timeout = timeout
+
+    def _key(self, key):
+        label, pk = key
+        return f'{self.prefix}:{label}:{pk}'
+
+    def get_many(self, keys, variant):
+        keys = list(keys)
+        pipeline = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.hget(self._key(key), variant)
+        return {
+            key: json.loads(value.decode('utf-8'), object_pairs_hook=OrderedDict)
+            for key, value in zip(keys, pipeline.execute())
+            if value is not None
+        }
+
+    def set(self, key, variant, data):
+        redis_key = self._key(key)
+        pipeline = self._client.pipeline(transaction=False)
+        pipeline.hset(redis_key, variant, json.dumps(data))
+        pipeline.expire(redis_key, self._timeout)
+        pipeline.execute()
+
+    def delete_many(self, keys):
+        keys = [self._key(key) for key in keys]
+        if keys:
+            self._client.delete(*keys)
+
+
+def get_representation_cache():
+    """
+    REPRESENTATION_CACHE_BACKEND 설정에 해당하는 cache를 반환
+    REPRESENTATION_CACHE_ENABLED가 False일 경우 None
+    CELERY_BROKER_URL이 있을 경우 worker process의 invalidate가 web process에 반영되어야 하므로 shared backend만 허용
+    """
+    global _cache, _cache_config
+    if not getattr(settings, 'REPRESENTATION_CACHE_ENABLED', False):
+        return None
+    config = (
+        getattr(settings, 'REPRESENTATION_CACHE_BACKEND', 'utils.representation_cache.LocalRepresentationCache'),
+        getattr(settings, 'REPRESENTATION_CACHE_TIMEOUT', 3600),
+        getattr(settings, 'REPRESENTATION_CACHE_MAX_ENTRIES', 10000),
+        getattr(settings, 'REPRESENTATION_CACHE_REDIS_URL', None),
+    )
+    backend, timeout, max_entries, url = config
+    backend_class = import_string(backend)
+    if not getattr(backend_class, 'shared', False) and getattr(settings, 'CELERY_BROKER_URL', None):
+        raise ImproperlyConfigured(
+            f'{backend_class.__name__}는 process 마다 따로 저장되므로 CELERY_BROKER_URL이 있을 경우 '
+            f'RedisRepresentationCache를 사용해야 합니다.')
+    with _cache_lock:
+        if _cache is None or _cache_config != config:
+            _cache = backend_class(timeout=timeout, max_entries=max_entries, url=url)
+            _cache_config = config
+    return _cache
+
+
+def invalidate_representations(model, pks):
+    """
+    model의 pks에 해당하는 cache된 serialize 결과를 transaction commit 이후에 모두 삭제
+    commit 전에 삭제하면 그 사이의 다른 요청이 변경 전의 값을 다시 cache 할 수 있음
+    pks는 cache를 사용할 때만 evaluate 됨 (queryset 가능)
+    """
+    label = model._meta.label
+
+    def delete():
+        cache = get_representation_cache()
+        if cache is not None:
+            cache.delete_many([(label, pk) for pk in pks])
+
+    on_commit(delete)
+
+
+def invalidate_representation(instance):
+    # delete() 이후에는 instance.pk가 None이 되므로 호출 시점의 pk를 사용
+    invalidate_representations(instance.__class__, [instance.pk])
+
+
+class CachedRepresentationListSerializer(BufferedCounterListSerializer):
+    """
+    many=True로 serialize 할 때 page 안의 객체들의 cache를 한 번에 가져와 child serializer에 전달
+    buffer에 쌓인 count delta도 BufferedCounterListSerializer가 한 번에 가져옴
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, 'all') else data
+        instances = list(iterable)
+        self.child.prefetch_representations(instances)
+        self.child.prefetch_uncached_related(instances)
+        try:
+            return super().to_representation(instances)
+        finally:
+            self.child.cached_representations = None
+
+
+class CachedRepresentationSerializerMixin:
+    """
+    viewer와 상관없는 serialize 결과를 (model, pk, modified_at) 단위로 cache 하는 Serializer Mixin
+    uncached_fields(추천 여부 등 viewer에 따라 다른 필드, queryset.update로 바뀌는 count 필드)는
+    cache 여부와 상관없이 요청마다 instance에서 다시 계산하여 합침
+    """
+    uncached_fields = ()
+    # cache 된 결과가 없는 instance를 serialize 할 때 필요한 관계 - page 단위로 한 번에 prefetch_related
+    uncached_prefetch_related = ()
+    # CachedRepresentationListSerializer가 채워주는 {(model label, pk): 저장된 serialize 결과}
+    cached_representations = None
+
+    def _get_variant(self, instance):
+        request = self.context.get('request')
+        base_url = request.build_absolute_uri('/') if request is not None else ''
+        return '|'.join([
+            str(getattr(settings, 'REPRESENTATION_CACHE_VERSION', 1)),
+            self.__class__.__name__,
+            instance.modified_at.isoformat(),
+            base_url,
+        ])
+
+    def _is_cacheable(self, instance):
+        return getattr(instance, 'pk', None) is not None and getattr(instance, 'modified_at', None) is not None
+
+    def prefetch_representations(self, instances):
+        """
+        instances의 cache된 serialize 결과를 variant 별로 한 번에 가져옴
+        """
+        cache = get_representation_cache()
+        self.cached_representations = dict()
+        if cache is None:
+            return
+        keys_by_variant = dict()
+        for instance in instances:
+            if self._is_cacheable(instance):
+                keys_by_variant.setdefault(self._get_variant(instance), []).append(
+                    (instance._meta.label, instance.pk))
+        for variant, keys in keys_by_variant.items():
+            self.cached_representations.update(
+                {(key, variant): data for key, data in cache.get_many(keys, variant).items()})
+
+    def prefetch_uncached_related(self, instances):
+        """
+        prefetch_representations 이후 cache 된 결과가 없는 instances의 uncached_prefetch_related 관계를 한 번에 가져옴
+        """
+        if not self.uncached_prefetch_related:
+            return
+        missing = [instance for instance in instances if not self._has_cached_representation(instance)]
+        if missing:
+            prefetch_related_objects(missing, *self.uncached_prefetch_related)
+
+    def _has_cached_representation(self, instance):
+        if not self.cached_representations or not self._is_cacheable(instance):
+            return False
+        return ((instance._meta.label, instance.pk), self._get_variant(instance)) in self.cached_representations
+
+    def to_representation(self, instance):
+        cache = get_representation_cache()
+        if cache is None or not self._is_cacheable(instance):
+            return super().to_representation(instance)
+
+        key, variant = (instance._meta.label, instance.pk), self._get_variant(instance)
+        if self.cached_representations is not None:
+            cached = self.cached_representations.get((key, variant))
+        else:
+            cached = cache.get_many([key], variant).get(key)
+
+        if cached is None:
+            data = super().to_representation(instance)
+            cache.set(key, variant, OrderedDict(
+                (name, value) for name, value in data.items() if name not in self.uncached_fields))
+            return data
+
+        # 필드 순서를 유지하며 uncached_fields만 다시 계산
+        data = OrderedDict()
+        for field in self._readable_fields:
+            if field.field_name not in self.uncached_fields:
+                data[field.field_name] = cached.get(field.field_name)
+                continue
+            attribute = field.get_attribute(instance)
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            data[field.field_name] = None if check_for_none is None else field.to_representation(attribute)
+        return data
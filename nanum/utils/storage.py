@@ -0,0 +1,30 @@
+__all__ = (
+    'delete_files',
+)
+
+
+def delete_files(storage, names, batch_size=1000):
+    """
+    storage에서 여러 파일을 삭제
+    S3Boto3Storage일 경우 DeleteObjects 요청 한 번에 batch_size 개씩 삭제하고,
+    그 외 storage는 파일마다 storage.delete를 호출
+
+    :param storage: Django Storage instance
+    :param names: 삭제할 파일 name list
+    :param batch_size: 한 번의 요청에 삭제할 파일 수 (S3 최대 1000)
+    :return: 삭제 요청한 파일 수
+    """
+    names = [name for name in names if name]
+    bucket = getattr(storage, 'bucket', None)
+    if bucket is None or not hasattr(storage, '_normalize_name'):
+        for name in names:
+            storage.delete(name)
+        return len(names)
+
+    keys = [storage._normalize_name(storage._clean_name(name)) for name in names]
+    for i in range(0, len(keys), batch_size):
+        bucket.delete_objects(Delete={
+            'Objects': [{'Key': key} for key in keys[i:i + batch_size]],
+            'Quiet': True,
+        })
+    return len(keys)
@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+__all__ = (
+    'run_task',
+    'run_task_in_background',
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def run_task(task, *args, **kwargs):
+    """
+    Celery broker가 설정되어 있을 경우 task를 worker에게 비동기로 전달하고,
+    broker가 없을 경우(local, travis 등) 현재 프로세스에서 동기적으로 실행
+
+    :param task: shared_task 로 등록된 Celery task
+    :return: AsyncResult 혹은 task의 반환값
+    """
+    if getattr(settings, 'CELERY_BROKER_URL', None):
+        return task.delay(*args, **kwargs)
+    return task(*args, **kwargs)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'TASK_RUNNER_THREAD_POOL_SIZE', 4))
+    return _executor
+
+
+def _run_and_close_connections(task, args, kwargs):
+    try:
+        return task(*args, **kwargs)
+    finally:
+        # thread마다 생성된 DB connection이 남지 않도록 정리
+        connections.close_all()
+
+
+def run_task_in_background(task, *args, **kwargs):
+    """
+    Celery broker가 설정되어 있을 경우 task를 worker에게 비동기로 전달하고,
+    broker가 없을 경우 현재 프로세스의 thread pool에서 실행하여 request를 막지 않음
+
+    :param task: shared_task 로 등록된 Celery task
+    :return: AsyncResult 혹은 Future
+    """
+    if getattr(settings, 'CELERY_BROKER_URL', None):
+        return task.delay(*args, **kwargs)
+    return _get_executor().submit(_run_and_close_connections, task, args, kwargs)